@@ -3,6 +3,7 @@
 Punto de entrada para la interfaz gráfica de AutoMount.
 """
 
+import argparse
 import shutil
 import sys
 import os
@@ -11,20 +12,16 @@ from pathlib import Path
 import tkinter as tk
 from tkinter import messagebox
 
-from automount_gui_app import AutoMountGUI, ensure_root
+from automount_gui_app import ensure_root
+from automount_gui_app.devices import SysfsBlockEnumerator
+from automount_gui_app.helper import connect_helper
+from automount_gui_app.tracing import TRACE_ENV, start_tracing, stop_tracing
 
-try:
-    from ttkthemes import ThemedTk
-except Exception:
-    ThemedTk = None
+# Se aplica después de mostrar la ventana; ttkthemes se importa en ese momento.
+THEME = "equilux"
 
 
 def create_root() -> tk.Tk:
-    if ThemedTk is not None:
-        try:
-            return ThemedTk(theme="equilux")
-        except Exception:
-            pass
     return tk.Tk()
 
 
@@ -57,18 +54,66 @@ def request_admin(script_path: Path) -> bool:
     return False
 
 
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Configura el montaje automático de unidades.")
+    parser.add_argument(
+        "--trace",
+        metavar="DIR",
+        default=os.environ.get(TRACE_ENV),
+        help=f"guarda trazas de tiempo (JSONL y Chrome) en DIR; también con la variable {TRACE_ENV}",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FICHERO",
+        nargs="?",
+        const="automount.prof",
+        help="ejecuta la sesión bajo cProfile y guarda las estadísticas (por omisión automount.prof)",
+    )
+    return parser.parse_args(argv)
+
+
+def run_session(helper=None) -> None:
+    from automount_gui_app.gui import AutoMountGUI
+
+    root = create_root()
+    AutoMountGUI(root, theme=THEME, helper=helper)
+    root.mainloop()
+
+
 def main() -> None:
+    args = parse_args()
     script_path = Path(__file__).resolve()
-    if not request_admin(script_path):
+    # Con el ayudante en marcha no hace falta relanzar la interfaz como root.
+    helper = connect_helper() if os.geteuid() != 0 else None
+    if helper is None and not request_admin(script_path):
         return
 
-    if not shutil.which("lsblk"):
-        print("Error: se requiere lsblk para ejecutar esta aplicación.", file=sys.stderr)
+    if not SysfsBlockEnumerator().available() and not shutil.which("lsblk"):
+        print("Error: se requiere /sys o lsblk para ejecutar esta aplicación.", file=sys.stderr)
         sys.exit(1)
 
-    root = create_root()
-    AutoMountGUI(root)
-    root.mainloop()
+    if args.trace:
+        base = start_tracing(Path(args.trace))
+        print(f"Trazas en {base}.jsonl y {base}.trace.json", file=sys.stderr)
+    try:
+        if args.profile:
+            import cProfile
+            import pstats
+
+            profiler = cProfile.Profile()
+            try:
+                profiler.runcall(run_session, helper)
+            finally:
+                profiler.dump_stats(args.profile)
+                pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(25)
+                print(f"Perfil guardado en {args.profile}", file=sys.stderr)
+        else:
+            run_session(helper)
+    finally:
+        if helper is not None:
+            helper.close()
+        if args.trace:
+            stop_tracing()
 
 
 if __name__ == "__main__":
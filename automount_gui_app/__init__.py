@@ -1,8 +1,18 @@
 """
 Paquete de soporte para la aplicación AutoMount GUI.
+
+`AutoMountGUI` se importa al pedirlo: así los módulos sin interfaz (devices,
+fstab, helper...) no cargan tkinter ni el resto de la GUI.
 """
 
-from .gui import AutoMountGUI
 from .system import ensure_root
 
 __all__ = ["AutoMountGUI", "ensure_root"]
+
+
+def __getattr__(name: str):
+    if name == "AutoMountGUI":
+        from .gui import AutoMountGUI
+
+        return AutoMountGUI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
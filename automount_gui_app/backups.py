@@ -0,0 +1,184 @@
+"""
+Almacén de respaldos de fstab direccionado por contenido.
+
+Cada versión se guarda una sola vez con el nombre de su hash SHA-256
+(opcionalmente comprimida con gzip); un índice JSON registra cuándo se tomó
+cada respaldo. Guardar un contenido ya conocido sólo añade una línea al
+índice, o nada si coincide con el último respaldo. La política de retención
+(cantidad y antigüedad) se aplica después de cada guardado.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from .constants import FSTAB_BACKUP_DIR, FSTAB_PATH
+from .journal import FstabJournal, atomic_write
+
+INDEX_NAME = "index.json"
+DEFAULT_KEEP_COUNT = 30
+DEFAULT_KEEP_DAYS = 180
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+@dataclass
+class BackupRecord:
+    """Entrada del índice de respaldos."""
+
+    digest: str
+    created: float
+    size: int
+    compressed: bool
+    source: str
+
+    @property
+    def short_digest(self) -> str:
+        return self.digest[:12]
+
+    @property
+    def created_text(self) -> str:
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.created))
+
+
+class FstabBackupStore:
+    """Respaldos deduplicados de fstab con retención configurable."""
+
+    def __init__(
+        self,
+        directory: Path = FSTAB_BACKUP_DIR,
+        compress: bool = True,
+        keep_count: Optional[int] = DEFAULT_KEEP_COUNT,
+        keep_days: Optional[float] = DEFAULT_KEEP_DAYS,
+    ) -> None:
+        self.directory = Path(directory)
+        self.compress = compress
+        self.keep_count = keep_count
+        self.keep_days = keep_days
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self) -> Path:
+        return self.directory / INDEX_NAME
+
+    def object_path(self, digest: str, compressed: bool) -> Path:
+        return self.directory / (f"{digest}.gz" if compressed else digest)
+
+    def _load_index(self) -> List[BackupRecord]:
+        try:
+            raw = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return []
+        except ValueError:
+            raise RuntimeError(f"El índice de respaldos {self.index_path} está dañado.") from None
+        return [BackupRecord(**item) for item in raw]
+
+    def _save_index(self, records: List[BackupRecord]) -> None:
+        atomic_write(self.index_path, json.dumps([asdict(record) for record in records], indent=1))
+
+    def list(self) -> List[BackupRecord]:
+        """Respaldos registrados, del más reciente al más antiguo."""
+        with self._lock:
+            return sorted(self._load_index(), key=lambda record: record.created, reverse=True)
+
+    def save(self, source: Path = FSTAB_PATH) -> BackupRecord:
+        """Respalda `source`; el contenido repetido no ocupa espacio adicional."""
+        source = Path(source)
+        data = source.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+            records = self._load_index()
+            latest = max(records, key=lambda record: record.created, default=None)
+            if latest is not None and latest.digest == digest and self._object_exists(latest):
+                return latest
+
+            existing = next((record for record in records if record.digest == digest and self._object_exists(record)), None)
+            compressed = existing.compressed if existing else self.compress
+            if existing is None:
+                self._write_object(digest, data, compressed)
+            record = BackupRecord(digest, time.time(), len(data), compressed, str(source))
+            records.append(record)
+            records = self._apply_retention(records)
+            self._save_index(records)
+            self._collect_garbage(records)
+            return record
+
+    def read(self, digest: str) -> bytes:
+        record = self.find(digest)
+        if record is None:
+            raise RuntimeError(f"No existe un respaldo con hash {digest}.")
+        raw = self.object_path(record.digest, record.compressed).read_bytes()
+        return gzip.decompress(raw) if record.compressed else raw
+
+    def find(self, digest: str) -> Optional[BackupRecord]:
+        """Busca un respaldo por hash completo o por prefijo único."""
+        matches = {record.digest: record for record in self.list() if record.digest.startswith(digest)}
+        if len(matches) > 1:
+            raise RuntimeError(f"El prefijo {digest} identifica más de un respaldo.")
+        return next(iter(matches.values()), None)
+
+    def restore(self, digest: str, target: Path = FSTAB_PATH) -> BackupRecord:
+        """Reemplaza `target` por el respaldo indicado, respaldando antes la versión actual."""
+        record = self.find(digest)
+        if record is None:
+            raise RuntimeError(f"No existe un respaldo con hash {digest}.")
+        data = self.read(record.digest).decode("utf-8")
+        if Path(target).exists():
+            self.save(target)
+        FstabJournal(target).commit(data, f"restaurar respaldo {record.short_digest}").finalize()
+        return record
+
+    def prune(self) -> int:
+        """Aplica la política de retención; devuelve cuántos registros se eliminaron."""
+        with self._lock:
+            records = self._load_index()
+            kept = self._apply_retention(records)
+            if len(kept) != len(records):
+                self._save_index(kept)
+            self._collect_garbage(kept)
+            return len(records) - len(kept)
+
+    def _apply_retention(self, records: List[BackupRecord]) -> List[BackupRecord]:
+        ordered = sorted(records, key=lambda record: record.created, reverse=True)
+        if self.keep_days is not None:
+            cutoff = time.time() - self.keep_days * SECONDS_PER_DAY
+            # El respaldo más reciente se conserva siempre, aunque sea antiguo.
+            ordered = ordered[:1] + [record for record in ordered[1:] if record.created >= cutoff]
+        if self.keep_count is not None:
+            ordered = ordered[:max(self.keep_count, 1)]
+        return sorted(ordered, key=lambda record: record.created)
+
+    def _object_exists(self, record: BackupRecord) -> bool:
+        return self.object_path(record.digest, record.compressed).exists()
+
+    def _write_object(self, digest: str, data: bytes, compressed: bool) -> None:
+        path = self.object_path(digest, compressed)
+        payload = gzip.compress(data, mtime=0) if compressed else data
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "wb") as tmp_file:
+            tmp_file.write(payload)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.chmod(tmp_path, 0o600)
+        os.rename(tmp_path, path)
+
+    def _collect_garbage(self, records: List[BackupRecord]) -> None:
+        referenced = {self.object_path(record.digest, record.compressed).name for record in records}
+        referenced.add(INDEX_NAME)
+        for path in self.directory.iterdir():
+            if path.name not in referenced and not path.name.startswith("."):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+
+__all__ = ["BackupRecord", "FstabBackupStore"]
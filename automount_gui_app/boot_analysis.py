@@ -0,0 +1,299 @@
+"""
+Análisis de las entradas de fstab que pueden retrasar o bloquear el arranque.
+
+Cruza /etc/fstab con la instantánea de dispositivos y estima, para cada
+entrada, cuánto puede esperar el arranque en el peor caso: el tiempo de espera
+del dispositivo si falta y no tiene nofail, la espera de red si un sistema de
+archivos remoto no lleva _netdev y la duración de fsck en discos grandes. Cada
+hallazgo propone una reescritura que puede aplicarse con un clic.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .constants import NETWORK_FILESYSTEMS, PROTECTED_MOUNTPOINTS, PSEUDO_FILESYSTEMS, SYSFS_ROOT
+from .devices import SourceIndex
+from .errors import StaleAnalysisError
+from .fstab import FstabDocument, FstabEntry, merge_options, normalize_mountpoint, split_source
+
+DEFAULT_DEVICE_TIMEOUT = 90.0
+FIX_DEVICE_TIMEOUT = "x-systemd.device-timeout=10s"
+NETWORK_WAIT = 90.0
+FSCK_SECONDS_PER_TIB = 300.0
+LARGE_FILESYSTEM_BYTES = 1 << 40
+SECTOR_SIZE = 512
+
+SEVERITY_HIGH = "alta"
+SEVERITY_MEDIUM = "media"
+SEVERITY_LOW = "baja"
+SEVERITY_ORDER = {SEVERITY_HIGH: 0, SEVERITY_MEDIUM: 1, SEVERITY_LOW: 2}
+
+SYSTEM_MOUNTPOINTS = {path.as_posix() for path in PROTECTED_MOUNTPOINTS} | {"/usr", "/var", "/home"}
+FSCK_FILESYSTEMS = {"ext2", "ext3", "ext4", "vfat", "exfat"}
+NOOP_FSCK_FILESYSTEMS = {"xfs", "btrfs"}
+UNSTABLE_NAME_TYPES = {"disk", "part"}
+TIME_UNITS = {"": 1.0, "s": 1.0, "sec": 1.0, "ms": 0.001, "min": 60.0, "m": 60.0, "h": 3600.0}
+
+
+@dataclass
+class BootFinding:
+    """Problema detectado en una entrada y la corrección propuesta."""
+
+    code: str
+    severity: str
+    message: str
+    delay: float = 0.0
+    add_options: Tuple[str, ...] = ()
+    changes: Dict[str, object] = field(default_factory=dict)
+
+    @property
+    def fixable(self) -> bool:
+        return bool(self.add_options or self.changes)
+
+
+@dataclass
+class EntryReport:
+    """Resultado del análisis de una entrada de fstab."""
+
+    entry: FstabEntry
+    findings: List[BootFinding]
+    device: Optional[str] = None
+
+    @property
+    def worst_delay(self) -> float:
+        return sum(finding.delay for finding in self.findings)
+
+    @property
+    def severity(self) -> Optional[str]:
+        if not self.findings:
+            return None
+        return min((finding.severity for finding in self.findings), key=SEVERITY_ORDER.__getitem__)
+
+    @property
+    def fixable(self) -> bool:
+        return any(finding.fixable for finding in self.findings)
+
+    def rewrite(self) -> Dict[str, object]:
+        """Cambios para `FstabDocument.modify` que aplican todas las correcciones."""
+        changes: Dict[str, object] = {}
+        additions: List[str] = []
+        for finding in self.findings:
+            changes.update(finding.changes)
+            additions.extend(finding.add_options)
+        if additions:
+            changes["options"] = merge_options(str(changes.get("options", self.entry.options)), additions)
+        return changes
+
+    def preview(self) -> str:
+        changes = self.rewrite()
+        if not changes:
+            return self.entry.render()
+        fields = {name: getattr(self.entry, name) for name in ("source", "mountpoint", "fstype", "options", "freq", "passno")}
+        fields.update(changes)
+        return FstabEntry(**fields).render()
+
+
+@dataclass
+class BootAnalysis:
+    """Informes de un análisis junto con el fstab y la generación de dispositivos analizados."""
+
+    document: FstabDocument
+    reports: List[EntryReport]
+    text: str
+    generation: int = 0
+
+
+def parse_timespan(value: str) -> Optional[float]:
+    """Interpreta un intervalo de systemd sencillo (`10`, `10s`, `2min`, `500ms`)."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([a-z]*)\s*", value)
+    if not match or match.group(2) not in TIME_UNITS:
+        return None
+    return float(match.group(1)) * TIME_UNITS[match.group(2)]
+
+
+def format_delay(seconds: float) -> str:
+    if seconds <= 0:
+        return "0 s"
+    if seconds < 120:
+        return f"{seconds:.0f} s"
+    return f"{seconds / 60:.1f} min"
+
+
+class BootAnalyzer:
+    """Evalúa el impacto en el arranque de cada entrada de fstab.
+
+    `snapshot` debe ofrecer `source_index()` (p. ej. `DeviceSnapshot`); sin él
+    no se comprueba si los dispositivos están conectados.
+    """
+
+    def __init__(self, snapshot=None, sysfs_root: Path = SYSFS_ROOT) -> None:
+        self.snapshot = snapshot
+        self.sysfs_root = Path(sysfs_root)
+
+    def analyze(self, document: FstabDocument) -> List[EntryReport]:
+        index = self._source_index()
+        reports = [self.analyze_entry(entry, index) for entry in document.entries()]
+        return sorted(
+            reports,
+            key=lambda report: (SEVERITY_ORDER.get(report.severity, 3), -report.worst_delay),
+        )
+
+    def analyze_entry(self, entry: FstabEntry, index: Optional[SourceIndex] = None) -> EntryReport:
+        index = index if index is not None else self._source_index()
+        options = set(entry.option_list)
+        findings: List[BootFinding] = []
+        if entry.fstype in PSEUDO_FILESYSTEMS or "noauto" in options:
+            return EntryReport(entry, findings)
+
+        mountpoint = normalize_mountpoint(entry.mountpoint)
+        is_system = mountpoint in SYSTEM_MOUNTPOINTS
+        is_network = entry.fstype in NETWORK_FILESYSTEMS or "_netdev" in options
+        lazy = "x-systemd.automount" in options
+        waits = "nofail" not in options and not lazy
+        device = None
+
+        if is_network:
+            if "_netdev" not in options and entry.fstype in NETWORK_FILESYSTEMS:
+                findings.append(BootFinding(
+                    "red-sin-netdev",
+                    SEVERITY_HIGH,
+                    "Sistema de archivos de red sin _netdev: se intentará montar antes de que haya red.",
+                    NETWORK_WAIT if waits else 0.0,
+                    ("_netdev",) + (() if is_system else ("nofail",)),
+                ))
+            elif waits and not is_system:
+                findings.append(BootFinding(
+                    "red-sin-nofail",
+                    SEVERITY_MEDIUM,
+                    "Si el servidor no responde, el arranque esperará al montaje de red.",
+                    NETWORK_WAIT,
+                    ("nofail",),
+                ))
+        else:
+            timeout = self._device_timeout(entry)
+            record, known = index.lookup(entry.source) if index is not None else (None, False)
+            device = record.get("name") if record else None
+            if known and record is None:
+                findings.append(BootFinding(
+                    "dispositivo-ausente",
+                    SEVERITY_HIGH if waits else SEVERITY_LOW,
+                    f"{entry.source} no está conectado: "
+                    + (
+                        f"el arranque esperará {format_delay(timeout)} y entrará en modo de emergencia."
+                        if waits
+                        else "se omitirá en el arranque."
+                    ),
+                    timeout if waits else 0.0,
+                    ("nofail", FIX_DEVICE_TIMEOUT) if waits and not is_system else (),
+                ))
+            elif waits and not is_system:
+                findings.append(BootFinding(
+                    "sin-nofail",
+                    SEVERITY_MEDIUM,
+                    f"Sin nofail: si la unidad falta, el arranque esperará {format_delay(timeout)} y fallará.",
+                    timeout,
+                    ("nofail", FIX_DEVICE_TIMEOUT),
+                ))
+            kind, _ = split_source(entry.source)
+            # Sólo los nombres del kernel (sda1, nvme0n1p2) cambian; /dev/mapper, /dev/<vg>/<lv> y by-id no.
+            if (
+                kind == "devnode"
+                and record is not None
+                and record.get("type") in UNSTABLE_NAME_TYPES
+                and entry.source[len("/dev/"):] in (record.get("name"), record.get("kname"))
+            ):
+                uuid = record.get("uuid")
+                findings.append(BootFinding(
+                    "nombre-inestable",
+                    SEVERITY_MEDIUM,
+                    f"{entry.source} puede cambiar de nombre entre arranques; conviene usar UUID.",
+                    changes={"source": f"UUID={uuid}"} if uuid else {},
+                ))
+            findings.extend(self._fsck_findings(entry, record, is_system))
+
+        return EntryReport(entry, findings, device)
+
+    def _fsck_findings(self, entry: FstabEntry, record: Optional[Dict], is_system: bool) -> List[BootFinding]:
+        if entry.passno <= 0:
+            return []
+        if entry.fstype in NOOP_FSCK_FILESYSTEMS:
+            return [BootFinding(
+                "fsck-inutil",
+                SEVERITY_LOW,
+                f"fsck no hace nada en {entry.fstype}; el pase {entry.passno} puede ser 0.",
+                changes={} if is_system else {"passno": 0},
+            )]
+        size = self._device_bytes(record.get("kname") or record["name"]) if record else None
+        if entry.fstype not in FSCK_FILESYSTEMS or size is None or size < LARGE_FILESYSTEM_BYTES:
+            return []
+        estimate = size / (1 << 40) * FSCK_SECONDS_PER_TIB
+        return [BootFinding(
+            "fsck-lento",
+            SEVERITY_LOW if is_system else SEVERITY_MEDIUM,
+            f"Un fsck completo de {size / (1 << 40):.1f} TiB puede tardar unos {format_delay(estimate)}.",
+            estimate,
+            changes={} if is_system else {"passno": 0},
+        )]
+
+    def _source_index(self) -> Optional[SourceIndex]:
+        return self.snapshot.source_index() if self.snapshot is not None else None
+
+    def _device_timeout(self, entry: FstabEntry) -> float:
+        for option in entry.option_list:
+            if option.startswith("x-systemd.device-timeout="):
+                value = parse_timespan(option.split("=", 1)[1])
+                if value is not None:
+                    return value
+        return DEFAULT_DEVICE_TIMEOUT
+
+    def _device_bytes(self, name: str) -> Optional[int]:
+        try:
+            sectors = (self.sysfs_root / "class" / "block" / name / "size").read_text().strip()
+            return int(sectors) * SECTOR_SIZE
+        except (OSError, ValueError):
+            return None
+
+
+def rematch_reports(document: FstabDocument, reports: Sequence[EntryReport]) -> List[EntryReport]:
+    """Asocia cada informe con la entrada de `document` que tiene su mismo origen y punto de montaje.
+
+    Lanza StaleAnalysisError si alguna ya no existe o aparece repetida.
+    """
+    matched = []
+    for report in reports:
+        candidates = [
+            entry for entry in document.find_mountpoint(report.entry.mountpoint) if entry.source == report.entry.source
+        ]
+        if len(candidates) != 1:
+            raise StaleAnalysisError(
+                f"La entrada {report.entry.source} {report.entry.mountpoint} cambió en /etc/fstab; vuelva a analizar."
+            )
+        matched.append(EntryReport(candidates[0], report.findings, report.device))
+    return matched
+
+
+def apply_rewrites(document: FstabDocument, reports: Sequence[EntryReport]) -> int:
+    """Aplica en `document` las correcciones de `reports`; devuelve cuántas entradas cambiaron."""
+    changed = 0
+    for report in reports:
+        changes = report.rewrite()
+        if changes:
+            document.modify(report.entry, **changes)
+            changed += 1
+    return changed
+
+
+__all__ = [
+    "BootAnalysis",
+    "BootAnalyzer",
+    "BootFinding",
+    "EntryReport",
+    "apply_rewrites",
+    "format_delay",
+    "parse_timespan",
+    "rematch_reports",
+]
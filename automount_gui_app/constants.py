@@ -5,6 +5,42 @@ Constantes compartidas para AutoMount GUI.
 from pathlib import Path
 
 FSTAB_PATH = Path("/etc/fstab")
+FSTAB_BACKUP_DIR = Path("/etc/fstab.backups")
 PROTECTED_MOUNTPOINTS = {Path("/"), Path("/boot"), Path("/boot/efi")}
 
-__all__ = ["FSTAB_PATH", "PROTECTED_MOUNTPOINTS"]
+# Tipos sin dispositivo de bloque detrás; el verificador y el análisis de arranque
+# los clasifican igual a partir de estos conjuntos.
+PSEUDO_FILESYSTEMS = {
+    "proc", "sysfs", "devpts", "tmpfs", "devtmpfs", "cgroup", "cgroup2", "securityfs", "debugfs",
+    "tracefs", "mqueue", "hugetlbfs", "configfs", "efivarfs", "binfmt_misc", "pstore", "ramfs", "overlay",
+}
+NETWORK_FILESYSTEMS = {
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "ceph", "glusterfs", "davfs", "fuse.sshfs", "sshfs", "9p", "afs",
+}
+
+SYSFS_ROOT = Path("/sys")
+UDEV_DATA_PATH = Path("/run/udev/data")
+MOUNTINFO_PATH = Path("/proc/self/mountinfo")
+SWAPS_PATH = Path("/proc/swaps")
+PARTITIONS_PATH = Path("/proc/partitions")
+SYSTEMD_UNIT_DIR = Path("/etc/systemd/system")
+SYSTEMD_RUNTIME_DIR = Path("/run/systemd/system")
+HELPER_SOCKET = Path("/run/automount/helper.sock")
+LOG_DIR = Path("/var/log/automount")
+
+__all__ = [
+    "FSTAB_PATH",
+    "FSTAB_BACKUP_DIR",
+    "PROTECTED_MOUNTPOINTS",
+    "PSEUDO_FILESYSTEMS",
+    "NETWORK_FILESYSTEMS",
+    "SYSFS_ROOT",
+    "UDEV_DATA_PATH",
+    "MOUNTINFO_PATH",
+    "SWAPS_PATH",
+    "PARTITIONS_PATH",
+    "SYSTEMD_UNIT_DIR",
+    "SYSTEMD_RUNTIME_DIR",
+    "HELPER_SOCKET",
+    "LOG_DIR",
+]
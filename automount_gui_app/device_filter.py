@@ -0,0 +1,317 @@
+"""
+Búsqueda incremental sobre los dispositivos para la barra de filtro.
+
+Las consultas combinan términos separados por espacios (todos deben cumplirse):
+
+    fs:ntfs size>1T label:backup mounted:no
+    sda -type:disk mp:/media uuid:69f3
+
+`campo:valor` busca por prefijo en los tokens del campo, `size` admite
+`> >= < <= =` con sufijos de lsblk (K, M, G, T...), `mounted:` acepta
+sí/no y un término sin campo busca por prefijo en todos los textos. Un `-`
+delante niega el término.
+
+`DeviceIndex` precalcula, por campo, la lista ordenada de tokens con los
+dispositivos que los contienen; un prefijo se resuelve con dos búsquedas
+binarias y el tamaño con una lista ordenada, así que cada pulsación no vuelve
+a recorrer las filas. Los resultados de cada término se guardan mientras el
+índice no cambie.
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import random
+import re
+import shlex
+import time
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .devices import human_size, parse_size
+
+FIELD_ALIASES = {
+    "name": "name",
+    "nombre": "name",
+    "fs": "fstype",
+    "fstype": "fstype",
+    "label": "label",
+    "etiqueta": "label",
+    "uuid": "uuid",
+    "type": "type",
+    "tipo": "type",
+    "mp": "mountpoint",
+    "mountpoint": "mountpoint",
+    "montaje": "mountpoint",
+    "size": "size",
+    "tamaño": "size",
+    "mounted": "mounted",
+    "montado": "mounted",
+}
+TEXT_FIELDS = {
+    "name": ("name", "kname"),
+    "fstype": ("fstype",),
+    "label": ("label",),
+    "uuid": ("uuid", "partuuid"),
+    "type": ("type",),
+    "mountpoint": ("mountpoint",),
+}
+ANY_FIELD = "*"
+YES_VALUES = {"si", "sí", "yes", "y", "s", "true", "1"}
+NO_VALUES = {"no", "n", "false", "0"}
+MAX_CACHED_TERMS = 512
+
+_TOKEN_SPLIT = re.compile(r"[^0-9a-záéíóúñü]+")
+
+
+@dataclass(frozen=True)
+class QueryTerm:
+    field: str
+    op: str
+    value: str
+    negate: bool = False
+
+
+@dataclass
+class DeviceQuery:
+    terms: List[QueryTerm] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+
+@dataclass
+class SearchResult:
+    """Claves que cumplen la consulta (None si no hay filtro) y errores de sintaxis."""
+
+    keys: Optional[FrozenSet[str]]
+    errors: List[str]
+
+
+def _tokens(value: str) -> Set[str]:
+    value = value.casefold()
+    tokens = {token for token in _TOKEN_SPLIT.split(value) if token}
+    tokens.add(value)
+    return tokens
+
+
+def parse_query(text: str) -> DeviceQuery:
+    """Divide la consulta en términos; los errores no impiden usar el resto."""
+    query = DeviceQuery()
+    try:
+        words = shlex.split(text)
+    except ValueError:
+        # Comillas sin cerrar mientras se escribe.
+        words = re.sub(r"[\"']", "", text).split()
+    for word in words:
+        negate = word.startswith("-") and len(word) > 1
+        if negate:
+            word = word[1:]
+        name, op, value = _split_term(word)
+        if name is None:
+            query.terms.append(QueryTerm(ANY_FIELD, ":", word.casefold(), negate))
+            continue
+        target = FIELD_ALIASES.get(name.casefold())
+        if target is None:
+            query.errors.append(f"Campo desconocido: {name}")
+            continue
+        if not value:
+            # Campo a medio escribir: todavía no filtra.
+            continue
+        if target == "size":
+            if parse_size(value) is None:
+                query.errors.append(f"Tamaño no válido: {value}")
+                continue
+        elif op != ":":
+            query.errors.append(f"El campo {name} sólo admite ':'")
+            continue
+        elif target == "mounted" and value.casefold() not in YES_VALUES | NO_VALUES:
+            query.errors.append(f"Valor no válido para {name}: {value} (use sí o no)")
+            continue
+        query.terms.append(QueryTerm(target, op, value.casefold(), negate))
+    return query
+
+
+def _split_term(word: str) -> Tuple[Optional[str], str, str]:
+    match = re.match(r"^([^\W\d][\w]*)(>=|<=|>|<|=|:)(.*)$", word)
+    if match is None:
+        return None, "", ""
+    return match.group(1), match.group(2), match.group(3)
+
+
+class DeviceIndex:
+    """Índice de prefijos y de tamaños sobre los dispositivos de la instantánea."""
+
+    def __init__(self, entries: Iterable[Tuple[str, Dict]] = ()) -> None:
+        self.keys: List[str] = []
+        self._tokens: Dict[str, List[str]] = {}
+        self._postings: Dict[str, List[Tuple[int, ...]]] = {}
+        self._sizes: List[Tuple[int, int]] = []
+        self._mounted: FrozenSet[int] = frozenset()
+        self._all: FrozenSet[int] = frozenset()
+        self._cache: Dict[QueryTerm, FrozenSet[int]] = {}
+        self.rebuild(entries)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def rebuild(self, entries: Iterable[Tuple[str, Dict]]) -> None:
+        by_field: Dict[str, Dict[str, List[int]]] = {name: {} for name in (*TEXT_FIELDS, ANY_FIELD)}
+        keys: List[str] = []
+        sizes: List[Tuple[int, int]] = []
+        mounted: Set[int] = set()
+        for row_id, (key, entry) in enumerate(entries):
+            keys.append(key)
+            for name, sources in TEXT_FIELDS.items():
+                for source in sources:
+                    value = entry.get(source)
+                    if not value:
+                        continue
+                    for token in _tokens(str(value)):
+                        by_field[name].setdefault(token, []).append(row_id)
+                        by_field[ANY_FIELD].setdefault(token, []).append(row_id)
+            size = parse_size(str(entry.get("size") or ""))
+            if size is not None:
+                sizes.append((size, row_id))
+            if entry.get("mountpoint"):
+                mounted.add(row_id)
+        self.keys = keys
+        self._tokens = {name: sorted(tokens) for name, tokens in by_field.items()}
+        self._postings = {
+            name: [tuple(sorted(set(by_field[name][token]))) for token in self._tokens[name]] for name in by_field
+        }
+        self._sizes = sorted(sizes)
+        self._mounted = frozenset(mounted)
+        self._all = frozenset(range(len(keys)))
+        self._cache = {}
+
+    def search(self, text: str) -> SearchResult:
+        query = parse_query(text)
+        if not query.terms:
+            return SearchResult(None, query.errors)
+        ids: Optional[FrozenSet[int]] = None
+        # Los términos más selectivos primero acotan antes la intersección.
+        for ids_term in sorted((self._term_ids(term) for term in query.terms), key=len):
+            ids = ids_term if ids is None else ids & ids_term
+            if not ids:
+                break
+        keys = self.keys
+        return SearchResult(frozenset(keys[row_id] for row_id in ids or ()), query.errors)
+
+    def _term_ids(self, term: QueryTerm) -> FrozenSet[int]:
+        cached = self._cache.get(term)
+        if cached is not None:
+            return cached
+        if term.field == "size":
+            ids = self._size_ids(term.op, parse_size(term.value) or 0)
+        elif term.field == "mounted":
+            ids = self._mounted if term.value in YES_VALUES else self._all - self._mounted
+        else:
+            ids = self._prefix_ids(term.field, term.value)
+        if term.negate:
+            ids = self._all - ids
+        if len(self._cache) >= MAX_CACHED_TERMS:
+            self._cache.clear()
+        self._cache[term] = ids
+        return ids
+
+    def _prefix_ids(self, name: str, prefix: str) -> FrozenSet[int]:
+        tokens = self._tokens[name]
+        start = bisect.bisect_left(tokens, prefix)
+        stop = bisect.bisect_left(tokens, prefix + "\uffff", start)
+        postings = self._postings[name]
+        if stop - start == 1:
+            return frozenset(postings[start])
+        ids: Set[int] = set()
+        for position in range(start, stop):
+            ids.update(postings[position])
+        return frozenset(ids)
+
+    def _size_ids(self, op: str, size: int) -> FrozenSet[int]:
+        sizes = self._sizes
+        low = bisect.bisect_left(sizes, (size, -1))
+        high = bisect.bisect_left(sizes, (size + 1, -1))
+        if op == ">":
+            selected = sizes[high:]
+        elif op == ">=":
+            selected = sizes[low:]
+        elif op == "<":
+            selected = sizes[:low]
+        elif op == "<=":
+            selected = sizes[:high]
+        else:
+            # "=" y ":" admiten el redondeo de lsblk: size:1T abarca de 0.95T a 1.05T.
+            low = bisect.bisect_left(sizes, (int(size * 0.95), -1))
+            high = bisect.bisect_left(sizes, (int(size * 1.05) + 1, -1))
+            selected = sizes[low:high]
+        return frozenset(row_id for _, row_id in selected)
+
+
+def synthetic_entries(count: int, seed: int = 0) -> List[Tuple[str, Dict]]:
+    rng = random.Random(seed)
+    filesystems = ("ext4", "xfs", "btrfs", "ntfs", "vfat", "exfat", "")
+    labels = ("backup", "datos", "media", "home", "scratch", "Backup-2023", "")
+    entries = []
+    for number in range(count):
+        name = f"sd{number // 8}p{number % 8 + 1}"
+        uuid = f"{rng.getrandbits(64):016x}"
+        mountpoint = f"/mnt/{name}" if rng.random() < 0.3 else ""
+        entry = {
+            "name": name,
+            "type": "part",
+            "fstype": rng.choice(filesystems),
+            "label": rng.choice(labels),
+            "uuid": uuid,
+            "size": human_size(rng.randint(1, 1 << 44)),
+            "mountpoint": mountpoint,
+        }
+        entries.append((f"{name}|{uuid}", entry))
+    return entries
+
+
+def _benchmark(count: int, query: str) -> None:
+    entries = synthetic_entries(count)
+    started = time.perf_counter()
+    index = DeviceIndex(entries)
+    print(f"{count} dispositivos: índice construido en {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    timings = []
+    for length in range(1, len(query) + 1):
+        started = time.perf_counter()
+        result = index.search(query[:length])
+        timings.append((time.perf_counter() - started, query[:length], result))
+    slowest = max(timings, key=lambda item: item[0])
+    total = sum(elapsed for elapsed, _, _ in timings)
+    last = timings[-1][2]
+    print(f"{len(timings)} pulsaciones de {query!r}: media {total / len(timings) * 1000:.3f} ms, "
+          f"máximo {slowest[0] * 1000:.3f} ms ({slowest[1]!r})")
+    print(f"Resultado final: {len(last.keys or ())} coincidencias")
+
+    started = time.perf_counter()
+    expected = sum(
+        1 for _, entry in entries
+        if entry["fstype"] == "ntfs" and (parse_size(entry["size"]) or 0) > 1 << 40
+        and "backup" in _tokens(entry["label"]) and not entry["mountpoint"]
+    )
+    print(f"Recorrido completo equivalente: {(time.perf_counter() - started) * 1000:.1f} ms, {expected} coincidencias")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Mide la búsqueda incremental sobre dispositivos sintéticos.")
+    parser.add_argument("--dispositivos", type=int, default=10000)
+    parser.add_argument("--consulta", default="fs:ntfs size>1T label:backup mounted:no")
+    options = parser.parse_args(argv)
+    _benchmark(options.dispositivos, options.consulta)
+
+
+__all__ = [
+    "DeviceIndex",
+    "DeviceQuery",
+    "FIELD_ALIASES",
+    "QueryTerm",
+    "SearchResult",
+    "parse_query",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,435 @@
+"""
+Tabla de dispositivos con desplazamiento virtual para equipos con miles de nodos.
+
+`RowStore` guarda las filas por columnas y mantiene la vista (orden y filtro)
+como un array de índices: ordenar o filtrar no toca ningún widget. `DeviceTable`
+pinta esa vista en un ttk.Treeview; con pocas filas las inserta todas, y por
+encima de `VIRTUAL_THRESHOLD` sólo inserta las que caben en pantalla y mueve
+esa ventana al desplazarse (la barra de desplazamiento refleja la vista
+completa). Los cambios de la ventana se aplican con `tree_sync`, así que
+bajar una fila cuesta un borrado y una inserción, y las etiquetas de filas
+alternas sólo se corrigen en las filas visibles.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import re
+import time
+from array import array
+from tkinter import TclError
+from typing import AbstractSet, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .devices import parse_size
+from .tree_sync import CountingTree, TreeRow, apply_plan, plan_tree, restripe, synthetic_rows
+
+VIRTUAL_THRESHOLD = 1000
+SORT_ARROWS = {False: " ▲", True: " ▼"}
+
+RowMatcher = Callable[[str, Tuple[str, ...]], bool]
+
+
+def _natural_key(text: str):
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", text)]
+
+
+def _size_key(text: str):
+    size = parse_size(text) if text else None
+    return -1 if size is None else size
+
+
+SORT_KEYS: Dict[str, Callable[[str], object]] = {"name": _natural_key, "size": _size_key}
+
+
+class RowStore:
+    """Filas de una tabla guardadas por columnas, con una vista ordenada y filtrada."""
+
+    def __init__(self, columns: Sequence[str]) -> None:
+        self.columns = tuple(columns)
+        self.sort_column: Optional[str] = None
+        self.descending = False
+        self._keys: List[str] = []
+        self._data: List[List[str]] = [[] for _ in self.columns]
+        self._sort_keys: Dict[str, List] = {}
+        self._matcher: Optional[RowMatcher] = None
+        self._visible_keys: Optional[AbstractSet[str]] = None
+        self._highlight: AbstractSet[str] = frozenset()
+        self._row_index: Dict[str, int] = {}
+        self._view = array("l")
+        self._positions: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+    @property
+    def total(self) -> int:
+        return len(self._keys)
+
+    def load(self, rows: Sequence[TreeRow]) -> None:
+        """Reemplaza el contenido; se conservan el orden y el filtro activos."""
+        self._keys = [row.key for row in rows]
+        self._row_index = {key: index for index, key in enumerate(self._keys)}
+        self._data = [list(column) for column in zip(*(row.values for row in rows))] or [[] for _ in self.columns]
+        self._sort_keys = {}
+        self._update_view()
+
+    def sort(self, column: Optional[str], descending: bool = False) -> None:
+        self.sort_column = column
+        self.descending = descending
+        self._update_view()
+
+    def set_filter(self, matcher: Optional[RowMatcher]) -> None:
+        """Deja en la vista sólo las filas para las que `matcher(clave, valores)` es verdadero."""
+        self._matcher = matcher
+        self._update_view()
+
+    def set_visible_keys(self, keys: Optional[AbstractSet[str]]) -> None:
+        """Deja en la vista sólo `keys` (p. ej. el resultado de un índice); None las muestra todas.
+
+        A diferencia de `set_filter`, el coste depende del número de claves y no del de filas.
+        """
+        self._visible_keys = keys
+        self._update_view()
+
+    def set_highlight(self, keys: AbstractSet[str]) -> None:
+        """Marca con la etiqueta "match" las filas de `keys`."""
+        self._highlight = keys
+
+    def _update_view(self) -> None:
+        indices = range(len(self._keys))
+        if self._visible_keys is not None:
+            row_index = self._row_index
+            indices = sorted(row_index[key] for key in self._visible_keys if key in row_index)
+        if self._matcher is not None:
+            matcher, keys = self._matcher, self._keys
+            indices = [index for index in indices if matcher(keys[index], self.values(index))]
+        if self.sort_column is not None:
+            sort_keys = self._column_sort_keys(self.sort_column)
+            indices = sorted(indices, key=sort_keys.__getitem__, reverse=self.descending)
+        self._view = array("l", indices)
+        self._positions = None
+
+    def _column_sort_keys(self, column: str) -> List:
+        cached = self._sort_keys.get(column)
+        if cached is None:
+            convert = SORT_KEYS.get(column, str.casefold)
+            cached = self._sort_keys[column] = [convert(value) for value in self._data[self.columns.index(column)]]
+        return cached
+
+    def values(self, index: int) -> Tuple[str, ...]:
+        return tuple(column[index] for column in self._data)
+
+    def key_at(self, position: int) -> str:
+        return self._keys[self._view[position]]
+
+    def row_at(self, position: int) -> TreeRow:
+        index = self._view[position]
+        key = self._keys[index]
+        # La etiqueta de fila alterna depende de la posición en pantalla; la pone `DeviceTable`.
+        return TreeRow(key, self.values(index), ("match",) if key in self._highlight else ())
+
+    def position(self, key: str) -> Optional[int]:
+        """Posición de `key` en la vista, o None si está filtrada o no existe."""
+        if self._positions is None:
+            keys = self._keys
+            self._positions = {keys[index]: position for position, index in enumerate(self._view)}
+        return self._positions.get(key)
+
+    def view_values(self) -> List[Tuple[str, ...]]:
+        return [self.values(index) for index in self._view]
+
+
+class DeviceTable:
+    """Muestra un `RowStore` en un ttk.Treeview, virtualizando por encima de `threshold` filas."""
+
+    def __init__(
+        self,
+        tree,
+        scrollbar,
+        columns: Sequence[str],
+        headings: Sequence[str],
+        threshold: int = VIRTUAL_THRESHOLD,
+    ) -> None:
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.store = RowStore(columns)
+        self.headings = dict(zip(columns, headings))
+        self.threshold = threshold
+        self.virtual = False
+        self.first = 0
+        self._rendered: List[TreeRow] = []
+        self._stripes: Dict[str, str] = {}
+        self._selected: List[str] = []
+        self._key_filter: Tuple[Optional[AbstractSet[str]], bool] = (None, False)
+        for column in columns:
+            tree.heading(column, text=self.headings[column], command=lambda name=column: self.toggle_sort(name))
+        tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        tree.bind("<Configure>", lambda _e: self.virtual and self.render(), add="+")
+        tree.bind("<MouseWheel>", lambda e: self.scroll(-3 if e.delta > 0 else 3), add="+")
+        tree.bind("<Button-4>", lambda _e: self.scroll(-3), add="+")
+        tree.bind("<Button-5>", lambda _e: self.scroll(3), add="+")
+        tree.bind("<Up>", lambda _e: self._move_focus(-1), add="+")
+        tree.bind("<Down>", lambda _e: self._move_focus(1), add="+")
+        tree.bind("<Prior>", lambda _e: self._move_focus(-self._visible_rows()), add="+")
+        tree.bind("<Next>", lambda _e: self._move_focus(self._visible_rows()), add="+")
+        self._set_virtual(False)
+
+    # --- Datos -----------------------------------------------------------
+
+    def set_rows(self, rows: Sequence[TreeRow]) -> None:
+        self.store.load(rows)
+        self._selected = [key for key in self._selected if self.store.position(key) is not None]
+        self.render()
+
+    def toggle_sort(self, column: str) -> None:
+        descending = self.store.sort_column == column and not self.store.descending
+        self.store.sort(column, descending)
+        for name, text in self.headings.items():
+            arrow = SORT_ARROWS[descending] if name == column else ""
+            self.tree.heading(name, text=text + arrow)
+        self.render()
+
+    def set_filter(self, matcher: Optional[RowMatcher]) -> None:
+        self.store.set_filter(matcher)
+        self.first = 0
+        self.render()
+
+    def set_visible_keys(self, keys: Optional[AbstractSet[str]], highlight: bool = False) -> None:
+        """Filtra por un conjunto de claves; con `highlight` las muestra todas y resalta esas."""
+        if (keys, highlight) == self._key_filter:
+            return
+        self._key_filter = (keys, highlight)
+        self.store.set_highlight(keys if highlight and keys is not None else frozenset())
+        self.store.set_visible_keys(None if highlight else keys)
+        self.first = 0
+        self.render()
+
+    def view_values(self) -> List[Tuple[str, ...]]:
+        """Valores de todas las filas de la vista, estén o no pintadas."""
+        return self.store.view_values()
+
+    # --- Selección -------------------------------------------------------
+
+    def selection(self) -> Tuple[str, ...]:
+        """Claves seleccionadas en el orden de la vista, incluidas las que no están pintadas."""
+        if not self.virtual:
+            return tuple(self.tree.selection())
+        positions = (self.store.position(key) for key in self._selected)
+        return tuple(self.store.key_at(position) for position in sorted(p for p in positions if p is not None))
+
+    def selection_set(self, *keys: str) -> None:
+        self._selected = list(keys)
+        self.tree.selection_set([key for key in keys if self.tree.exists(key)])
+
+    def set_selectmode(self, mode: str) -> None:
+        self.tree.configure(selectmode=mode)
+        selection = self.selection()
+        if mode == "browse" and len(selection) > 1:
+            self.selection_set(selection[0])
+
+    def _on_select(self, _event=None) -> None:
+        shown = set(self.tree.selection())
+        if not self.virtual:
+            self._selected = list(shown)
+            return
+        if str(self.tree.cget("selectmode")) == "browse" and shown:
+            self._selected = list(shown)
+            return
+        # Lo seleccionado fuera de la ventana pintada se conserva.
+        rendered = {row.key for row in self._rendered}
+        self._selected = [key for key in self._selected if key not in rendered] + sorted(shown)
+
+    # --- Pintado ---------------------------------------------------------
+
+    def _set_virtual(self, virtual: bool) -> None:
+        self.virtual = virtual
+        if virtual:
+            self.tree.configure(yscrollcommand="")
+            self.scrollbar.configure(command=self._on_scrollbar)
+        else:
+            self.first = 0
+            self.tree.configure(yscrollcommand=self._on_tree_scroll)
+            self.scrollbar.configure(command=self.tree.yview)
+
+    def _on_tree_scroll(self, first: str, last: str) -> None:
+        """yscrollcommand del modo normal: mueve la barra y corrige las filas que entran en pantalla."""
+        self.scrollbar.set(first, last)
+        self._restripe_visible(float(first), float(last))
+
+    def _restripe_visible(self, first: float, last: float) -> None:
+        count = len(self._rendered)
+        window = range(max(0, int(first * count)), min(count, math.ceil(last * count) + 1))
+        restripe(self.tree, self._rendered, self._stripes, window)
+
+    def _visible_rows(self) -> int:
+        height = self.tree.winfo_height()
+        if height <= 1:
+            return int(self.tree.cget("height"))
+        style = str(self.tree.cget("style")) or "Treeview"
+        try:
+            rowheight = int(self.tree.tk.call("ttk::style", "lookup", style, "-rowheight") or 20)
+        except (ValueError, TclError):
+            rowheight = 20
+        # La cabecera ocupa aproximadamente una fila.
+        return max(1, height // rowheight - 1)
+
+    def render(self) -> None:
+        """Pinta la vista completa o, en modo virtual, sólo la ventana visible."""
+        count = len(self.store)
+        virtual = count > self.threshold
+        if virtual != self.virtual:
+            self._set_virtual(virtual)
+        if virtual:
+            visible = self._visible_rows()
+            self.first = max(0, min(self.first, count - visible))
+            window = range(self.first, min(count, self.first + visible))
+        else:
+            window = range(count)
+        rows = [self.store.row_at(position) for position in window]
+        apply_plan(self.tree, plan_tree(self._rendered, rows), self._stripes, window.start)
+        self._rendered = rows
+        if not virtual:
+            self._restripe_visible(*self.tree.yview())
+        else:
+            # La ventana pintada es exactamente lo visible; la paridad sigue la posición en la vista.
+            restripe(self.tree, rows, self._stripes, range(len(rows)), window.start)
+            shown = [key for key in self._selected if self.tree.exists(key)]
+            if set(shown) != set(self.tree.selection()):
+                self.tree.selection_set(shown)
+            if count:
+                self.scrollbar.set(self.first / count, window.stop / count)
+            else:
+                self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, rows: int) -> Optional[str]:
+        """Desplaza la ventana `rows` filas; en modo normal deja actuar a Tk."""
+        if not self.virtual:
+            return None
+        self.first += rows
+        self.render()
+        return "break"
+
+    def _on_scrollbar(self, action: str, value: str, unit: Optional[str] = None) -> None:
+        if action == "moveto":
+            self.first = int(float(value) * len(self.store))
+            self.render()
+        elif action == "scroll":
+            step = self._visible_rows() if unit == "pages" else 1
+            self.scroll(int(value) * step)
+
+    def _move_focus(self, step: int) -> Optional[str]:
+        """Flechas y avance de página que cruzan el borde de la ventana pintada."""
+        if not self.virtual or not len(self.store):
+            return None
+        focus = self.tree.focus()
+        current = self.store.position(focus) if focus else None
+        target = max(0, min(len(self.store) - 1, (self.first if current is None else current) + step))
+        visible = self._visible_rows()
+        if target < self.first:
+            self.first = target
+        elif target >= self.first + visible:
+            self.first = target - visible + 1
+        key = self.store.key_at(target)
+        self._selected = [key]
+        self.render()
+        self.tree.focus(key)
+        self.tree.selection_set(key)
+        return "break"
+
+
+class _BenchTree(CountingTree):
+    """Tabla simulada con el resto de la interfaz de ttk.Treeview que usa `DeviceTable`."""
+
+    def __init__(self, height: int = 30) -> None:
+        super().__init__()
+        self.options = {"height": height, "selectmode": "browse", "style": "Treeview"}
+        self._selection: Tuple[str, ...] = ()
+
+    def heading(self, *_args, **_kwargs) -> None:
+        pass
+
+    def bind(self, *_args, **_kwargs) -> None:
+        pass
+
+    def configure(self, **options) -> None:
+        self.options.update(options)
+
+    def cget(self, name: str):
+        return self.options[name]
+
+    def winfo_height(self) -> int:
+        return 1
+
+    def exists(self, key: str) -> bool:
+        return key in self.items
+
+    def selection(self) -> Tuple[str, ...]:
+        return tuple(key for key in self._selection if key in self.items)
+
+    def selection_set(self, keys) -> None:
+        self._selection = (keys,) if isinstance(keys, str) else tuple(keys)
+
+    def focus(self, key: Optional[str] = None) -> str:
+        return ""
+
+    def yview(self, *_args) -> Tuple[float, float]:
+        # Sin ventana real: se toma la altura de la tabla como lo visible.
+        count = len(self.children)
+        return (0.0, min(1.0, self.options["height"] / count)) if count else (0.0, 1.0)
+
+    def set(self, *_args) -> None:
+        pass
+
+
+def _benchmark(count: int, repeat: int) -> None:
+    rows = synthetic_rows(count)
+    columns = ("name", "size", "type", "fstype", "mountpoint")
+    print(f"{count} particiones, {repeat} repeticiones")
+    print(f"{'paso':<26}{'completa':>24}{'virtual':>24}")
+    steps: List[Tuple[str, Callable[[DeviceTable], None]]] = [
+        ("carga inicial", lambda table: table.set_rows(rows)),
+        ("ordenar por tamaño", lambda table: table.toggle_sort("size")),
+        ("bajar una fila", lambda table: table.scroll(1)),
+        ("bajar una página", lambda table: table.scroll(30)),
+        ("filtrar (1 de cada 4)", lambda table: table.set_filter(lambda _key, values: values[0].endswith("p1"))),
+        ("quitar el filtro", lambda table: table.set_filter(None)),
+    ]
+    results: Dict[str, Dict[str, Tuple[int, float]]] = {label: {} for label, _ in steps}
+    for mode, threshold in (("completa", count + 1), ("virtual", 0)):
+        for _ in range(repeat):
+            tree = _BenchTree()
+            table = DeviceTable(tree, tree, columns, columns, threshold=threshold)
+            for label, step in steps:
+                tree.calls = 0
+                started = time.perf_counter()
+                step(table)
+                elapsed = time.perf_counter() - started
+                calls, total = results[label].get(mode, (0, 0.0))
+                results[label][mode] = (tree.calls, total + elapsed)
+    for label, _ in steps:
+        line = f"{label:<26}"
+        for mode in ("completa", "virtual"):
+            calls, total = results[label][mode]
+            line += f"{calls:>8} llamadas {total / repeat * 1000:7.1f} ms"
+        print(line)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compara la tabla completa con la tabla virtual.")
+    parser.add_argument("--particiones", type=int, default=20000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    options = parser.parse_args(argv)
+    _benchmark(options.particiones, options.repeticiones)
+
+
+__all__ = [
+    "DeviceTable",
+    "RowStore",
+    "SORT_KEYS",
+    "VIRTUAL_THRESHOLD",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,524 @@
 """
-Funciones auxiliares para obtener información de lsblk.
+Funciones auxiliares para enumerar dispositivos de bloque.
+
+El backend principal lee sysfs y la base de datos de udev directamente; lsblk
+queda como respaldo cuando sysfs no está disponible.
 """
 
 from __future__ import annotations
 
+import hashlib
 import json
-from typing import Dict, Iterable, Iterator, List
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Callable, Collection, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from .constants import MOUNTINFO_PATH, PARTITIONS_PATH, SWAPS_PATH, SYSFS_ROOT, UDEV_DATA_PATH
+from .fstab import split_source
+from .mounttable import get_mount_table, unescape_mount_field
+from .probe import FilesystemInfo, probe_device
 from .system import run_cmd
+from .tracing import span
+
+LSBLK_COLUMNS = "NAME,KNAME,MAJ:MIN,SIZE,TYPE,FSTYPE,MOUNTPOINT,UUID,PARTUUID,LABEL"
+
+SECTOR_SIZE = 512
+RAMDISK_MAJOR = 1
+SIZE_SUFFIXES = "BKMGTPE"
+DM_UUID_TYPES = {"mpath": "mpath", "LVM": "lvm", "CRYPT": "crypt"}
+MAX_HOLDER_DEPTH = 16
+
+
+def _read_attr(path: Path) -> Optional[str]:
+    try:
+        return path.read_text(encoding="utf-8", errors="replace").strip()
+    except OSError:
+        return None
+
+
+def human_size(num_bytes: int) -> str:
+    """Formatea un tamaño en bytes igual que la columna SIZE de lsblk."""
+    exp = 0
+    for shift in range(10, 70, 10):
+        if num_bytes < (1 << shift):
+            exp = shift - 10
+            break
+    suffix = SIZE_SUFFIXES[exp // 10]
+    if not exp:
+        return f"{num_bytes}{suffix}"
+
+    whole = num_bytes >> exp
+    frac = num_bytes & ((1 << exp) - 1)
+    tenths = 0
+    if frac:
+        tenths = ((frac * 1000 >> exp) + 50) // 100
+        if tenths == 10:
+            whole += 1
+            tenths = 0
+    if tenths:
+        return f"{whole}.{tenths}{suffix}"
+    return f"{whole}{suffix}"
+
+
+def parse_size(text: str) -> Optional[int]:
+    """Inverso aproximado de `human_size`: "931.5G" (o "931,5G") en bytes."""
+    text = text.strip().upper().replace(",", ".")
+    if not text:
+        return None
+    exp = SIZE_SUFFIXES.find(text[-1]) if not text[-1].isdigit() else 0
+    number = text[:-1] if not text[-1].isdigit() else text
+    if exp < 0:
+        return None
+    try:
+        return int(float(number) * (1 << (10 * exp)))
+    except ValueError:
+        return None
+
+
+class SysfsBlockEnumerator:
+    """Construye el árbol de dispositivos de bloque sin lanzar lsblk."""
+
+    def __init__(
+        self,
+        sysfs_root: Path = SYSFS_ROOT,
+        udev_data_path: Path = UDEV_DATA_PATH,
+        mountinfo_path: Path = MOUNTINFO_PATH,
+        swaps_path: Path = SWAPS_PATH,
+    ) -> None:
+        self.sysfs_root = Path(sysfs_root)
+        self.udev_data_path = Path(udev_data_path)
+        self.mountinfo_path = Path(mountinfo_path)
+        self.swaps_path = Path(swaps_path)
+
+    @property
+    def class_block(self) -> Path:
+        return self.sysfs_root / "class" / "block"
+
+    def available(self) -> bool:
+        return self.class_block.is_dir()
+
+    def device_exists(self, name: str) -> bool:
+        """Comprueba si existe un dispositivo por nombre de kernel o nombre dm."""
+        if "/" not in name and (self.class_block / name).exists():
+            return True
+        return name in self.dm_names().values()
 
-LSBLK_COLUMNS = "NAME,SIZE,TYPE,FSTYPE,MOUNTPOINT"
+    def dm_names(self) -> Dict[str, str]:
+        """Relaciona cada nodo device-mapper (dm-N) con su nombre legible."""
+        names = {}
+        for name_file in self.class_block.glob("dm-*/dm/name"):
+            name = _read_attr(name_file)
+            if name:
+                names[name_file.parent.parent.name] = name
+        return names
 
+    def describe(self, names: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """Devuelve el registro (sin hijos) de cada nombre de kernel indicado."""
+        mounts = self._read_mountpoints()
+        records: Dict[str, Optional[Dict]] = {}
+        for kname in names:
+            sys_dir = self.class_block / kname
+            records[kname] = self._build_record(sys_dir, mounts, depth=0, with_children=False) if sys_dir.exists() else None
+        return records
 
-def load_block_devices() -> List[Dict]:
+    def load(self) -> List[Dict]:
+        """Devuelve la lista de dispositivos con la misma forma que `lsblk -J`."""
+        mounts = self._read_mountpoints()
+        block_root = self.sysfs_root / "block"
+        top_level = []
+        for entry in sorted(block_root.iterdir(), key=lambda path: _natural_key(path.name)):
+            if any((entry / "slaves").glob("*")):
+                # Igual que lsblk: los dispositivos apilados se muestran bajo sus esclavos.
+                continue
+            record = self._build_record(entry, mounts, depth=0)
+            if record is not None:
+                top_level.append(record)
+        return top_level
+
+    def _build_record(
+        self, sys_dir: Path, mounts: Dict[str, str], depth: int, with_children: bool = True
+    ) -> Optional[Dict]:
+        kname = sys_dir.name
+        dev = _read_attr(sys_dir / "dev") or ""
+        major = dev.split(":", 1)[0]
+        if major == str(RAMDISK_MAJOR):
+            return None
+        if kname.startswith("loop") and not (sys_dir / "loop").is_dir():
+            return None
+
+        sectors = _read_attr(sys_dir / "size")
+        size = int(sectors) * SECTOR_SIZE if sectors and sectors.isdigit() else 0
+        name = _read_attr(sys_dir / "dm" / "name") or kname
+        udev = self._read_udev(dev)
+
+        record: Dict = {
+            "name": name,
+            "kname": kname,
+            "maj:min": dev,
+            "size": human_size(size),
+            "type": self._device_type(sys_dir, kname),
+            "fstype": udev.get("ID_FS_TYPE") or None,
+            "mountpoint": mounts.get(dev) or mounts.get(f"/dev/{kname}") or mounts.get(f"/dev/mapper/{name}"),
+            "uuid": udev.get("ID_FS_UUID") or None,
+            "partuuid": udev.get("ID_PART_ENTRY_UUID") or None,
+            "label": udev.get("ID_FS_LABEL") or None,
+        }
+
+        children = []
+        if with_children and depth < MAX_HOLDER_DEPTH:
+            for part_dir in sorted(sys_dir.iterdir(), key=lambda path: _natural_key(path.name)):
+                if (part_dir / "partition").is_file():
+                    child = self._build_record(part_dir, mounts, depth + 1)
+                    if child is not None:
+                        children.append(child)
+            for holder in sorted((sys_dir / "holders").glob("*"), key=lambda path: _natural_key(path.name)):
+                child = self._build_record(self.class_block / holder.name, mounts, depth + 1)
+                if child is not None:
+                    children.append(child)
+        if children:
+            record["children"] = children
+        return record
+
+    def _device_type(self, sys_dir: Path, kname: str) -> str:
+        if (sys_dir / "partition").is_file():
+            return "part"
+        dm_uuid = _read_attr(sys_dir / "dm" / "uuid")
+        if dm_uuid is not None:
+            prefix = dm_uuid.split("-", 1)[0]
+            if prefix.startswith("part"):
+                return "part"
+            return DM_UUID_TYPES.get(prefix, "dm")
+        if kname.startswith("loop"):
+            return "loop"
+        level = _read_attr(sys_dir / "md" / "level")
+        if level:
+            return level
+        if _read_attr(sys_dir / "device" / "type") == "5":
+            return "rom"
+        return "disk"
+
+    def _read_udev(self, dev: str) -> Dict[str, str]:
+        properties: Dict[str, str] = {}
+        if not dev:
+            return properties
+        try:
+            with (self.udev_data_path / f"b{dev}").open("r", encoding="utf-8", errors="replace") as udev_file:
+                for line in udev_file:
+                    if line.startswith("E:") and "=" in line:
+                        key, value = line[2:].rstrip("\n").split("=", 1)
+                        properties[key] = value
+        except OSError:
+            pass
+        return properties
+
+    def _read_mountpoints(self) -> Dict[str, str]:
+        """Indexa el primer punto de montaje por major:minor y por ruta de origen."""
+        mounts: Dict[str, str] = {}
+        try:
+            entries = get_mount_table(self.mountinfo_path).entries()
+        except OSError:
+            entries = []
+        for entry in entries:
+            if entry.root == "/":
+                mounts.setdefault(entry.majmin, entry.mountpoint)
+            mounts.setdefault(entry.source, entry.mountpoint)
+        try:
+            with self.swaps_path.open("r", encoding="utf-8", errors="replace") as swaps:
+                next(swaps, None)
+                for line in swaps:
+                    fields = line.split()
+                    if fields:
+                        mounts.setdefault(unescape_mount_field(fields[0]), "[SWAP]")
+        except OSError:
+            pass
+        return mounts
+
+
+def _natural_key(name: str):
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+
+def load_block_devices_lsblk() -> List[Dict]:
     """Devuelve la salida de lsblk parseada en JSON."""
     data = run_cmd(["lsblk", "-J", "-o", LSBLK_COLUMNS])
     parsed = json.loads(data)
     return parsed.get("blockdevices", [])
 
 
-def flatten_lsblk(devices: Iterable[Dict]) -> Iterator[Dict]:
-    """Itera productos de lsblk, incluyendo hijos."""
+def load_block_devices(enumerator: Optional[SysfsBlockEnumerator] = None) -> List[Dict]:
+    """Devuelve el árbol de dispositivos, leyendo sysfs o, si no es posible, lsblk."""
+    enumerator = enumerator or SysfsBlockEnumerator()
+    with span("load_block_devices") as step:
+        if enumerator.available():
+            try:
+                devices = enumerator.load()
+                step.set(source="sysfs", devices=len(devices))
+                return devices
+            except OSError:
+                pass
+        devices = load_block_devices_lsblk()
+        step.set(source="lsblk", devices=len(devices))
+        return devices
+
+
+def device_exists(name: str, enumerator: Optional[SysfsBlockEnumerator] = None) -> bool:
+    """Indica si el dispositivo sigue presente en el sistema."""
+    enumerator = enumerator or SysfsBlockEnumerator()
+    if enumerator.available():
+        return enumerator.device_exists(name)
+    available_names = [
+        entry.lstrip("├─└─│ ")
+        for entry in run_cmd(["lsblk", "-ln", "-o", "NAME"]).splitlines()
+    ]
+    return name in available_names
+
+
+def flatten_lsblk(devices: Iterable[Dict], types: Optional[Collection[str]] = ("disk", "part")) -> Iterator[Dict]:
+    """Itera productos de lsblk, incluyendo hijos; con `types=None` no filtra por tipo."""
     for dev in devices:
-        if dev.get("type") in {"disk", "part"}:
+        if types is None or dev.get("type") in types:
             yield dev
-        for child in flatten_lsblk(dev.get("children") or []):
+        for child in flatten_lsblk(dev.get("children") or [], types):
             yield child
 
 
+SNAPSHOT_INDEXES = ("name", "uuid", "partuuid", "label", "mountpoint")
+SOURCE_FIELDS = ("uuid", "partuuid", "label")
+
+
+class SourceIndex:
+    """Resuelve orígenes de fstab contra todos los dispositivos de bloque.
+
+    Los índices de `DeviceSnapshot` sólo guardan discos y particiones (lo que
+    muestran las tablas); éste incluye también volúmenes LVM, LUKS, md y dm.
+    Un origen que no aparece sólo se da por ausente si tampoco existe su nodo
+    o su enlace de udev en /dev.
+    """
+
+    def __init__(self, entries: Iterable[Dict] = (), dev_root: Path = Path("/dev")) -> None:
+        self.dev_root = Path(dev_root)
+        self._by_name: Dict[str, Dict] = {}
+        self._by_field: Dict[str, Dict[str, Dict]] = {field: {} for field in SOURCE_FIELDS}
+        for entry in entries:
+            for name in (entry.get("name"), entry.get("kname")):
+                if name:
+                    self._by_name.setdefault(name, entry)
+            for field in SOURCE_FIELDS:
+                value = entry.get(field)
+                if value:
+                    self._by_field[field].setdefault(value if field == "label" else value.lower(), entry)
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def get(self, name: str) -> Optional[Dict]:
+        """Registro por nombre (nombre dm incluido) o nombre de kernel."""
+        return self._by_name.get(name)
+
+    def lookup(self, spec: str) -> Tuple[Optional[Dict], bool]:
+        """Devuelve (registro del dispositivo, si se pudo determinar su presencia).
+
+        (None, True) significa que el dispositivo no está conectado; (None, False)
+        que no se puede saber: orígenes que no son de bloque o un nodo que existe
+        pero todavía no figura en la instantánea.
+        """
+        kind, value = split_source(spec)
+        if kind == "devnode":
+            return self._lookup_devnode(value)
+        if kind not in self._by_field:
+            return None, False
+        record = self._by_field[kind].get(value if kind == "label" else value.lower())
+        if record is not None:
+            return record, True
+        return self._lookup_devnode(f"/dev/disk/by-{kind}/{value}")
+
+    def _lookup_devnode(self, path: str) -> Tuple[Optional[Dict], bool]:
+        relative = path[len("/dev/"):]
+        record = self._by_name.get(relative[len("mapper/"):] if relative.startswith("mapper/") else relative)
+        if record is not None:
+            return record, True
+        local = self.dev_root / relative
+        if os.path.islink(local):
+            # /dev/<vg>/<lv>, /dev/mapper/..., /dev/disk/by-*/...: el destino es el nodo del kernel (dm-N, sdXN).
+            record = self._by_name.get(os.path.basename(os.path.realpath(local)))
+            if record is not None:
+                return record, True
+        if os.path.exists(local):
+            return None, False
+        return None, True
+
+
+def _build_indexes(entries: Iterable[Dict]) -> Dict[str, Dict[str, Dict]]:
+    indexes: Dict[str, Dict[str, Dict]] = {field: {} for field in SNAPSHOT_INDEXES}
+    for entry in entries:
+        for field in SNAPSHOT_INDEXES:
+            value = entry.get(field)
+            if value:
+                indexes[field].setdefault(value, entry)
+    return indexes
+
+
+class DeviceSnapshot:
+    """Caché compartida de dispositivos, indexada y con contador de generación.
+
+    La generación avanza con `invalidate()` (p. ej. desde el vigilante de hotplug)
+    o cuando cambia el contenido de /proc/partitions; cualquier consulta sobre una
+    instantánea obsoleta recarga los dispositivos antes de responder.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], List[Dict]] = load_block_devices,
+        partitions_path: Path = PARTITIONS_PATH,
+    ) -> None:
+        self.loader = loader
+        self.partitions_path = Path(partitions_path)
+        self.generation = 0
+        self._loaded_generation = -1
+        self._partitions_digest: Optional[bytes] = None
+        self._entries: List[Dict] = []
+        self._indexes: Dict[str, Dict[str, Dict]] = {field: {} for field in SNAPSHOT_INDEXES}
+        self._devices: List[Dict] = []
+        self._source_index = SourceIndex()
+        self._lock = threading.RLock()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.generation += 1
+
+    def _read_partitions_digest(self) -> Optional[bytes]:
+        try:
+            return hashlib.blake2b(self.partitions_path.read_bytes(), digest_size=16).digest()
+        except OSError:
+            return None
+
+    def is_stale(self) -> bool:
+        with self._lock:
+            if self._loaded_generation != self.generation:
+                return True
+            digest = self._read_partitions_digest()
+            if digest != self._partitions_digest:
+                self.generation += 1
+                return True
+            return False
+
+    def refresh(self) -> List[Dict]:
+        """Recarga los dispositivos y reconstruye los índices."""
+        with self._lock, span("snapshot.refresh") as step:
+            generation = self.generation
+            digest = self._read_partitions_digest()
+            devices = self.loader()
+            entries = list(flatten_lsblk(devices))
+            self._devices = devices
+            self._entries = entries
+            self._indexes = _build_indexes(entries)
+            self._source_index = SourceIndex(flatten_lsblk(devices, types=None))
+            self._partitions_digest = digest
+            self._loaded_generation = generation
+            step.set(entries=len(entries))
+            return list(entries)
+
+    def refresh_devices(self, names: Iterable[str], enumerator: Optional[SysfsBlockEnumerator] = None) -> None:
+        """Vuelve a leer sólo los dispositivos `names` (p. ej. tras montar uno).
+
+        El registro se reemplaza en su posición y no avanza la generación, así
+        que el resto de la caché sigue vigente. Si no hay sysfs, la caché usa
+        otro cargador o algún dispositivo ya no existe, se recarga todo.
+        """
+        enumerator = enumerator or SysfsBlockEnumerator()
+        with self._lock, span("snapshot.refresh_devices") as step:
+            records: Dict[str, Optional[Dict]] = {}
+            current: List[Dict] = []
+            if self.loader is load_block_devices and enumerator.available() and not self.is_stale():
+                current = [self._indexes["name"].get(name) for name in names]
+                if current and None not in current:
+                    records = enumerator.describe(entry.get("kname") or entry["name"] for entry in current)
+            if not records or None in records.values():
+                step.set(full=True)
+                self.refresh()
+                return
+            for entry in current:
+                record = records[entry.get("kname") or entry["name"]]
+                children = entry.get("children")
+                entry.clear()
+                entry.update(record)
+                if children:
+                    entry["children"] = children
+            self._indexes = _build_indexes(self._entries)
+            self._source_index = SourceIndex(flatten_lsblk(self._devices, types=None))
+            step.set(full=False, devices=len(current))
+
+    def entries(self) -> List[Dict]:
+        with self._lock:
+            if self.is_stale():
+                return self.refresh()
+            return list(self._entries)
+
+    def find(self, field: str, value: str) -> Optional[Dict]:
+        """Busca un dispositivo por nombre, UUID, PARTUUID, etiqueta o punto de montaje."""
+        with self._lock:
+            if self.is_stale():
+                self.refresh()
+            return self._indexes[field].get(value)
+
+    def index(self, field: str) -> Dict[str, Dict]:
+        """Copia del índice `field`, tras comprobar una sola vez que la caché esté vigente."""
+        with self._lock:
+            if self.is_stale():
+                self.refresh()
+            return dict(self._indexes[field])
+
+    def source_index(self) -> SourceIndex:
+        """Índice de orígenes de fstab sobre todos los tipos de dispositivo (ver `SourceIndex`)."""
+        with self._lock:
+            if self.is_stale():
+                self.refresh()
+            return self._source_index
+
+    def get(self, name: str) -> Optional[Dict]:
+        return self.find("name", name)
+
+    def identifiers(
+        self, name: str, probe: Callable[[str], Optional[FilesystemInfo]] = probe_device
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Devuelve (UUID, FSTYPE), sondeando el dispositivo sólo si la caché no los tiene.
+
+        `probe` lee el superbloque; sin privilegios puede ser el del ayudante.
+        """
+        with self._lock:
+            entry = self.get(name)
+            if entry is not None and entry.get("uuid") and entry.get("fstype"):
+                return entry["uuid"], entry["fstype"]
+        info = probe(f"/dev/{name}")
+        if info is None:
+            return None, None
+        with self._lock:
+            if entry is not None:
+                entry["uuid"], entry["fstype"] = info.uuid, info.fstype
+                entry["label"] = entry.get("label") or info.label
+                if info.uuid:
+                    self._indexes["uuid"].setdefault(info.uuid, entry)
+                if info.label:
+                    self._indexes["label"].setdefault(info.label, entry)
+        return info.uuid, info.fstype
+
+
 def list_partition_entries() -> List[Dict]:
     """Retorna únicamente las entradas de tipo partición."""
     return [entry for entry in flatten_lsblk(load_block_devices()) if entry.get("type") == "part"]
 
 
-__all__ = ["load_block_devices", "flatten_lsblk", "list_partition_entries"]
+__all__ = [
+    "DeviceSnapshot",
+    "SourceIndex",
+    "SysfsBlockEnumerator",
+    "human_size",
+    "parse_size",
+    "load_block_devices",
+    "load_block_devices_lsblk",
+    "device_exists",
+    "flatten_lsblk",
+    "list_partition_entries",
+]
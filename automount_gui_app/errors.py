@@ -0,0 +1,32 @@
+"""
+Excepciones compartidas por los módulos de montaje.
+"""
+
+
+class NTFSUnsupportedError(RuntimeError):
+    """Error especializado cuando falta soporte NTFS en el sistema."""
+
+
+class MountBusyError(RuntimeError):
+    """El punto de montaje está en uso y el kernel rechazó el desmontaje."""
+
+
+class CommandTimeoutError(RuntimeError):
+    """Un comando externo no terminó dentro del tiempo permitido y se detuvo."""
+
+
+class OperationCancelledError(RuntimeError):
+    """El usuario canceló una operación en cola antes de una de sus etapas."""
+
+
+class StaleAnalysisError(RuntimeError):
+    """/etc/fstab o los dispositivos cambiaron desde el análisis que se quiere aplicar."""
+
+
+__all__ = [
+    "CommandTimeoutError",
+    "MountBusyError",
+    "NTFSUnsupportedError",
+    "OperationCancelledError",
+    "StaleAnalysisError",
+]
@@ -0,0 +1,289 @@
+"""
+Ejecución de montajes y desmontajes.
+
+El backend preferido llama directamente a mount(2) y umount2(2) mediante
+ctypes con las opciones ya analizadas de la entrada de fstab. Cuando el tipo
+de sistema de archivos necesita un ayudante de espacio de usuario
+(/sbin/mount.<tipo>, p. ej. ntfs-3g), cuando no se ejecuta como root o cuando
+libc no está disponible se recurre a los comandos mount/umount.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from .errors import MountBusyError, NTFSUnsupportedError
+from .fstab import FstabEntry, split_source
+from .system import get_runner, run_cmd
+from .tracing import span
+
+MS_RDONLY = 1
+MS_NOSUID = 2
+MS_NODEV = 4
+MS_NOEXEC = 8
+MS_SYNCHRONOUS = 16
+MS_REMOUNT = 32
+MS_MANDLOCK = 64
+MS_DIRSYNC = 128
+MS_NOATIME = 1024
+MS_NODIRATIME = 2048
+MS_BIND = 4096
+MS_REC = 16384
+MS_SILENT = 32768
+MS_RELATIME = 1 << 21
+MS_STRICTATIME = 1 << 24
+MS_LAZYTIME = 1 << 25
+
+MNT_FORCE = 1
+MNT_DETACH = 2
+
+# opción -> (bits a activar, bits a desactivar)
+FLAG_OPTIONS = {
+    "ro": (MS_RDONLY, 0),
+    "rw": (0, MS_RDONLY),
+    "nosuid": (MS_NOSUID, 0),
+    "suid": (0, MS_NOSUID),
+    "nodev": (MS_NODEV, 0),
+    "dev": (0, MS_NODEV),
+    "noexec": (MS_NOEXEC, 0),
+    "exec": (0, MS_NOEXEC),
+    "sync": (MS_SYNCHRONOUS, 0),
+    "async": (0, MS_SYNCHRONOUS),
+    "mand": (MS_MANDLOCK, 0),
+    "nomand": (0, MS_MANDLOCK),
+    "dirsync": (MS_DIRSYNC, 0),
+    "noatime": (MS_NOATIME, 0),
+    "atime": (0, MS_NOATIME),
+    "nodiratime": (MS_NODIRATIME, 0),
+    "diratime": (0, MS_NODIRATIME),
+    "relatime": (MS_RELATIME, 0),
+    "norelatime": (0, MS_RELATIME),
+    "strictatime": (MS_STRICTATIME, 0),
+    "nostrictatime": (0, MS_STRICTATIME),
+    "lazytime": (MS_LAZYTIME, 0),
+    "nolazytime": (0, MS_LAZYTIME),
+    "silent": (MS_SILENT, 0),
+    "loud": (0, MS_SILENT),
+    "remount": (MS_REMOUNT, 0),
+    "bind": (MS_BIND, 0),
+    "rbind": (MS_BIND | MS_REC, 0),
+    "defaults": (0, 0),
+    # Igual que mount(8): user/users implican noexec,nosuid,nodev salvo que se indique lo contrario después.
+    "user": (MS_NOEXEC | MS_NOSUID | MS_NODEV, 0),
+    "users": (MS_NOEXEC | MS_NOSUID | MS_NODEV, 0),
+    "owner": (MS_NOSUID | MS_NODEV, 0),
+    "group": (MS_NOSUID | MS_NODEV, 0),
+}
+# Opciones que sólo interpretan mount(8), systemd o fsck; no llegan al kernel.
+USERSPACE_OPTIONS = {"auto", "noauto", "nouser", "nofail", "_netdev", "noowner", "nogroup"}
+USERSPACE_PREFIXES = ("x-", "comment=", "helper=")
+
+ERRNO_MESSAGES = {
+    errno.ENODEV: "unknown filesystem type '{fstype}'",
+    errno.ENOENT: "mount point or device does not exist",
+    errno.ENOTBLK: "{source} is not a block device",
+    errno.EBUSY: "target is busy",
+    errno.EINVAL: "wrong fs type, bad option, bad superblock on {source}, missing codepage or helper program",
+    errno.EACCES: "permission denied",
+    errno.EPERM: "must be superuser to use mount",
+    errno.EROFS: "{source} is write-protected",
+    errno.ENXIO: "{source} does not exist",
+}
+
+
+def parse_mount_options(options: str) -> Tuple[int, str]:
+    """Traduce las opciones de fstab a banderas MS_* y la cadena de datos del sistema de archivos."""
+    flags = 0
+    data: List[str] = []
+    for option in options.split(","):
+        if not option or option in USERSPACE_OPTIONS or option.startswith(USERSPACE_PREFIXES):
+            continue
+        if option in FLAG_OPTIONS:
+            set_bits, clear_bits = FLAG_OPTIONS[option]
+            flags = (flags | set_bits) & ~clear_bits
+        else:
+            data.append(option)
+    return flags, ",".join(data)
+
+
+def format_mount_error(err: int, fstype: str, source: str, target: str) -> str:
+    template = ERRNO_MESSAGES.get(err)
+    message = template.format(fstype=fstype, source=source, target=target) if template else os.strerror(err)
+    return f"mount: {target}: {message}."
+
+
+class LibcSyscalls:
+    """Llamadas reales a mount(2) y umount2(2)."""
+
+    def __init__(self) -> None:
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError(errno.ENOSYS, "libc no disponible")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._libc.mount.argtypes = (ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_ulong, ctypes.c_void_p)
+        self._libc.umount2.argtypes = (ctypes.c_char_p, ctypes.c_int)
+
+    def mount(self, source: str, target: str, fstype: str, flags: int, data: str) -> None:
+        data_bytes = data.encode() if data else None
+        if self._libc.mount(source.encode(), target.encode(), fstype.encode(), flags, data_bytes) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def umount2(self, target: str, flags: int) -> None:
+        if self._libc.umount2(target.encode(), flags) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+
+class RecordingSyscalls:
+    """Backend simulado: registra las llamadas y puede devolver errores programados."""
+
+    def __init__(self, errors: Optional[dict] = None) -> None:
+        self.calls: List[Tuple] = []
+        self.errors = dict(errors or {})
+
+    def _maybe_fail(self, target: str) -> None:
+        err = self.errors.get(target)
+        if err:
+            raise OSError(err, os.strerror(err))
+
+    def mount(self, source: str, target: str, fstype: str, flags: int, data: str) -> None:
+        self.calls.append(("mount", source, target, fstype, flags, data))
+        self._maybe_fail(target)
+
+    def umount2(self, target: str, flags: int) -> None:
+        self.calls.append(("umount2", target, flags))
+        self._maybe_fail(target)
+
+
+def resolve_source(spec: str, lookup: Optional[Callable[[str, str], Optional[str]]] = None) -> str:
+    """Convierte UUID=, LABEL= o PARTUUID= en la ruta del dispositivo."""
+    kind, value = split_source(spec)
+    if kind == "devnode":
+        return spec
+    if kind in {"uuid", "label", "partuuid"}:
+        by_link = Path(f"/dev/disk/by-{kind}") / value
+        if by_link.exists():
+            return os.path.realpath(by_link)
+        if lookup is not None:
+            name = lookup(kind, value)
+            if name:
+                return f"/dev/{name}"
+        raise RuntimeError(f"mount: no se encontró el dispositivo {spec}.")
+    return spec
+
+
+class MountExecutor:
+    """Monta y desmonta con syscalls directas y recurre a util-linux cuando hace falta."""
+
+    def __init__(
+        self,
+        syscalls=None,
+        use_syscalls: Optional[bool] = None,
+        lookup: Optional[Callable[[str, str], Optional[str]]] = None,
+        helper_dirs: Tuple[str, ...] = ("/sbin", "/usr/sbin"),
+    ) -> None:
+        if use_syscalls is None:
+            use_syscalls = syscalls is not None or os.geteuid() == 0
+        if use_syscalls and syscalls is None:
+            try:
+                syscalls = LibcSyscalls()
+            except OSError:
+                use_syscalls = False
+        self.syscalls = syscalls
+        self.use_syscalls = use_syscalls
+        self.lookup = lookup
+        self.helper_dirs = helper_dirs
+
+    def needs_helper(self, fstype: str) -> bool:
+        if fstype.startswith("fuse") or fstype in {"ntfs-3g", "nfs", "nfs4", "cifs", "smb3", "sshfs"}:
+            return True
+        return any(os.path.exists(os.path.join(directory, f"mount.{fstype}")) for directory in self.helper_dirs)
+
+    def mount(self, entry: FstabEntry, in_fstab: bool = True) -> None:
+        """Monta `entry`; si no está en fstab el comando mount recibe origen, tipo y opciones."""
+        with span("mount", target=entry.mountpoint, fstype=entry.fstype) as step:
+            step.set(method=self._mount(entry, in_fstab))
+
+    def _mount(self, entry: FstabEntry, in_fstab: bool) -> str:
+        if not self.use_syscalls or self.needs_helper(entry.fstype):
+            self._mount_command(entry, in_fstab)
+            return "mount(8)"
+        source = resolve_source(entry.source, self.lookup)
+        flags, data = parse_mount_options(entry.options)
+        try:
+            self.syscalls.mount(source, entry.mountpoint, entry.fstype, flags, data)
+        except OSError as exc:
+            err = exc.errno or 0
+            message = format_mount_error(err, entry.fstype, source, entry.mountpoint)
+            if err == errno.ENODEV and entry.fstype in {"ntfs", "ntfs3"}:
+                raise NTFSUnsupportedError(message) from exc
+            if err == errno.ENOSYS:
+                self._mount_command(entry, in_fstab)
+                return "mount(8)"
+            raise RuntimeError(message) from exc
+        # Como al lanzar mount(8): las consultas de sólo lectura en caché (findmnt, lsblk) ya no valen.
+        get_runner().invalidate()
+        return "mount(2)"
+
+    def unmount(self, target: str, lazy: bool = False) -> None:
+        """Desmonta `target`; con `lazy` usa MNT_DETACH. Lanza MountBusyError si está en uso."""
+        with span("unmount", target=target, lazy=lazy):
+            self._unmount(target, lazy)
+
+    def _unmount(self, target: str, lazy: bool) -> None:
+        if not self.use_syscalls:
+            self._unmount_command(target, lazy)
+            return
+        try:
+            self.syscalls.umount2(target, MNT_DETACH if lazy else 0)
+        except OSError as exc:
+            err = exc.errno or 0
+            if err == errno.ENOSYS:
+                self._unmount_command(target, lazy)
+                return
+            reason = ERRNO_MESSAGES.get(err, os.strerror(err)).format(fstype="", source=target, target=target)
+            if err == errno.EINVAL:
+                reason = "not mounted"
+            error_class = MountBusyError if err == errno.EBUSY else RuntimeError
+            raise error_class(f"umount: {target}: {reason}.") from exc
+        get_runner().invalidate()
+
+    def _unmount_command(self, target: str, lazy: bool) -> None:
+        try:
+            run_cmd(["umount", *(["-l"] if lazy else []), target])
+        except RuntimeError as exc:
+            if "target is busy" in str(exc).lower():
+                raise MountBusyError(str(exc)) from exc
+            raise
+
+    def _mount_command(self, entry: FstabEntry, in_fstab: bool) -> None:
+        if not shutil.which("mount"):
+            raise RuntimeError("No se encontró el comando mount.")
+        if in_fstab:
+            cmd = ["mount", entry.mountpoint]
+        else:
+            cmd = ["mount", "-t", entry.fstype, "-o", entry.options, entry.source, entry.mountpoint]
+        try:
+            run_cmd(cmd)
+        except RuntimeError as exc:
+            if "unknown filesystem type 'ntfs'" in str(exc).lower():
+                raise NTFSUnsupportedError(str(exc)) from exc
+            raise
+
+
+__all__ = [
+    "LibcSyscalls",
+    "MNT_DETACH",
+    "MountExecutor",
+    "RecordingSyscalls",
+    "format_mount_error",
+    "parse_mount_options",
+    "resolve_source",
+]
@@ -0,0 +1,276 @@
+"""
+Modelo indexado de /etc/fstab con ida y vuelta sin pérdidas.
+
+Las líneas que no se modifican (comentarios, espacios, entradas ajenas) se
+reescriben byte a byte tal como se leyeron. Las entradas se indexan por
+origen, normalizado entre UUID=, LABEL=, PARTUUID= y rutas /dev, y por
+punto de montaje.
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Union
+
+from .constants import FSTAB_PATH, SYSFS_ROOT
+from .journal import atomic_write
+from .mounttable import unescape_mount_field
+
+SOURCE_TAGS = {"UUID": "uuid", "LABEL": "label", "PARTUUID": "partuuid"}
+DISK_BY_DIRS = {"/dev/disk/by-uuid/": "uuid", "/dev/disk/by-label/": "label", "/dev/disk/by-partuuid/": "partuuid"}
+CASE_INSENSITIVE_TAGS = {"uuid", "partuuid"}
+ESCAPED_CHARS = {" ": "\\040", "\t": "\\011", "\n": "\\012", "\\": "\\134"}
+
+
+def escape_field(value: str) -> str:
+    """Escapa un campo de fstab con la notación octal (\\040 para el espacio)."""
+    return "".join(ESCAPED_CHARS.get(ch, ch) for ch in value)
+
+
+def normalize_mountpoint(mountpoint: str) -> str:
+    if len(mountpoint) > 1:
+        mountpoint = mountpoint.rstrip("/") or "/"
+    return mountpoint
+
+
+def merge_options(options: str, additions: Sequence[str]) -> str:
+    """Añade opciones reemplazando las que tienen la misma clave (`clave=valor`)."""
+    result = [option for option in options.split(",") if option]
+    for addition in additions:
+        key = addition.split("=", 1)[0]
+        result = [option for option in result if option.split("=", 1)[0] != key]
+        result.append(addition)
+    return ",".join(result)
+
+
+def split_source(spec: str):
+    """Devuelve (tipo, valor) para un origen de fstab: uuid, label, partuuid o devnode."""
+    tag, sep, value = spec.partition("=")
+    if sep and tag.upper() in SOURCE_TAGS:
+        return SOURCE_TAGS[tag.upper()], value.strip('"')
+    for prefix, kind in DISK_BY_DIRS.items():
+        if spec.startswith(prefix):
+            return kind, unescape_mount_field(spec[len(prefix):].replace("\\x20", " "))
+    if spec.startswith("/dev/"):
+        return "devnode", spec
+    return "other", spec
+
+
+@dataclass(eq=False)
+class FstabEntry:
+    """Entrada de fstab; `raw` guarda el texto original mientras no se modifique."""
+
+    source: str
+    mountpoint: str
+    fstype: str
+    options: str = "defaults"
+    freq: int = 0
+    passno: int = 0
+    raw: Optional[str] = field(default=None, repr=False)
+
+    def render(self) -> str:
+        return " ".join(
+            (
+                escape_field(self.source),
+                escape_field(self.mountpoint),
+                self.fstype,
+                self.options,
+                str(self.freq),
+                str(self.passno),
+            )
+        )
+
+    def text(self) -> str:
+        return self.raw if self.raw is not None else f"{self.render()}\n"
+
+    @property
+    def option_list(self) -> List[str]:
+        return [option for option in self.options.split(",") if option]
+
+    @classmethod
+    def parse(cls, line: str) -> Optional["FstabEntry"]:
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            return None
+        fields = stripped.split()
+        if len(fields) < 3 or len(fields) > 6:
+            return None
+        numbers = fields[4:6]
+        if not all(number.isdigit() for number in numbers):
+            return None
+        return cls(
+            source=unescape_mount_field(fields[0]),
+            mountpoint=unescape_mount_field(fields[1]),
+            fstype=fields[2],
+            options=fields[3] if len(fields) > 3 else "defaults",
+            freq=int(numbers[0]) if numbers else 0,
+            passno=int(numbers[1]) if len(numbers) > 1 else 0,
+            raw=line,
+        )
+
+
+Line = Union[str, FstabEntry]
+
+
+class FstabDocument:
+    """Documento fstab en memoria con índices O(1) por origen y punto de montaje.
+
+    `snapshot`, si se indica, debe ofrecer `index(campo)` (p. ej.
+    `DeviceSnapshot`) y se usa para reconocer el mismo dispositivo escrito de
+    formas distintas.
+    """
+
+    def __init__(self, text: str = "", path: Path = FSTAB_PATH, snapshot=None, sysfs_root: Path = SYSFS_ROOT) -> None:
+        self.path = Path(path)
+        self.snapshot = snapshot
+        self.sysfs_root = Path(sysfs_root)
+        self._device_indexes: Optional[Dict[str, Dict[str, Dict]]] = None
+        self._ids = itertools.count()
+        self._lines: Dict[int, Line] = {}
+        self._line_ids: Dict[int, int] = {}
+        self._by_source: Dict[str, Set[int]] = {}
+        self._indexed_keys: Dict[int, Set[str]] = {}
+        self._by_mountpoint: Dict[str, Set[int]] = {}
+        for line in text.splitlines(keepends=True):
+            entry = FstabEntry.parse(line)
+            self._append(entry if entry is not None else line)
+
+    @classmethod
+    def load(cls, path: Path = FSTAB_PATH, snapshot=None) -> "FstabDocument":
+        path = Path(path)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            text = ""
+        return cls(text, path=path, snapshot=snapshot)
+
+    def serialize(self) -> str:
+        return "".join(line.text() if isinstance(line, FstabEntry) else line for line in self._lines.values())
+
+    def save(self, path: Optional[Path] = None) -> None:
+        atomic_write(Path(path) if path is not None else self.path, self.serialize())
+
+    # Índices -----------------------------------------------------------------
+
+    def source_keys(self, spec: str) -> Set[str]:
+        """Claves bajo las que se indexa un origen, incluida la del dispositivo resuelto."""
+        kind, value = split_source(spec)
+        if kind in CASE_INSENSITIVE_TAGS:
+            value = value.lower()
+        keys = {f"{kind}:{value}"}
+        device = self._resolve_device(kind, value, spec)
+        if device:
+            keys.add(f"device:{device}")
+        return keys
+
+    def _resolve_device(self, kind: str, value: str, spec: str) -> Optional[str]:
+        if kind == "devnode":
+            # /dev/mapper/<nombre> es un enlace a /dev/dm-N: se mira antes de resolverlo.
+            if spec.startswith("/dev/mapper/"):
+                return spec[len("/dev/mapper/"):]
+            resolved = os.path.realpath(spec) if os.path.islink(spec) else spec
+            name = resolved[len("/dev/"):]
+            if name.startswith("dm-"):
+                # Los dispositivos device-mapper figuran en la instantánea con su nombre dm.
+                try:
+                    return (self.sysfs_root / "class" / "block" / name / "dm" / "name").read_text().strip() or name
+                except OSError:
+                    return name
+            return name
+        if self.snapshot is None or kind not in SOURCE_TAGS.values():
+            return None
+        if self._device_indexes is None:
+            self._device_indexes = {tag: self.snapshot.index(tag) for tag in SOURCE_TAGS.values()}
+        index = self._device_indexes[kind]
+        entry = index.get(value)
+        if entry is None and kind in CASE_INSENSITIVE_TAGS:
+            entry = index.get(value.upper())
+        return entry.get("name") if entry else None
+
+    def _index(self, line_id: int, entry: FstabEntry) -> None:
+        keys = self.source_keys(entry.source)
+        self._indexed_keys[line_id] = keys
+        for key in keys:
+            self._by_source.setdefault(key, set()).add(line_id)
+        self._by_mountpoint.setdefault(normalize_mountpoint(entry.mountpoint), set()).add(line_id)
+
+    def _unindex(self, line_id: int, entry: FstabEntry) -> None:
+        for key in self._indexed_keys.pop(line_id, set()):
+            self._by_source.get(key, set()).discard(line_id)
+        self._by_mountpoint.get(normalize_mountpoint(entry.mountpoint), set()).discard(line_id)
+
+    def _append(self, line: Line) -> int:
+        line_id = next(self._ids)
+        self._lines[line_id] = line
+        if isinstance(line, FstabEntry):
+            self._line_ids[id(line)] = line_id
+            self._index(line_id, line)
+        return line_id
+
+    def _line_id(self, entry: FstabEntry) -> int:
+        try:
+            return self._line_ids[id(entry)]
+        except KeyError:
+            raise ValueError("La entrada no pertenece a este documento fstab.") from None
+
+    # Consultas ---------------------------------------------------------------
+
+    def entries(self) -> Iterator[FstabEntry]:
+        return (line for line in self._lines.values() if isinstance(line, FstabEntry))
+
+    def find_source(self, spec: str) -> List[FstabEntry]:
+        """Entradas que apuntan al mismo dispositivo que `spec`, en orden de archivo."""
+        line_ids: Set[int] = set()
+        for key in self.source_keys(spec):
+            line_ids |= self._by_source.get(key, set())
+        return [self._lines[line_id] for line_id in sorted(line_ids)]
+
+    def find_mountpoint(self, mountpoint: str) -> List[FstabEntry]:
+        line_ids = self._by_mountpoint.get(normalize_mountpoint(mountpoint), set())
+        return [self._lines[line_id] for line_id in sorted(line_ids)]
+
+    # Modificaciones ----------------------------------------------------------
+
+    def add(self, entry: FstabEntry) -> FstabEntry:
+        entry.raw = None
+        if self._lines:
+            last_id = next(reversed(self._lines))
+            last = self._lines[last_id]
+            last_text = last.text() if isinstance(last, FstabEntry) else last
+            if not last_text.endswith("\n"):
+                if isinstance(last, FstabEntry):
+                    last.raw = f"{last_text}\n"
+                else:
+                    self._lines[last_id] = f"{last_text}\n"
+        self._append(entry)
+        return entry
+
+    def remove(self, entry: FstabEntry) -> None:
+        line_id = self._line_id(entry)
+        self._unindex(line_id, entry)
+        del self._lines[line_id]
+        del self._line_ids[id(entry)]
+
+    def modify(self, entry: FstabEntry, **changes) -> FstabEntry:
+        line_id = self._line_id(entry)
+        self._unindex(line_id, entry)
+        for name, value in changes.items():
+            if name not in {"source", "mountpoint", "fstype", "options", "freq", "passno"}:
+                raise AttributeError(f"Campo de fstab desconocido: {name}")
+            setattr(entry, name, value)
+        entry.raw = None
+        self._index(line_id, entry)
+        return entry
+
+
+__all__ = [
+    "FstabDocument",
+    "FstabEntry",
+    "escape_field",
+    "merge_options",
+    "normalize_mountpoint",
+    "split_source",
+]
@@ -9,22 +9,9 @@ import subprocess
 import shutil
 import threading
 from pathlib import Path
-from tkinter import filedialog, messagebox, ttk
+from tkinter import filedialog, messagebox, simpledialog, ttk
 from tkinter.scrolledtext import ScrolledText
-from typing import Dict, Optional
-
-try:
-    from tkinter_tooltip import ToolTip  # type: ignore
-except Exception:
-    try:
-        from tktooltip import ToolTip  # type: ignore
-    except Exception:
-        ToolTip = None  # type: ignore
-
-try:
-    from ttkbootstrap.icons import Icon  # type: ignore
-except Exception:
-    Icon = None
+from typing import Callable, Dict, List, Optional, Set
 
 EMBEDDED_ICONS = {
     "arrow-repeat": "iVBORw0KGgoAAAANSUhEUgAAABgAAAAYCAYAAADgdz34AAAAiUlEQVR4nO1UWw6AIAwrxrNwSj85pZeZXyaL7FES1B/6ObqWDTZg4W8UllibyDN2HqXLr01Ex1MDSziDNtjeFAeAnRWP2hFdxKyAEbfiFi9sUSTOcsyyR8QzpBUsg+8N9MOygzY8B2yyPq9NxOJSLfJMmIE0//mMHXSjq2CmOOAsO2+xjQgv0LgAIgBNcyHMvIYAAAAASUVORK5CYII=",
@@ -34,83 +21,211 @@ EMBEDDED_ICONS = {
     "clipboard": "iVBORw0KGgoAAAANSUhEUgAAABgAAAAYCAYAAADgdz34AAAAb0lEQVR4nGNgGAUDDRgJKYhKyvhPSM2yeTNwmsNEqotIBThtRnd5T0sdhpqSmiYUPjaf0NwHLMQqRHctsWDgfTCtr4OgIVlFFTjlBt4HDAz4XUjIh4PDB8TEA0UWjAYRQTCog4jo0pQYMCCl6dAHAOXiH/rvHeO8AAAAAElFTkSuQmCC",
 }
 
-from .devices import flatten_lsblk, load_block_devices
-from .mounting import MountConfigurator, NTFSUnsupportedError
+from .boot_analysis import BootAnalysis, EntryReport, format_delay
+from .device_filter import DeviceIndex
+from .device_table import DeviceTable
+from .devices import DeviceSnapshot
+from .errors import StaleAnalysisError
+from .hotplug import DeviceDelta, HotplugWatcher
+from .log_pipeline import LEVEL_DEBUG, LEVEL_LABELS, LEVELS, LogPipeline, LogView, default_log_path
+from .mounttable import get_mount_table
+from .operations import (
+    FINAL_STATES,
+    FSTAB_CANCELLABLE,
+    FSTAB_STAGES,
+    STAGE_LABELS,
+    STATE_CANCELLED,
+    STATE_DONE,
+    STATE_FAILED,
+    STATE_QUEUED,
+    STATE_RUNNING,
+    UNMOUNT_CANCELLABLE,
+    UNMOUNT_STAGES,
+    Operation,
+    OperationQueue,
+    UiDispatcher,
+)
+from .holders import HolderScan
+from .mounting import (
+    BUSY_KILL,
+    BUSY_LAZY,
+    MODE_FSTAB,
+    MODE_ON_DEMAND,
+    MODE_SYSTEMD,
+    MountConfigurator,
+    NTFSUnsupportedError,
+)
 from .constants import FSTAB_PATH
+from .profiles import PROFILE_COMPATIBLE, PROFILE_LATENCY, PROFILE_REMOVABLE_SAFE, PROFILE_THROUGHPUT
+from .tracing import span
+from .tree_sync import TreeRow, device_key
+
+MOUNT_MODE_LABELS = {
+    "Al arrancar (fstab)": MODE_FSTAB,
+    "Bajo demanda (fstab + systemd)": MODE_ON_DEMAND,
+    "Bajo demanda (unidades systemd)": MODE_SYSTEMD,
+}
+PROFILE_LABELS = {
+    "Compatible": PROFILE_COMPATIBLE,
+    "Rendimiento (throughput)": PROFILE_THROUGHPUT,
+    "Baja latencia (latency)": PROFILE_LATENCY,
+    "Extraíble seguro (removable-safe)": PROFILE_REMOVABLE_SAFE,
+}
 
 
-if ToolTip is None:
-    class SimpleToolTip:
-        """Fallback de tooltip ligero si no hay dependencias externas."""
-
-        def __init__(self, widget, text: str):
-            self.widget = widget
-            self.text = text
-            self.tip_window = None
-            widget.bind("<Enter>", self.show)
-            widget.bind("<Leave>", self.hide)
+class SimpleToolTip:
+    """Fallback de tooltip ligero si no hay dependencias externas."""
 
-        def show(self, _event=None):
-            if self.tip_window or not self.text:
-                return
-            x = self.widget.winfo_rootx() + 10
-            y = self.widget.winfo_rooty() + self.widget.winfo_height() + 5
-            self.tip_window = tk.Toplevel(self.widget)
-            self.tip_window.wm_overrideredirect(True)
-            self.tip_window.wm_geometry(f"+{x}+{y}")
-            label = tk.Label(
-                self.tip_window,
-                text=self.text,
-                justify=tk.LEFT,
-                background="#2c2c2c",
-                foreground="#ffffff",
-                relief=tk.SOLID,
-                borderwidth=1,
-                padx=6,
-                pady=3,
-                font=("TkDefaultFont", 9),
-            )
-            label.pack(ipadx=1)
+    def __init__(self, widget, text: str):
+        self.widget = widget
+        self.text = text
+        self.tip_window = None
+        widget.bind("<Enter>", self.show)
+        widget.bind("<Leave>", self.hide)
 
-        def hide(self, _event=None):
-            if self.tip_window:
-                self.tip_window.destroy()
-                self.tip_window = None
+    def show(self, _event=None):
+        if self.tip_window or not self.text:
+            return
+        x = self.widget.winfo_rootx() + 10
+        y = self.widget.winfo_rooty() + self.widget.winfo_height() + 5
+        self.tip_window = tk.Toplevel(self.widget)
+        self.tip_window.wm_overrideredirect(True)
+        self.tip_window.wm_geometry(f"+{x}+{y}")
+        label = tk.Label(
+            self.tip_window,
+            text=self.text,
+            justify=tk.LEFT,
+            background="#2c2c2c",
+            foreground="#ffffff",
+            relief=tk.SOLID,
+            borderwidth=1,
+            padx=6,
+            pady=3,
+            font=("TkDefaultFont", 9),
+        )
+        label.pack(ipadx=1)
 
-    ToolTip = SimpleToolTip  # type: ignore
+    def hide(self, _event=None):
+        if self.tip_window:
+            self.tip_window.destroy()
+            self.tip_window = None
 
 
 APP_NAME = "AutoMount"
 APP_VERSION = "1.0.0"
 APP_CREDITS = "Martin Oviedo & Ashriel Lopez"
+MAX_CONFIRM_LINES = 20
+
+_optional_classes: Dict[str, Optional[type]] = {}
+
+
+def _tooltip_class() -> type:
+    """Clase de tooltip; el paquete externo se importa la primera vez que hace falta."""
+    if "tooltip" not in _optional_classes:
+        try:
+            from tkinter_tooltip import ToolTip  # type: ignore
+        except Exception:
+            try:
+                from tktooltip import ToolTip  # type: ignore
+            except Exception:
+                ToolTip = SimpleToolTip  # type: ignore
+        _optional_classes["tooltip"] = ToolTip
+    return _optional_classes["tooltip"]
+
+
+def _icon_class() -> Optional[type]:
+    """`Icon` de ttkbootstrap si está instalado; importarlo cuesta, así que se hace al primer uso."""
+    if "icon" not in _optional_classes:
+        try:
+            from ttkbootstrap.icons import Icon  # type: ignore
+        except Exception:
+            Icon = None
+        _optional_classes["icon"] = Icon
+    return _optional_classes["icon"]
 
 
 class AutoMountGUI:
-    def __init__(self, root: tk.Tk) -> None:
+    def __init__(self, root: tk.Tk, theme: Optional[str] = None, helper=None) -> None:
+        """`helper` es un `HelperClient` conectado cuando la aplicación no corre como root."""
         self.root = root
         self.root.title("AutoMount GUI")
         self.root.geometry("720x600")
 
         self.unmounted_items: Dict[str, Dict] = {}
         self.mounted_items: Dict[str, Dict] = {}
+        self._device_entries: Dict[str, Dict] = {}
+        self.device_index = DeviceIndex()
+        self._filter_keys = None
+        self._pending_deltas: List[DeviceDelta] = []
         self._tooltips = []
+        self._pending_tooltips: Optional[List] = []
+        self._theme = theme
+        self._lazy_tabs: Dict[str, Callable[[ttk.Frame], None]] = {}
         self._icon_cache: Dict[str, Optional[tk.PhotoImage]] = {}
+        self._icon_provider = None
         self._refreshing_devices = False
-        if Icon is not None:
-            try:
-                self._icon_provider = Icon()
-            except Exception:
-                self._icon_provider = None
-        else:
-            self._icon_provider = None
-
-        self.mount_configurator = MountConfigurator(self.log)
+        self._boot_reports: Dict[str, EntryReport] = {}
+        self._boot_analysis: Optional[BootAnalysis] = None
+        self.operations_tree: Optional[ttk.Treeview] = None
+
+        # El registro existe antes que MountConfigurator: la recuperación del diario ya escribe en él.
+        self.log_pipeline = LogPipeline(default_log_path())
+        self.dispatcher = UiDispatcher(self.root)
+        self.operation_queue = OperationQueue(self.dispatcher, self._on_operation_change)
+        self._operation_rows: Dict[str, Operation] = {}
+        self._reported_operations: Set[int] = set()
+        self.device_snapshot = DeviceSnapshot()
+        self.mount_configurator = MountConfigurator(self.log, self.device_snapshot, helper=helper)
 
         self.style = ttk.Style(self.root)
         self._configure_styles()
         self._create_menus()
-        self._build_widgets()
+        # La enumeración corre en su hilo mientras se construyen los widgets; su resultado
+        # llega por el UiDispatcher (call_soon), que sólo se vacía con el bucle de Tk en marcha.
         self.refresh_devices()
+        self._build_widgets()
+        self.dispatcher.start()
+        self.log_view.start()
+        if self.log_pipeline.spill_error:
+            self.log(self.log_pipeline.spill_error)
+        # "after idle" + "after 0": se ejecuta después del primer repintado de la ventana.
+        self.root.after_idle(lambda: self.root.after(0, self._after_first_paint))
+        self.hotplug_watcher = HotplugWatcher(self._on_hotplug_deltas)
+        self._start_hotplug_watcher()
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+
+    def _on_close(self) -> None:
+        if self.operation_queue.active() and not messagebox.askyesno(
+            "Operaciones en curso",
+            "Hay operaciones de montaje pendientes o en curso. Si cierra ahora, la que esté en marcha "
+            "puede quedar a medias. ¿Desea salir igualmente?",
+        ):
+            return
+        self.operation_queue.shutdown()
+        self.hotplug_watcher.stop()
+        self.log_pipeline.close()
+        self.root.destroy()
+
+    def _after_first_paint(self) -> None:
+        """Carga lo opcional que no hace falta para ver la ventana: tema y tooltips."""
+        with span("gui.after_first_paint", theme=self._theme):
+            if self._theme:
+                self.apply_theme(self._theme)
+            pending, self._pending_tooltips = self._pending_tooltips or [], None
+            for widget, text in pending:
+                self.add_tooltip(widget, text)
+
+    def apply_theme(self, name: str) -> bool:
+        """Aplica un tema de ttkthemes sobre la ventana ya creada; devuelve False si no está disponible."""
+        try:
+            from ttkthemes import ThemedStyle  # type: ignore
+
+            ThemedStyle(self.root).set_theme(name)
+        except Exception:
+            return False
+        # Los estilos propios se configuran por tema.
+        self._configure_styles()
+        return True
 
     def _configure_styles(self) -> None:
         self.style.configure(
@@ -161,10 +276,13 @@ class AutoMountGUI:
 
         devices_frame = ttk.Frame(frame)
         devices_frame.grid(row=0, column=0, columnspan=2, sticky="nsew")
+        self._build_filter_bar(devices_frame)
         notebook = ttk.Notebook(devices_frame)
         notebook.pack(fill=tk.BOTH, expand=True)
+        self.notebook = notebook
 
         columns = ("name", "size", "type", "fstype", "mountpoint")
+        headings = ("Nombre", "Tamaño", "Tipo", "FS", "Punto de montaje")
 
         unmounted_tab = ttk.Frame(notebook, padding=6)
         unmounted_container = ttk.Frame(unmounted_tab, borderwidth=1, relief="solid", padding=4)
@@ -172,16 +290,16 @@ class AutoMountGUI:
         self.unmounted_tree = ttk.Treeview(
             unmounted_container, columns=columns, show="headings", selectmode="browse", height=14, style="Table.Treeview"
         )
-        for col, text in zip(columns, ("Nombre", "Tamaño", "Tipo", "FS", "Punto de montaje")):
-            self.unmounted_tree.heading(col, text=text)
+        for col in columns:
             self.unmounted_tree.column(col, width=120 if col != "mountpoint" else 160, anchor="w")
         self.unmounted_tree.grid(row=0, column=0, sticky="nsew")
-        unmounted_scroll = ttk.Scrollbar(unmounted_container, orient=tk.VERTICAL, command=self.unmounted_tree.yview)
+        unmounted_scroll = ttk.Scrollbar(unmounted_container, orient=tk.VERTICAL)
         unmounted_scroll.grid(row=0, column=1, sticky="ns")
-        self.unmounted_tree.configure(yscrollcommand=unmounted_scroll.set)
-        self.unmounted_tree.bind("<Button-3>", lambda e: self.show_list_menu(e, self.unmounted_tree))
+        self.unmounted_table = DeviceTable(self.unmounted_tree, unmounted_scroll, columns, headings)
+        self.unmounted_tree.bind("<Button-3>", lambda e: self.show_list_menu(e, self.unmounted_table))
         self.unmounted_tree.tag_configure("odd", background="#f0f0f0")
         self.unmounted_tree.tag_configure("even", background="#fafafa")
+        self.unmounted_tree.tag_configure("match", background="#fff3b0")
 
         unmounted_container.columnconfigure(0, weight=1)
         unmounted_container.rowconfigure(0, weight=1)
@@ -194,16 +312,16 @@ class AutoMountGUI:
         self.mounted_tree = ttk.Treeview(
             mounted_container, columns=columns, show="headings", selectmode="browse", height=14, style="Table.Treeview"
         )
-        for col, text in zip(columns, ("Nombre", "Tamaño", "Tipo", "FS", "Punto de montaje")):
-            self.mounted_tree.heading(col, text=text)
+        for col in columns:
             self.mounted_tree.column(col, width=120 if col != "mountpoint" else 160, anchor="w")
         self.mounted_tree.grid(row=0, column=0, sticky="nsew")
-        mounted_scroll = ttk.Scrollbar(mounted_container, orient=tk.VERTICAL, command=self.mounted_tree.yview)
+        mounted_scroll = ttk.Scrollbar(mounted_container, orient=tk.VERTICAL)
         mounted_scroll.grid(row=0, column=1, sticky="ns")
-        self.mounted_tree.configure(yscrollcommand=mounted_scroll.set)
-        self.mounted_tree.bind("<Button-3>", lambda e: self.show_list_menu(e, self.mounted_tree))
+        self.mounted_table = DeviceTable(self.mounted_tree, mounted_scroll, columns, headings)
+        self.mounted_tree.bind("<Button-3>", lambda e: self.show_list_menu(e, self.mounted_table))
         self.mounted_tree.tag_configure("odd", background="#f0f0f0")
         self.mounted_tree.tag_configure("even", background="#fafafa")
+        self.mounted_tree.tag_configure("match", background="#fff3b0")
 
         mounted_container.columnconfigure(0, weight=1)
         mounted_container.rowconfigure(0, weight=1)
@@ -212,9 +330,16 @@ class AutoMountGUI:
 
         notebook.add(unmounted_tab, text="Unidades sin montar")
         notebook.add(mounted_tab, text="Unidades ya montadas")
-        terminal_tab = ttk.Frame(notebook, padding=6)
-        self._build_fstab_tab(terminal_tab)
-        notebook.add(terminal_tab, text="fstab en la app")
+        # El resto de pestañas se construye la primera vez que se muestran.
+        for text, builder in (
+            ("fstab en la app", self._build_fstab_tab),
+            ("Arranque", self._build_boot_tab),
+            ("Operaciones", self._build_operations_tab),
+        ):
+            tab = ttk.Frame(notebook, padding=6)
+            notebook.add(tab, text=text)
+            self._lazy_tabs[str(tab)] = builder
+        notebook.bind("<<NotebookTabChanged>>", lambda _event: self._ensure_tab(notebook.select()))
 
         btn_frame = ttk.Frame(frame)
         btn_frame.grid(row=1, column=0, columnspan=2, pady=(5, 15), sticky="w")
@@ -228,7 +353,20 @@ class AutoMountGUI:
             style="Dark.TButton",
         )
         refresh_btn.pack(side=tk.LEFT)
-        self.add_tooltip(refresh_btn, "Vuelve a consultar lsblk para actualizar las tablas.")
+        self.add_tooltip(refresh_btn, "Vuelve a consultar los dispositivos para actualizar las tablas.")
+        self.operation_status = ttk.Label(btn_frame, text="")
+        self.operation_status.pack(side=tk.LEFT, padx=(15, 5))
+        self.operation_progress = ttk.Progressbar(btn_frame, length=160, mode="determinate")
+        self.operation_progress.pack(side=tk.LEFT)
+        self.cancel_button = ttk.Button(
+            btn_frame, text="Cancelar", command=self.cancel_current_operation, style="Dark.TButton"
+        )
+        self.cancel_button.pack(side=tk.LEFT, padx=(5, 0))
+        self.cancel_button.state(["disabled"])
+        self.add_tooltip(
+            self.cancel_button,
+            "Cancela la operación en curso al terminar la etapa actual (no se interrumpe un montaje ya hecho).",
+        )
 
         ttk.Label(frame, text="Punto de montaje").grid(row=2, column=0, sticky="w")
         mount_frame = ttk.Frame(frame)
@@ -263,6 +401,48 @@ class AutoMountGUI:
             self.umask_combo,
             "Permisos por defecto para sistemas no POSIX (NTFS, FAT, etc.).",
         )
+        ttk.Label(options_frame, text="Perfil").pack(side=tk.LEFT, padx=(15, 0))
+        self.profile_var = tk.StringVar(value=next(iter(PROFILE_LABELS)))
+        profile_combo = ttk.Combobox(
+            options_frame,
+            textvariable=self.profile_var,
+            values=tuple(PROFILE_LABELS),
+            state="readonly",
+            width=30,
+        )
+        profile_combo.pack(side=tk.LEFT, padx=(5, 0))
+        self.add_tooltip(
+            profile_combo,
+            "Ajusta las opciones según el disco (SSD, USB, NVMe): noatime, commit, compresión, discard...",
+        )
+        ttk.Label(options_frame, text="Montaje").pack(side=tk.LEFT, padx=(15, 0))
+        self.mode_var = tk.StringVar(value=next(iter(MOUNT_MODE_LABELS)))
+        mode_combo = ttk.Combobox(
+            options_frame,
+            textvariable=self.mode_var,
+            values=tuple(MOUNT_MODE_LABELS),
+            state="readonly",
+            width=30,
+        )
+        mode_combo.pack(side=tk.LEFT, padx=(5, 0))
+        self.add_tooltip(
+            mode_combo,
+            "Bajo demanda: el arranque no espera al disco; se monta al acceder y se desmonta tras "
+            "10 minutos sin uso.",
+        )
+        self.batch_var = tk.BooleanVar(value=False)
+        batch_check = ttk.Checkbutton(
+            options_frame,
+            text="Varias unidades (lote)",
+            variable=self.batch_var,
+            command=self._toggle_batch_mode,
+        )
+        batch_check.pack(side=tk.LEFT, padx=(15, 0))
+        self.add_tooltip(
+            batch_check,
+            "Permite seleccionar varias unidades sin montar; cada una se monta en una subcarpeta "
+            "del punto de montaje indicado.",
+        )
 
         actions_frame = ttk.Frame(frame)
         actions_frame.grid(row=5, column=0, columnspan=2, sticky="ew", pady=(0, 10))
@@ -304,33 +484,58 @@ class AutoMountGUI:
         )
         copy_btn.pack(side=tk.RIGHT)
         self.add_tooltip(copy_btn, "Copia el historial de operaciones al portapapeles.")
+        search_btn = ttk.Button(
+            log_header,
+            text="Buscar en historial...",
+            command=self.search_log_history,
+            style="Dark.TButton",
+        )
+        search_btn.pack(side=tk.RIGHT, padx=(0, 5))
+        self.add_tooltip(search_btn, "Busca en el historial completo guardado en disco, no sólo en las líneas visibles.")
+        self.log_level_var = tk.StringVar(value=LEVEL_LABELS[LEVEL_DEBUG])
+        level_combo = ttk.Combobox(
+            log_header,
+            textvariable=self.log_level_var,
+            values=[LEVEL_LABELS[level] for level in LEVELS],
+            state="readonly",
+            width=12,
+        )
+        level_combo.pack(side=tk.RIGHT, padx=(0, 5))
+        level_combo.bind("<<ComboboxSelected>>", lambda _event: self.log_view.set_minimum_level(self._log_level()))
+        self.add_tooltip(level_combo, "Nivel mínimo de los mensajes que se muestran.")
 
         self.log_text = tk.Text(frame, height=8, state=tk.DISABLED)
         self.log_text.grid(row=7, column=0, columnspan=2, sticky="nsew")
+        self.log_view = LogView(self.log_text, self.log_pipeline)
 
         frame.rowconfigure(0, weight=3)
         frame.rowconfigure(7, weight=1)
         frame.columnconfigure(0, weight=1)
 
-    def log(self, message: str) -> None:
-        self.log_text.configure(state=tk.NORMAL)
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
-        self.log_text.configure(state=tk.DISABLED)
+    def log(self, message: str, level: Optional[str] = None) -> None:
+        # Seguro desde cualquier hilo: LogView pinta los mensajes por tandas desde el bucle de Tk.
+        self.log_pipeline.emit(message, level)
+
+    def _log_level(self) -> str:
+        label = self.log_level_var.get()
+        return next((level for level in LEVELS if LEVEL_LABELS[level] == label), LEVEL_DEBUG)
 
     def _run_in_thread(self, target, on_success=None, on_error=None) -> None:
+        # Los resultados vuelven por el dispatcher y no con root.after: tkinter rechaza llamadas
+        # desde otros hilos mientras el hilo principal no está en mainloop (p. ej. construyendo widgets).
         def worker():
             try:
                 result = target()
                 if on_success:
-                    self.root.after(0, lambda: on_success(result))
+                    self.dispatcher.call_soon(on_success, result)
             except Exception as exc:  # noqa: BLE001
                 if on_error:
-                    self.root.after(0, lambda: on_error(exc))
+                    self.dispatcher.call_soon(on_error, exc)
         threading.Thread(target=worker, daemon=True).start()
 
     def copy_log(self) -> None:
-        content = self.log_text.get("1.0", tk.END).strip()
+        self.log_view.flush()
+        content = self.log_view.content()
         if not content:
             self.log("No hay contenido para copiar.")
             return
@@ -338,20 +543,42 @@ class AutoMountGUI:
         self.root.clipboard_append(content)
         self.log("Registro copiado al portapapeles.")
 
-    def refresh_devices(self) -> None:
+    def search_log_history(self) -> None:
+        text = simpledialog.askstring("Buscar en historial", "Texto a buscar:", parent=self.root)
+        if not text:
+            return
+        if self.log_pipeline.spill_path is None:
+            messagebox.showinfo("Historial no disponible", "El historial del registro no se está guardando en disco.")
+            return
+        level = self._log_level()
+
+        def show(lines: List[str]) -> None:
+            title = f"Historial: «{text}» ({len(lines)} coincidencias)"
+            self._show_text_viewer(title, "\n".join(lines) if lines else "Sin coincidencias.")
+
+        self._run_in_thread(
+            lambda: self.log_pipeline.search_history(text, level),
+            on_success=show,
+            on_error=lambda exc: self.log(f"Error al buscar en el historial: {exc}"),
+        )
+
+    def refresh_devices(self, full: bool = True) -> None:
+        """Recarga las tablas; con `full=False` reutiliza la caché si sigue vigente."""
         if self._refreshing_devices:
             return
         self._refreshing_devices = True
         self.log("Actualizando listas de unidades...")
         self._run_in_thread(
-            target=self._load_devices_thread,
+            target=lambda: self._load_devices_thread(full),
             on_success=self._populate_devices,
             on_error=self._populate_devices_error,
         )
 
-    def _load_devices_thread(self):
-        block_devices = load_block_devices()
-        return flatten_lsblk(block_devices)
+    def _load_devices_thread(self, full: bool = True):
+        with span("gui.load_devices", full=full):
+            if full:
+                return self.device_snapshot.refresh()
+            return self.device_snapshot.entries()
 
     def _populate_devices_error(self, exc: Exception) -> None:
         self._refreshing_devices = False
@@ -359,34 +586,121 @@ class AutoMountGUI:
         messagebox.showerror("Error", f"No se pudieron obtener las unidades: {exc}")
 
     def _populate_devices(self, entries) -> None:
-        for tree in (self.unmounted_tree, self.mounted_tree):
-            for item in tree.get_children():
-                tree.delete(item)
-        self.unmounted_items.clear()
-        self.mounted_items.clear()
-
-        for idx, entry in enumerate(entries):
-            if entry.get("type") != "part":
-                continue
-            values = (
-                entry.get("name", ""),
-                entry.get("size", ""),
-                entry.get("type", ""),
-                entry.get("fstype", ""),
-                entry.get("mountpoint", ""),
+        with span("gui.populate_devices", entries=len(entries)):
+            self._device_entries = {
+                entry.get("name", ""): entry for entry in entries if entry.get("type") == "part"
+            }
+            self._sync_device_trees()
+        self._refreshing_devices = False
+
+        if self._pending_deltas:
+            pending, self._pending_deltas = self._pending_deltas, []
+            self._apply_device_deltas(pending)
+
+    def _sync_device_trees(self) -> None:
+        """Lleva las tablas al contenido de `_device_entries` tocando sólo las filas que cambiaron."""
+        rows: Dict[DeviceTable, List[TreeRow]] = {self.unmounted_table: [], self.mounted_table: []}
+        items: Dict[DeviceTable, Dict[str, Dict]] = {self.unmounted_table: {}, self.mounted_table: {}}
+        for entry in self._device_entries.values():
+            entry = dict(entry, mountpoint=self._current_mountpoint(entry))
+            table = self.mounted_table if entry.get("mountpoint") else self.unmounted_table
+            key = device_key(entry)
+            values = tuple(entry.get(column) or "" for column in table.store.columns)
+            rows[table].append(TreeRow(key, values))
+            items[table][key] = entry
+        for table, table_rows in rows.items():
+            table.set_rows(table_rows)
+        self.unmounted_items = items[self.unmounted_table]
+        self.mounted_items = items[self.mounted_table]
+        self.device_index.rebuild([*self.unmounted_items.items(), *self.mounted_items.items()])
+        self._apply_filter()
+
+    def _build_filter_bar(self, parent: ttk.Frame) -> None:
+        bar = ttk.Frame(parent)
+        bar.pack(fill=tk.X, pady=(0, 6))
+        ttk.Label(bar, text="Filtrar").pack(side=tk.LEFT)
+        self.filter_var = tk.StringVar()
+        filter_entry = ttk.Entry(bar, textvariable=self.filter_var)
+        filter_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
+        self.add_tooltip(
+            filter_entry,
+            "Ejemplos: fs:ntfs size>1T label:backup mounted:no · sda -type:disk mp:/media\n"
+            "Campos: name, fs, label, uuid, type, mp, size (> >= < <= =), mounted (sí/no). "
+            "Un '-' delante excluye.",
+        )
+        self.highlight_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            bar, text="Resaltar en lugar de ocultar", variable=self.highlight_var, command=self._apply_filter
+        ).pack(side=tk.LEFT, padx=(10, 0))
+        self.filter_status = ttk.Label(bar, text="")
+        self.filter_status.pack(side=tk.LEFT, padx=(10, 0))
+        self.filter_var.trace_add("write", lambda *_args: self._apply_filter())
+        filter_entry.bind("<Escape>", lambda _e: self.filter_var.set(""))
+
+    def _apply_filter(self) -> None:
+        """Aplica la consulta de la barra de filtro usando el índice de dispositivos."""
+        with span("gui.filter") as step:
+            result = self.device_index.search(self.filter_var.get())
+            if result.keys is None and self._filter_keys is None:
+                self.filter_status.configure(text="; ".join(result.errors))
+                return
+            self._filter_keys = result.keys
+            highlight = self.highlight_var.get()
+            for table in (self.unmounted_table, self.mounted_table):
+                table.set_visible_keys(result.keys, highlight=highlight)
+            step.set(matches=None if result.keys is None else len(result.keys))
+        if result.keys is None:
+            status = ""
+        else:
+            unmounted = len(result.keys & self.unmounted_items.keys())
+            status = (
+                f"{len(result.keys)} de {len(self.device_index)} unidades "
+                f"({unmounted} sin montar, {len(result.keys) - unmounted} montadas)"
             )
-            mountpoint = entry.get("mountpoint")
-            tag = "even" if idx % 2 == 0 else "odd"
-            if mountpoint:
-                item_id = self.mounted_tree.insert("", tk.END, values=values, tags=(tag,))
-                self.mounted_items[item_id] = entry
+        self.filter_status.configure(text="; ".join(filter(None, [status, *result.errors])))
+
+    def _current_mountpoint(self, entry: Dict) -> Optional[str]:
+        """Consulta el punto de montaje vigente en la tabla de montajes del kernel."""
+        if entry.get("mountpoint") == "[SWAP]":
+            return entry["mountpoint"]
+        try:
+            table = get_mount_table()
+        except OSError:
+            return entry.get("mountpoint")
+        sources = (f"/dev/{entry.get('kname') or entry.get('name')}", f"/dev/mapper/{entry.get('name')}")
+        return table.mountpoint_for(entry.get("maj:min"), sources)
+
+    def _start_hotplug_watcher(self) -> None:
+        try:
+            self.hotplug_watcher.start()
+        except Exception as exc:  # noqa: BLE001
+            self.log(f"No se pudo iniciar la detección de dispositivos: {exc}")
+
+    def _on_hotplug_deltas(self, deltas: List[DeviceDelta]) -> None:
+        # Se invoca desde el hilo del vigilante; la actualización se hace en el hilo de Tk.
+        self.device_snapshot.invalidate()
+        self.dispatcher.call_soon(self._apply_device_deltas, deltas)
+
+    def _apply_device_deltas(self, deltas: List[DeviceDelta]) -> None:
+        if self._refreshing_devices:
+            self._pending_deltas.extend(deltas)
+            return
+        for delta in deltas:
+            if delta.action == "remove":
+                self._device_entries.pop(delta.name, None)
+                self.log(f"Dispositivo retirado: {delta.name}")
+                continue
+            if delta.record.get("type") == "part":
+                # Un cambio conserva la posición de la fila; un dispositivo nuevo va al final.
+                self._device_entries[delta.name] = delta.record
             else:
-                item_id = self.unmounted_tree.insert("", tk.END, values=values, tags=(tag,))
-                self.unmounted_items[item_id] = entry
-        self._refreshing_devices = False
+                self._device_entries.pop(delta.name, None)
+            if delta.action == "add":
+                self.log(f"Dispositivo conectado: {delta.name}")
+        self._sync_device_trees()
 
-    def show_list_menu(self, event, tree: ttk.Treeview) -> None:
-        self._context_target = tree
+    def show_list_menu(self, event, table: DeviceTable) -> None:
+        self._context_target = table
         try:
             self.list_context_menu.tk_popup(event.x_root, event.y_root)
         finally:
@@ -395,9 +709,7 @@ class AutoMountGUI:
     def copy_current_list(self) -> None:
         if not self._context_target:
             return
-        entries = [
-            "\t".join(self._context_target.item(item, "values")) for item in self._context_target.get_children()
-        ]
+        entries = ["\t".join(values) for values in self._context_target.view_values()]
         if not entries:
             self.log("No hay elementos para copiar.")
             return
@@ -411,7 +723,13 @@ class AutoMountGUI:
             self.mount_entry.delete(0, tk.END)
             self.mount_entry.insert(0, directory)
 
+    def _toggle_batch_mode(self) -> None:
+        self.unmounted_table.set_selectmode("extended" if self.batch_var.get() else "browse")
+
     def configure_mount(self) -> None:
+        if self.batch_var.get():
+            self.configure_batch()
+            return
         try:
             selection = self._get_selected_device()
             if not selection:
@@ -419,67 +737,259 @@ class AutoMountGUI:
             mount_point = self.mount_entry.get().strip()
             if not mount_point:
                 raise ValueError("Ingrese un punto de montaje.")
+        except ValueError as exc:
+            messagebox.showerror("Error", str(exc))
+            return
 
-            umask_value = self.umask_var.get().strip() or "000"
-            success = self.mount_configurator.configure(
-                selection,
-                mount_point,
-                umask=umask_value,
-                confirm_entry=self.confirm_entry,
+        umask_value = self.umask_var.get().strip() or "000"
+        mode = self._selected_mode()
+        profile = PROFILE_LABELS.get(self.profile_var.get(), PROFILE_COMPATIBLE)
+        self._submit_operation(
+            Operation(
+                f"Configurar {selection['name']} en {mount_point}",
+                lambda on_stage: self.mount_configurator.configure(
+                    selection,
+                    mount_point,
+                    umask=umask_value,
+                    confirm_entry=lambda text: self.dispatcher.call(self.confirm_entry, text, mode),
+                    mode=mode,
+                    profile=profile,
+                    on_stage=on_stage,
+                ),
+                success_message=f"Montaje configurado en {Path(mount_point)}.",
+                failure_hint="/etc/fstab no quedó modificado.",
             )
-            if success:
-                messagebox.showinfo("Éxito", f"Montaje configurado en {Path(mount_point)}.")
-                self.refresh_devices()
-        except NTFSUnsupportedError:
-            messagebox.showerror(
-                "NTFS no soportado",
-                "El kernel no reconoce NTFS. Instala ntfs-3g e inténtalo nuevamente.\n"
-                "La entrada en /etc/fstab fue restaurada."
-            )
-        except Exception as exc:
-            self.log(f"Error: {exc}")
+        )
+
+    def configure_batch(self) -> None:
+        try:
+            selections = [self.unmounted_items[item] for item in self.unmounted_table.selection()]
+            if not selections:
+                raise ValueError("Seleccione una o más unidades en la tabla de unidades sin montar.")
+            base_dir = self.mount_entry.get().strip()
+            if not base_dir:
+                raise ValueError("Ingrese el directorio base donde se crearán los puntos de montaje.")
+        except ValueError as exc:
             messagebox.showerror("Error", str(exc))
+            return
+
+        requests = [
+            (entry, str(Path(base_dir) / (entry.get("label") or entry["name"]).replace("/", "_")))
+            for entry in selections
+        ]
+        umask_value = self.umask_var.get().strip() or "000"
+        mode = self._selected_mode()
+        profile = PROFILE_LABELS.get(self.profile_var.get(), PROFILE_COMPATIBLE)
+        self._submit_operation(
+            Operation(
+                f"Configurar lote de {len(requests)} unidades bajo {base_dir}",
+                lambda on_stage: self.mount_configurator.configure_batch(
+                    requests,
+                    umask=umask_value,
+                    confirm_entries=lambda entries: self.dispatcher.call(self.confirm_entries, entries),
+                    mode=mode,
+                    profile=profile,
+                    on_stage=on_stage,
+                ),
+                success_message=f"Se configuraron {len(requests)} montajes bajo {Path(base_dir)}.",
+                failure_hint="Se deshizo todo el lote y /etc/fstab no quedó modificado.",
+            )
+        )
 
     def unmount_selected(self) -> None:
-        try:
-            selection = self._get_selected_mounted_device()
-            if not selection:
-                raise ValueError("Seleccione una unidad desde la tabla de montadas para desmontar.")
+        selection = self._get_selected_mounted_device()
+        if not selection:
+            messagebox.showerror("Error", "Seleccione una unidad desde la tabla de montadas para desmontar.")
+            return
+        self._submit_operation(
+            Operation(
+                f"Desmontar {selection['name']} de {selection.get('mountpoint')}",
+                lambda on_stage: self.mount_configurator.unmount(
+                    selection,
+                    confirm_action=lambda name, mountpoint: self.dispatcher.call(self.confirm_unmount, name, mountpoint),
+                    on_busy=lambda mountpoint, scan: self.dispatcher.call(self.resolve_busy_unmount, mountpoint, scan),
+                    on_stage=on_stage,
+                ),
+                stages=UNMOUNT_STAGES,
+                cancellable=UNMOUNT_CANCELLABLE,
+                success_message=f"Se desmontó {selection['name']} y se eliminó su entrada de /etc/fstab.",
+            )
+        )
 
-            success = self.mount_configurator.unmount(
-                selection,
-                confirm_action=self.confirm_unmount,
+    def _ensure_tab(self, name: str) -> None:
+        builder = self._lazy_tabs.pop(name, None)
+        if builder is not None:
+            with span("gui.build_tab", tab=self.notebook.tab(name, "text")):
+                builder(self.root.nametowidget(name))
+
+    def _submit_operation(self, operation: Operation) -> None:
+        pending = len(self.operation_queue.active())
+        self.operation_queue.submit(operation)
+        if pending:
+            self.log(f"En cola ({pending} por delante): {operation.title}")
+
+    def _build_operations_tab(self, tab: ttk.Frame) -> None:
+        container = ttk.Frame(tab)
+        container.pack(fill=tk.BOTH, expand=True)
+        columns = ("title", "stage", "state")
+        self.operations_tree = ttk.Treeview(container, columns=columns, show="headings", height=10, selectmode="browse")
+        for col, text, width in zip(columns, ("Operación", "Etapa", "Estado"), (320, 200, 90)):
+            self.operations_tree.heading(col, text=text)
+            self.operations_tree.column(col, width=width, anchor="w")
+        self.operations_tree.grid(row=0, column=0, sticky="nsew")
+        scroll = ttk.Scrollbar(container, orient=tk.VERTICAL, command=self.operations_tree.yview)
+        scroll.grid(row=0, column=1, sticky="ns")
+        self.operations_tree.configure(yscrollcommand=scroll.set)
+        self.operations_tree.tag_configure(STATE_FAILED, foreground="#a61b1b")
+        self.operations_tree.tag_configure(STATE_CANCELLED, foreground="#6c6c6c")
+        container.columnconfigure(0, weight=1)
+        container.rowconfigure(0, weight=1)
+        for operation in self._operation_rows.values():
+            self._show_operation_row(operation)
+
+        buttons = ttk.Frame(tab)
+        buttons.pack(fill=tk.X, pady=(6, 0))
+        ttk.Button(
+            buttons, text="Cancelar seleccionada", command=self.cancel_selected_operation, style="Dark.TButton"
+        ).pack(side=tk.LEFT)
+        ttk.Button(
+            buttons, text="Quitar terminadas", command=self.clear_finished_operations, style="Dark.TButton"
+        ).pack(side=tk.LEFT, padx=(5, 0))
+
+    def _operation_stage_text(self, operation: Operation) -> str:
+        done, total = operation.progress()
+        if operation.stage is None:
+            return ""
+        return f"{min(done + 1, total)}/{total} {STAGE_LABELS.get(operation.stage, operation.stage)}"
+
+    def _on_operation_change(self, operation: Operation) -> None:
+        """Se ejecuta en el hilo de Tk cada vez que una operación cambia de estado o de etapa."""
+        self._operation_rows[str(operation.op_id)] = operation
+        if self.operations_tree is not None:
+            self._show_operation_row(operation)
+        self._update_operation_status()
+        # Los avisos se encolan con la operación, así que varios pueden llegar ya con el estado final.
+        if operation.state in FINAL_STATES and operation.op_id not in self._reported_operations:
+            self._reported_operations.add(operation.op_id)
+            self._report_operation(operation)
+            if operation.on_finish is not None:
+                operation.on_finish(operation)
+
+    def _show_operation_row(self, operation: Operation) -> None:
+        key = str(operation.op_id)
+        state = operation.state
+        if operation.cancel_requested and state not in FINAL_STATES:
+            state = "cancelando"
+        values = (operation.title, self._operation_stage_text(operation), state)
+        if self.operations_tree.exists(key):
+            self.operations_tree.item(key, values=values, tags=(operation.state,))
+        else:
+            self.operations_tree.insert("", tk.END, iid=key, values=values, tags=(operation.state,))
+
+    def _update_operation_status(self) -> None:
+        current = next((op for op in self.operation_queue.active() if op.state == STATE_RUNNING), None)
+        queued = sum(1 for op in self.operation_queue.active() if op.state == STATE_QUEUED)
+        if current is None:
+            self.operation_status.configure(text=f"{queued} en cola" if queued else "")
+            self.operation_progress.configure(value=0)
+            self.cancel_button.state(["disabled"])
+            return
+        done, total = current.progress()
+        text = f"{current.title}: {self._operation_stage_text(current)}"
+        if queued:
+            text += f" (+{queued} en cola)"
+        self.operation_status.configure(text=text)
+        self.operation_progress.configure(maximum=total, value=done)
+        self.cancel_button.state(["!disabled"] if current.can_cancel and not current.cancel_requested else ["disabled"])
+
+    def _report_operation(self, operation: Operation) -> None:
+        if operation.state == STATE_DONE:
+            messagebox.showinfo("Éxito", operation.success_message)
+            self.refresh_devices(full=False)
+        elif operation.state == STATE_CANCELLED:
+            if operation.error is not None:
+                self.log(str(operation.error))
+            self.refresh_devices(full=False)
+        elif isinstance(operation.error, StaleAnalysisError):
+            self.log(f"Aviso: {operation.error}")
+            messagebox.showwarning("Análisis desactualizado", str(operation.error))
+        elif isinstance(operation.error, NTFSUnsupportedError):
+            self.log(f"Error: {operation.error}")
+            messagebox.showerror(
+                "NTFS no soportado",
+                "El sistema no tiene un controlador NTFS utilizable (ntfs3 del kernel o ntfs-3g).\n"
+                f"Instala ntfs-3g e inténtalo nuevamente. {operation.failure_hint}",
             )
-            if success:
-                messagebox.showinfo(
-                    "Éxito", f"Se desmontó {selection['name']} y se eliminó su entrada de /etc/fstab."
-                )
-                self.refresh_devices()
-        except Exception as exc:
-            self.log(f"Error: {exc}")
-            messagebox.showerror("Error", str(exc))
+        else:
+            self.log(f"Error: {operation.error}")
+            messagebox.showerror("Error", str(operation.error))
+            self.refresh_devices(full=False)
+
+    def cancel_current_operation(self) -> None:
+        current = next((op for op in self.operation_queue.active() if op.state == STATE_RUNNING), None)
+        if current is not None:
+            self._cancel_operation(current)
+
+    def cancel_selected_operation(self) -> None:
+        selection = self.operations_tree.selection()
+        if selection:
+            self._cancel_operation(self._operation_rows[selection[0]])
+
+    def _cancel_operation(self, operation: Operation) -> None:
+        if self.operation_queue.cancel(operation):
+            self.log(f"Cancelación solicitada: {operation.title}")
+        else:
+            self.log(f"No se puede cancelar «{operation.title}»: ya pasó la última etapa cancelable.")
+
+    def clear_finished_operations(self) -> None:
+        for key, operation in list(self._operation_rows.items()):
+            if operation.state in FINAL_STATES:
+                if self.operations_tree is not None:
+                    self.operations_tree.delete(key)
+                del self._operation_rows[key]
+        self.operation_queue.clear_finished()
 
     def _get_selected_device(self):
-        selection = self.unmounted_tree.selection()
+        selection = self.unmounted_table.selection()
         if selection:
             return self.unmounted_items[selection[0]]
-        selection = self.mounted_tree.selection()
+        selection = self.mounted_table.selection()
         if selection:
             return self.mounted_items[selection[0]]
         return None
 
     def _get_selected_mounted_device(self):
-        selection = self.mounted_tree.selection()
+        selection = self.mounted_table.selection()
         if selection:
             return self.mounted_items[selection[0]]
         return None
 
-    def confirm_entry(self, entry: str) -> bool:
+    def _selected_mode(self) -> str:
+        return MOUNT_MODE_LABELS.get(self.mode_var.get(), MODE_FSTAB)
+
+    def confirm_entry(self, entry: str, mode: Optional[str] = None) -> bool:
+        if (mode or self._selected_mode()) == MODE_SYSTEMD:
+            return messagebox.askyesno(
+                "Confirmar",
+                f"Se crearán unidades systemd en {self.mount_configurator.unit_writer.unit_dir}:\n\n{entry}\n"
+                "¿Desea continuar?",
+            )
         return messagebox.askyesno(
             "Confirmar",
             f"Se agregará la siguiente entrada a /etc/fstab:\n{entry}\n\n¿Desea continuar?",
         )
 
+    def confirm_entries(self, entries: List[str]) -> bool:
+        shown = entries[:MAX_CONFIRM_LINES]
+        if len(entries) > len(shown):
+            shown.append(f"... y {len(entries) - len(shown)} entradas más")
+        listing = "\n".join(shown)
+        return messagebox.askyesno(
+            "Confirmar lote",
+            f"Se agregarán {len(entries)} entradas a /etc/fstab y se montarán en paralelo:\n{listing}\n\n"
+            "Si algún montaje falla se deshará todo el lote. ¿Desea continuar?",
+        )
+
     def confirm_unmount(self, device_name: str, mountpoint: str) -> bool:
         return messagebox.askyesno(
             "Confirmar desmontaje",
@@ -487,6 +997,44 @@ class AutoMountGUI:
             "¿Desea continuar?",
         )
 
+    def resolve_busy_unmount(self, mountpoint: str, scan: HolderScan) -> Optional[str]:
+        """Pregunta cómo continuar cuando el montaje está ocupado."""
+        window = tk.Toplevel(self.root)
+        window.title("Montaje en uso")
+        window.transient(self.root)
+        window.grab_set()
+        choice: Dict[str, Optional[str]] = {"value": None}
+
+        ttk.Label(
+            window,
+            text=f"{mountpoint} está en uso y no se pudo desmontar.",
+            wraplength=460,
+        ).pack(anchor="w", padx=10, pady=(10, 5))
+        details = ScrolledText(window, height=10, width=64)
+        details.insert("1.0", scan.summary(limit=50))
+        details.configure(state=tk.DISABLED)
+        details.pack(fill=tk.BOTH, expand=True, padx=10)
+
+        def choose(value: Optional[str]) -> None:
+            choice["value"] = value
+            window.destroy()
+
+        buttons = ttk.Frame(window)
+        buttons.pack(fill=tk.X, padx=10, pady=10)
+        ttk.Button(buttons, text="Cancelar", command=lambda: choose(None), style="Dark.TButton").pack(side=tk.RIGHT)
+        kill_button = ttk.Button(
+            buttons, text="Cerrar procesos y reintentar", command=lambda: choose(BUSY_KILL), style="Dark.TButton"
+        )
+        kill_button.pack(side=tk.RIGHT, padx=(0, 5))
+        if not scan.holders:
+            kill_button.state(["disabled"])
+        ttk.Button(
+            buttons, text="Desmontaje diferido", command=lambda: choose(BUSY_LAZY), style="Dark.TButton"
+        ).pack(side=tk.RIGHT, padx=(0, 5))
+        window.protocol("WM_DELETE_WINDOW", lambda: choose(None))
+        self.root.wait_window(window)
+        return choice["value"]
+
     def open_fstab(self) -> None:
         path = FSTAB_PATH
         if not path.exists():
@@ -518,8 +1066,11 @@ class AutoMountGUI:
             messagebox.showerror("Error", f"No se pudo leer {path}.\n{exc}")
             return
 
+        self._show_text_viewer(f"Vista de {path}", content)
+
+    def _show_text_viewer(self, title: str, content: str) -> None:
         viewer = tk.Toplevel(self.root)
-        viewer.title(f"Vista de {path}")
+        viewer.title(title)
         viewer.geometry("720x480")
         viewer.transient(self.root)
 
@@ -563,6 +1114,213 @@ class AutoMountGUI:
         )
         view_btn.pack(side=tk.RIGHT)
         self.add_tooltip(view_btn, "Abre una vista de solo lectura de /etc/fstab.")
+        backups_btn = ttk.Button(
+            controls,
+            text="Respaldos...",
+            command=self.show_backups,
+            style="Dark.TButton",
+        )
+        backups_btn.pack(side=tk.RIGHT, padx=(0, 5))
+        self.add_tooltip(backups_btn, "Lista los respaldos de /etc/fstab y permite restaurarlos.")
+
+    def _build_boot_tab(self, tab: ttk.Frame) -> None:
+        tab.columnconfigure(0, weight=1)
+        tab.rowconfigure(1, weight=1)
+        ttk.Label(
+            tab,
+            text="Entradas de /etc/fstab que pueden retrasar o bloquear el arranque si falta la unidad.",
+        ).grid(row=0, column=0, sticky="w", pady=(0, 6))
+
+        container = ttk.Frame(tab, borderwidth=1, relief="solid", padding=4)
+        container.grid(row=1, column=0, sticky="nsew")
+        columns = ("mountpoint", "source", "delay", "severity", "problems")
+        self.boot_tree = ttk.Treeview(
+            container, columns=columns, show="headings", selectmode="extended", height=10, style="Table.Treeview"
+        )
+        headings = ("Punto de montaje", "Origen", "Demora máx.", "Riesgo", "Problemas")
+        for col, text, width in zip(columns, headings, (130, 160, 80, 60, 220)):
+            self.boot_tree.heading(col, text=text)
+            self.boot_tree.column(col, width=width, anchor="w")
+        self.boot_tree.grid(row=0, column=0, sticky="nsew")
+        boot_scroll = ttk.Scrollbar(container, orient=tk.VERTICAL, command=self.boot_tree.yview)
+        boot_scroll.grid(row=0, column=1, sticky="ns")
+        self.boot_tree.configure(yscrollcommand=boot_scroll.set)
+        self.boot_tree.tag_configure("alta", background="#f8d7da")
+        self.boot_tree.tag_configure("media", background="#fff3cd")
+        self.boot_tree.bind("<<TreeviewSelect>>", lambda _e: self._show_boot_details())
+        container.columnconfigure(0, weight=1)
+        container.rowconfigure(0, weight=1)
+
+        self.boot_details = tk.Text(tab, height=4, state=tk.DISABLED, wrap="word")
+        self.boot_details.grid(row=2, column=0, sticky="ew", pady=(6, 0))
+
+        controls = ttk.Frame(tab)
+        controls.grid(row=3, column=0, sticky="e", pady=(6, 0))
+        fix_all_btn = ttk.Button(
+            controls, text="Corregir todas", command=lambda: self.apply_boot_fixes(all_entries=True), style="Dark.TButton"
+        )
+        fix_all_btn.pack(side=tk.RIGHT)
+        fix_btn = ttk.Button(controls, text="Corregir selección", command=self.apply_boot_fixes, style="Dark.TButton")
+        fix_btn.pack(side=tk.RIGHT, padx=(0, 5))
+        self.add_tooltip(fix_btn, "Reescribe las entradas seleccionadas con las correcciones propuestas.")
+        analyze_btn = ttk.Button(controls, text="Analizar", command=self.analyze_boot, style="Dark.TButton")
+        analyze_btn.pack(side=tk.RIGHT, padx=(0, 5))
+        self.add_tooltip(analyze_btn, "Revisa /etc/fstab contra las unidades conectadas.")
+
+    def analyze_boot(self) -> None:
+        self._run_in_thread(
+            target=self.mount_configurator.analyze_boot,
+            on_success=self._populate_boot_reports,
+            on_error=lambda exc: self.log(f"Error al analizar /etc/fstab: {exc}"),
+        )
+
+    def _refresh_boot_tab(self, _operation: Operation) -> None:
+        """Tras reescribir fstab, el análisis de arranque mostrado deja de valer."""
+        if self._boot_analysis is not None:
+            self.analyze_boot()
+
+    def _populate_boot_reports(self, analysis: BootAnalysis) -> None:
+        self._boot_analysis = analysis
+        reports = analysis.reports
+        self.boot_tree.delete(*self.boot_tree.get_children())
+        self._boot_reports.clear()
+        flagged = [report for report in reports if report.findings]
+        for report in flagged:
+            item_id = self.boot_tree.insert(
+                "",
+                tk.END,
+                values=(
+                    report.entry.mountpoint,
+                    report.entry.source,
+                    format_delay(report.worst_delay),
+                    report.severity,
+                    "; ".join(finding.code for finding in report.findings),
+                ),
+                tags=(report.severity,),
+            )
+            self._boot_reports[item_id] = report
+        total = sum(report.worst_delay for report in flagged)
+        self.log(
+            f"Análisis de arranque: {len(flagged)} de {len(reports)} entradas con observaciones; "
+            f"demora máxima estimada {format_delay(total)}."
+        )
+        self._show_boot_details()
+
+    def _show_boot_details(self) -> None:
+        selection = self.boot_tree.selection()
+        if selection:
+            report = self._boot_reports[selection[0]]
+            lines = [f"[{finding.severity}] {finding.message}" for finding in report.findings]
+            if report.fixable:
+                lines.append(f"Propuesta: {report.preview()}")
+            text = "\n".join(lines)
+        elif self._boot_reports:
+            text = "Seleccione una entrada para ver el detalle y la corrección propuesta."
+        else:
+            text = "Pulse Analizar para revisar /etc/fstab."
+        self.boot_details.configure(state=tk.NORMAL)
+        self.boot_details.delete("1.0", tk.END)
+        self.boot_details.insert("1.0", text)
+        self.boot_details.configure(state=tk.DISABLED)
+
+    def apply_boot_fixes(self, all_entries: bool = False) -> None:
+        items = self.boot_tree.get_children() if all_entries else self.boot_tree.selection()
+        reports = [self._boot_reports[item] for item in items if self._boot_reports[item].fixable]
+        if not reports or self._boot_analysis is None:
+            messagebox.showinfo("Arranque", "No hay correcciones disponibles para las entradas indicadas.")
+            return
+        preview = "\n".join(report.preview() for report in reports[:MAX_CONFIRM_LINES])
+        if not messagebox.askyesno(
+            "Corregir /etc/fstab",
+            f"Se reescribirán {len(reports)} entradas:\n{preview}\n\n¿Desea continuar?",
+        ):
+            return
+        analysis = self._boot_analysis
+        self._submit_operation(
+            Operation(
+                f"Corregir {len(reports)} entradas de /etc/fstab para el arranque",
+                lambda on_stage: self.mount_configurator.apply_boot_rewrites(analysis, reports, on_stage=on_stage),
+                stages=FSTAB_STAGES,
+                cancellable=FSTAB_CANCELLABLE,
+                success_message="Se corrigieron las entradas de /etc/fstab para el arranque.",
+                failure_hint="/etc/fstab no quedó modificado.",
+                on_finish=self._refresh_boot_tab,
+            )
+        )
+
+    def show_backups(self) -> None:
+        store = self.mount_configurator.backup_store
+        try:
+            records = store.list()
+        except Exception as exc:
+            messagebox.showerror("Error", f"No se pudieron leer los respaldos.\n{exc}")
+            return
+
+        window = tk.Toplevel(self.root)
+        window.title("Respaldos de /etc/fstab")
+        window.geometry("560x320")
+        window.transient(self.root)
+
+        columns = ("created", "digest", "size")
+        tree = ttk.Treeview(window, columns=columns, show="headings", selectmode="browse", style="Table.Treeview")
+        for col, text, width in zip(columns, ("Fecha", "Hash", "Tamaño"), (180, 160, 100)):
+            tree.heading(col, text=text)
+            tree.column(col, width=width, anchor="w")
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
+        backups: Dict[str, object] = {}
+        for record in records:
+            item_id = tree.insert("", tk.END, values=(record.created_text, record.short_digest, f"{record.size} B"))
+            backups[item_id] = record
+
+        def selected_record():
+            selection = tree.selection()
+            if not selection:
+                messagebox.showinfo("Respaldos", "Seleccione un respaldo.", parent=window)
+                return None
+            return backups[selection[0]]
+
+        def view_selected() -> None:
+            record = selected_record()
+            if record is None:
+                return
+            try:
+                content = store.read(record.digest).decode("utf-8", "replace")
+            except Exception as exc:
+                messagebox.showerror("Error", str(exc), parent=window)
+                return
+            self._show_text_viewer(f"Respaldo {record.short_digest} ({record.created_text})", content)
+
+        def restore_selected() -> None:
+            record = selected_record()
+            if record is None:
+                return
+            if not messagebox.askyesno(
+                "Restaurar respaldo",
+                f"Se reemplazará {self.mount_configurator.fstab_path} por el respaldo del {record.created_text}.\n"
+                "La versión actual se respaldará antes.\n¿Desea continuar?",
+                parent=window,
+            ):
+                return
+            window.destroy()
+            self._submit_operation(
+                Operation(
+                    f"Restaurar el respaldo {record.short_digest} de /etc/fstab",
+                    lambda on_stage: self.mount_configurator.restore_backup(record.digest, on_stage=on_stage),
+                    stages=FSTAB_STAGES,
+                    cancellable=FSTAB_CANCELLABLE,
+                    success_message=f"/etc/fstab restaurado desde el respaldo del {record.created_text}.",
+                    failure_hint="/etc/fstab no quedó modificado.",
+                    on_finish=self._refresh_boot_tab,
+                )
+            )
+
+        buttons = ttk.Frame(window)
+        buttons.pack(fill=tk.X, padx=10, pady=(0, 10))
+        ttk.Button(buttons, text="Cerrar", command=window.destroy, style="Dark.TButton").pack(side=tk.RIGHT)
+        ttk.Button(buttons, text="Restaurar", command=restore_selected, style="Dark.TButton").pack(
+            side=tk.RIGHT, padx=(0, 5)
+        )
+        ttk.Button(buttons, text="Ver", command=view_selected, style="Dark.TButton").pack(side=tk.RIGHT, padx=(0, 5))
 
     def get_icon(self, name: str) -> Optional[tk.PhotoImage]:
         if name in self._icon_cache:
@@ -570,7 +1328,20 @@ class AutoMountGUI:
 
         icon_image: Optional[tk.PhotoImage] = None
 
-        if hasattr(self, "_icon_provider") and self._icon_provider is not None:
+        # Primero las copias incrustadas: así el arranque nunca tiene que importar ttkbootstrap.
+        icon_data = EMBEDDED_ICONS.get(name)
+        if icon_data:
+            try:
+                icon_image = tk.PhotoImage(data=icon_data)
+            except Exception:
+                icon_image = None
+
+        if icon_image is None:
+            if self._icon_provider is None and _icon_class() is not None:
+                try:
+                    self._icon_provider = _icon_class()()
+                except Exception:
+                    self._icon_provider = None
             # ttkbootstrap provides a few baked-in base64 icons as attributes.
             icon_data = getattr(self._icon_provider, name, None)
             if isinstance(icon_data, str):
@@ -579,24 +1350,19 @@ class AutoMountGUI:
                 except Exception:
                     icon_image = None
 
-        if icon_image is None:
-            icon_data = EMBEDDED_ICONS.get(name)
-            if icon_data:
-                try:
-                    icon_image = tk.PhotoImage(data=icon_data)
-                except Exception:
-                    icon_image = None
-
         self._icon_cache[name] = icon_image
         return icon_image
 
     def add_tooltip(self, widget, text: str) -> None:
-        if ToolTip is None:
+        if self._pending_tooltips is not None:
+            # Hasta el primer repintado sólo se anotan (ver _after_first_paint).
+            self._pending_tooltips.append((widget, text))
             return
+        tooltip_class = _tooltip_class()
         tooltip = None
         for kwargs in ({"text": text}, {"msg": text}):
             try:
-                tooltip = ToolTip(widget, **kwargs)
+                tooltip = tooltip_class(widget, **kwargs)
                 break
             except TypeError:
                 continue
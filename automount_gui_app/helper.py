@@ -0,0 +1,658 @@
+"""
+Ayudante privilegiado: un proceso root que atiende por un socket Unix.
+
+La interfaz y las herramientas de línea de comandos pueden ejecutarse sin
+privilegios y pedir al ayudante las operaciones que los necesitan: montar,
+desmontar, añadir o quitar entradas de fstab, sondear dispositivos y dar al
+usuario la propiedad de un punto de montaje recién montado. El
+ayudante vive más que cada sesión, así que la instantánea de dispositivos,
+la tabla de montajes y el índice de fstab se mantienen cargados.
+
+Protocolo: una línea JSON por mensaje.
+
+    -> {"id": 1, "op": "mount", "args": {"source": "UUID=...", ...}}
+    <- {"id": 1, "ok": true, "result": null}
+    <- {"id": 1, "ok": false, "error": {"type": "MountBusyError", "message": "..."}}
+
+Cada operación pasa por `HelperPolicy`, que conoce la identidad del cliente
+(SO_PEERCRED). Puede arrancarse como servicio de larga duración o activarse
+por socket con systemd (`python -m automount_gui_app.helper units`).
+"""
+
+from __future__ import annotations
+
+import argparse
+import grp
+import json
+import os
+import pwd
+import socket
+import struct
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from .backups import FstabBackupStore
+from .constants import FSTAB_BACKUP_DIR, FSTAB_PATH, HELPER_SOCKET, PROTECTED_MOUNTPOINTS
+from .devices import DeviceSnapshot
+from .drivers import FilesystemSupport
+from .errors import CommandTimeoutError, MountBusyError, NTFSUnsupportedError
+from .executor import MountExecutor
+from .fstab import FstabDocument, FstabEntry, normalize_mountpoint, split_source
+from .journal import FstabJournal
+from .mounttable import MountTable
+from .probe import probe_device
+from .verifier import FstabVerifier, check_change
+
+PROTOCOL_VERSION = 1
+MAX_MESSAGE = 1 << 20
+SD_LISTEN_FDS_START = 3
+
+READ_OPERATIONS = frozenset({"ping", "devices", "mounts", "fstab", "probe", "verify"})
+WRITE_OPERATIONS = frozenset({"mount", "unmount", "fstab_add", "fstab_remove", "chown_mountpoint"})
+ADMIN_GROUPS = frozenset({"sudo", "wheel", "admin"})
+ALLOWED_FSTYPES = frozenset({
+    "ext2", "ext3", "ext4", "xfs", "btrfs", "vfat", "exfat", "exfat-fuse", "ntfs", "ntfs3", "ntfs-3g",
+})
+# Opciones que un usuario no root no puede pedir: permitirían ejecutar binarios
+# setuid o abrir nodos de dispositivo de un disco ajeno.
+PRIVILEGED_OPTIONS = frozenset({"suid", "dev"})
+FORBIDDEN_TREES = ("/proc", "/sys", "/dev", "/run", "/usr", "/etc", "/bin", "/sbin", "/lib", "/var", "/boot")
+
+ERROR_TYPES = {
+    "MountBusyError": MountBusyError,
+    "NTFSUnsupportedError": NTFSUnsupportedError,
+    "CommandTimeoutError": CommandTimeoutError,
+    "PermissionError": PermissionError,
+    "ValueError": ValueError,
+}
+
+
+@dataclass(frozen=True)
+class PeerCredentials:
+    pid: int
+    uid: int
+    gid: int
+
+    @classmethod
+    def from_socket(cls, sock: socket.socket) -> "PeerCredentials":
+        data = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        return cls(*struct.unpack("3i", data))
+
+
+class HelperPolicy:
+    """Lista de operaciones permitidas y validación de sus argumentos.
+
+    Las consultas están abiertas a cualquier usuario local; las operaciones
+    que modifican el sistema exigen root, un uid de `allowed_uids` o
+    pertenecer a uno de `allowed_groups`.
+    """
+
+    def __init__(
+        self,
+        read_operations: FrozenSet[str] = READ_OPERATIONS,
+        write_operations: FrozenSet[str] = WRITE_OPERATIONS,
+        allowed_uids: FrozenSet[int] = frozenset(),
+        allowed_groups: FrozenSet[str] = ADMIN_GROUPS,
+        allowed_fstypes: FrozenSet[str] = ALLOWED_FSTYPES,
+    ) -> None:
+        self.read_operations = read_operations
+        self.write_operations = write_operations
+        self.allowed_uids = allowed_uids
+        self.allowed_groups = allowed_groups
+        self.allowed_fstypes = allowed_fstypes
+
+    def check(self, op: str, args: Dict, peer: PeerCredentials) -> None:
+        """Lanza PermissionError si `peer` no puede ejecutar `op` con `args`."""
+        if op in self.read_operations:
+            return
+        if op not in self.write_operations:
+            raise PermissionError(f"Operación no permitida: {op}")
+        if not self.is_admin(peer):
+            raise PermissionError(f"El usuario {peer.uid} no está autorizado para '{op}'.")
+        mountpoint = args.get("mountpoint")
+        if mountpoint is not None:
+            self.check_mountpoint(str(mountpoint))
+        if op in ("mount", "fstab_add"):
+            self.check_entry(args, peer)
+        if op == "chown_mountpoint" and peer.uid != 0 and args.get("uid") != peer.uid:
+            raise PermissionError("Sólo se puede asignar un punto de montaje al propio usuario.")
+
+    def is_admin(self, peer: PeerCredentials) -> bool:
+        if peer.uid == 0 or peer.uid in self.allowed_uids:
+            return True
+        try:
+            user = pwd.getpwuid(peer.uid)
+        except KeyError:
+            return False
+        groups = {grp.getgrgid(gid).gr_name for gid in os.getgrouplist(user.pw_name, user.pw_gid) if _group_exists(gid)}
+        return bool(groups & self.allowed_groups)
+
+    def check_mountpoint(self, mountpoint: str) -> None:
+        if not mountpoint.startswith("/") or "\0" in mountpoint:
+            raise PermissionError(f"Punto de montaje no válido: {mountpoint}")
+        normalized = normalize_mountpoint(os.path.normpath(mountpoint))
+        if normalized in {path.as_posix() for path in PROTECTED_MOUNTPOINTS}:
+            raise PermissionError(f"{normalized} está protegido.")
+        if any(normalized == tree or normalized.startswith(tree + "/") for tree in FORBIDDEN_TREES):
+            if not normalized.startswith(("/run/media/", "/var/mnt/")):
+                raise PermissionError(f"No se permite montar dentro de /{normalized.split('/')[1]}.")
+
+    def check_entry(self, args: Dict, peer: PeerCredentials) -> None:
+        fstype = args.get("fstype")
+        if fstype not in self.allowed_fstypes:
+            raise PermissionError(f"Tipo de sistema de archivos no permitido: {fstype}")
+        if split_source(str(args.get("source", "")))[0] == "other":
+            raise PermissionError("El origen debe ser UUID=, LABEL=, PARTUUID= o una ruta de /dev.")
+        options = {option.split("=", 1)[0] for option in str(args.get("options", "defaults")).split(",")}
+        if peer.uid != 0 and options & PRIVILEGED_OPTIONS:
+            raise PermissionError(f"Opciones reservadas a root: {', '.join(sorted(options & PRIVILEGED_OPTIONS))}")
+
+
+def _group_exists(gid: int) -> bool:
+    try:
+        grp.getgrgid(gid)
+        return True
+    except KeyError:
+        return False
+
+
+def _entry_from_args(args: Dict) -> FstabEntry:
+    return FstabEntry(
+        str(args["source"]),
+        str(args["mountpoint"]),
+        str(args["fstype"]),
+        str(args.get("options") or "defaults"),
+        int(args.get("freq", 0)),
+        int(args.get("passno", 0)),
+    )
+
+
+class SystemBackend:
+    """Operaciones reales; conserva cargados los datos entre peticiones."""
+
+    def __init__(
+        self,
+        snapshot=None,
+        fstab_path: Path = FSTAB_PATH,
+        executor=None,
+        backup_store: Optional[FstabBackupStore] = None,
+    ) -> None:
+        self.snapshot = snapshot or DeviceSnapshot()
+        self.mount_table = MountTable()
+        self.fstab_path = Path(fstab_path)
+        self.executor = executor or MountExecutor(lookup=self._lookup)
+        self.backup_store = backup_store or FstabBackupStore(self.fstab_path.with_name(FSTAB_BACKUP_DIR.name))
+        self.journal = FstabJournal(self.fstab_path)
+        self.verifier = FstabVerifier(self.snapshot, FilesystemSupport())
+        self._fstab: Optional[FstabDocument] = None
+        self._fstab_stamp: Optional[Tuple[int, int, int]] = None
+        self.journal.recover()
+
+    def _lookup(self, field: str, value: str) -> Optional[Dict]:
+        return self.snapshot.find(field, value)
+
+    def load_fstab(self) -> FstabDocument:
+        """Documento de fstab en memoria; sólo se relee si el fichero cambió."""
+        try:
+            stat = self.fstab_path.stat()
+            stamp = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            stamp = None
+        if self._fstab is None or stamp != self._fstab_stamp:
+            self._fstab = FstabDocument.load(self.fstab_path, snapshot=self.snapshot)
+            self._fstab_stamp = stamp
+        return self._fstab
+
+    def _commit(self, document: FstabDocument, description: str) -> None:
+        data = document.serialize()
+        previous = self.load_fstab().serialize()
+        check_change(self.verifier, previous, data)
+        self.backup_store.save(self.fstab_path)
+        self.journal.commit(data, description).finalize()
+        self._fstab = None
+
+    def ping(self) -> Dict:
+        return {"version": PROTOCOL_VERSION, "pid": os.getpid()}
+
+    def devices(self) -> List[Dict]:
+        return self.snapshot.entries()
+
+    def mounts(self) -> List[Dict]:
+        self.mount_table.refresh()
+        return [
+            {"source": entry.source, "mountpoint": entry.mountpoint, "fstype": entry.fstype, "options": entry.options}
+            for entry in self.mount_table.entries()
+        ]
+
+    def fstab(self) -> Dict:
+        document = self.load_fstab()
+        return {"text": document.serialize(), "entries": [entry.render() for entry in document.entries()]}
+
+    def probe(self, path: str) -> Optional[Dict]:
+        # Se normaliza antes de comprobar el prefijo: "/dev/../etc/shadow" no es de /dev.
+        normalized = os.path.normpath(str(path))
+        if not normalized.startswith("/dev/") or "\0" in normalized:
+            raise ValueError(f"Sólo se pueden sondear rutas de /dev: {path}")
+        info = probe_device(normalized)
+        return asdict(info) if info else None
+
+    def verify(self, text: Optional[str] = None) -> List[Dict]:
+        text = self.load_fstab().serialize() if text is None else text
+        return [asdict(issue) for issue in self.verifier.verify(text)]
+
+    def mount(self, source: str, mountpoint: str, fstype: str, options: str = "defaults", in_fstab: bool = True) -> None:
+        entry = FstabEntry(source, mountpoint, fstype, options)
+        Path(mountpoint).mkdir(parents=True, exist_ok=True)
+        self.executor.mount(entry, in_fstab=in_fstab)
+        self.snapshot.invalidate()
+
+    def unmount(self, mountpoint: str, lazy: bool = False) -> None:
+        self.executor.unmount(mountpoint, lazy=lazy)
+        self.snapshot.invalidate()
+
+    def chown_mountpoint(self, mountpoint: str, uid: int, gid: int) -> None:
+        # Sólo la raíz de un montaje: nunca un directorio cualquiera del sistema.
+        if not self.mount_table.is_mountpoint(Path(mountpoint)):
+            raise ValueError(f"{mountpoint} no es un punto de montaje.")
+        os.chown(mountpoint, int(uid), int(gid))
+
+    def fstab_add(self, **args) -> str:
+        entry = _entry_from_args(args)
+        document = FstabDocument.load(self.fstab_path, snapshot=self.snapshot)
+        if document.find_mountpoint(entry.mountpoint):
+            raise RuntimeError(f"Ya existe una entrada para {entry.mountpoint} en /etc/fstab.")
+        document.add(entry)
+        self._commit(document, f"añadir {entry.render()}")
+        return entry.render()
+
+    def fstab_remove(self, source: str, mountpoint: str) -> int:
+        document = FstabDocument.load(self.fstab_path, snapshot=self.snapshot)
+        matches = [
+            entry
+            for entry in document.find_source(source)
+            if normalize_mountpoint(entry.mountpoint) == normalize_mountpoint(mountpoint)
+        ]
+        if not matches:
+            raise RuntimeError("No se encontró una entrada en /etc/fstab para esta unidad.")
+        for entry in matches:
+            document.remove(entry)
+        self._commit(document, f"quitar {source} de {mountpoint}")
+        return len(matches)
+
+
+class MemoryBackend:
+    """Backend en memoria con la misma interfaz que `SystemBackend`.
+
+    Sirve para ejecutar el protocolo de extremo a extremo sin tocar el
+    sistema (por ejemplo sobre un `socket.socketpair()`).
+    """
+
+    def __init__(self, devices: Optional[List[Dict]] = None, fstab_text: str = "") -> None:
+        self._devices = list(devices or [])
+        self._mounts: Dict[str, Dict] = {}
+        self.document = FstabDocument(fstab_text)
+        self.verifier = FstabVerifier()
+        self.calls: List[Tuple[str, Dict]] = []
+
+    def ping(self) -> Dict:
+        return {"version": PROTOCOL_VERSION, "pid": os.getpid()}
+
+    def devices(self) -> List[Dict]:
+        return list(self._devices)
+
+    def mounts(self) -> List[Dict]:
+        return list(self._mounts.values())
+
+    def fstab(self) -> Dict:
+        return {"text": self.document.serialize(), "entries": [entry.render() for entry in self.document.entries()]}
+
+    def probe(self, path: str) -> Optional[Dict]:
+        for device in self._devices:
+            if f"/dev/{device.get('name')}" == path:
+                return {"fstype": device.get("fstype"), "uuid": device.get("uuid"), "label": device.get("label")}
+        return None
+
+    def verify(self, text: Optional[str] = None) -> List[Dict]:
+        text = self.document.serialize() if text is None else text
+        return [asdict(issue) for issue in self.verifier.verify(text)]
+
+    def mount(self, source: str, mountpoint: str, fstype: str, options: str = "defaults", in_fstab: bool = True) -> None:
+        self.calls.append(("mount", {"source": source, "mountpoint": mountpoint}))
+        if mountpoint in self._mounts:
+            raise RuntimeError(f"mount: {mountpoint}: ya hay algo montado.")
+        self._mounts[mountpoint] = {"source": source, "mountpoint": mountpoint, "fstype": fstype, "options": options}
+
+    def unmount(self, mountpoint: str, lazy: bool = False) -> None:
+        self.calls.append(("unmount", {"mountpoint": mountpoint, "lazy": lazy}))
+        if mountpoint not in self._mounts:
+            raise RuntimeError(f"umount: {mountpoint}: not mounted.")
+        if self._mounts[mountpoint].get("busy") and not lazy:
+            raise MountBusyError(f"umount: {mountpoint}: target is busy.")
+        del self._mounts[mountpoint]
+
+    def chown_mountpoint(self, mountpoint: str, uid: int, gid: int) -> None:
+        self.calls.append(("chown_mountpoint", {"mountpoint": mountpoint, "uid": uid, "gid": gid}))
+        if mountpoint not in self._mounts:
+            raise ValueError(f"{mountpoint} no es un punto de montaje.")
+
+    def fstab_add(self, **args) -> str:
+        entry = _entry_from_args(args)
+        before = self.document.serialize()
+        self.document.add(entry)
+        try:
+            check_change(self.verifier, before, self.document.serialize())
+        except RuntimeError:
+            self.document.remove(entry)
+            raise
+        return entry.render()
+
+    def fstab_remove(self, source: str, mountpoint: str) -> int:
+        matches = [
+            entry
+            for entry in self.document.find_source(source)
+            if normalize_mountpoint(entry.mountpoint) == normalize_mountpoint(mountpoint)
+        ]
+        if not matches:
+            raise RuntimeError("No se encontró una entrada en /etc/fstab para esta unidad.")
+        for entry in matches:
+            self.document.remove(entry)
+        return len(matches)
+
+
+class HelperServer:
+    """Atiende conexiones y despacha cada petición al backend según la política."""
+
+    def __init__(self, backend, policy: Optional[HelperPolicy] = None, log: Callable[[str], None] = print) -> None:
+        self.backend = backend
+        self.policy = policy or HelperPolicy()
+        self.log = log
+        # Las modificaciones se serializan; las consultas no esperan a nadie salvo a ellas.
+        self._write_lock = threading.Lock()
+        self._active = 0
+        self._last_activity = time.monotonic()
+        self._state_lock = threading.Lock()
+
+    def handle(self, request: Dict, peer: PeerCredentials) -> Dict:
+        request_id = request.get("id")
+        try:
+            op = request.get("op")
+            args = request.get("args") or {}
+            if not isinstance(op, str) or not isinstance(args, dict):
+                raise ValueError("Petición mal formada.")
+            self.policy.check(op, args, peer)
+            method = getattr(self.backend, op)
+            if op in self.policy.write_operations:
+                with self._write_lock:
+                    result = method(**args)
+                self.log(f"uid {peer.uid}: {op} {json.dumps(args, ensure_ascii=False)}")
+            else:
+                result = method(**args)
+            return {"id": request_id, "ok": True, "result": result}
+        except Exception as exc:  # noqa: BLE001 - el error viaja al cliente
+            if isinstance(exc, TypeError):
+                exc = ValueError(f"Argumentos no válidos para '{request.get('op')}': {exc}")
+            return {"id": request_id, "ok": False, "error": {"type": type(exc).__name__, "message": str(exc)}}
+
+    def serve_connection(self, conn: socket.socket, peer: Optional[PeerCredentials] = None) -> None:
+        """Atiende una conexión hasta que el cliente la cierra."""
+        peer = peer or PeerCredentials.from_socket(conn)
+        with self._state_lock:
+            self._active += 1
+        try:
+            with conn, conn.makefile("rb") as reader:
+                for line in iter(lambda: reader.readline(MAX_MESSAGE + 1), b""):
+                    if len(line) > MAX_MESSAGE:
+                        conn.sendall(_encode({"id": None, "ok": False, "error": {
+                            "type": "ValueError", "message": "Mensaje demasiado grande."}}))
+                        return
+                    try:
+                        request = json.loads(line)
+                    except ValueError:
+                        request = {"id": None, "op": None}
+                    if not isinstance(request, dict):
+                        request = {"id": None, "op": None}
+                    conn.sendall(_encode(self.handle(request, peer)))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self._state_lock:
+                self._active -= 1
+                self._last_activity = time.monotonic()
+
+    def serve_forever(self, listener: socket.socket, idle_timeout: Optional[float] = None) -> None:
+        """Acepta conexiones; con `idle_timeout` termina tras ese tiempo sin clientes."""
+        listener.settimeout(1.0 if idle_timeout else None)
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except socket.timeout:
+                with self._state_lock:
+                    idle = self._active == 0 and time.monotonic() - self._last_activity > idle_timeout
+                if idle:
+                    return
+                continue
+            conn.settimeout(None)
+            threading.Thread(target=self.serve_connection, args=(conn,), daemon=True).start()
+
+
+def _encode(message: Dict) -> bytes:
+    return json.dumps(message, separators=(",", ":"), default=str, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def open_listener(socket_path: Path = HELPER_SOCKET) -> socket.socket:
+    """Socket heredado de systemd (LISTEN_FDS) o uno nuevo en `socket_path`."""
+    if os.environ.get("LISTEN_PID") == str(os.getpid()) and int(os.environ.get("LISTEN_FDS", "0")) >= 1:
+        return socket.socket(fileno=SD_LISTEN_FDS_START)
+    socket_path = Path(socket_path)
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        socket_path.unlink()
+    except FileNotFoundError:
+        pass
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(socket_path))
+    # Cualquiera puede conectarse; la política decide qué puede hacer cada uid.
+    os.chmod(socket_path, 0o666)
+    listener.listen(16)
+    return listener
+
+
+class HelperClient:
+    """Cliente del ayudante; reproduce en local las excepciones del servidor."""
+
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+        self._reader = sock.makefile("rb")
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    @classmethod
+    def connect(cls, socket_path: Path = HELPER_SOCKET, timeout: Optional[float] = 120.0) -> "HelperClient":
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(str(socket_path))
+        except OSError:
+            sock.close()
+            raise
+        return cls(sock)
+
+    def close(self) -> None:
+        self._reader.close()
+        self.sock.close()
+
+    def __enter__(self) -> "HelperClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def call(self, op: str, **args):
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+            self.sock.sendall(_encode({"id": request_id, "op": op, "args": args}))
+            line = self._reader.readline(MAX_MESSAGE + 1)
+        if not line:
+            raise RuntimeError("El ayudante cerró la conexión.")
+        response = json.loads(line)
+        if response.get("id") != request_id:
+            raise RuntimeError("Respuesta del ayudante fuera de orden.")
+        if response.get("ok"):
+            return response.get("result")
+        error = response.get("error") or {}
+        raise ERROR_TYPES.get(error.get("type"), RuntimeError)(error.get("message", "Error del ayudante."))
+
+    def ping(self) -> Dict:
+        return self.call("ping")
+
+    def devices(self) -> List[Dict]:
+        return self.call("devices")
+
+    def mounts(self) -> List[Dict]:
+        return self.call("mounts")
+
+    def fstab(self) -> Dict:
+        return self.call("fstab")
+
+    def probe(self, path: str) -> Optional[Dict]:
+        return self.call("probe", path=path)
+
+    def verify(self, text: Optional[str] = None) -> List[Dict]:
+        return self.call("verify", text=text)
+
+    def mount(self, entry: FstabEntry, in_fstab: bool = True) -> None:
+        self.call(
+            "mount",
+            source=entry.source,
+            mountpoint=entry.mountpoint,
+            fstype=entry.fstype,
+            options=entry.options,
+            in_fstab=in_fstab,
+        )
+
+    def unmount(self, mountpoint: str, lazy: bool = False) -> None:
+        self.call("unmount", mountpoint=mountpoint, lazy=lazy)
+
+    def fstab_add(self, entry: FstabEntry) -> str:
+        return self.call(
+            "fstab_add",
+            source=entry.source,
+            mountpoint=entry.mountpoint,
+            fstype=entry.fstype,
+            options=entry.options,
+            freq=entry.freq,
+            passno=entry.passno,
+        )
+
+    def fstab_remove(self, source: str, mountpoint: str) -> int:
+        return self.call("fstab_remove", source=source, mountpoint=mountpoint)
+
+    def chown_mountpoint(self, mountpoint: str, uid: int, gid: int) -> None:
+        self.call("chown_mountpoint", mountpoint=mountpoint, uid=uid, gid=gid)
+
+
+def connect_helper(socket_path: Path = HELPER_SOCKET, timeout: Optional[float] = 120.0) -> Optional[HelperClient]:
+    """Cliente conectado al ayudante si responde, o None si el socket no está disponible."""
+    try:
+        client = HelperClient.connect(socket_path, timeout=2.0)
+    except OSError:
+        return None
+    try:
+        client.ping()
+    except (OSError, RuntimeError, ValueError):
+        client.close()
+        return None
+    client.sock.settimeout(timeout)
+    return client
+
+
+def helper_available(socket_path: Path = HELPER_SOCKET) -> bool:
+    client = connect_helper(socket_path)
+    if client is None:
+        return False
+    client.close()
+    return True
+
+
+def render_units(python: str = sys.executable, socket_path: Path = HELPER_SOCKET) -> Dict[str, str]:
+    """Unidades de systemd para activar el ayudante por socket."""
+    return {
+        "automount-helper.socket": (
+            "[Unit]\n"
+            "Description=AutoMount: socket del ayudante privilegiado\n\n"
+            "[Socket]\n"
+            f"ListenStream={socket_path}\n"
+            "SocketMode=0666\n\n"
+            "[Install]\n"
+            "WantedBy=sockets.target\n"
+        ),
+        "automount-helper.service": (
+            "[Unit]\n"
+            "Description=AutoMount: ayudante privilegiado\n"
+            "Requires=automount-helper.socket\n\n"
+            "[Service]\n"
+            f"ExecStart={python} -m automount_gui_app.helper serve --idle-timeout 900\n"
+        ),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m automount_gui_app.helper", description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="atiende peticiones (requiere root)")
+    serve.add_argument("--socket", default=str(HELPER_SOCKET))
+    serve.add_argument("--idle-timeout", type=float, default=None, help="segundos sin clientes antes de salir")
+    call = sub.add_parser("call", help="envía una operación al ayudante")
+    call.add_argument("op")
+    call.add_argument("args", nargs="*", metavar="clave=valor")
+    call.add_argument("--socket", default=str(HELPER_SOCKET))
+    sub.add_parser("units", help="muestra las unidades de systemd para la activación por socket")
+    options = parser.parse_args(argv)
+
+    if options.command == "units":
+        for name, text in render_units().items():
+            print(f"# {name}\n{text}")
+        return 0
+    if options.command == "serve":
+        if os.geteuid() != 0:
+            print("El ayudante debe ejecutarse como root.", file=sys.stderr)
+            return 1
+        server = HelperServer(SystemBackend(), log=lambda message: print(message, file=sys.stderr, flush=True))
+        server.serve_forever(open_listener(Path(options.socket)), options.idle_timeout)
+        return 0
+
+    args: Dict[str, object] = {}
+    for item in options.args:
+        key, _, value = item.partition("=")
+        args[key] = json.loads(value) if value[:1] in '[{"' or value in ("true", "false", "null") or value.isdigit() else value
+    try:
+        with HelperClient.connect(Path(options.socket)) as client:
+            result = client.call(options.op, **args)
+    except (OSError, RuntimeError, ValueError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    print(json.dumps(result, indent=2, ensure_ascii=False, default=str))
+    return 0
+
+
+__all__ = [
+    "HelperClient",
+    "HelperPolicy",
+    "HelperServer",
+    "MemoryBackend",
+    "PeerCredentials",
+    "SystemBackend",
+    "connect_helper",
+    "helper_available",
+    "open_listener",
+    "render_units",
+]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
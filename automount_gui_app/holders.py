@@ -0,0 +1,281 @@
+"""
+Diagnóstico de montajes ocupados.
+
+Recorre /proc/<pid>/{fd,cwd,root,maps} en un grupo de hilos y compara el
+st_dev de cada referencia con el del punto de montaje, como harían `fuser -m`
+o `lsof`, pero dentro del proceso y con un presupuesto de tiempo: si se agota
+se devuelven los procesos encontrados hasta ese momento.
+"""
+
+from __future__ import annotations
+
+import os
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+PROC_ROOT = Path("/proc")
+DEFAULT_BUDGET = 2.0
+DEFAULT_WORKERS = 8
+PIDS_PER_TASK = 64
+
+
+@dataclass
+class MountHolder:
+    """Proceso que mantiene abierta alguna referencia dentro del montaje."""
+
+    pid: int
+    command: str
+    kinds: Set[str] = field(default_factory=set)
+    paths: List[str] = field(default_factory=list)
+
+    def describe(self) -> str:
+        return f"{self.pid} ({self.command}): {', '.join(sorted(self.kinds))}"
+
+
+@dataclass
+class HolderScan:
+    """Resultado de un escaneo; `complete` es False si se agotó el presupuesto."""
+
+    holders: List[MountHolder]
+    scanned: int
+    total: int
+    elapsed: float
+    complete: bool
+
+    def summary(self, limit: int = 10) -> str:
+        if not self.holders:
+            text = "No se encontraron procesos usando el montaje."
+        else:
+            lines = [holder.describe() for holder in self.holders[:limit]]
+            if len(self.holders) > limit:
+                lines.append(f"... y {len(self.holders) - limit} procesos más")
+            text = "Procesos que usan el montaje:\n" + "\n".join(lines)
+        if not self.complete:
+            text += f"\n(escaneo parcial: {self.scanned} de {self.total} procesos en {self.elapsed:.2f} s)"
+        return text
+
+
+class BusyScanner:
+    """Busca los procesos que impiden desmontar un sistema de archivos."""
+
+    def __init__(self, proc_root: Path = PROC_ROOT, max_workers: int = DEFAULT_WORKERS) -> None:
+        self.proc_root = Path(proc_root)
+        self.max_workers = max_workers
+
+    def list_pids(self) -> List[int]:
+        try:
+            return [int(name) for name in os.listdir(self.proc_root) if name.isdigit()]
+        except OSError:
+            return []
+
+    def scan(self, mountpoint: str, budget: float = DEFAULT_BUDGET, device: Optional[int] = None) -> HolderScan:
+        """Escanea todos los procesos; `device` permite indicar el st_dev si ya se conoce."""
+        started = time.monotonic()
+        if device is None:
+            device = os.stat(mountpoint).st_dev
+        pids = self.list_pids()
+        chunks = [pids[i:i + PIDS_PER_TASK] for i in range(0, len(pids), PIDS_PER_TASK)]
+        holders: List[MountHolder] = []
+        scanned = 0
+        deadline = started + budget
+        pool = ThreadPoolExecutor(max_workers=max(1, self.max_workers))
+        try:
+            pending = {pool.submit(self._scan_chunk, chunk, device): len(chunk) for chunk in chunks}
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    scanned += pending.pop(future)
+                    holders.extend(future.result())
+        finally:
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=False)
+        holders.sort(key=lambda holder: holder.pid)
+        return HolderScan(holders, scanned, len(pids), time.monotonic() - started, not pending)
+
+    def _scan_chunk(self, pids: Sequence[int], device: int) -> List[MountHolder]:
+        found = []
+        for pid in pids:
+            holder = self._scan_process(pid, device)
+            if holder is not None:
+                found.append(holder)
+        return found
+
+    def _scan_process(self, pid: int, device: int) -> Optional[MountHolder]:
+        base = os.path.join(self.proc_root, str(pid))
+        kinds: Set[str] = set()
+        paths: List[str] = []
+
+        for kind in ("cwd", "root"):
+            link = os.path.join(base, kind)
+            if _same_device(link, device):
+                kinds.add(kind)
+                paths.append(_readlink(link))
+
+        fd_dir = os.path.join(base, "fd")
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            fds = []
+        for fd in fds:
+            link = os.path.join(fd_dir, fd)
+            if _same_device(link, device):
+                kinds.add("fd")
+                paths.append(_readlink(link))
+
+        maps_paths = _mapped_paths(os.path.join(base, "maps"), device)
+        if maps_paths:
+            kinds.add("maps")
+            paths.extend(maps_paths)
+
+        if not kinds:
+            return None
+        return MountHolder(pid, _read_comm(base), kinds, paths)
+
+
+def _same_device(path: str, device: int) -> bool:
+    try:
+        return os.stat(path).st_dev == device
+    except OSError:
+        return False
+
+
+def _readlink(path: str) -> str:
+    try:
+        return os.readlink(path)
+    except OSError:
+        return path
+
+
+def _read_comm(base: str) -> str:
+    try:
+        with open(os.path.join(base, "comm"), encoding="utf-8", errors="replace") as comm:
+            return comm.read().strip()
+    except OSError:
+        return "?"
+
+
+def _mapped_paths(maps_path: str, device: int) -> List[str]:
+    """Rutas de /proc/<pid>/maps cuyo campo dev (mayor:menor en hex) coincide con `device`."""
+    wanted = f"{os.major(device):02x}:{os.minor(device):02x}"
+    try:
+        with open(maps_path, encoding="utf-8", errors="replace") as maps:
+            content = maps.read()
+    except OSError:
+        return []
+    if wanted not in content:
+        return []
+    paths = []
+    for line in content.splitlines():
+        fields = line.split(None, 5)
+        if len(fields) == 6 and fields[3] == wanted and fields[5] not in paths:
+            paths.append(fields[5])
+    return paths
+
+
+def terminate_holders(
+    pids: Iterable[int],
+    grace: float = 3.0,
+    proc_root: Path = PROC_ROOT,
+) -> List[int]:
+    """Envía SIGTERM, espera `grace` segundos y remata con SIGKILL; devuelve los PID que siguen vivos."""
+    own_pid = os.getpid()
+    targets = [pid for pid in pids if pid != own_pid]
+    for pid in targets:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    deadline = time.monotonic() + grace
+    alive = targets
+    while alive and time.monotonic() < deadline:
+        time.sleep(0.05)
+        alive = [pid for pid in alive if (Path(proc_root) / str(pid)).exists()]
+    for pid in alive:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    time.sleep(0.1 if alive else 0)
+    return [pid for pid in alive if (Path(proc_root) / str(pid)).exists()]
+
+
+def build_synthetic_proc(
+    root: Path,
+    target: Path,
+    processes: int,
+    fds_per_process: int = 16,
+    holder_every: int = 100,
+    neutral: str = "/dev/null",
+) -> Dict[str, int]:
+    """Crea un árbol parecido a /proc en `root`; uno de cada `holder_every` procesos apunta a `target`.
+
+    El resto de las referencias apuntan a `neutral`, que debe estar en otro
+    sistema de archivos que `target`.
+    """
+    root = Path(root)
+    target = Path(target)
+    target.mkdir(parents=True, exist_ok=True)
+    held_file = target / "abierto.dat"
+    held_file.touch()
+    st_dev = os.stat(held_file).st_dev
+    dev_text = f"{os.major(st_dev):02x}:{os.minor(st_dev):02x}"
+    holders = 0
+    for pid in range(1, processes + 1):
+        base = root / str(pid)
+        (base / "fd").mkdir(parents=True)
+        (base / "comm").write_text(f"proc{pid}\n", encoding="utf-8")
+        holds = pid % holder_every == 0
+        holders += holds
+        os.symlink(os.path.dirname(neutral), base / "root")
+        os.symlink(target if holds else os.path.dirname(neutral), base / "cwd")
+        for fd in range(fds_per_process):
+            os.symlink(held_file if holds and fd == fds_per_process - 1 else neutral, base / "fd" / str(fd))
+        (base / "maps").write_text(
+            "00400000-00452000 r-xp 00000000 00:00 0 [vdso]\n"
+            + (f"7f0000000000-7f0000001000 r--p 00000000 {dev_text} 12 {held_file}\n" if holds else ""),
+            encoding="utf-8",
+        )
+    return {"processes": processes, "holders": holders, "device": st_dev}
+
+
+def _benchmark(processes: int, workers: Sequence[int]) -> None:
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        proc_root = Path(tmp) / "proc"
+        target = Path(tmp) / "montaje"
+        info = build_synthetic_proc(proc_root, target, processes)
+        for count in workers:
+            scanner = BusyScanner(proc_root, max_workers=count)
+            result = scanner.scan(str(target), budget=60.0)
+            print(
+                f"{processes} procesos, {count} hilos: {result.elapsed:.3f} s, "
+                f"{len(result.holders)} de {info['holders']} procesos esperados retienen el montaje"
+            )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mide el escaneo de procesos sobre un /proc sintético.")
+    parser.add_argument("--procesos", type=int, default=5000)
+    parser.add_argument("--hilos", type=int, nargs="+", default=[1, 4, 8, 16])
+    arguments = parser.parse_args()
+    _benchmark(arguments.procesos, arguments.hilos)
+
+
+__all__ = [
+    "BusyScanner",
+    "HolderScan",
+    "MountHolder",
+    "build_synthetic_proc",
+    "terminate_holders",
+]
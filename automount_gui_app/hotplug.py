@@ -0,0 +1,314 @@
+"""
+Vigilancia de conexión/desconexión de dispositivos de bloque.
+
+Escucha los uevents del kernel (o de udev) por netlink y, si no es posible,
+sondea /proc/partitions. Las ráfagas se agrupan y se entregan como deltas
+por nombre de dispositivo.
+"""
+
+from __future__ import annotations
+
+import os
+import select
+import socket
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .constants import PARTITIONS_PATH
+from .devices import SysfsBlockEnumerator
+
+UDEV_CONTROL_PATH = Path("/run/udev/control")
+
+NETLINK_KOBJECT_UEVENT = 15
+KERNEL_GROUP = 1
+UDEV_GROUP = 2
+UDEV_MONITOR_PREFIX = b"libudev\0"
+UDEV_MONITOR_MAGIC = 0xFEEDCAFE
+UEVENT_BUFFER_SIZE = 64 * 1024
+
+DEFAULT_DEBOUNCE = 0.3
+DEFAULT_MAX_DELAY = 2.0
+DEFAULT_POLL_INTERVAL = 1.0
+
+ACTION_ADD = "add"
+ACTION_REMOVE = "remove"
+ACTION_CHANGE = "change"
+
+
+@dataclass
+class DeviceDelta:
+    """Cambio agregado sobre un dispositivo, identificado por su nombre de kernel."""
+
+    action: str
+    kname: str
+    record: Optional[Dict] = None
+
+    @property
+    def name(self) -> str:
+        if self.record and self.record.get("name"):
+            return self.record["name"]
+        return self.kname
+
+
+def parse_uevent(data: bytes) -> Optional[Dict[str, str]]:
+    """Decodifica un mensaje netlink del kernel o de udev en un diccionario."""
+    if data.startswith(UDEV_MONITOR_PREFIX):
+        if len(data) < 24:
+            return None
+        (magic,) = struct.unpack_from("!I", data, 8)
+        _header_size, properties_off, properties_len = struct.unpack_from("=III", data, 12)
+        if magic != UDEV_MONITOR_MAGIC:
+            return None
+        payload = data[properties_off:properties_off + properties_len]
+    else:
+        header, _, payload = data.partition(b"\0")
+        if b"@" not in header:
+            return None
+
+    event: Dict[str, str] = {}
+    for field in payload.split(b"\0"):
+        key, sep, value = field.partition(b"=")
+        if sep:
+            event[key.decode("utf-8", "replace")] = value.decode("utf-8", "replace")
+    if "ACTION" not in event:
+        return None
+    return event
+
+
+def _event_kname(event: Dict[str, str]) -> Optional[str]:
+    if event.get("SUBSYSTEM") != "block":
+        return None
+    devname = event.get("DEVNAME") or os.path.basename(event.get("DEVPATH", ""))
+    if devname.startswith("/dev/"):
+        devname = devname[len("/dev/"):]
+    return devname or None
+
+
+def merge_action(previous: Optional[str], current: str) -> Optional[str]:
+    """Combina dos acciones consecutivas sobre el mismo dispositivo."""
+    if previous is None:
+        return current
+    if previous == ACTION_ADD:
+        if current == ACTION_REMOVE:
+            return None
+        return ACTION_ADD
+    if previous == ACTION_REMOVE:
+        if current == ACTION_ADD:
+            return ACTION_CHANGE
+        return ACTION_REMOVE
+    if current == ACTION_REMOVE:
+        return ACTION_REMOVE
+    return ACTION_CHANGE
+
+
+def coalesce_events(events: Iterable[Dict[str, str]]) -> List[Tuple[str, str]]:
+    """Reduce una ráfaga de uevents a una acción por dispositivo, en orden de llegada."""
+    pending: Dict[str, Optional[str]] = {}
+    for event in events:
+        kname = _event_kname(event)
+        action = event.get("ACTION")
+        if not kname or action not in {ACTION_ADD, ACTION_REMOVE, ACTION_CHANGE}:
+            continue
+        merged = merge_action(pending.get(kname), action)
+        if kname in pending and merged is None:
+            del pending[kname]
+            continue
+        pending[kname] = merged
+    return [(kname, action) for kname, action in pending.items() if action is not None]
+
+
+class NetlinkEventSource:
+    """Fuente de uevents sobre el socket NETLINK_KOBJECT_UEVENT."""
+
+    def __init__(self, group: Optional[int] = None) -> None:
+        if group is None:
+            group = UDEV_GROUP if UDEV_CONTROL_PATH.exists() else KERNEL_GROUP
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+        try:
+            self.sock.bind((0, group))
+        except OSError:
+            self.sock.close()
+            raise
+
+    def read(self, timeout: float) -> Optional[List[Dict[str, str]]]:
+        events: List[Dict[str, str]] = []
+        ready, _, _ = select.select([self.sock], [], [], timeout)
+        while ready:
+            event = parse_uevent(self.sock.recv(UEVENT_BUFFER_SIZE))
+            if event is not None:
+                events.append(event)
+            ready, _, _ = select.select([self.sock], [], [], 0)
+        return events
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+class PartitionsPollSource:
+    """Fuente de respaldo que compara /proc/partitions en cada sondeo."""
+
+    def __init__(self, partitions_path: Path = PARTITIONS_PATH, interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        self.partitions_path = Path(partitions_path)
+        self.interval = interval
+        self._closed = threading.Event()
+        self._known = self._snapshot()
+
+    def _snapshot(self) -> Dict[str, str]:
+        entries: Dict[str, str] = {}
+        try:
+            with self.partitions_path.open("r", encoding="utf-8") as partitions:
+                for line in partitions:
+                    fields = line.split()
+                    if len(fields) == 4 and fields[0].isdigit():
+                        entries[fields[3]] = fields[2]
+        except OSError:
+            pass
+        return entries
+
+    def read(self, timeout: float) -> Optional[List[Dict[str, str]]]:
+        if self._closed.wait(min(timeout, self.interval)):
+            return None
+        current = self._snapshot()
+        events = []
+        for kname, blocks in current.items():
+            previous = self._known.get(kname)
+            if previous is None:
+                events.append({"ACTION": ACTION_ADD, "SUBSYSTEM": "block", "DEVNAME": kname})
+            elif previous != blocks:
+                events.append({"ACTION": ACTION_CHANGE, "SUBSYSTEM": "block", "DEVNAME": kname})
+        for kname in self._known.keys() - current.keys():
+            events.append({"ACTION": ACTION_REMOVE, "SUBSYSTEM": "block", "DEVNAME": kname})
+        self._known = current
+        return events
+
+    def close(self) -> None:
+        self._closed.set()
+
+
+class ReplayEventSource:
+    """Reproduce una secuencia grabada de (espera, uevent) para pruebas sin hardware."""
+
+    def __init__(self, script: Sequence[Tuple[float, Dict[str, str]]]) -> None:
+        self._script = list(script)
+        self._position = 0
+        self._closed = threading.Event()
+
+    def read(self, timeout: float) -> Optional[List[Dict[str, str]]]:
+        if self._position >= len(self._script):
+            return None
+        delay, event = self._script[self._position]
+        if delay > timeout:
+            self._script[self._position] = (delay - timeout, event)
+            return None if self._closed.wait(timeout) else []
+        if delay and self._closed.wait(delay):
+            return None
+        self._position += 1
+        return [event]
+
+    def close(self) -> None:
+        self._closed.set()
+
+
+def default_event_source():
+    """Intenta netlink y, si falla, recurre al sondeo de /proc/partitions."""
+    try:
+        return NetlinkEventSource()
+    except OSError:
+        return PartitionsPollSource()
+
+
+class HotplugWatcher:
+    """Agrupa los eventos de una fuente y entrega deltas a un callback."""
+
+    def __init__(
+        self,
+        callback: Callable[[List[DeviceDelta]], None],
+        source=None,
+        enumerator: Optional[SysfsBlockEnumerator] = None,
+        debounce: float = DEFAULT_DEBOUNCE,
+        max_delay: float = DEFAULT_MAX_DELAY,
+    ) -> None:
+        self.callback = callback
+        self.source = source
+        self.enumerator = enumerator or SysfsBlockEnumerator()
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._display_names: Dict[str, str] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        if self.source is None:
+            self.source = default_event_source()
+        if self.enumerator.available():
+            self._display_names.update(self.enumerator.dm_names())
+        self._thread = threading.Thread(target=self.run, name="hotplug-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self.source is not None:
+            self.source.close()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def run(self) -> None:
+        """Bucle principal: acumula eventos y los entrega tras un periodo de calma."""
+        pending: List[Dict[str, str]] = []
+        first_at = last_at = 0.0
+        while not self._stop.is_set():
+            timeout = self.debounce if pending else self.max_delay
+            events = self.source.read(timeout)
+            now = time.monotonic()
+            if events:
+                if not pending:
+                    first_at = now
+                pending.extend(events)
+                last_at = now
+            if pending and (events is None or now - last_at >= self.debounce or now - first_at >= self.max_delay):
+                self.flush(pending)
+                pending = []
+            if events is None:
+                break
+
+    def flush(self, events: Iterable[Dict[str, str]]) -> List[DeviceDelta]:
+        """Convierte una ráfaga en deltas, resuelve sus registros y notifica."""
+        changes = coalesce_events(events)
+        if not changes:
+            return []
+        records = self.enumerator.describe(
+            kname for kname, action in changes if action != ACTION_REMOVE
+        ) if self.enumerator.available() else {}
+
+        deltas = []
+        for kname, action in changes:
+            if action == ACTION_REMOVE:
+                record = {"name": self._display_names.pop(kname, kname)}
+            else:
+                record = records.get(kname)
+                if record is None:
+                    continue
+                self._display_names[kname] = record["name"]
+            deltas.append(DeviceDelta(action, kname, record))
+        if deltas:
+            self.callback(deltas)
+        return deltas
+
+
+__all__ = [
+    "DeviceDelta",
+    "HotplugWatcher",
+    "NetlinkEventSource",
+    "PartitionsPollSource",
+    "ReplayEventSource",
+    "coalesce_events",
+    "default_event_source",
+    "parse_uevent",
+]
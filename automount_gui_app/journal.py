@@ -0,0 +1,230 @@
+"""
+Escritura atómica de /etc/fstab con un diario para deshacer cambios.
+
+Cada commit escribe un archivo temporal en el mismo directorio, lo sincroniza,
+lo renombra sobre fstab y sincroniza el directorio. Antes de tocar nada se
+crea un enlace duro a la versión anterior y un pequeño registro de diario, de
+modo que deshacer es un único rename() y un cierre inesperado puede
+recuperarse al iniciar.
+
+Desde commit() hasta finalize()/rollback() se mantiene un flock sobre un
+archivo de bloqueo junto a fstab. Así la interfaz y el ayudante privilegiado
+no pisan el cambio del otro, y recover() no deshace un cambio que otro
+proceso sigue aplicando.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from .constants import FSTAB_PATH
+
+JOURNAL_SUFFIX = ".automount-journal"
+PREVIOUS_SUFFIX = ".automount-prev"
+LOCK_SUFFIX = ".automount-lock"
+
+STATE_PREPARED = "prepared"
+STATE_COMMITTED = "committed"
+
+
+def fsync_directory(directory: Path) -> None:
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: Path, data: str, template: Optional[Path] = None) -> None:
+    """Reemplaza `path` de forma atómica, conservando modo y dueño de `template`."""
+    path = Path(path)
+    template = Path(template) if template is not None else path
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+            tmp_file.write(data)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        try:
+            stat = os.stat(template)
+        except FileNotFoundError:
+            os.chmod(tmp_name, 0o644)
+        else:
+            os.chmod(tmp_name, stat.st_mode & 0o7777)
+            if os.geteuid() == 0:
+                os.chown(tmp_name, stat.st_uid, stat.st_gid)
+        os.rename(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+    fsync_directory(path.parent)
+
+
+class FstabCommit:
+    """Cambio ya aplicado a fstab que aún puede confirmarse o deshacerse."""
+
+    def __init__(self, journal: "FstabJournal", has_previous: bool) -> None:
+        self.journal = journal
+        self.has_previous = has_previous
+        self.closed = False
+
+    def finalize(self) -> None:
+        """Da el cambio por bueno y descarta la versión anterior."""
+        if self.closed:
+            return
+        try:
+            self.journal._discard_previous()
+            self.journal._clear()
+        finally:
+            self.journal._unlock()
+        self.closed = True
+
+    def rollback(self) -> None:
+        """Restaura la versión anterior con un único rename()."""
+        if self.closed:
+            return
+        try:
+            self.journal._restore_previous(self.has_previous)
+            self.journal._clear()
+        finally:
+            self.journal._unlock()
+        self.closed = True
+
+
+class FstabJournal:
+    """Capa de commit atómico para un archivo fstab."""
+
+    def __init__(self, fstab_path: Path = FSTAB_PATH) -> None:
+        self.fstab_path = Path(fstab_path)
+        self.journal_path = self.fstab_path.with_name(self.fstab_path.name + JOURNAL_SUFFIX)
+        self.previous_path = self.fstab_path.with_name(self.fstab_path.name + PREVIOUS_SUFFIX)
+        self.lock_path = self.fstab_path.with_name(self.fstab_path.name + LOCK_SUFFIX)
+        self._lock_fd: Optional[int] = None
+
+    def commit(self, data: str, description: str = "") -> FstabCommit:
+        """Escribe `data` como nuevo fstab y devuelve el commit pendiente de confirmar.
+
+        El bloqueo se conserva hasta `finalize()` o `rollback()` del commit devuelto.
+        """
+        locked = self._try_lock()
+        if self.journal_path.exists():
+            if locked:
+                self._unlock()
+            raise RuntimeError(
+                f"Hay un cambio pendiente en {self.journal_path}; recupérelo antes de modificar fstab."
+            )
+        if not locked:
+            raise RuntimeError(f"Otro proceso está modificando {self.fstab_path}; inténtelo de nuevo en unos segundos.")
+        try:
+            has_previous = self.fstab_path.exists()
+            self._write_record(STATE_PREPARED, has_previous, description)
+            try:
+                if has_previous:
+                    self._discard_previous()
+                    os.link(self.fstab_path, self.previous_path)
+                atomic_write(self.fstab_path, data, template=self.previous_path if has_previous else None)
+            except BaseException:
+                self._restore_previous(has_previous, only_if_linked=True)
+                self._clear()
+                raise
+            self._write_record(STATE_COMMITTED, has_previous, description)
+        except BaseException:
+            self._unlock()
+            raise
+        return FstabCommit(self, has_previous)
+
+    def recover(self) -> Optional[str]:
+        """Deshace un commit interrumpido; devuelve su descripción si hubo que restaurar.
+
+        Si otro proceso tiene el bloqueo, su cambio sigue en curso y no se toca.
+        """
+        if not self._try_lock():
+            return None
+        try:
+            try:
+                record = json.loads(self.journal_path.read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                return None
+            except ValueError:
+                record = {"has_previous": True, "description": ""}
+            self._restore_previous(bool(record.get("has_previous")), only_if_linked=True)
+            self._remove_temporaries()
+            self._clear()
+            return record.get("description") or "cambio sin descripción"
+        finally:
+            self._unlock()
+
+    def _try_lock(self) -> bool:
+        """Toma el bloqueo exclusivo sin esperar; False si lo tiene otro proceso o commit."""
+        if self._lock_fd is not None:
+            return False
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        except BaseException:
+            os.close(fd)
+            raise
+        self._lock_fd = fd
+        return True
+
+    def _unlock(self) -> None:
+        # Cerrar el descriptor libera el flock; el archivo de bloqueo se deja en su sitio.
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def _write_record(self, state: str, has_previous: bool, description: str) -> None:
+        record = {"state": state, "has_previous": has_previous, "description": description}
+        atomic_write(self.journal_path, json.dumps(record))
+
+    def _restore_previous(self, has_previous: bool, only_if_linked: bool = False) -> None:
+        if has_previous:
+            if only_if_linked and not self.previous_path.exists():
+                return
+            if self.fstab_path.exists() and os.path.samefile(self.previous_path, self.fstab_path):
+                # Se cortó antes del rename: fstab sigue intacto y rename() entre dos
+                # enlaces al mismo archivo no hace nada, así que se quita el enlace.
+                os.unlink(self.previous_path)
+            else:
+                os.rename(self.previous_path, self.fstab_path)
+        else:
+            try:
+                os.unlink(self.fstab_path)
+            except FileNotFoundError:
+                pass
+        fsync_directory(self.fstab_path.parent)
+
+    def _remove_temporaries(self) -> None:
+        """Borra los temporales que atomic_write() dejó a medias antes del cierre."""
+        for path in self.fstab_path.parent.glob(f".{self.fstab_path.name}.*.tmp"):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def _discard_previous(self) -> None:
+        try:
+            os.unlink(self.previous_path)
+        except FileNotFoundError:
+            pass
+
+    def _clear(self) -> None:
+        try:
+            os.unlink(self.journal_path)
+        except FileNotFoundError:
+            pass
+        fsync_directory(self.fstab_path.parent)
+
+
+__all__ = ["FstabCommit", "FstabJournal", "atomic_write", "fsync_directory"]
@@ -0,0 +1,353 @@
+"""
+Registro de la aplicación: cola segura entre hilos, panel acotado e historial en disco.
+
+`LogPipeline.emit()` puede llamarse desde cualquier hilo (es el `log_callback`
+de `MountConfigurator`): guarda el mensaje en una cola y lo escribe en un
+fichero rotativo con el historial completo. `LogView` vacía la cola desde el
+bucle de Tk cada `interval_ms` y pinta cada tanda con una sola inserción en
+el widget de texto, que nunca pasa de `max_lines` líneas; las anteriores
+siguen en el fichero y se pueden buscar con `search_history()`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Deque, Iterator, List, Optional, Sequence, Tuple
+
+from .constants import LOG_DIR
+
+LEVEL_DEBUG = "debug"
+LEVEL_INFO = "info"
+LEVEL_WARNING = "warning"
+LEVEL_ERROR = "error"
+LEVELS = (LEVEL_DEBUG, LEVEL_INFO, LEVEL_WARNING, LEVEL_ERROR)
+LEVEL_LABELS = {
+    LEVEL_DEBUG: "Depuración",
+    LEVEL_INFO: "Información",
+    LEVEL_WARNING: "Avisos",
+    LEVEL_ERROR: "Errores",
+}
+LEVEL_COLORS = {LEVEL_DEBUG: "#6c6c6c", LEVEL_WARNING: "#8a5a00", LEVEL_ERROR: "#a61b1b"}
+_LOGGING_LEVELS = {
+    LEVEL_DEBUG: logging.DEBUG,
+    LEVEL_INFO: logging.INFO,
+    LEVEL_WARNING: logging.WARNING,
+    LEVEL_ERROR: logging.ERROR,
+}
+
+DEFAULT_MAX_LINES = 2000
+DEFAULT_INTERVAL_MS = 100
+LOG_FILE_NAME = "automount.log"
+LOG_MAX_BYTES = 1 << 20
+LOG_BACKUPS = 5
+
+# Los mensajes existentes no indican nivel; se deduce del texto.
+_ERROR_PREFIXES = ("error", "ocurrió un error", "falló")
+_WARNING_PREFIXES = ("aviso", "no se pudo", "no se puede", "verificación de /etc/fstab")
+_HISTORY_LINE = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) (\w+) (.*)$")
+
+
+@dataclass(frozen=True)
+class LogRecord:
+    created: float
+    level: str
+    message: str
+
+    @property
+    def line_count(self) -> int:
+        return self.message.count("\n") + 1
+
+
+def classify(message: str) -> str:
+    lowered = message.lstrip().lower()
+    if lowered.startswith(_ERROR_PREFIXES):
+        return LEVEL_ERROR
+    if lowered.startswith(_WARNING_PREFIXES):
+        return LEVEL_WARNING
+    return LEVEL_INFO
+
+
+def level_at_least(level: str, minimum: str) -> bool:
+    return LEVELS.index(level) >= LEVELS.index(minimum)
+
+
+def default_log_path() -> Path:
+    """LOG_DIR si se puede escribir (la aplicación corre como root); si no, la caché del usuario."""
+    if os.access(LOG_DIR, os.W_OK) or (not LOG_DIR.exists() and os.access(LOG_DIR.parent, os.W_OK)):
+        return LOG_DIR / LOG_FILE_NAME
+    cache = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    return cache / "automount" / LOG_FILE_NAME
+
+
+class LogPipeline:
+    """Cola de mensajes entre hilos con un búfer circular y el historial completo en disco."""
+
+    def __init__(
+        self,
+        spill_path: Optional[Path] = None,
+        capacity: int = DEFAULT_MAX_LINES,
+        max_bytes: int = LOG_MAX_BYTES,
+        backups: int = LOG_BACKUPS,
+    ) -> None:
+        self.records: Deque[LogRecord] = deque(maxlen=capacity)
+        self._pending: Deque[LogRecord] = deque()
+        self._lock = threading.Lock()
+        self.spill_path: Optional[Path] = None
+        self.spill_error: Optional[str] = None
+        self._logger = logging.getLogger(f"automount.registro.{id(self)}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.DEBUG)
+        if spill_path is not None:
+            self._open_spill(Path(spill_path), max_bytes, backups)
+
+    def _open_spill(self, path: Path, max_bytes: int, backups: int) -> None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        except OSError as exc:
+            self.spill_error = f"No se pudo abrir el historial del registro en {path}: {exc}"
+            return
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s", "%Y-%m-%d %H:%M:%S"))
+        self._logger.addHandler(handler)
+        self.spill_path = path
+
+    def emit(self, message: str, level: Optional[str] = None) -> None:
+        """Registra un mensaje; se puede llamar desde cualquier hilo."""
+        record = LogRecord(time.time(), level or classify(message), message)
+        with self._lock:
+            self._pending.append(record)
+        if self.spill_path is not None:
+            self._logger.log(_LOGGING_LEVELS[record.level], message)
+
+    __call__ = emit
+
+    def drain(self) -> List[LogRecord]:
+        """Saca los mensajes pendientes (desde el hilo de Tk) y los pasa al búfer circular."""
+        with self._lock:
+            if not self._pending:
+                return []
+            batch, self._pending = list(self._pending), deque()
+        self.records.extend(batch)
+        return batch
+
+    def history_files(self) -> List[Path]:
+        """Ficheros del historial, del más antiguo al más reciente."""
+        if self.spill_path is None:
+            return []
+        rotated = sorted(
+            self.spill_path.parent.glob(f"{self.spill_path.name}.*"),
+            key=lambda path: int(path.suffix[1:]) if path.suffix[1:].isdigit() else 0,
+            reverse=True,
+        )
+        return [path for path in (*rotated, self.spill_path) if path.exists()]
+
+    def search_history(self, text: str, minimum: str = LEVEL_DEBUG, limit: int = 5000) -> List[str]:
+        """Busca `text` (sin distinguir mayúsculas) en todo el historial en disco.
+
+        Devuelve las últimas `limit` coincidencias con su fecha; las líneas de
+        continuación de un mensaje de varias líneas cuentan como parte de él.
+        """
+        needle = text.casefold()
+        matches: Deque[str] = deque(maxlen=limit)
+        for stamp, level, message in self._history_records():
+            if level_at_least(level, minimum) and needle in message.casefold():
+                matches.append(f"{stamp} [{LEVEL_LABELS[level]}] {message}")
+        return list(matches)
+
+    def _history_records(self) -> Iterator[Tuple[str, str, str]]:
+        levels = {logging.getLevelName(number): name for name, number in _LOGGING_LEVELS.items()}
+        for path in self.history_files():
+            current: Optional[List[str]] = None
+            try:
+                with path.open("r", encoding="utf-8", errors="replace") as history:
+                    for line in history:
+                        line = line.rstrip("\n")
+                        match = _HISTORY_LINE.match(line)
+                        if match and match.group(2) in levels:
+                            if current is not None:
+                                yield current[0], current[1], "\n".join(current[2:])
+                            current = [match.group(1), levels[match.group(2)], match.group(3)]
+                        elif current is not None:
+                            current.append(line)
+            except OSError:
+                continue
+            if current is not None:
+                yield current[0], current[1], "\n".join(current[2:])
+
+    def close(self) -> None:
+        for handler in list(self._logger.handlers):
+            handler.close()
+            self._logger.removeHandler(handler)
+
+
+class LogView:
+    """Pinta un `LogPipeline` en un tk.Text con una inserción por tanda y un máximo de líneas."""
+
+    def __init__(
+        self,
+        text,
+        pipeline: LogPipeline,
+        max_lines: int = DEFAULT_MAX_LINES,
+        interval_ms: int = DEFAULT_INTERVAL_MS,
+    ) -> None:
+        self.text = text
+        self.pipeline = pipeline
+        self.max_lines = max_lines
+        self.interval_ms = interval_ms
+        self.minimum = LEVEL_DEBUG
+        self._lines = 0
+        for level, color in LEVEL_COLORS.items():
+            text.tag_configure(level, foreground=color)
+
+    def start(self) -> None:
+        self._tick()
+
+    def _tick(self) -> None:
+        self.flush()
+        self.text.after(self.interval_ms, self._tick)
+
+    def flush(self) -> None:
+        """Pinta lo pendiente; si hay más de `max_lines` líneas nuevas sólo se pintan las últimas."""
+        batch = [record for record in self.pipeline.drain() if level_at_least(record.level, self.minimum)]
+        if batch:
+            self._append(batch)
+
+    def set_minimum_level(self, level: str) -> None:
+        """Cambia el filtro y repinta a partir del búfer circular."""
+        self.minimum = level
+        self.flush()
+        self.text.configure(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.configure(state="disabled")
+        self._lines = 0
+        self._append([record for record in self.pipeline.records if level_at_least(record.level, level)])
+
+    def _append(self, records: Sequence[LogRecord]) -> None:
+        # Si la tanda no cabe entera, sólo se pintan sus últimas líneas.
+        kept: List[LogRecord] = []
+        lines = 0
+        for record in reversed(records):
+            if lines >= self.max_lines:
+                break
+            kept.append(record)
+            lines += record.line_count
+        if not kept:
+            return
+        chunks: List = []
+        for record in reversed(kept):
+            chunks.extend((record.message + "\n", (record.level,)))
+        self.text.configure(state="normal")
+        self.text.insert("end", *chunks)
+        self._lines += lines
+        excess = self._lines - self.max_lines
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
+            self._lines = self.max_lines
+        self.text.configure(state="disabled")
+        self.text.see("end")
+
+    def content(self) -> str:
+        return self.text.get("1.0", "end").strip()
+
+
+class _CountingText:
+    """tk.Text simulado que cuenta las llamadas; sirve para medir sin pantalla."""
+
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+        self.calls = 0
+
+    def tag_configure(self, *_args, **_kwargs) -> None:
+        pass
+
+    def configure(self, **_options) -> None:
+        self.calls += 1
+
+    def insert(self, _index: str, *chunks) -> None:
+        self.calls += 1
+        for text in chunks[::2]:
+            self.lines.extend(text.splitlines())
+
+    def delete(self, _start: str, end: str) -> None:
+        self.calls += 1
+        if end == "end":
+            self.lines = []
+        else:
+            del self.lines[: int(end.split(".")[0]) - 1]
+
+    def see(self, _index: str) -> None:
+        self.calls += 1
+
+    def get(self, *_args) -> str:
+        return "\n".join(self.lines)
+
+
+def _benchmark(messages: int, max_lines: int, directory: Path) -> None:
+    pipeline = LogPipeline(directory / LOG_FILE_NAME, capacity=max_lines, max_bytes=256 << 10)
+    text = _CountingText()
+    view = LogView(text, pipeline, max_lines=max_lines)
+
+    started = time.perf_counter()
+    workers = [
+        threading.Thread(target=lambda n=n: [pipeline.emit(f"Montando sdx{n}p{i}...") for i in range(messages // 4)])
+        for n in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    ticks = 0
+    slowest = 0.0
+    while any(worker.is_alive() for worker in workers) or pipeline._pending:
+        tick = time.perf_counter()
+        view.flush()
+        slowest = max(slowest, time.perf_counter() - tick)
+        ticks += 1
+        time.sleep(DEFAULT_INTERVAL_MS / 1000)
+    elapsed = time.perf_counter() - started
+    print(f"{messages} mensajes desde 4 hilos en {elapsed * 1000:.0f} ms")
+    print(f"  por tandas: {ticks} tandas, {text.calls} llamadas a Tk, tanda más lenta {slowest * 1000:.1f} ms")
+    print(f"  línea a línea (antes): {messages * 4} llamadas a Tk")
+    print(f"  líneas en el panel: {len(text.lines)} (máximo {max_lines})")
+    started = time.perf_counter()
+    found = pipeline.search_history("sdx3p1")
+    print(f"  búsqueda en {len(pipeline.history_files())} ficheros: {len(found)} coincidencias en "
+          f"{(time.perf_counter() - started) * 1000:.0f} ms")
+    pipeline.close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Mide el registro por tandas con muchos mensajes.")
+    parser.add_argument("--mensajes", type=int, default=20000)
+    parser.add_argument("--lineas", type=int, default=DEFAULT_MAX_LINES)
+    options = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory() as directory:
+        _benchmark(options.mensajes, options.lineas, Path(directory))
+
+
+__all__ = [
+    "LEVELS",
+    "LEVEL_DEBUG",
+    "LEVEL_ERROR",
+    "LEVEL_INFO",
+    "LEVEL_LABELS",
+    "LEVEL_WARNING",
+    "LogPipeline",
+    "LogRecord",
+    "LogView",
+    "classify",
+    "default_log_path",
+]
+
+
+if __name__ == "__main__":
+    main()
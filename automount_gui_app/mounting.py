@@ -4,27 +4,115 @@ Lógica para validar y configurar montajes persistentes.
 
 from __future__ import annotations
 
-import datetime
 import os
 import pwd
-import shutil
 from pathlib import Path
-from typing import Callable, Dict, Tuple
-
-from .constants import FSTAB_PATH, PROTECTED_MOUNTPOINTS
-from .system import is_mountpoint, run_cmd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .backups import BackupRecord, FstabBackupStore
+from .boot_analysis import BootAnalysis, BootAnalyzer, EntryReport, apply_rewrites, rematch_reports
+from .constants import FSTAB_BACKUP_DIR, FSTAB_PATH, PROTECTED_MOUNTPOINTS, SYSTEMD_UNIT_DIR
+from .devices import SNAPSHOT_INDEXES, DeviceSnapshot
+from .drivers import FUSE_DRIVER, FilesystemSupport
+from .errors import MountBusyError, NTFSUnsupportedError, StaleAnalysisError
+from .executor import MountExecutor
+from .fstab import FstabDocument, FstabEntry, normalize_mountpoint
+from .holders import BusyScanner, HolderScan, terminate_holders
+from .journal import FstabCommit, FstabJournal
+from .mounttable import get_mount_table
+from .operations import (
+    STAGE_COMMIT,
+    STAGE_CONFIRM,
+    STAGE_MOUNT,
+    STAGE_PROBE,
+    STAGE_VALIDATE,
+    STAGE_VERIFY,
+    StageCallback,
+    ignore_stage,
+)
+from .probe import FilesystemInfo, probe_device
+from .profiles import PROFILE_COMPATIBLE, apply_profile, read_device_traits
+from .system import is_mountpoint
+from .systemd_units import SystemdUnitWriter, on_demand_options, reload_units, systemd_running, unit_name
+from .tracing import span
+from .verifier import FstabVerifier, check_change
 
 PROTECTED_PATHS = {path.as_posix() for path in PROTECTED_MOUNTPOINTS}
+MAX_PARALLEL_MOUNTS = 4
+# Respuestas posibles de `on_busy` cuando el desmontaje falla porque el montaje está en uso.
+BUSY_LAZY = "lazy"
+BUSY_KILL = "kill"
+# Modos de configuración: entrada clásica de fstab, fstab con automount de systemd o unidades propias.
+MODE_FSTAB = "fstab"
+MODE_ON_DEMAND = "on-demand"
+MODE_SYSTEMD = "systemd"
+MOUNT_MODES = (MODE_FSTAB, MODE_ON_DEMAND, MODE_SYSTEMD)
+
+
+class HelperFstabChange:
+    """Entradas añadidas a fstab por el ayudante; con la misma interfaz que `FstabCommit`.
+
+    Cada `fstab_add` es un commit completo en el ayudante, así que deshacer
+    consiste en quitar las entradas añadidas, en orden inverso.
+    """
+
+    def __init__(self, helper, entries: Sequence[FstabEntry]) -> None:
+        self.helper = helper
+        self.entries: List[FstabEntry] = []
+        try:
+            for entry in entries:
+                helper.fstab_add(entry)
+                self.entries.append(entry)
+        except BaseException:
+            self.rollback()
+            raise
 
-class NTFSUnsupportedError(RuntimeError):
-    """Error especializado cuando falta soporte NTFS en el sistema."""
+    def finalize(self) -> None:
+        self.entries = []
+
+    def rollback(self) -> None:
+        while self.entries:
+            entry = self.entries.pop()
+            self.helper.fstab_remove(entry.source, entry.mountpoint)
 
 
 class MountConfigurator:
-    """Encapsula la lógica necesaria para registrar montajes en /etc/fstab."""
+    """Encapsula la lógica necesaria para registrar montajes en /etc/fstab.
+
+    Con `helper` (un `HelperClient`) la aplicación no necesita ser root: montar,
+    desmontar, añadir o quitar entradas de fstab, sondear y dar la propiedad del
+    punto de montaje se piden al ayudante privilegiado, que hace sus propios
+    respaldos y recupera su diario.
+    """
 
-    def __init__(self, log_callback: Callable[[str], None]) -> None:
+    def __init__(
+        self,
+        log_callback: Callable[[str], None],
+        snapshot: Optional[DeviceSnapshot] = None,
+        fstab_path: Path = FSTAB_PATH,
+        backup_store: Optional[FstabBackupStore] = None,
+        executor: Optional[MountExecutor] = None,
+        busy_scanner: Optional[BusyScanner] = None,
+        unit_dir: Path = SYSTEMD_UNIT_DIR,
+        fs_support: Optional[FilesystemSupport] = None,
+        helper=None,
+    ) -> None:
         self.log = log_callback
+        self.helper = helper
+        self.snapshot = snapshot or DeviceSnapshot()
+        # HelperClient.mount/unmount tienen la misma firma que MountExecutor.
+        self.executor = executor or helper or MountExecutor(lookup=self._lookup_device)
+        self.busy_scanner = busy_scanner or BusyScanner()
+        self.unit_writer = SystemdUnitWriter(unit_dir)
+        self.fs_support = fs_support or FilesystemSupport()
+        self.verifier = FstabVerifier(self.snapshot, self.fs_support)
+        self.fstab_path = Path(fstab_path)
+        self.backup_store = backup_store or FstabBackupStore(self.fstab_path.with_name(FSTAB_BACKUP_DIR.name))
+        self.journal = FstabJournal(self.fstab_path)
+        recovered = self.journal.recover() if helper is None else None
+        if recovered:
+            self.log(f"Se deshizo un cambio interrumpido en {self.fstab_path}: {recovered}")
 
     def configure(
         self,
@@ -32,54 +120,329 @@ class MountConfigurator:
         mount_point: str,
         umask: str,
         confirm_entry: Callable[[str], bool],
+        mode: str = MODE_FSTAB,
+        profile: str = PROFILE_COMPATIBLE,
+        on_stage: StageCallback = ignore_stage,
+    ) -> bool:
+        """Registra el montaje según `mode` y `profile` y monta la unidad para validarlo.
+
+        En MODE_SYSTEMD no se toca fstab: `confirm_entry` recibe el texto de
+        la unidad .mount que se escribirá. `on_stage` se llama al entrar en
+        cada etapa (ver `operations`) y puede lanzar OperationCancelledError.
+        """
+        with span("configure", device=device_info.get("name"), mode=mode, profile=profile) as step:
+            configured = self._configure(device_info, mount_point, umask, confirm_entry, mode, profile, on_stage)
+            step.set(configured=configured)
+            return configured
+
+    def _configure(
+        self,
+        device_info: Dict,
+        mount_point: str,
+        umask: str,
+        confirm_entry: Callable[[str], bool],
+        mode: str,
+        profile: str,
+        on_stage: StageCallback,
     ) -> bool:
+        self._check_mode(mode)
         device_name = device_info["name"]
+        on_stage(STAGE_PROBE)
         self._ensure_device_available(device_name)
+        uuid, fstype = self._obtain_device_identifiers(device_name, device_info)
+        fstype = self._select_driver(fstype)
 
+        on_stage(STAGE_VALIDATE)
         mount_path = Path(mount_point)
         self.log(f"Punto de montaje seleccionado: {mount_path}")
         self._prepare_mount_directory(mount_path)
         umask_value = self._sanitize_umask(umask)
 
         user_info = self._resolve_user_info()
-        uuid, fstype = self._obtain_device_identifiers(device_name, device_info)
-        self._ensure_fstab_entry_absent(uuid)
+        fstab = self.load_fstab()
+        self._ensure_fstab_entry_absent(fstab, uuid, mount_path)
 
         options, posix_fs = mount_options(fstype, user_info.pw_uid, user_info.pw_gid, umask_value)
-        entry = f"UUID={uuid} {mount_path} {fstype} {options} 0 0"
-
-        if not confirm_entry(entry):
+        options = self._apply_profile(options, fstype, device_name, profile)
+        if mode == MODE_ON_DEMAND:
+            options = on_demand_options(options)
+        entry = FstabEntry(f"UUID={uuid}", str(mount_path), fstype, options)
+        if mode == MODE_SYSTEMD:
+            return self._configure_units(entry, posix_fs, user_info, confirm_entry, on_stage)
+
+        on_stage(STAGE_CONFIRM)
+        if not confirm_entry(entry.render()):
             self.log("Operación cancelada por el usuario.")
             return False
 
-        backup_path = create_fstab_backup()
-        self.log(f"Respaldo de /etc/fstab creado en {backup_path}")
+        on_stage(STAGE_COMMIT)
+        commit = self._add_fstab_entries(fstab, [entry], f"añadir {entry.render()}")
+        self.log("Entrada añadida correctamente.")
 
         try:
-            with FSTAB_PATH.open("a", encoding="utf-8") as fstab_file:
-                fstab_file.write(f"{entry}\n")
-            self.log("Entrada añadida correctamente.")
-
+            on_stage(STAGE_MOUNT)
             self.log("Montando unidad para validar...")
-            run_cmd(["mount", str(mount_path)])
+            self.executor.mount(entry)
+            self._refresh_devices([entry])
+            on_stage(STAGE_VERIFY)
+            self._verify_mounted(mount_path)
             if posix_fs:
-                os.chown(mount_path, user_info.pw_uid, user_info.pw_gid)
+                self._chown_mountpoint(mount_path, user_info)
 
+            commit.finalize()
             self.log(f"La unidad se montó correctamente en {mount_path}.")
-            return True
         except RuntimeError as exc:
-            self._handle_mount_error(exc, backup_path)
+            self._handle_mount_error(exc, commit.rollback)
+            return False
         except Exception:
-            self.log("Ocurrió un error. Restaurando /etc/fstab desde el respaldo.")
-            shutil.copy(backup_path, FSTAB_PATH)
+            self.log("Ocurrió un error. Restaurando la versión anterior de /etc/fstab.")
+            commit.rollback()
             raise
-        return False
+        if mode == MODE_ON_DEMAND:
+            self._activate_automount([entry])
+        return True
+
+    def _configure_units(
+        self,
+        entry: FstabEntry,
+        posix_fs: bool,
+        user_info,
+        confirm_entry: Callable[[str], bool],
+        on_stage: StageCallback,
+    ) -> bool:
+        self._require_local("Escribir unidades systemd")
+        if self.unit_writer.exists(entry.mountpoint):
+            raise RuntimeError(f"Ya existen unidades systemd para {entry.mountpoint} en {self.unit_writer.unit_dir}.")
+        on_stage(STAGE_CONFIRM)
+        if not confirm_entry(self.unit_writer.render_mount(entry)):
+            self.log("Operación cancelada por el usuario.")
+            return False
+
+        on_stage(STAGE_COMMIT)
+        created = self.unit_writer.write(entry)
+        self.log(f"Unidades escritas en {self.unit_writer.unit_dir}: {', '.join(path.name for path in created)}")
+
+        def remove_units() -> None:
+            self.unit_writer.remove(entry.mountpoint, entry.source)
+
+        try:
+            on_stage(STAGE_MOUNT)
+            self.log("Montando unidad para validar...")
+            self.executor.mount(entry, in_fstab=False)
+            self._refresh_devices([entry])
+            on_stage(STAGE_VERIFY)
+            self._verify_mounted(Path(entry.mountpoint))
+            if posix_fs:
+                self._chown_mountpoint(Path(entry.mountpoint), user_info)
+            self.log(f"La unidad se montó correctamente en {entry.mountpoint}.")
+        except RuntimeError as exc:
+            self._handle_mount_error(exc, remove_units, "Eliminando las unidades systemd generadas.")
+            return False
+        except Exception:
+            self.log("Ocurrió un error. Eliminando las unidades systemd generadas.")
+            remove_units()
+            raise
+        self._activate_automount([entry])
+        return True
+
+    def _activate_automount(self, entries: Sequence[FstabEntry]) -> None:
+        """Cambia el montaje de validación por el automount para que rija desde ya y no sólo tras reiniciar."""
+        if self.helper is not None:
+            # systemctl necesita root y el ayudante no lo ofrece: se deja montado como está.
+            self.log("El automontaje regirá desde el próximo arranque.")
+            return
+        if not systemd_running():
+            self.log("systemd no está activo: el montaje bajo demanda regirá desde el próximo arranque.")
+            return
+        try:
+            for entry in entries:
+                self.executor.unmount(entry.mountpoint)
+            reload_units(start=[unit_name(entry.mountpoint, "automount") for entry in entries])
+        except RuntimeError as exc:
+            self.log(f"No se pudo activar el automontaje ahora ({exc}); regirá desde el próximo arranque.")
+            return
+        finally:
+            self._refresh_devices(entries)
+        self.log("Automontaje activo: la unidad se montará al acceder y se desmontará tras estar inactiva.")
+
+    def configure_batch(
+        self,
+        requests: Sequence[Tuple[Dict, str]],
+        umask: str,
+        confirm_entries: Callable[[List[str]], bool],
+        max_workers: int = MAX_PARALLEL_MOUNTS,
+        mode: str = MODE_FSTAB,
+        profile: str = PROFILE_COMPATIBLE,
+        on_stage: StageCallback = ignore_stage,
+    ) -> bool:
+        """Configura varias unidades con una sola confirmación, un solo commit y montajes en paralelo.
+
+        Si cualquier montaje falla se desmontan los que sí se montaron y fstab
+        vuelve a su versión anterior. Admite MODE_FSTAB y MODE_ON_DEMAND.
+        """
+        self._check_mode(mode)
+        if mode == MODE_SYSTEMD:
+            raise ValueError("El modo de unidades systemd no admite lotes; use el modo bajo demanda de fstab.")
+        if not requests:
+            raise ValueError("No hay unidades seleccionadas para el lote.")
+        on_stage(STAGE_PROBE)
+        for device_info, _ in requests:
+            # Sondea todas las unidades antes de validar; los resultados quedan en la caché.
+            self._obtain_device_identifiers(device_info["name"], device_info)
+
+        on_stage(STAGE_VALIDATE)
+        umask_value = self._sanitize_umask(umask)
+        user_info = self._resolve_user_info()
+        fstab = self.load_fstab()
+
+        staged: List[Tuple[FstabEntry, Path, bool]] = []
+        seen_devices = set()
+        seen_mountpoints = set()
+        for device_info, mount_point in requests:
+            device_name = device_info["name"]
+            mount_path = Path(mount_point)
+            if device_name in seen_devices:
+                raise ValueError(f"La unidad {device_name} aparece más de una vez en el lote.")
+            if normalize_mountpoint(str(mount_path)) in seen_mountpoints:
+                raise ValueError(f"El punto de montaje {mount_path} aparece más de una vez en el lote.")
+            seen_devices.add(device_name)
+            seen_mountpoints.add(normalize_mountpoint(str(mount_path)))
+
+            self._ensure_device_available(device_name)
+            if is_mountpoint(mount_path):
+                raise ValueError(f"El punto de montaje {mount_path} ya está en uso.")
+            uuid, fstype = self._obtain_device_identifiers(device_name, device_info)
+            fstype = self._select_driver(fstype)
+            try:
+                self._ensure_fstab_entry_absent(fstab, uuid, mount_path)
+            except RuntimeError as exc:
+                raise RuntimeError(f"{device_name}: {exc}") from exc
+            options, posix_fs = mount_options(fstype, user_info.pw_uid, user_info.pw_gid, umask_value)
+            options = self._apply_profile(options, fstype, device_name, profile)
+            if mode == MODE_ON_DEMAND:
+                options = on_demand_options(options)
+            staged.append((FstabEntry(f"UUID={uuid}", str(mount_path), fstype, options), mount_path, posix_fs))
+
+        on_stage(STAGE_CONFIRM)
+        if not confirm_entries([entry.render() for entry, _, _ in staged]):
+            self.log("Operación cancelada por el usuario.")
+            return False
+
+        on_stage(STAGE_COMMIT)
+        created: List[Path] = []
+        try:
+            for _, mount_path, _ in staged:
+                created.extend(self._create_mount_directory(mount_path))
+            commit = self._add_fstab_entries(
+                fstab, [entry for entry, _, _ in staged], f"añadir lote de {len(staged)} entradas"
+            )
+        except BaseException:
+            self._remove_directories(created)
+            raise
+        self.log(f"Se añadieron {len(staged)} entradas a /etc/fstab.")
+
+        mounted: List[Path] = []
+        failures: List[Tuple[Path, Exception]] = []
+        try:
+            on_stage(STAGE_MOUNT)
+            self.log(f"Montando {len(staged)} unidades para validar...")
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(staged)))) as pool:
+                futures = {pool.submit(self.executor.mount, entry): mount_path for entry, mount_path, _ in staged}
+                for future in as_completed(futures):
+                    mount_path = futures[future]
+                    try:
+                        future.result()
+                        mounted.append(mount_path)
+                        self._verify_mounted(mount_path)
+                    except Exception as exc:  # noqa: BLE001
+                        failures.append((mount_path, exc))
+            self._refresh_devices([entry for entry, _, _ in staged])
+            if not failures:
+                on_stage(STAGE_VERIFY)
+                for _, mount_path, posix_fs in staged:
+                    if posix_fs:
+                        self._chown_mountpoint(mount_path, user_info)
+        except BaseException:
+            # Cancelación o error del propio lote: se deshace todo antes de propagarlo.
+            self._rollback_batch(mounted, commit, created)
+            raise
+
+        if failures:
+            for mount_path, exc in failures:
+                self.log(f"Error al montar {mount_path}: {exc}")
+            self._rollback_batch(mounted, commit, created)
+            on_stage(STAGE_VERIFY)
+            messages = "\n".join(f"{mount_path}: {exc}" for mount_path, exc in failures)
+            if any(isinstance(exc, NTFSUnsupportedError) for _, exc in failures):
+                raise NTFSUnsupportedError(messages)
+            raise RuntimeError(f"Falló el montaje de {len(failures)} de {len(staged)} unidades:\n{messages}")
+
+        commit.finalize()
+        self.log(f"Se montaron correctamente {len(staged)} unidades.")
+        if mode == MODE_ON_DEMAND:
+            self._activate_automount([entry for entry, _, _ in staged])
+        return True
+
+    def _create_mount_directory(self, mount_path: Path) -> List[Path]:
+        """Crea `mount_path` y sus padres; devuelve los creados, del más externo al más interno.
+
+        Con el ayudante no se crea nada aquí: lo crea él al montar.
+        """
+        if self.helper is not None:
+            return []
+        missing: List[Path] = []
+        path = mount_path
+        while not path.exists():
+            missing.append(path)
+            path = path.parent
+        if missing:
+            self.log(f"Creando directorio {mount_path}")
+            mount_path.mkdir(parents=True, exist_ok=True)
+        return list(reversed(missing))
+
+    def _remove_directories(self, created: Sequence[Path]) -> None:
+        for path in reversed(created):
+            try:
+                path.rmdir()
+            except OSError as exc:
+                self.log(f"No se pudo eliminar el directorio {path}: {exc}")
+
+    def _rollback_batch(self, mounted: List[Path], commit: FstabCommit, created: Sequence[Path] = ()) -> None:
+        self.log("Deshaciendo el lote: desmontando unidades y restaurando /etc/fstab.")
+        for mount_path in mounted:
+            try:
+                self.executor.unmount(str(mount_path))
+            except RuntimeError as exc:
+                self.log(f"No se pudo desmontar {mount_path}: {exc}")
+        commit.rollback()
+        self._remove_directories(created)
+        self.snapshot.invalidate()
 
     def unmount(
         self,
         device_info: Dict,
         confirm_action: Callable[[str, str], bool],
+        on_busy: Optional[Callable[[str, HolderScan], Optional[str]]] = None,
+        on_stage: StageCallback = ignore_stage,
     ) -> bool:
+        """Desmonta la unidad y quita su entrada de fstab.
+
+        Si el montaje está ocupado se buscan los procesos que lo usan y
+        `on_busy` decide entre BUSY_LAZY, BUSY_KILL o None para cancelar.
+        """
+        with span("unmount_device", device=device_info.get("name"), mountpoint=device_info.get("mountpoint")) as step:
+            unmounted = self._unmount(device_info, confirm_action, on_busy, on_stage)
+            step.set(unmounted=unmounted)
+            return unmounted
+
+    def _unmount(
+        self,
+        device_info: Dict,
+        confirm_action: Callable[[str, str], bool],
+        on_busy: Optional[Callable[[str, HolderScan], Optional[str]]],
+        on_stage: StageCallback,
+    ) -> bool:
+        on_stage(STAGE_VALIDATE)
         mountpoint = device_info.get("mountpoint")
         if not mountpoint or not mountpoint.startswith("/"):
             raise ValueError("La unidad seleccionada no tiene un punto de montaje válido para desmontar.")
@@ -88,32 +451,79 @@ class MountConfigurator:
             raise ValueError("No se puede desmontar este punto de montaje desde la aplicación.")
 
         device_name = device_info["name"]
+        on_stage(STAGE_PROBE)
         uuid, _ = self._obtain_device_identifiers(device_name, device_info)
 
+        on_stage(STAGE_CONFIRM)
         if not confirm_action(device_name, mountpoint):
             self.log("Operación cancelada por el usuario.")
             return False
 
-        backup_path = create_fstab_backup()
-        self.log(f"Respaldo de /etc/fstab creado en {backup_path}")
+        on_stage(STAGE_MOUNT)
+        if self.helper is None:
+            self._backup_fstab()
 
+        self.log(f"Desmontando {device_name} de {mountpoint}...")
         try:
-            self.log(f"Desmontando {device_name} de {mountpoint}...")
-            run_cmd(["umount", mountpoint])
-            self.log("Unidad desmontada correctamente.")
-            remove_fstab_entry(uuid, mountpoint)
+            self.executor.unmount(mountpoint)
+        except MountBusyError as exc:
+            if not self._resolve_busy_mount(mountpoint, exc, on_busy):
+                self.log("Operación cancelada por el usuario.")
+                return False
+        self.snapshot.refresh_devices([device_name])
+        self.log("Unidad desmontada correctamente.")
+        on_stage(STAGE_COMMIT)
+        if self.unit_writer.exists(mountpoint):
+            self._require_local("Eliminar unidades systemd")
+            removed = self.unit_writer.remove(mountpoint, f"UUID={uuid}")
+            self.log(f"Se eliminaron las unidades systemd: {', '.join(path.name for path in removed)}")
+        elif self.helper is not None:
+            self.helper.fstab_remove(f"UUID={uuid}", mountpoint)
             self.log("La entrada correspondiente se eliminó de /etc/fstab.")
-            return True
-        except Exception:
-            self.log("Ocurrió un error. Restaurando /etc/fstab desde el respaldo.")
-            shutil.copy(backup_path, FSTAB_PATH)
-            raise
+        else:
+            # El commit es atómico: si falla, /etc/fstab queda intacto.
+            remove_fstab_entry(uuid, mountpoint, self.load_fstab(), self.journal, self.verifier)
+            self.log("La entrada correspondiente se eliminó de /etc/fstab.")
+        # Si había un automount (fstab con x-systemd.automount o unidad propia) se retira también.
+        if systemd_running() and self.helper is None:
+            reload_units(stop=[unit_name(mountpoint, "automount")])
+        on_stage(STAGE_VERIFY)
+        if is_mountpoint(mount_path):
+            self.log(f"Aviso: {mount_path} sigue apareciendo como punto de montaje.")
+        return True
+
+    def _resolve_busy_mount(
+        self,
+        mountpoint: str,
+        exc: MountBusyError,
+        on_busy: Optional[Callable[[str, HolderScan], Optional[str]]],
+    ) -> bool:
+        self.log(f"{exc} Buscando procesos que usan el montaje...")
+        scan = self.busy_scanner.scan(mountpoint)
+        self.log(scan.summary())
+        if on_busy is None:
+            raise MountBusyError(f"{exc}\n{scan.summary()}") from exc
+
+        choice = on_busy(mountpoint, scan)
+        if choice == BUSY_LAZY:
+            self.log("Desmontaje diferido: el sistema de archivos se liberará cuando dejen de usarlo.")
+            self.executor.unmount(mountpoint, lazy=True)
+        elif choice == BUSY_KILL:
+            pids = [holder.pid for holder in scan.holders]
+            self.log(f"Terminando {len(pids)} procesos que usan {mountpoint}...")
+            survivors = terminate_holders(pids, proc_root=self.busy_scanner.proc_root)
+            if survivors:
+                raise RuntimeError(f"No se pudieron terminar los procesos: {', '.join(map(str, survivors))}")
+            self.executor.unmount(mountpoint)
+        else:
+            return False
+        return True
 
     def _prepare_mount_directory(self, mount_path: Path) -> None:
         if is_mountpoint(mount_path):
             raise ValueError(f"El punto de montaje {mount_path} ya está en uso.")
 
-        if not mount_path.exists():
+        if not mount_path.exists() and self.helper is None:
             self.log(f"Creando directorio {mount_path}")
             mount_path.mkdir(parents=True, exist_ok=True)
 
@@ -122,8 +532,7 @@ class MountConfigurator:
         return pwd.getpwnam(user_name)
 
     def _obtain_device_identifiers(self, device_name: str, device_info: Dict) -> Tuple[str, str]:
-        uuid = run_cmd(["blkid", "-s", "UUID", "-o", "value", f"/dev/{device_name}"])
-        fstype = run_cmd(["blkid", "-s", "TYPE", "-o", "value", f"/dev/{device_name}"])
+        uuid, fstype = self.snapshot.identifiers(device_name, self._probe)
         if uuid and fstype:
             return uuid, fstype
         hint = ""
@@ -134,17 +543,79 @@ class MountConfigurator:
             )
         raise RuntimeError(f"No se pudo determinar UUID o tipo de sistema de archivos para /dev/{device_name}.{hint}")
 
-    def _ensure_fstab_entry_absent(self, uuid: str) -> None:
-        with FSTAB_PATH.open("r", encoding="utf-8") as fstab_file:
-            if f"UUID={uuid}" in fstab_file.read():
-                raise RuntimeError("Ya existe una entrada en /etc/fstab para esta unidad.")
+    def _probe(self, path: str) -> Optional[FilesystemInfo]:
+        if self.helper is None:
+            return probe_device(path)
+        result = self.helper.probe(path)
+        return FilesystemInfo(**result) if result else None
+
+    def _chown_mountpoint(self, mount_path: Path, user_info) -> None:
+        if self.helper is not None:
+            self.helper.chown_mountpoint(str(mount_path), user_info.pw_uid, user_info.pw_gid)
+        else:
+            os.chown(mount_path, user_info.pw_uid, user_info.pw_gid)
+
+    def _require_local(self, action: str) -> None:
+        """Las operaciones que el ayudante no ofrece necesitan que la aplicación sea root."""
+        if self.helper is not None:
+            raise RuntimeError(f"{action} requiere ejecutar AutoMount como administrador (sudo).")
+
+    def _add_fstab_entries(self, fstab: FstabDocument, entries: Sequence[FstabEntry], description: str):
+        """Añade `entries` a fstab y devuelve el cambio pendiente de confirmar o deshacer."""
+        if self.helper is not None:
+            return HelperFstabChange(self.helper, entries)
+        self._backup_fstab()
+        for entry in entries:
+            fstab.add(entry)
+        return self._commit_fstab(fstab, description)
+
+    def _lookup_device(self, field: str, value: str) -> Optional[str]:
+        record = self.snapshot.find(field, value)
+        return record.get("name") if record else None
+
+    def _verify_mounted(self, mount_path: Path) -> None:
+        if not is_mountpoint(mount_path):
+            raise RuntimeError(f"El montaje terminó sin errores, pero {mount_path} no aparece en la tabla de montajes.")
+
+    def _refresh_devices(self, entries: Sequence[FstabEntry]) -> None:
+        """Vuelve a leer sólo los dispositivos de `entries` tras montarlos o desmontarlos."""
+        names = []
+        for entry in entries:
+            field, _, value = entry.source.partition("=")
+            field = field.lower()
+            name = self._lookup_device(field, value) if value and field in SNAPSHOT_INDEXES else None
+            if name is None:
+                self.snapshot.invalidate()
+                return
+            names.append(name)
+        self.snapshot.refresh_devices(names)
+
+    def _backup_fstab(self) -> None:
+        with span("fstab.backup"):
+            record = create_fstab_backup(self.fstab_path, self.backup_store)
+        self.log(f"Respaldo de /etc/fstab guardado ({record.short_digest}) en {self.backup_store.directory}")
+
+    def load_fstab(self) -> FstabDocument:
+        return FstabDocument.load(self.fstab_path, snapshot=self.snapshot)
+
+    def _commit_fstab(self, fstab: FstabDocument, description: str) -> FstabCommit:
+        """Verifica el nuevo contenido frente al actual y lo escribe con el diario."""
+        data = fstab.serialize()
+        with span("fstab.verify", lines=data.count("\n")):
+            warnings = check_change(self.verifier, _read_fstab_text(self.fstab_path), data)
+        for issue in warnings:
+            self.log(f"Verificación de /etc/fstab: {issue}")
+        with span("fstab.write", description=description):
+            return self.journal.commit(data, description)
+
+    def _ensure_fstab_entry_absent(self, fstab: FstabDocument, uuid: str, mount_path: Path) -> None:
+        if fstab.find_source(f"UUID={uuid}"):
+            raise RuntimeError("Ya existe una entrada en /etc/fstab para esta unidad.")
+        if fstab.find_mountpoint(str(mount_path)):
+            raise RuntimeError(f"Ya existe una entrada en /etc/fstab para el punto de montaje {mount_path}.")
 
     def _ensure_device_available(self, device_name: str) -> None:
-        available_names = [
-            name.lstrip("├─└─│ ")
-            for name in run_cmd(["lsblk", "-ln", "-o", "NAME"]).splitlines()
-        ]
-        if device_name not in available_names:
+        if self.snapshot.get(device_name) is None:
             raise ValueError(f"La unidad {device_name} ya no está disponible.")
 
     def _sanitize_umask(self, umask: str) -> str:
@@ -154,11 +625,106 @@ class MountConfigurator:
         self.log(f"Umask inválido '{umask}', usando 000 como valor por defecto.")
         return "000"
 
-    def _handle_mount_error(self, exc: RuntimeError, backup_path: Path) -> None:
+    def analyze_boot(self) -> BootAnalysis:
+        """Analiza fstab y devuelve el informe de cada entrada junto con lo analizado."""
+        text = _read_fstab_text(self.fstab_path)
+        fstab = FstabDocument(text, path=self.fstab_path, snapshot=self.snapshot)
+        reports = BootAnalyzer(self.snapshot).analyze(fstab)
+        return BootAnalysis(fstab, reports, text, self.snapshot.generation)
+
+    def apply_boot_rewrites(
+        self,
+        analysis: BootAnalysis,
+        reports: Sequence[EntryReport],
+        on_stage: StageCallback = ignore_stage,
+    ) -> int:
+        """Aplica las correcciones propuestas por el análisis de arranque en un único commit.
+
+        Se trabaja sobre /etc/fstab releído en este momento, no sobre el documento
+        del análisis: si el fichero o los dispositivos cambiaron desde entonces se
+        lanza StaleAnalysisError para no perder esos cambios.
+        """
+        self._require_local("Corregir /etc/fstab")
+        on_stage(STAGE_VALIDATE)
+        text = _read_fstab_text(self.fstab_path)
+        self.snapshot.is_stale()
+        if text != analysis.text or self.snapshot.generation != analysis.generation:
+            raise StaleAnalysisError(
+                "/etc/fstab o las unidades conectadas cambiaron desde el análisis; "
+                "vuelva a analizar antes de aplicar las correcciones."
+            )
+        fstab = FstabDocument(text, path=self.fstab_path, snapshot=self.snapshot)
+        reports = rematch_reports(fstab, reports)
+
+        on_stage(STAGE_COMMIT)
+        self._backup_fstab()
+        changed = apply_rewrites(fstab, reports)
+        if not changed:
+            return 0
+        self._commit_fstab(fstab, f"corregir {changed} entradas para el arranque").finalize()
+        self.log(f"Se corrigieron {changed} entradas de /etc/fstab.")
+
+        on_stage(STAGE_VERIFY)
+        self._verify_fstab(fstab.serialize())
+        if systemd_running():
+            reload_units()
+        return changed
+
+    def restore_backup(self, digest: str, on_stage: StageCallback = ignore_stage) -> BackupRecord:
+        """Sustituye /etc/fstab por un respaldo; la versión actual se respalda antes."""
+        self._require_local("Restaurar un respaldo de /etc/fstab")
+        on_stage(STAGE_VALIDATE)
+        record = self.backup_store.find(digest)
+        if record is None:
+            raise RuntimeError(f"No existe un respaldo con hash {digest}.")
+        data = self.backup_store.read(record.digest).decode("utf-8")
+
+        on_stage(STAGE_COMMIT)
+        with span("fstab.restore", digest=record.short_digest):
+            self.backup_store.restore(record.digest, self.fstab_path)
+        self.log(f"/etc/fstab restaurado desde el respaldo {record.short_digest}.")
+
+        on_stage(STAGE_VERIFY)
+        self._verify_fstab(data)
+        if systemd_running():
+            reload_units()
+        return record
+
+    def _verify_fstab(self, expected: str) -> None:
+        if _read_fstab_text(self.fstab_path) != expected:
+            self.log(f"Aviso: el contenido de {self.fstab_path} no coincide con lo que se acaba de escribir.")
+
+    def _select_driver(self, fstype: str) -> str:
+        """Traduce ntfs/exfat al controlador disponible, prefiriendo el del kernel."""
+        choice = self.fs_support.select(fstype)
+        if choice.fstype != fstype or choice.driver == FUSE_DRIVER:
+            self.log(f"Sistema de archivos {fstype}: se usará {choice.description} (tipo {choice.fstype}).")
+        return choice.fstype
+
+    def _apply_profile(self, options: str, fstype: str, device_name: str, profile: str) -> str:
+        if profile == PROFILE_COMPATIBLE:
+            return options
+        traits = read_device_traits(device_name)
+        result = apply_profile(options, fstype, profile, traits)
+        self.log(f"Perfil {profile} para {device_name} ({traits.describe()}): {result.options}")
+        for note in result.notes:
+            self.log(note)
+        return result.options
+
+    def _check_mode(self, mode: str) -> None:
+        if mode not in MOUNT_MODES:
+            raise ValueError(f"Modo de montaje desconocido: {mode}")
+
+    def _handle_mount_error(
+        self,
+        exc: RuntimeError,
+        rollback: Callable[[], None],
+        restore_message: str = "Restaurando la versión anterior de /etc/fstab.",
+    ) -> None:
         message = str(exc)
-        self.log("Ocurrió un error. Restaurando /etc/fstab desde el respaldo.")
-        shutil.copy(backup_path, FSTAB_PATH)
-        if "unknown filesystem type 'ntfs'" in message.lower():
+        self.log(f"Ocurrió un error. {restore_message}")
+        rollback()
+        if isinstance(exc, NTFSUnsupportedError) or "unknown filesystem type 'ntfs'" in message.lower():
             self.log(
                 "El sistema informa 'unknown filesystem type NTFS'. "
                 "Instala ntfs-3g (sudo apt-get install ntfs-3g) para habilitar soporte NTFS con escritura."
@@ -172,8 +738,12 @@ def mount_options(fstype: str, uid: int, gid: int, umask: str) -> Tuple[str, boo
     if fstype in {"ext4", "ext3", "ext2"}:
         opts = "defaults,auto,user,rw,exec"
         posix_fs = True
-    elif fstype in {"ntfs", "vfat", "exfat"}:
+    elif fstype in {"ntfs", "ntfs-3g", "vfat", "exfat-fuse"}:
         opts = f"defaults,auto,users,rw,exec,uid={uid},gid={gid},umask={umask}"
+    elif fstype == "ntfs3":
+        opts = f"defaults,auto,users,rw,exec,uid={uid},gid={gid},umask={umask},iocharset=utf8,prealloc"
+    elif fstype == "exfat":
+        opts = f"defaults,auto,users,rw,exec,uid={uid},gid={gid},umask={umask},iocharset=utf8"
     elif fstype in {"btrfs", "xfs"}:
         opts = "defaults,auto,users,rw,exec"
         posix_fs = True
@@ -182,42 +752,73 @@ def mount_options(fstype: str, uid: int, gid: int, umask: str) -> Tuple[str, boo
     return opts, posix_fs
 
 
-def create_fstab_backup() -> Path:
-    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-    backup_path = FSTAB_PATH.with_name(f"fstab.backup-{timestamp}")
-    shutil.copy(FSTAB_PATH, backup_path)
-    return backup_path
-
-
-def remove_fstab_entry(uuid: str, mountpoint: str) -> None:
-    removed = False
-    with FSTAB_PATH.open("r", encoding="utf-8") as fstab_file:
-        lines = fstab_file.readlines()
+def create_fstab_backup(fstab_path: Path = FSTAB_PATH, store: Optional[FstabBackupStore] = None) -> BackupRecord:
+    store = store or FstabBackupStore()
+    return store.save(fstab_path)
+
+
+def remove_fstab_entry(
+    uuid: str,
+    mountpoint: str,
+    fstab: Optional[FstabDocument] = None,
+    journal: Optional[FstabJournal] = None,
+    verifier: Optional[FstabVerifier] = None,
+) -> None:
+    if fstab is None:
+        fstab = FstabDocument.load(FSTAB_PATH)
+    matches = [
+        entry
+        for entry in fstab.find_source(f"UUID={uuid}")
+        if normalize_mountpoint(entry.mountpoint) == normalize_mountpoint(mountpoint)
+    ]
+    if not matches:
+        raise RuntimeError("No se encontró una entrada en /etc/fstab para esta unidad.")
 
-    new_lines = []
-    for line in lines:
-        stripped = line.strip()
-        if not stripped or stripped.startswith("#"):
-            new_lines.append(line)
-            continue
-        parts = stripped.split()
-        if len(parts) >= 2 and parts[0] == f"UUID={uuid}" and parts[1] == mountpoint:
-            removed = True
-            continue
-        new_lines.append(line)
+    for entry in matches:
+        fstab.remove(entry)
+    journal = journal or FstabJournal(fstab.path)
+    data = fstab.serialize()
+    if verifier is not None:
+        check_change(verifier, _read_fstab_text(fstab.path), data)
+    with span("fstab.write", description=f"quitar UUID={uuid}"):
+        journal.commit(data, f"quitar UUID={uuid} de {mountpoint}").finalize()
 
-    if not removed:
-        raise RuntimeError("No se encontró una entrada en /etc/fstab para esta unidad.")
 
-    with FSTAB_PATH.open("w", encoding="utf-8") as fstab_file:
-        fstab_file.writelines(new_lines)
+def _read_fstab_text(path: Path) -> str:
+    try:
+        return Path(path).read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return ""
 
 
 def is_protected_mountpoint(path: Path) -> bool:
-    return path.as_posix() in PROTECTED_PATHS
+    """Protege las rutas críticas y cualquier otro montaje del mismo sistema de archivos."""
+    resolved = os.path.realpath(path)
+    if path.as_posix() in PROTECTED_PATHS or resolved in PROTECTED_PATHS:
+        return True
+    try:
+        table = get_mount_table()
+    except OSError:
+        return False
+    entry = table.by_mountpoint(resolved)
+    if entry is None:
+        return False
+    protected_devices = set()
+    for protected in PROTECTED_PATHS:
+        protected_entry = table.by_mountpoint(protected)
+        if protected_entry is not None:
+            protected_devices.add(protected_entry.majmin)
+    return entry.majmin in protected_devices
 
 
 __all__ = [
+    "BUSY_KILL",
+    "BUSY_LAZY",
+    "MODE_FSTAB",
+    "MODE_ON_DEMAND",
+    "MODE_SYSTEMD",
+    "MOUNT_MODES",
+    "MountBusyError",
     "MountConfigurator",
     "NTFSUnsupportedError",
     "mount_options",
@@ -0,0 +1,210 @@
+"""
+Tabla de montajes basada en /proc/self/mountinfo.
+
+El archivo se analiza una sola vez y sólo se vuelve a leer cuando poll()
+informa POLLPRI/POLLERR sobre su descriptor, que es como el kernel avisa
+de cambios en la tabla de montajes. Para archivos fuera de /proc (p. ej.
+mountinfo grabados para pruebas) se usa el tamaño y la fecha de
+modificación en su lugar.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import select
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .constants import MOUNTINFO_PATH
+
+MOUNTINFO_CHANGE_EVENTS = select.POLLPRI | select.POLLERR
+
+
+@dataclass
+class MountEntry:
+    """Una línea de mountinfo."""
+
+    mount_id: int
+    parent_id: int
+    majmin: str
+    root: str
+    mountpoint: str
+    options: str
+    fstype: str
+    source: str
+    super_options: str
+
+
+def unescape_mount_field(value: str) -> str:
+    """Decodifica los escapes octales (\\040) usados en mountinfo, swaps y fstab."""
+    return re.sub(r"\\([0-7]{3})", lambda match: chr(int(match.group(1), 8)), value)
+
+
+def _is_procfs_path(path: Path) -> bool:
+    """Indica si `path` está en /proc, donde el kernel avisa de cambios con POLLPRI."""
+    parts = Path(os.path.realpath(path)).parts
+    return len(parts) > 1 and parts[1] == "proc"
+
+
+def parse_mountinfo(lines: Iterable[str]) -> List[MountEntry]:
+    entries = []
+    for line in lines:
+        fields = line.split()
+        if "-" not in fields:
+            continue
+        separator = fields.index("-")
+        if separator < 6 or len(fields) < separator + 4:
+            continue
+        entries.append(
+            MountEntry(
+                mount_id=int(fields[0]),
+                parent_id=int(fields[1]),
+                majmin=fields[2],
+                root=unescape_mount_field(fields[3]),
+                mountpoint=unescape_mount_field(fields[4]),
+                options=fields[5],
+                fstype=fields[separator + 1],
+                source=unescape_mount_field(fields[separator + 2]),
+                super_options=fields[separator + 3],
+            )
+        )
+    return entries
+
+
+class MountTable:
+    """Índice de montajes por punto de montaje, major:minor y origen."""
+
+    def __init__(self, path: Path = MOUNTINFO_PATH) -> None:
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._file = self.path.open("r", encoding="utf-8", errors="replace")
+        # Los archivos de procfs declaran tamaño 0, pero un mountinfo grabado también puede estar vacío.
+        self._use_poll = _is_procfs_path(self.path)
+        self._poller = select.poll()
+        self._poller.register(self._file.fileno(), MOUNTINFO_CHANGE_EVENTS)
+        self._stamp = None
+        self._dirty = False
+        self._entries: List[MountEntry] = []
+        self._by_mountpoint: Dict[str, MountEntry] = {}
+        self._by_majmin: Dict[str, List[MountEntry]] = {}
+        self._by_source: Dict[str, List[MountEntry]] = {}
+        self.generation = 0
+        self._load()
+
+    def close(self) -> None:
+        with self._lock:
+            self._poller.unregister(self._file.fileno())
+            self._file.close()
+
+    def _file_stamp(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _load(self) -> None:
+        self._file.seek(0)
+        entries = parse_mountinfo(self._file.read().splitlines())
+        if not self._use_poll:
+            self._stamp = self._file_stamp()
+        by_mountpoint: Dict[str, MountEntry] = {}
+        by_majmin: Dict[str, List[MountEntry]] = {}
+        by_source: Dict[str, List[MountEntry]] = {}
+        for entry in entries:
+            # Un montaje posterior sobre la misma ruta oculta al anterior.
+            by_mountpoint[entry.mountpoint] = entry
+            by_majmin.setdefault(entry.majmin, []).append(entry)
+            by_source.setdefault(entry.source, []).append(entry)
+        self._entries = entries
+        self._by_mountpoint = by_mountpoint
+        self._by_majmin = by_majmin
+        self._by_source = by_source
+        self._dirty = False
+        self.generation += 1
+
+    def changed(self, timeout: float = 0) -> bool:
+        """Indica si la tabla cambió desde la última lectura (espera hasta `timeout` segundos)."""
+        with self._lock:
+            if self._dirty:
+                return True
+            if self._use_poll:
+                # El kernel sólo notifica una vez por cambio: se recuerda hasta la próxima lectura.
+                events = self._poller.poll(int(timeout * 1000))
+                self._dirty = any(mask & MOUNTINFO_CHANGE_EVENTS for _fd, mask in events)
+            else:
+                try:
+                    self._dirty = self._file_stamp() != self._stamp
+                except OSError:
+                    self._dirty = True
+            return self._dirty
+
+    def refresh(self, force: bool = False) -> bool:
+        """Relee mountinfo si cambió; devuelve True cuando hubo recarga."""
+        with self._lock:
+            if not force and not self.changed():
+                return False
+            if not self._use_poll:
+                self._file.close()
+                self._file = self.path.open("r", encoding="utf-8", errors="replace")
+            self._load()
+            return True
+
+    def entries(self) -> List[MountEntry]:
+        with self._lock:
+            self.refresh()
+            return list(self._entries)
+
+    def by_mountpoint(self, mountpoint: str) -> Optional[MountEntry]:
+        with self._lock:
+            self.refresh()
+            return self._by_mountpoint.get(mountpoint)
+
+    def by_majmin(self, majmin: str) -> List[MountEntry]:
+        with self._lock:
+            self.refresh()
+            return list(self._by_majmin.get(majmin, []))
+
+    def by_source(self, source: str) -> List[MountEntry]:
+        with self._lock:
+            self.refresh()
+            return list(self._by_source.get(source, []))
+
+    def is_mountpoint(self, path: Path) -> bool:
+        return self.by_mountpoint(os.path.realpath(path)) is not None
+
+    def mountpoint_for(self, majmin: Optional[str] = None, sources: Iterable[str] = ()) -> Optional[str]:
+        """Primer punto de montaje de un dispositivo, prefiriendo el montaje de su raíz."""
+        with self._lock:
+            self.refresh()
+            candidates = list(self._by_majmin.get(majmin, [])) if majmin else []
+            for source in sources:
+                candidates.extend(self._by_source.get(source, []))
+            for entry in candidates:
+                if entry.root == "/":
+                    return entry.mountpoint
+            return candidates[0].mountpoint if candidates else None
+
+
+_shared_tables: Dict[Path, MountTable] = {}
+_shared_lock = threading.Lock()
+
+
+def get_mount_table(path: Path = MOUNTINFO_PATH) -> MountTable:
+    """Devuelve la tabla compartida para `path`, creándola la primera vez."""
+    path = Path(path)
+    with _shared_lock:
+        table = _shared_tables.get(path)
+        if table is None:
+            table = MountTable(path)
+            _shared_tables[path] = table
+        return table
+
+
+__all__ = [
+    "MountEntry",
+    "MountTable",
+    "get_mount_table",
+    "parse_mountinfo",
+    "unescape_mount_field",
+]
@@ -0,0 +1,260 @@
+"""
+Cola de operaciones de montaje que se ejecutan fuera del hilo de Tk.
+
+Cada `Operation` recorre etapas (sondeo, validación, confirmación, escritura
+de fstab, montaje y verificación) y avisa al entrar en cada una. La
+cancelación se pide en cualquier momento y se atiende al entrar en la
+siguiente etapa, siempre que esa etapa figure en `cancellable`: una vez
+montada la unidad ya no se interrumpe a medias.
+
+Las operaciones se ejecutan de una en una y en orden de llegada en un único
+hilo, porque todas escriben el mismo /etc/fstab. `UiDispatcher` lleva las
+llamadas al hilo de Tk (confirmaciones, avisos de progreso, registro) por
+medio de una cola que el bucle de Tk vacía periódicamente.
+"""
+
+from __future__ import annotations
+
+import itertools
+import queue
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from .errors import OperationCancelledError
+from .tracing import span
+
+STAGE_PROBE = "probe"
+STAGE_VALIDATE = "validate"
+STAGE_CONFIRM = "confirm"
+STAGE_COMMIT = "commit"
+STAGE_MOUNT = "mount"
+STAGE_VERIFY = "verify"
+STAGE_LABELS = {
+    STAGE_PROBE: "Sondeo",
+    STAGE_VALIDATE: "Validación",
+    STAGE_CONFIRM: "Confirmación",
+    STAGE_COMMIT: "Escritura de fstab",
+    STAGE_MOUNT: "Montaje",
+    STAGE_VERIFY: "Verificación",
+}
+CONFIGURE_STAGES = (STAGE_PROBE, STAGE_VALIDATE, STAGE_CONFIRM, STAGE_COMMIT, STAGE_MOUNT, STAGE_VERIFY)
+UNMOUNT_STAGES = (STAGE_VALIDATE, STAGE_PROBE, STAGE_CONFIRM, STAGE_MOUNT, STAGE_COMMIT, STAGE_VERIFY)
+# Cambios que sólo reescriben fstab (correcciones de arranque, restaurar un respaldo).
+FSTAB_STAGES = (STAGE_VALIDATE, STAGE_COMMIT, STAGE_VERIFY)
+# Etapas en las que todavía se puede cancelar sin dejar el sistema a medias.
+CONFIGURE_CANCELLABLE = (STAGE_PROBE, STAGE_VALIDATE, STAGE_CONFIRM, STAGE_COMMIT, STAGE_MOUNT)
+UNMOUNT_CANCELLABLE = (STAGE_VALIDATE, STAGE_PROBE, STAGE_CONFIRM, STAGE_MOUNT)
+FSTAB_CANCELLABLE = (STAGE_VALIDATE, STAGE_COMMIT)
+
+STATE_QUEUED = "en cola"
+STATE_RUNNING = "en curso"
+STATE_DONE = "terminada"
+STATE_FAILED = "falló"
+STATE_CANCELLED = "cancelada"
+FINAL_STATES = (STATE_DONE, STATE_FAILED, STATE_CANCELLED)
+
+PUMP_INTERVAL_MS = 30
+
+StageCallback = Callable[[str], None]
+
+_operation_ids = itertools.count(1)
+
+
+def ignore_stage(_stage: str) -> None:
+    """`on_stage` por defecto: no informa de nada y nunca cancela."""
+
+
+class UiDispatcher:
+    """Ejecuta llamadas en el hilo de Tk desde cualquier otro hilo."""
+
+    def __init__(self, root=None, interval_ms: int = PUMP_INTERVAL_MS) -> None:
+        self.root = root
+        self.interval_ms = interval_ms
+        self._calls: "queue.SimpleQueue[Tuple[Callable, tuple, Optional[Future]]]" = queue.SimpleQueue()
+        self._ui_thread = threading.current_thread()
+
+    def start(self) -> None:
+        """Empieza a vaciar la cola desde el bucle de Tk (llamar desde el hilo de Tk)."""
+        self._ui_thread = threading.current_thread()
+        self._schedule()
+
+    def _schedule(self) -> None:
+        self.pump()
+        if self.root is not None:
+            self.root.after(self.interval_ms, self._schedule)
+
+    def on_ui_thread(self) -> bool:
+        return threading.current_thread() is self._ui_thread
+
+    def call_soon(self, func: Callable, *args) -> None:
+        """Encola `func(*args)` sin esperar el resultado."""
+        self._calls.put((func, args, None))
+
+    def call(self, func: Callable, *args):
+        """Ejecuta `func(*args)` en el hilo de Tk y devuelve su resultado (o relanza su excepción)."""
+        if self.on_ui_thread():
+            return func(*args)
+        future: Future = Future()
+        self._calls.put((func, args, future))
+        return future.result()
+
+    def pump(self) -> None:
+        while True:
+            try:
+                func, args, future = self._calls.get_nowait()
+            except queue.Empty:
+                return
+            if future is None:
+                func(*args)
+                continue
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args))
+            except BaseException as exc:  # noqa: BLE001 - se entrega al hilo que espera
+                future.set_exception(exc)
+
+
+@dataclass
+class Operation:
+    """Una operación de la cola; `run(on_stage)` hace el trabajo y devuelve su resultado."""
+
+    title: str
+    run: Callable[[StageCallback], object]
+    stages: Tuple[str, ...] = CONFIGURE_STAGES
+    cancellable: Tuple[str, ...] = CONFIGURE_CANCELLABLE
+    success_message: str = ""
+    failure_hint: str = ""
+    # Se llama en el hilo de Tk cuando la operación llega a un estado final.
+    on_finish: Optional[Callable[["Operation"], None]] = None
+    op_id: int = field(default_factory=lambda: next(_operation_ids))
+    state: str = STATE_QUEUED
+    stage: Optional[str] = None
+    result: object = None
+    error: Optional[BaseException] = None
+    _cancel: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def can_cancel(self) -> bool:
+        if self.state == STATE_QUEUED:
+            return True
+        if self.state != STATE_RUNNING:
+            return False
+        remaining = self.stages[self.stages.index(self.stage) + 1:] if self.stage in self.stages else self.stages
+        return any(stage in self.cancellable for stage in remaining)
+
+    def progress(self) -> Tuple[int, int]:
+        """(etapas completadas, etapas totales)."""
+        if self.state == STATE_DONE:
+            return len(self.stages), len(self.stages)
+        if self.stage not in self.stages:
+            return 0, len(self.stages)
+        return self.stages.index(self.stage), len(self.stages)
+
+
+class OperationQueue:
+    """Ejecuta operaciones en orden en un hilo propio y avisa de cada cambio en el hilo de Tk."""
+
+    def __init__(self, dispatcher: UiDispatcher, on_change: Callable[[Operation], None]) -> None:
+        self.dispatcher = dispatcher
+        self.on_change = on_change
+        self.operations: List[Operation] = []
+        self._pending: "queue.Queue[Optional[Operation]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, operation: Operation) -> Operation:
+        with self._lock:
+            self.operations.append(operation)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._work, name="automount-ops", daemon=True)
+                self._worker.start()
+        self._pending.put(operation)
+        self._notify(operation)
+        return operation
+
+    def cancel(self, operation: Operation) -> bool:
+        """Pide cancelar; devuelve False si la operación ya no puede detenerse."""
+        if not operation.can_cancel:
+            return False
+        operation._cancel.set()
+        self._notify(operation)
+        return True
+
+    def active(self) -> List[Operation]:
+        return [operation for operation in self.operations if operation.state not in FINAL_STATES]
+
+    def clear_finished(self) -> None:
+        with self._lock:
+            self.operations = self.active()
+
+    def shutdown(self) -> None:
+        self._pending.put(None)
+
+    def _notify(self, operation: Operation) -> None:
+        self.dispatcher.call_soon(self.on_change, operation)
+
+    def _enter_stage(self, operation: Operation, stage: str) -> None:
+        if operation.cancel_requested and stage in operation.cancellable:
+            raise OperationCancelledError(f"Operación cancelada antes de la etapa «{STAGE_LABELS.get(stage, stage)}».")
+        operation.stage = stage
+        self._notify(operation)
+
+    def _work(self) -> None:
+        while True:
+            operation = self._pending.get()
+            if operation is None:
+                return
+            if operation.cancel_requested:
+                operation.state = STATE_CANCELLED
+                self._notify(operation)
+                continue
+            operation.state = STATE_RUNNING
+            self._notify(operation)
+            with span("operation", title=operation.title) as step:
+                try:
+                    operation.result = operation.run(lambda stage: self._enter_stage(operation, stage))
+                    # Las operaciones de montaje devuelven False si el usuario rechaza la confirmación.
+                    operation.state = STATE_CANCELLED if operation.result is False else STATE_DONE
+                except OperationCancelledError as exc:
+                    operation.error = exc
+                    operation.state = STATE_CANCELLED
+                except Exception as exc:  # noqa: BLE001 - se muestra en la interfaz
+                    operation.error = exc
+                    operation.state = STATE_FAILED
+                step.set(state=operation.state, stage=operation.stage)
+            self._notify(operation)
+
+
+__all__ = [
+    "CONFIGURE_CANCELLABLE",
+    "CONFIGURE_STAGES",
+    "FINAL_STATES",
+    "FSTAB_CANCELLABLE",
+    "FSTAB_STAGES",
+    "Operation",
+    "OperationQueue",
+    "STAGE_COMMIT",
+    "STAGE_CONFIRM",
+    "STAGE_LABELS",
+    "STAGE_MOUNT",
+    "STAGE_PROBE",
+    "STAGE_VALIDATE",
+    "STAGE_VERIFY",
+    "STATE_CANCELLED",
+    "STATE_DONE",
+    "STATE_FAILED",
+    "STATE_QUEUED",
+    "STATE_RUNNING",
+    "StageCallback",
+    "UNMOUNT_CANCELLABLE",
+    "UNMOUNT_STAGES",
+    "UiDispatcher",
+    "ignore_stage",
+]
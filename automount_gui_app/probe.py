@@ -0,0 +1,254 @@
+"""
+Lectura directa de superbloques para obtener UUID, LABEL y tipo de sistema de archivos.
+
+Una sola lectura con os.pread cubre ext2/3/4, vfat, exfat, ntfs, btrfs y xfs.
+Lo que no se reconozca se resuelve con una única llamada agrupada a blkid.
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+import uuid as uuid_module
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from .system import run_cmd
+
+PROBE_SIZE = 128 * 1024
+
+EXT_SUPERBLOCK = 1024
+EXT_MAGIC = 0xEF53
+EXT3_FEATURE_COMPAT_HAS_JOURNAL = 0x0004
+EXT3_FEATURE_INCOMPAT_JOURNAL_DEV = 0x0008
+EXT3_FEATURE_INCOMPAT_SUPPORTED = 0x0002 | 0x0004 | 0x0010
+EXT3_FEATURE_RO_COMPAT_SUPPORTED = 0x0001 | 0x0002 | 0x0004
+
+BTRFS_SUPERBLOCK = 64 * 1024
+BTRFS_MAGIC = b"_BHRfS_M"
+
+NTFS_VOLUME_MFT_RECORD = 3
+NTFS_ATTR_VOLUME_NAME = 0x60
+NTFS_ATTR_END = 0xFFFFFFFF
+
+EXFAT_ENTRY_VOLUME_LABEL = 0x83
+EXFAT_ENTRY_SIZE = 32
+EXFAT_LABEL_SCAN_ENTRIES = 64
+
+
+@dataclass
+class FilesystemInfo:
+    """Identificadores de un sistema de archivos, equivalentes a la salida de blkid."""
+
+    fstype: str
+    uuid: Optional[str] = None
+    label: Optional[str] = None
+
+
+def _u16(buf: bytes, offset: int) -> int:
+    return struct.unpack_from("<H", buf, offset)[0]
+
+
+def _u32(buf: bytes, offset: int) -> int:
+    return struct.unpack_from("<I", buf, offset)[0]
+
+
+def _u64(buf: bytes, offset: int) -> int:
+    return struct.unpack_from("<Q", buf, offset)[0]
+
+
+def _format_uuid(raw: bytes) -> Optional[str]:
+    if not any(raw):
+        return None
+    return str(uuid_module.UUID(bytes=bytes(raw)))
+
+
+def _cstring(raw: bytes) -> Optional[str]:
+    value = raw.split(b"\0", 1)[0].decode("utf-8", "replace").strip()
+    return value or None
+
+
+def _probe_ext(buf: bytes) -> Optional[FilesystemInfo]:
+    sb = EXT_SUPERBLOCK
+    if len(buf) < sb + 0x88 or _u16(buf, sb + 0x38) != EXT_MAGIC:
+        return None
+    compat = _u32(buf, sb + 0x5C)
+    incompat = _u32(buf, sb + 0x60)
+    ro_compat = _u32(buf, sb + 0x64)
+    if incompat & EXT3_FEATURE_INCOMPAT_JOURNAL_DEV:
+        fstype = "jbd"
+    elif incompat & ~EXT3_FEATURE_INCOMPAT_SUPPORTED or ro_compat & ~EXT3_FEATURE_RO_COMPAT_SUPPORTED:
+        fstype = "ext4"
+    elif compat & EXT3_FEATURE_COMPAT_HAS_JOURNAL:
+        fstype = "ext3"
+    else:
+        fstype = "ext2"
+    return FilesystemInfo(fstype, _format_uuid(buf[sb + 0x68:sb + 0x78]), _cstring(buf[sb + 0x78:sb + 0x88]))
+
+
+def _probe_xfs(buf: bytes) -> Optional[FilesystemInfo]:
+    if len(buf) < 120 or buf[0:4] != b"XFSB":
+        return None
+    return FilesystemInfo("xfs", _format_uuid(buf[32:48]), _cstring(buf[108:120]))
+
+
+def _probe_btrfs(buf: bytes) -> Optional[FilesystemInfo]:
+    sb = BTRFS_SUPERBLOCK
+    if len(buf) < sb + 0x12B + 256 or buf[sb + 0x40:sb + 0x48] != BTRFS_MAGIC:
+        return None
+    return FilesystemInfo("btrfs", _format_uuid(buf[sb + 0x20:sb + 0x30]), _cstring(buf[sb + 0x12B:sb + 0x22B]))
+
+
+def _probe_vfat(buf: bytes) -> Optional[FilesystemInfo]:
+    if len(buf) < 512 or buf[510:512] != b"\x55\xaa":
+        return None
+    if buf[0x52:0x57] == b"FAT32":
+        serial_offset, label_offset = 0x43, 0x47
+    elif buf[0x36:0x39] == b"FAT":
+        serial_offset, label_offset = 0x27, 0x2B
+    else:
+        return None
+    serial = _u32(buf, serial_offset)
+    label = buf[label_offset:label_offset + 11].decode("latin-1").rstrip()
+    if label == "NO NAME":
+        label = ""
+    return FilesystemInfo("vfat", f"{serial >> 16:04X}-{serial & 0xFFFF:04X}", label or None)
+
+
+def _probe_exfat(fd: int, buf: bytes) -> Optional[FilesystemInfo]:
+    if len(buf) < 512 or buf[3:11] != b"EXFAT   ":
+        return None
+    serial = _u32(buf, 0x64)
+    info = FilesystemInfo("exfat", f"{serial >> 16:04X}-{serial & 0xFFFF:04X}")
+
+    sector_size = 1 << buf[0x6C]
+    cluster_size = sector_size << buf[0x6D]
+    root_offset = _u32(buf, 0x58) * sector_size + (_u32(buf, 0x60) - 2) * cluster_size
+    entries = _read_at(fd, buf, root_offset, EXFAT_ENTRY_SIZE * EXFAT_LABEL_SCAN_ENTRIES)
+    for pos in range(0, len(entries) - EXFAT_ENTRY_SIZE + 1, EXFAT_ENTRY_SIZE):
+        entry_type = entries[pos]
+        if entry_type == 0:
+            break
+        if entry_type == EXFAT_ENTRY_VOLUME_LABEL:
+            length = min(entries[pos + 1], 11)
+            info.label = entries[pos + 2:pos + 2 + length * 2].decode("utf-16-le", "replace") or None
+            break
+    return info
+
+
+def _probe_ntfs(fd: int, buf: bytes) -> Optional[FilesystemInfo]:
+    if len(buf) < 512 or buf[3:11] != b"NTFS    ":
+        return None
+    info = FilesystemInfo("ntfs", f"{_u64(buf, 0x48):016X}")
+
+    sector_size = _u16(buf, 0x0B)
+    sectors_per_cluster = buf[0x0D]
+    if sectors_per_cluster > 0x80:
+        sectors_per_cluster = 1 << (256 - sectors_per_cluster)
+    cluster_size = sector_size * sectors_per_cluster
+    record_clusters = struct.unpack_from("<b", buf, 0x40)[0]
+    record_size = 1 << -record_clusters if record_clusters < 0 else record_clusters * cluster_size
+    if not sector_size or not record_size:
+        return info
+
+    record_offset = _u64(buf, 0x30) * cluster_size + NTFS_VOLUME_MFT_RECORD * record_size
+    record = bytearray(_read_at(fd, buf, record_offset, record_size))
+    if len(record) < record_size or record[0:4] != b"FILE":
+        return info
+    _apply_ntfs_fixups(record, sector_size)
+
+    offset = _u16(record, 0x14)
+    while offset + 8 <= len(record):
+        attr_type = _u32(record, offset)
+        attr_length = _u32(record, offset + 4)
+        if attr_type == NTFS_ATTR_END or attr_length == 0:
+            break
+        if attr_type == NTFS_ATTR_VOLUME_NAME and record[offset + 8] == 0:
+            value_length = _u32(record, offset + 0x10)
+            value_offset = offset + _u16(record, offset + 0x14)
+            label = bytes(record[value_offset:value_offset + value_length]).decode("utf-16-le", "replace")
+            info.label = label or None
+            break
+        offset += attr_length
+    return info
+
+
+def _apply_ntfs_fixups(record: bytearray, sector_size: int) -> None:
+    usa_offset = _u16(record, 0x04)
+    usa_count = _u16(record, 0x06)
+    for index in range(1, usa_count):
+        end = index * sector_size
+        if end > len(record):
+            break
+        fixup = usa_offset + index * 2
+        record[end - 2:end] = record[fixup:fixup + 2]
+
+
+def _read_at(fd: int, buf: bytes, offset: int, length: int) -> bytes:
+    """Reutiliza el bloque ya leído cuando cubre el rango pedido."""
+    if offset + length <= len(buf):
+        return buf[offset:offset + length]
+    return os.pread(fd, length, offset)
+
+
+def probe_superblock(path: str) -> Optional[FilesystemInfo]:
+    """Identifica el sistema de archivos de un dispositivo o imagen leyendo su cabecera."""
+    fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+    try:
+        buf = os.pread(fd, PROBE_SIZE, 0)
+        for prober in (_probe_ext, _probe_xfs, _probe_btrfs):
+            info = prober(buf)
+            if info is not None:
+                return info
+        # NTFS y exFAT también terminan su sector de arranque en 0x55AA: van antes que vfat.
+        for prober in (_probe_ntfs, _probe_exfat):
+            info = prober(fd, buf)
+            if info is not None:
+                return info
+        return _probe_vfat(buf)
+    finally:
+        os.close(fd)
+
+
+def parse_blkid_export(output: str) -> Dict[str, FilesystemInfo]:
+    """Convierte la salida de `blkid -o export` en un diccionario por DEVNAME."""
+    results: Dict[str, FilesystemInfo] = {}
+    for block in output.split("\n\n"):
+        fields = dict(line.split("=", 1) for line in block.splitlines() if "=" in line)
+        devname = fields.get("DEVNAME")
+        if devname and fields.get("TYPE"):
+            results[devname] = FilesystemInfo(fields["TYPE"], fields.get("UUID"), fields.get("LABEL"))
+    return results
+
+
+def probe_devices(paths: Iterable[str]) -> Dict[str, FilesystemInfo]:
+    """Prueba cada ruta en proceso y agrupa las no reconocidas en un solo blkid."""
+    results: Dict[str, FilesystemInfo] = {}
+    pending = []
+    for path in paths:
+        try:
+            info = probe_superblock(path)
+        except OSError:
+            info = None
+        if info is None:
+            pending.append(path)
+        else:
+            results[path] = info
+    if pending:
+        output = run_cmd(["blkid", "-o", "export", *pending], check=False)
+        results.update(parse_blkid_export(output))
+    return results
+
+
+def probe_device(path: str) -> Optional[FilesystemInfo]:
+    """Devuelve los identificadores de una única ruta, o None si no se reconocen."""
+    return probe_devices([path]).get(path)
+
+
+__all__ = [
+    "FilesystemInfo",
+    "parse_blkid_export",
+    "probe_device",
+    "probe_devices",
+    "probe_superblock",
+]
@@ -0,0 +1,177 @@
+"""
+Perfiles de opciones de montaje según el sistema de archivos y el hardware.
+
+Las características del dispositivo se leen de sysfs (rotacional, soporte de
+discard, bus USB o NVMe, extraíble) y cada perfil ajusta las opciones base
+de `mount_options()`:
+
+- throughput: menos escrituras de metadatos y commits más espaciados.
+- latency: evita trabajo síncrono en la ruta de E/S.
+- removable-safe: vacía los datos pronto y no bloquea el arranque si falta.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Tuple
+
+from .constants import SYSFS_ROOT
+from .fstab import merge_options
+
+PROFILE_COMPATIBLE = "compatible"
+PROFILE_THROUGHPUT = "throughput"
+PROFILE_LATENCY = "latency"
+PROFILE_REMOVABLE_SAFE = "removable-safe"
+PROFILES = (PROFILE_COMPATIBLE, PROFILE_THROUGHPUT, PROFILE_LATENCY, PROFILE_REMOVABLE_SAFE)
+
+LAZYTIME_FILESYSTEMS = {"ext4", "ext3", "xfs", "btrfs"}
+FUSE_FILESYSTEMS = {"ntfs-3g", "exfat-fuse", "fuseblk"}
+# Tipos que el kernel monta con la opción discard (ntfs3 es el que elige FilesystemSupport para NTFS).
+DISCARD_FILESYSTEMS = {"ext4", "ext3", "xfs", "vfat", "exfat", "ntfs3"}
+FSTRIM_NOTE = "El dispositivo admite discard: habilite fstrim.timer para recortar bloques libres periódicamente."
+
+
+@dataclass(frozen=True)
+class DeviceTraits:
+    """Características del disco que influyen en las opciones de montaje."""
+
+    rotational: bool = True
+    discard: bool = False
+    bus: str = "other"
+    removable: bool = False
+
+    @property
+    def flash(self) -> bool:
+        return not self.rotational
+
+    def describe(self) -> str:
+        kind = "rotacional" if self.rotational else "SSD/flash"
+        extras = [self.bus] if self.bus != "other" else []
+        if self.discard:
+            extras.append("discard")
+        if self.removable:
+            extras.append("extraíble")
+        return f"{kind} ({', '.join(extras)})" if extras else kind
+
+
+@dataclass
+class ProfileResult:
+    options: str
+    notes: List[str] = field(default_factory=list)
+
+
+def read_device_traits(name: str, sysfs_root: Path = SYSFS_ROOT) -> DeviceTraits:
+    """Lee las características del disco que contiene `name` (partición o disco)."""
+    block_dir = Path(sysfs_root) / "class" / "block" / name
+    try:
+        device_dir = Path(os.path.realpath(block_dir))
+    except OSError:
+        return DeviceTraits()
+    disk_dir = device_dir.parent if (device_dir / "partition").exists() else device_dir
+    disk_name = disk_dir.name
+
+    rotational = _read_int(disk_dir / "queue" / "rotational", 1) != 0
+    discard = _read_int(disk_dir / "queue" / "discard_max_bytes", 0) > 0
+    removable = _read_int(disk_dir / "removable", 0) != 0
+    if disk_name.startswith("nvme"):
+        bus = "nvme"
+    elif "/usb" in disk_dir.as_posix():
+        bus = "usb"
+        removable = True
+    else:
+        bus = "other"
+    return DeviceTraits(rotational=rotational, discard=discard, bus=bus, removable=removable)
+
+
+def _read_int(path: Path, default: int) -> int:
+    try:
+        return int(path.read_text().strip())
+    except (OSError, ValueError):
+        return default
+
+
+def apply_profile(base_options: str, fstype: str, profile: str, traits: DeviceTraits) -> ProfileResult:
+    """Ajusta `base_options` al perfil indicado; PROFILE_COMPATIBLE las deja intactas."""
+    if profile not in PROFILES:
+        raise ValueError(f"Perfil de montaje desconocido: {profile}")
+    if profile == PROFILE_COMPATIBLE:
+        return ProfileResult(base_options)
+
+    additions: List[str] = []
+    notes: List[str] = []
+    fuse = fstype in FUSE_FILESYSTEMS or fstype.startswith("fuse.")
+    inline_discard = False
+
+    additions.append("noatime")
+    if fstype in LAZYTIME_FILESYSTEMS:
+        additions.append("lazytime")
+
+    if profile == PROFILE_THROUGHPUT:
+        if fstype in {"ext4", "ext3"}:
+            additions.append("commit=60")
+        elif fstype == "xfs":
+            additions.append("logbsize=256k")
+        elif fstype == "btrfs":
+            additions += ["compress=zstd:1", "commit=60"]
+        if fuse:
+            additions.append("big_writes")
+    elif profile == PROFILE_LATENCY:
+        if fstype == "btrfs":
+            additions.append("compress=lzo")
+        if fuse:
+            additions.append("big_writes")
+    elif profile == PROFILE_REMOVABLE_SAFE:
+        if fstype in {"ext4", "ext3"}:
+            additions.append("commit=1")
+        elif fstype == "btrfs":
+            additions += ["commit=5", "flushoncommit"]
+        elif fstype == "vfat":
+            additions.append("flush")
+        additions += ["nofail", "x-systemd.device-timeout=5s"]
+        # Un disco extraíble puede no estar conectado cuando corre fstrim.timer.
+        inline_discard = traits.discard and fstype in DISCARD_FILESYSTEMS
+
+    if fstype == "btrfs" and traits.flash:
+        additions.append("ssd")
+        if traits.discard:
+            additions.append("discard=async")
+    elif inline_discard:
+        additions.append("discard")
+    elif traits.discard and (fstype in DISCARD_FILESYSTEMS or fstype in {"ntfs", "ntfs-3g", "exfat-fuse"}):
+        notes.append(FSTRIM_NOTE)
+
+    if traits.bus == "usb" and profile != PROFILE_REMOVABLE_SAFE:
+        notes.append("Unidad USB: considere el perfil removable-safe si suele desconectarse sin desmontar.")
+    return ProfileResult(merge_options(base_options, additions), notes)
+
+
+def profile_matrix(base_options: str = "defaults,auto,users,rw,exec") -> List[Tuple[str, str, str, str]]:
+    """Tabla determinista (perfil, fstype, dispositivo, opciones) para revisar cambios en los perfiles."""
+    trait_cases = (
+        DeviceTraits(rotational=True),
+        DeviceTraits(rotational=False, discard=True, bus="nvme"),
+        DeviceTraits(rotational=False, discard=True, bus="usb", removable=True),
+        DeviceTraits(rotational=True, bus="usb", removable=True),
+    )
+    rows = []
+    for profile in PROFILES:
+        for fstype in ("ext4", "xfs", "btrfs", "vfat", "exfat", "exfat-fuse", "ntfs", "ntfs3", "ntfs-3g"):
+            for traits in trait_cases:
+                rows.append((profile, fstype, traits.describe(), apply_profile(base_options, fstype, profile, traits).options))
+    return rows
+
+
+__all__ = [
+    "DeviceTraits",
+    "PROFILES",
+    "PROFILE_COMPATIBLE",
+    "PROFILE_LATENCY",
+    "PROFILE_REMOVABLE_SAFE",
+    "PROFILE_THROUGHPUT",
+    "ProfileResult",
+    "apply_profile",
+    "profile_matrix",
+    "read_device_traits",
+]
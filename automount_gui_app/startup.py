@@ -0,0 +1,149 @@
+"""
+Medición del arranque de la interfaz.
+
+Cada repetición arranca un intérprete nuevo que importa la GUI, crea la
+ventana y mide tres momentos desde el inicio del script:
+
+    importación   `import automount_gui_app.gui` terminado
+    primer pintado  primer evento <Expose> de la ventana
+    con datos      las tablas de dispositivos ya rellenas
+
+Hace falta un servidor X. Si no hay DISPLAY y está instalado Xvfb, se lanza
+uno propio durante la medición; sin ninguno de los dos sólo se mide la
+importación.
+
+    python -m automount_gui_app.startup --repeticiones 10
+    python -m automount_gui_app.startup --tema equilux
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+PHASES = (("import", "importación"), ("first_paint", "primer pintado"), ("populated", "con datos"))
+SESSION_TIMEOUT = 30.0
+XVFB_SCREEN = "1280x800x24"
+
+
+def _measure_child(theme: Optional[str], import_only: bool) -> Dict[str, float]:
+    """Se ejecuta en el intérprete hijo; devuelve los tiempos en ms desde el inicio."""
+    started = time.perf_counter()
+    from .gui import AutoMountGUI
+
+    marks = {"import": time.perf_counter()}
+    if import_only:
+        return {name: (moment - started) * 1000 for name, moment in marks.items()}
+
+    import tkinter as tk
+
+    root = tk.Tk()
+    root.bind("<Expose>", lambda _event: marks.setdefault("first_paint", time.perf_counter()), add="+")
+    gui = AutoMountGUI(root, theme=theme)
+    deadline = started + SESSION_TIMEOUT
+    while time.perf_counter() < deadline and ("first_paint" not in marks or "populated" not in marks):
+        root.update()
+        if not gui._refreshing_devices:
+            marks.setdefault("populated", time.perf_counter())
+        time.sleep(0.001)
+    gui._on_close()
+    return {name: (moment - started) * 1000 for name, moment in marks.items()}
+
+
+def _start_xvfb() -> Tuple[Optional[subprocess.Popen], Optional[str]]:
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        return None, None
+    number = next(
+        n for n in range(99, 200)
+        if not Path(f"/tmp/.X11-unix/X{n}").exists() and not Path(f"/tmp/.X{n}-lock").exists()
+    )
+    process = subprocess.Popen(
+        [xvfb, f":{number}", "-screen", "0", XVFB_SCREEN, "-nolisten", "tcp"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    socket_path = Path(f"/tmp/.X11-unix/X{number}")
+    deadline = time.monotonic() + 5
+    while not socket_path.exists():
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            return None, None
+        time.sleep(0.05)
+    return process, f":{number}"
+
+
+def _run_child(env: Dict[str, str], theme: Optional[str], import_only: bool) -> Dict[str, float]:
+    command = [sys.executable, "-m", "automount_gui_app.startup", "--hijo"]
+    if theme:
+        command += ["--tema", theme]
+    if import_only:
+        command.append("--solo-importacion")
+    result = subprocess.run(command, env=env, capture_output=True, text=True, timeout=SESSION_TIMEOUT + 10)
+    if result.returncode != 0:
+        raise RuntimeError(f"La sesión de medición falló:\n{result.stderr.strip()}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _benchmark(repeat: int, theme: Optional[str], use_xvfb: bool) -> None:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(Path(__file__).resolve().parents[1]), env.get("PYTHONPATH")]))
+    xvfb = None
+    if use_xvfb or not env.get("DISPLAY"):
+        xvfb, display = _start_xvfb()
+        if display:
+            env["DISPLAY"] = display
+    import_only = not env.get("DISPLAY")
+    if import_only:
+        print("Sin DISPLAY ni Xvfb: sólo se mide la importación.")
+    else:
+        print(f"Pantalla {env['DISPLAY']}{' (Xvfb)' if xvfb else ''}, tema: {theme or 'predeterminado'}")
+
+    runs: List[Dict[str, float]] = []
+    try:
+        for _ in range(repeat):
+            runs.append(_run_child(env, theme, import_only))
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+
+    print(f"{repeat} arranques (ms desde el inicio del script)")
+    print(f"{'fase':<18}{'mediana':>10}{'mínimo':>10}{'máximo':>10}")
+    for key, label in PHASES:
+        values = [run[key] for run in runs if key in run]
+        if not values:
+            continue
+        print(f"{label:<18}{statistics.median(values):>10.1f}{min(values):>10.1f}{max(values):>10.1f}")
+    missing = sum(1 for run in runs if "populated" not in run) if not import_only else 0
+    if missing:
+        print(f"Aviso: {missing} arranques no llegaron a rellenar las tablas en {SESSION_TIMEOUT:.0f} s")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Mide el arranque de la interfaz (importación, primer pintado y datos).")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--tema", default=None, help="tema de ttkthemes que se aplica tras el primer pintado")
+    parser.add_argument("--xvfb", action="store_true", help="usa un Xvfb propio aunque haya DISPLAY")
+    parser.add_argument("--hijo", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--solo-importacion", action="store_true", help=argparse.SUPPRESS)
+    options = parser.parse_args(argv)
+    if options.hijo:
+        print(json.dumps(_measure_child(options.tema, options.solo_importacion)))
+        return
+    _benchmark(options.repeticiones, options.tema, options.xvfb)
+
+
+__all__ = ["PHASES"]
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,225 @@
 """
 Funciones relacionadas con interacción del sistema y privilegios.
+
+Los comandos externos se ejecutan con `CommandRunner`: un bucle asyncio en
+un hilo propio que limita cuántos procesos corren a la vez, aplica un tiempo
+máximo a cada llamada (SIGTERM y, si no basta, SIGKILL al grupo del proceso)
+y guarda durante unos segundos la salida de las consultas de sólo lectura
+(lsblk, blkid...). Cualquier otro comando se considera modificador e invalida
+esa caché. `run_cmd()` es la fachada síncrona que usan los demás módulos.
 """
 
 from __future__ import annotations
 
+import asyncio
 import os
 import shutil
-import subprocess
+import signal
 import sys
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Sequence
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+from .errors import CommandTimeoutError
+from .mounttable import get_mount_table
+from .tracing import span
+
+DEFAULT_TIMEOUT = 60.0
+KILL_GRACE = 3.0
+MAX_CONCURRENT = 4
+CACHE_TTL = 2.0
+READ_ONLY_COMMANDS = frozenset({"lsblk", "blkid", "findmnt", "mountpoint", "systemd-escape"})
+
+
+@dataclass(frozen=True)
+class CommandResult:
+    args: Tuple[str, ...]
+    returncode: int
+    stdout: str
+    stderr: str
+    cached: bool = False
+
+
+def is_read_only(cmd: Sequence[str]) -> bool:
+    """Indica si el comando sólo consulta el estado del sistema y su salida puede reutilizarse."""
+    return bool(cmd) and os.path.basename(cmd[0]) in READ_ONLY_COMMANDS
+
 
+class CommandRunner:
+    """Ejecuta comandos externos con límite de concurrencia, tiempo máximo y caché.
 
-def run_cmd(cmd: Sequence[str], check: bool = True, capture_output: bool = True) -> str:
+    `env` permite sustituir el entorno de los procesos (por ejemplo un PATH
+    con ejecutables de prueba).
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = MAX_CONCURRENT,
+        default_timeout: float = DEFAULT_TIMEOUT,
+        kill_grace: float = KILL_GRACE,
+        cache_ttl: float = CACHE_TTL,
+        env: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        self.max_concurrent = max(1, max_concurrent)
+        self.default_timeout = default_timeout
+        self.kill_grace = kill_grace
+        self.cache_ttl = cache_ttl
+        self.env = dict(env) if env is not None else None
+        self._cache: Dict[Tuple[str, ...], Tuple[float, CommandResult]] = {}
+        self._inflight: Dict[Tuple[str, ...], asyncio.Future] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                ready = threading.Event()
+
+                def serve() -> None:
+                    loop = asyncio.new_event_loop()
+                    asyncio.set_event_loop(loop)
+                    self._loop = loop
+                    self._semaphore = asyncio.Semaphore(self.max_concurrent)
+                    ready.set()
+                    loop.run_forever()
+
+                threading.Thread(target=serve, name="automount-cmd", daemon=True).start()
+                ready.wait()
+            return self._loop
+
+    def submit(self, cmd: Sequence[str], timeout: Optional[float] = None, capture_output: bool = True) -> Future:
+        """Programa el comando en el bucle del ejecutor y devuelve un `concurrent.futures.Future`.
+
+        Desde otro bucle asyncio puede esperarse con `asyncio.wrap_future()`.
+        """
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self.run(cmd, timeout, capture_output), loop)
+
+    def run_sync(self, cmd: Sequence[str], timeout: Optional[float] = None, capture_output: bool = True) -> CommandResult:
+        return self.submit(cmd, timeout, capture_output).result()
+
+    def invalidate(self) -> None:
+        """Descarta las salidas guardadas; los resultados en curso tampoco se guardarán."""
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    async def run(
+        self, cmd: Sequence[str], timeout: Optional[float] = None, capture_output: bool = True
+    ) -> CommandResult:
+        """Corrutina que debe ejecutarse en el bucle del ejecutor (ver `submit`)."""
+        key = tuple(str(arg) for arg in cmd)
+        if not (capture_output and is_read_only(key)):
+            self.invalidate()
+            try:
+                return await self._execute(key, timeout, capture_output)
+            finally:
+                self.invalidate()
+
+        with self._lock:
+            cached = self._cache.get(key)
+            generation = self._generation
+        if cached is not None and cached[0] > time.monotonic():
+            return replace(cached[1], cached=True)
+        # Dos consultas idénticas simultáneas comparten un único proceso.
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return replace(await asyncio.shield(pending), cached=True)
+        pending = asyncio.get_running_loop().create_future()
+        self._inflight[key] = pending
+        try:
+            result = await self._execute(key, timeout, capture_output)
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as exc:
+            pending.set_exception(exc)
+            pending.exception()  # Evita el aviso si nadie más la esperaba.
+            raise
+        finally:
+            del self._inflight[key]
+        pending.set_result(result)
+        with self._lock:
+            if generation == self._generation and self.cache_ttl > 0:
+                self._cache[key] = (time.monotonic() + self.cache_ttl, result)
+        return result
+
+    async def _execute(self, args: Tuple[str, ...], timeout: Optional[float], capture_output: bool) -> CommandResult:
+        timeout = self.default_timeout if timeout is None else timeout
+        pipe = asyncio.subprocess.PIPE if capture_output else None
+        async with self._semaphore:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *args, stdout=pipe, stderr=pipe, env=self.env, start_new_session=True
+                )
+            except OSError as exc:
+                raise RuntimeError(f"No se pudo ejecutar {args[0]}: {exc.strerror}") from exc
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+            except asyncio.TimeoutError:
+                await self._stop(process)
+                raise CommandTimeoutError(
+                    f"{' '.join(args)} no terminó en {timeout:g} s y se detuvo."
+                ) from None
+            except asyncio.CancelledError:
+                await self._stop(process)
+                raise
+        return CommandResult(
+            args,
+            process.returncode,
+            (stdout or b"").decode("utf-8", errors="replace"),
+            (stderr or b"").decode("utf-8", errors="replace"),
+        )
+
+    async def _stop(self, process: asyncio.subprocess.Process) -> None:
+        """SIGTERM al grupo del proceso y SIGKILL si sigue vivo tras `kill_grace`."""
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(process.pid, sig)
+            except ProcessLookupError:
+                return
+            try:
+                await asyncio.wait_for(process.wait(), self.kill_grace)
+                return
+            except asyncio.TimeoutError:
+                continue
+        # Un proceso en espera no interrumpible (D) no muere ni con SIGKILL: se deja atrás
+        # y el bucle lo recogerá cuando termine, sin bloquear a quien lo lanzó.
+
+
+_runner: Optional[CommandRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_runner() -> CommandRunner:
+    """Ejecutor compartido por toda la aplicación."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = CommandRunner()
+        return _runner
+
+
+def run_cmd(
+    cmd: Sequence[str],
+    check: bool = True,
+    capture_output: bool = True,
+    timeout: Optional[float] = None,
+) -> str:
     """
     Ejecuta un comando y devuelve stdout. Lanza RuntimeError si falla y check es True.
+
+    Si no termina en `timeout` segundos (DEFAULT_TIMEOUT por omisión) se detiene
+    y se lanza CommandTimeoutError, también cuando check es False.
     """
-    result = subprocess.run(cmd, text=True, capture_output=capture_output)
+    with span(f"cmd {os.path.basename(cmd[0])}", argv=" ".join(cmd)) as step:
+        result = get_runner().run_sync(cmd, timeout=timeout, capture_output=capture_output)
+        step.set(returncode=result.returncode, cached=result.cached)
     if check and result.returncode != 0:
         error_msg = result.stderr.strip() if capture_output else ""
         raise RuntimeError(error_msg or f"Error ejecutando {' '.join(cmd)}")
@@ -25,8 +228,10 @@ def run_cmd(cmd: Sequence[str], check: bool = True, capture_output: bool = True)
 
 def is_mountpoint(path: Path) -> bool:
     """Indica si la ruta ya es un punto de montaje activo."""
-    result = subprocess.run(["mountpoint", "-q", str(path)])
-    return result.returncode == 0
+    try:
+        return get_mount_table().is_mountpoint(path)
+    except OSError:
+        return get_runner().run_sync(["mountpoint", "-q", str(path)]).returncode == 0
 
 
 def ensure_root(target_script: Path | None = None) -> None:
@@ -60,4 +265,12 @@ def ensure_root(target_script: Path | None = None) -> None:
     sys.exit(1)
 
 
-__all__ = ["run_cmd", "is_mountpoint", "ensure_root"]
+__all__ = [
+    "CommandResult",
+    "CommandRunner",
+    "ensure_root",
+    "get_runner",
+    "is_mountpoint",
+    "is_read_only",
+    "run_cmd",
+]
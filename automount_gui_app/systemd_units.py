@@ -0,0 +1,253 @@
+"""
+Montaje bajo demanda con systemd.
+
+Ofrece dos variantes equivalentes: añadir a la entrada de fstab las opciones
+x-systemd.automount, x-systemd.idle-timeout, x-systemd.device-timeout y
+nofail, o escribir directamente unidades .mount y .automount en un
+directorio de unidades. En ambos casos el arranque deja de esperar al disco:
+se monta en el primer acceso y se desmonta tras un periodo de inactividad.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from .constants import SYSTEMD_RUNTIME_DIR, SYSTEMD_UNIT_DIR
+from .fstab import FstabEntry, split_source
+from .journal import atomic_write
+from .system import run_cmd
+
+DEFAULT_IDLE_TIMEOUT = 600
+DEFAULT_DEVICE_TIMEOUT = 10
+WANTED_BY = "local-fs.target"
+GENERATED_MARKER = "# Generado por AutoMount"
+DEVICE_TIMEOUT_DROPIN = "automount-timeout.conf"
+
+# Opciones que sólo interpretan mount(8), fstab o el generador de systemd.
+FSTAB_ONLY_OPTIONS = {"auto", "noauto", "nofail", "_netdev", "defaults"}
+SAFE_UNIT_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789:_.")
+DISK_BY_PATHS = {"uuid": "/dev/disk/by-uuid/", "label": "/dev/disk/by-label/", "partuuid": "/dev/disk/by-partuuid/"}
+
+
+def escape_path(path: str) -> str:
+    """Equivalente a `systemd-escape --path`."""
+    parts = [part for part in str(path).split("/") if part and part != "."]
+    if not parts:
+        return "-"
+    escaped = []
+    for index, byte in enumerate("/".join(parts).encode("utf-8")):
+        char = chr(byte)
+        if char == "/":
+            escaped.append("-")
+        elif char in SAFE_UNIT_CHARS and not (index == 0 and char == "."):
+            escaped.append(char)
+        else:
+            escaped.append(f"\\x{byte:02x}")
+    return "".join(escaped)
+
+
+def unit_name(mountpoint: str, suffix: str) -> str:
+    return f"{escape_path(mountpoint)}.{suffix}"
+
+
+def escape_value(value: str) -> str:
+    """Escapa los especificadores (%) en un valor de unidad."""
+    return value.replace("%", "%%")
+
+
+def device_path(source: str) -> str:
+    """Ruta de dispositivo estable para UUID=, LABEL= o PARTUUID=."""
+    kind, value = split_source(source)
+    if kind in DISK_BY_PATHS:
+        # udev escapa los caracteres especiales de las etiquetas en /dev/disk/by-label.
+        escaped = "".join(ch if ch.isalnum() or ch in "#+-.:=@_" else f"\\x{ord(ch):02x}" for ch in value)
+        return DISK_BY_PATHS[kind] + escaped
+    return source
+
+
+def on_demand_options(
+    options: str,
+    idle_timeout: int = DEFAULT_IDLE_TIMEOUT,
+    device_timeout: int = DEFAULT_DEVICE_TIMEOUT,
+) -> str:
+    """Añade a las opciones de fstab lo necesario para montar bajo demanda."""
+    kept = [
+        option
+        for option in options.split(",")
+        if option and option != "nofail" and not option.startswith("x-systemd.")
+    ]
+    kept += [
+        "nofail",
+        "x-systemd.automount",
+        f"x-systemd.idle-timeout={idle_timeout}",
+        f"x-systemd.device-timeout={device_timeout}s",
+    ]
+    return ",".join(kept)
+
+
+def unit_options(options: str) -> str:
+    """Opciones para Options=, sin las que sólo tienen sentido en fstab."""
+    kept = [
+        option
+        for option in options.split(",")
+        if option and option not in FSTAB_ONLY_OPTIONS and not option.startswith(("x-systemd.", "comment="))
+    ]
+    return ",".join(kept) or "defaults"
+
+
+class SystemdUnitWriter:
+    """Genera, instala y elimina unidades .mount/.automount en `unit_dir`."""
+
+    def __init__(self, unit_dir: Path = SYSTEMD_UNIT_DIR, wanted_by: str = WANTED_BY) -> None:
+        self.unit_dir = Path(unit_dir)
+        self.wanted_by = wanted_by
+
+    @property
+    def wants_dir(self) -> Path:
+        return self.unit_dir / f"{self.wanted_by}.wants"
+
+    def render_mount(self, entry: FstabEntry, automount: bool = True) -> str:
+        lines = [
+            GENERATED_MARKER,
+            "[Unit]",
+            f"Description=AutoMount: {escape_value(entry.mountpoint)}",
+            "Documentation=man:systemd.mount(5)",
+            "",
+            "[Mount]",
+            f"What={escape_value(device_path(entry.source))}",
+            f"Where={escape_value(entry.mountpoint)}",
+            f"Type={entry.fstype}",
+            f"Options={escape_value(unit_options(entry.options))}",
+        ]
+        if not automount:
+            # Sin Before=local-fs.target, igual que nofail: el arranque no espera al disco.
+            lines += ["", "[Install]", f"WantedBy={self.wanted_by}"]
+        return "\n".join(lines) + "\n"
+
+    def render_automount(self, entry: FstabEntry, idle_timeout: int = DEFAULT_IDLE_TIMEOUT) -> str:
+        lines = [
+            GENERATED_MARKER,
+            "[Unit]",
+            f"Description=AutoMount bajo demanda: {escape_value(entry.mountpoint)}",
+            "Documentation=man:systemd.automount(5)",
+            "",
+            "[Automount]",
+            f"Where={escape_value(entry.mountpoint)}",
+            f"TimeoutIdleSec={idle_timeout}",
+            "",
+            "[Install]",
+            f"WantedBy={self.wanted_by}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def render_device_timeout(self, device_timeout: int) -> str:
+        return f"{GENERATED_MARKER}\n[Unit]\nJobRunningTimeoutSec={device_timeout}s\n"
+
+    def unit_paths(self, entry_or_mountpoint) -> List[Path]:
+        mountpoint = getattr(entry_or_mountpoint, "mountpoint", entry_or_mountpoint)
+        return [self.unit_dir / unit_name(mountpoint, suffix) for suffix in ("mount", "automount")]
+
+    def exists(self, mountpoint: str) -> bool:
+        return any(path.exists() for path in self.unit_paths(mountpoint))
+
+    def write(
+        self,
+        entry: FstabEntry,
+        automount: bool = True,
+        idle_timeout: int = DEFAULT_IDLE_TIMEOUT,
+        device_timeout: Optional[int] = DEFAULT_DEVICE_TIMEOUT,
+    ) -> List[Path]:
+        """Escribe y habilita las unidades; devuelve las rutas creadas."""
+        mount_path, automount_path = self.unit_paths(entry)
+        for path in (mount_path, automount_path):
+            if path.exists() or path.is_symlink():
+                raise RuntimeError(f"Ya existe la unidad {path}.")
+        self.unit_dir.mkdir(parents=True, exist_ok=True)
+        created: List[Path] = []
+        try:
+            atomic_write(mount_path, self.render_mount(entry, automount))
+            created.append(mount_path)
+            enabled = mount_path
+            if automount:
+                atomic_write(automount_path, self.render_automount(entry, idle_timeout))
+                created.append(automount_path)
+                enabled = automount_path
+            self.wants_dir.mkdir(parents=True, exist_ok=True)
+            link = self.wants_dir / enabled.name
+            os.symlink(enabled, link)
+            created.append(link)
+            if device_timeout is not None and split_source(entry.source)[0] != "other":
+                dropin_dir = self.unit_dir / f"{unit_name(device_path(entry.source), 'device')}.d"
+                dropin_dir.mkdir(parents=True, exist_ok=True)
+                dropin = dropin_dir / DEVICE_TIMEOUT_DROPIN
+                atomic_write(dropin, self.render_device_timeout(device_timeout))
+                created.append(dropin)
+        except BaseException:
+            self._unlink(created)
+            raise
+        return created
+
+    def remove(self, mountpoint: str, source: Optional[str] = None) -> List[Path]:
+        """Elimina las unidades generadas para `mountpoint`; respeta las que no creó AutoMount."""
+        removed: List[Path] = []
+        for path in self.unit_paths(mountpoint):
+            if not path.exists():
+                continue
+            if not path.read_text(encoding="utf-8", errors="replace").startswith(GENERATED_MARKER):
+                raise RuntimeError(f"La unidad {path} no fue generada por AutoMount; no se modificará.")
+            removed.append(path)
+            link = self.wants_dir / path.name
+            if link.is_symlink():
+                removed.append(link)
+        if source is not None and split_source(source)[0] != "other":
+            dropin = self.unit_dir / f"{unit_name(device_path(source), 'device')}.d" / DEVICE_TIMEOUT_DROPIN
+            if dropin.exists():
+                removed.append(dropin)
+        self._unlink(removed)
+        return removed
+
+    @staticmethod
+    def _unlink(paths: Sequence[Path]) -> None:
+        for path in reversed(paths):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            parent = path.parent
+            if parent.name.endswith((".d", ".wants")):
+                try:
+                    parent.rmdir()
+                except OSError:
+                    pass
+
+
+def systemd_running(runtime_dir: Path = SYSTEMD_RUNTIME_DIR) -> bool:
+    return Path(runtime_dir).is_dir() and shutil.which("systemctl") is not None
+
+
+def reload_units(start: Sequence[str] = (), stop: Sequence[str] = ()) -> None:
+    """Recarga systemd y arranca/detiene unidades; no hace nada si systemd no está activo."""
+    if not systemd_running():
+        return
+    if stop:
+        run_cmd(["systemctl", "stop", *stop], check=False)
+    run_cmd(["systemctl", "daemon-reload"])
+    if start:
+        run_cmd(["systemctl", "start", *start])
+
+
+__all__ = [
+    "DEFAULT_DEVICE_TIMEOUT",
+    "DEFAULT_IDLE_TIMEOUT",
+    "SystemdUnitWriter",
+    "device_path",
+    "escape_path",
+    "on_demand_options",
+    "reload_units",
+    "systemd_running",
+    "unit_name",
+    "unit_options",
+]
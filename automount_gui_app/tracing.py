@@ -0,0 +1,198 @@
+"""
+Trazas de tiempo de las operaciones (dispositivos, montaje y comandos).
+
+`span("nombre", clave=valor)` mide un paso: tiempo de reloj, tiempo de CPU
+consumido por los procesos hijos que terminaron durante el paso y estado
+(`ok` o el tipo de excepción). Los pasos anidados en el mismo hilo guardan
+a su padre. Con el trazado desactivado `span()` devuelve siempre el mismo
+objeto inerte, así que el coste es una llamada y una comprobación.
+
+Las trazas se escriben en JSONL (una línea por paso) y, al cerrar, en el
+formato de eventos de Chrome (chrome://tracing o https://ui.perfetto.dev).
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import resource
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+TRACE_ENV = "AUTOMOUNT_TRACE"
+
+
+class _NullSpan:
+    """Paso inerte que se usa cuando el trazado está desactivado."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """Paso en curso; `set()` añade atributos que se conocen durante la ejecución."""
+
+    __slots__ = ("tracer", "name", "attrs", "span_id", "parent_id", "start", "child_cpu")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.span_id = next(tracer._ids)
+        self.parent_id: Optional[int] = None
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        stack = self.tracer._stack()
+        self.parent_id = stack[-1].span_id if stack else None
+        stack.append(self)
+        self.child_cpu = _children_cpu()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        end = time.perf_counter_ns()
+        child_cpu = _children_cpu() - self.child_cpu
+        stack = self.tracer._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        self.tracer._finish({
+            "name": self.name,
+            "id": self.span_id,
+            "parent": self.parent_id,
+            "thread": threading.current_thread().name,
+            "tid": threading.get_ident(),
+            "start_us": (self.start - self.tracer.origin) // 1000,
+            "wall_ms": round((end - self.start) / 1e6, 3),
+            "child_cpu_ms": round(child_cpu * 1000, 3),
+            "status": "ok" if exc_type is None else exc_type.__name__,
+            "attrs": self.attrs,
+        })
+        return False
+
+
+def _children_cpu() -> float:
+    # Es por proceso: con varios hilos lanzando comandos, el valor de un paso
+    # incluye a los hijos de otros hilos que terminaron en ese intervalo.
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class Tracer:
+    """Recoge los pasos y los escribe en `jsonl_path` y `chrome_path`."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.origin = time.perf_counter_ns()
+        self.jsonl_path: Optional[Path] = None
+        self.chrome_path: Optional[Path] = None
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._jsonl = None
+        self._events: List[Dict] = []
+
+    def start(self, jsonl_path: Optional[Path] = None, chrome_path: Optional[Path] = None) -> None:
+        with self._lock:
+            self.jsonl_path = Path(jsonl_path) if jsonl_path else None
+            self.chrome_path = Path(chrome_path) if chrome_path else None
+            if self.jsonl_path is not None:
+                self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+                self._jsonl = self.jsonl_path.open("a", encoding="utf-8", buffering=1)
+            self._events = []
+            self.origin = time.perf_counter_ns()
+            self.enabled = True
+
+    def stop(self) -> None:
+        """Desactiva el trazado, cierra el JSONL y escribe la traza de Chrome."""
+        with self._lock:
+            self.enabled = False
+            if self._jsonl is not None:
+                self._jsonl.close()
+                self._jsonl = None
+            if self.chrome_path is not None:
+                self.chrome_path.parent.mkdir(parents=True, exist_ok=True)
+                self.chrome_path.write_text(
+                    json.dumps({"traceEvents": self._events, "displayTimeUnit": "ms"}), encoding="utf-8"
+                )
+            self._events = []
+
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, attrs)
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _finish(self, record: Dict) -> None:
+        with self._lock:
+            if not self.enabled:
+                return
+            if self._jsonl is not None:
+                self._jsonl.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+            if self.chrome_path is not None:
+                args = {key: str(value) for key, value in record["attrs"].items()}
+                args.update(status=record["status"], child_cpu_ms=record["child_cpu_ms"])
+                self._events.append({
+                    "name": record["name"],
+                    "ph": "X",
+                    "ts": record["start_us"],
+                    "dur": int(record["wall_ms"] * 1000),
+                    "pid": os.getpid(),
+                    "tid": record["tid"],
+                    "args": args,
+                })
+
+
+tracer = Tracer()
+
+
+def span(name: str, **attrs):
+    """Mide un paso con el trazador global: `with span("mount", device=...) as sp: ...`."""
+    if not tracer.enabled:
+        return NULL_SPAN
+    return Span(tracer, name, attrs)
+
+
+def start_tracing(directory: Path) -> Path:
+    """Activa el trazado en `directory`; devuelve la ruta base de los ficheros."""
+    directory = Path(directory)
+    base = directory / time.strftime("automount-%Y%m%d-%H%M%S")
+    tracer.start(base.with_suffix(".jsonl"), base.with_suffix(".trace.json"))
+    return base
+
+
+def stop_tracing() -> None:
+    tracer.stop()
+
+
+__all__ = [
+    "NULL_SPAN",
+    "Span",
+    "TRACE_ENV",
+    "Tracer",
+    "span",
+    "start_tracing",
+    "stop_tracing",
+    "tracer",
+]
@@ -0,0 +1,306 @@
+"""
+Actualización incremental de las tablas de dispositivos (ttk.Treeview).
+
+En lugar de borrar y volver a insertar todas las filas, cada fila se
+identifica con una clave estable (nombre del dispositivo y UUID) y se
+calcula la diferencia con el contenido actual: sólo se borran, insertan,
+mueven o actualizan las filas que cambiaron. Así se conservan la selección
+y la posición de desplazamiento y se reducen las llamadas a Tk.
+
+Para reordenar se mantiene fija la subsecuencia creciente más larga de las
+filas que ya estaban; sólo se mueven las demás.
+
+Las etiquetas de filas alternas no forman parte de la fila: dependen de la
+posición, y conectar un dispositivo desplazaría las de todas las filas de
+debajo. `apply_plan` conserva la etiqueta que cada fila ya tenía y
+`restripe` corrige sólo las filas visibles; las demás se corrigen cuando se
+desplaza la tabla hasta ellas.
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+STRIPE_TAGS = ("even", "odd")
+# Filas que caben en pantalla en las mediciones (altura habitual de la tabla).
+VISIBLE_ROWS = 30
+
+
+@dataclass(frozen=True)
+class TreeRow:
+    key: str
+    values: Tuple[str, ...]
+    tags: Tuple[str, ...] = ()
+
+
+@dataclass
+class TreePlan:
+    """Operaciones que llevan una tabla de un contenido a otro."""
+
+    delete: List[str] = field(default_factory=list)
+    detach: List[str] = field(default_factory=list)
+    place: List[Tuple[int, TreeRow, bool]] = field(default_factory=list)
+    update: List[TreeRow] = field(default_factory=list)
+
+    @property
+    def calls(self) -> int:
+        """Llamadas a Tk que hará `apply_plan`."""
+        return bool(self.delete) + bool(self.detach) + len(self.place) + len(self.update)
+
+    def __bool__(self) -> bool:
+        return bool(self.delete or self.place or self.update)
+
+
+def device_key(entry: Dict) -> str:
+    """Identidad estable de un dispositivo en las tablas."""
+    return f"{entry.get('name', '')}|{entry.get('uuid') or ''}"
+
+
+def _stable_positions(sequence: Sequence[int]) -> List[int]:
+    """Índices de una subsecuencia creciente más larga de `sequence`."""
+    tails: List[int] = []
+    tail_index: List[int] = []
+    previous = [-1] * len(sequence)
+    for index, value in enumerate(sequence):
+        slot = bisect.bisect_left(tails, value)
+        if slot == len(tails):
+            tails.append(value)
+            tail_index.append(index)
+        else:
+            tails[slot] = value
+            tail_index[slot] = index
+        previous[index] = tail_index[slot - 1] if slot else -1
+    result = []
+    index = tail_index[-1] if tail_index else -1
+    while index != -1:
+        result.append(index)
+        index = previous[index]
+    result.reverse()
+    return result
+
+
+def plan_tree(old: Sequence[TreeRow], new: Sequence[TreeRow]) -> TreePlan:
+    """Calcula las operaciones para pasar de `old` a `new` (ambas en orden de pantalla)."""
+    plan = TreePlan()
+    old_by_key = {row.key: (position, row) for position, row in enumerate(old)}
+    new_keys = {row.key for row in new}
+    plan.delete = [row.key for row in old if row.key not in new_keys]
+
+    kept = [row for row in new if row.key in old_by_key]
+    positions = [old_by_key[row.key][0] for row in kept]
+    if all(a < b for a, b in zip(positions, positions[1:])):
+        # Caso habitual: las filas que siguen conservan su orden relativo.
+        moved = set()
+    else:
+        stable = {kept[index].key for index in _stable_positions(positions)}
+        moved = {row.key for row in kept if row.key not in stable}
+        plan.detach = [row.key for row in kept if row.key in moved]
+
+    for index, row in enumerate(new):
+        previous = old_by_key.get(row.key)
+        if previous is None:
+            plan.place.append((index, row, True))
+            continue
+        if row.key in moved:
+            plan.place.append((index, row, False))
+        if previous[1] != row:
+            plan.update.append(row)
+    return plan
+
+
+def _with_stripe(row: TreeRow, tag: Optional[str]) -> Tuple[str, ...]:
+    return (tag,) + row.tags if tag else row.tags
+
+
+def apply_plan(tree, plan: TreePlan, stripes: Optional[Dict[str, str]] = None, offset: int = 0) -> None:
+    """Aplica `plan` sobre un ttk.Treeview (o cualquier objeto con la misma interfaz).
+
+    `stripes` guarda la etiqueta de fila alterna que tiene cada fila en pantalla:
+    las filas nuevas la reciben según su posición (más `offset`) y las que se
+    actualizan conservan la suya. Sin `stripes` no se ponen etiquetas alternas.
+    """
+    if plan.delete:
+        tree.delete(*plan.delete)
+        if stripes is not None:
+            for key in plan.delete:
+                stripes.pop(key, None)
+    if plan.detach:
+        tree.detach(*plan.detach)
+    # Tras separar las filas que se mueven, las que quedan ya están en el orden final;
+    # insertar cada fila en su índice definitivo, de arriba abajo, mantiene ese invariante.
+    for index, row, is_new in plan.place:
+        if is_new:
+            tag = None
+            if stripes is not None:
+                tag = stripes[row.key] = STRIPE_TAGS[(offset + index) % 2]
+            tree.insert("", index, iid=row.key, values=row.values, tags=_with_stripe(row, tag))
+        else:
+            tree.move(row.key, "", index)
+    for row in plan.update:
+        tag = stripes.get(row.key) if stripes is not None else None
+        tree.item(row.key, values=row.values, tags=_with_stripe(row, tag))
+
+
+def restripe(tree, rows: Sequence[TreeRow], stripes: Dict[str, str], window: range, offset: int = 0) -> int:
+    """Corrige la etiqueta alterna de las filas `rows[window]`; devuelve las llamadas a Tk."""
+    calls = 0
+    for position in window:
+        row = rows[position]
+        tag = STRIPE_TAGS[(offset + position) % 2]
+        if stripes.get(row.key) != tag:
+            tree.item(row.key, tags=_with_stripe(row, tag))
+            stripes[row.key] = tag
+            calls += 1
+    return calls
+
+
+class CountingTree:
+    """Treeview simulado que cuenta las llamadas; sirve para medir sin pantalla."""
+
+    def __init__(self) -> None:
+        self.children: List[str] = []
+        self.items: Dict[str, Dict] = {}
+        self.calls = 0
+
+    def get_children(self, _parent: str = "") -> Tuple[str, ...]:
+        return tuple(self.children)
+
+    def delete(self, *keys: str) -> None:
+        self.calls += 1
+        removed = set(keys)
+        self.children = [key for key in self.children if key not in removed]
+        for key in keys:
+            self.items.pop(key, None)
+
+    def detach(self, *keys: str) -> None:
+        self.calls += 1
+        detached = set(keys)
+        self.children = [key for key in self.children if key not in detached]
+
+    def insert(self, _parent: str, index, iid: str, values=(), tags=()) -> str:
+        self.calls += 1
+        position = len(self.children) if index == "end" else index
+        self.children.insert(position, iid)
+        self.items[iid] = {"values": tuple(values), "tags": tuple(tags)}
+        return iid
+
+    def move(self, key: str, _parent: str, index: int) -> None:
+        self.calls += 1
+        if key in self.children:
+            self.children.remove(key)
+        self.children.insert(index, key)
+
+    def item(self, key: str, **options) -> None:
+        self.calls += 1
+        self.items[key].update({name: tuple(value) for name, value in options.items()})
+
+
+def synthetic_rows(count: int, seed: int = 0) -> List[TreeRow]:
+    rng = random.Random(seed)
+    rows = []
+    for disk in range(count // 4 + 1):
+        for part in range(1, 5):
+            if len(rows) == count:
+                break
+            name = f"sd{disk}p{part}"
+            uuid = f"{rng.getrandbits(64):016x}"
+            rows.append(TreeRow(f"{name}|{uuid}", (name, f"{rng.randint(1, 999)}G", "part", "ext4", "")))
+    return rows
+
+
+def _tk_tree_factory():
+    """Devuelve una función que crea Treeviews reales, o None si no hay pantalla."""
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+
+        root = tk.Tk()
+    except Exception as exc:  # noqa: BLE001 - sin DISPLAY se usa la tabla simulada
+        print(f"No se pudo abrir Tk ({exc}); se usa una tabla simulada.")
+        return None
+    root.withdraw()
+
+    def create():
+        tree = ttk.Treeview(root, columns=("name", "size", "type", "fstype", "mountpoint"), show="headings")
+        tree.calls = 0
+        return tree
+
+    return create
+
+
+def _benchmark(count: int, repeat: int, use_tk: bool) -> None:
+    create_tree = (_tk_tree_factory() if use_tk else None) or CountingTree
+    base = synthetic_rows(count)
+    middle = count // 2
+    mounted = list(base)
+    mounted[middle] = TreeRow(base[middle].key, base[middle].values[:4] + ("/mnt/x",))
+    scenarios: List[Tuple[str, List[TreeRow]]] = [
+        ("sin cambios", list(base)),
+        ("un dispositivo montado", mounted),
+        ("un dispositivo conectado", base[:middle] + synthetic_rows(1, seed=99) + base[middle:]),
+        ("un dispositivo retirado", base[:middle] + base[middle + 1:]),
+        ("50 filas reordenadas", base[50:] + base[:50]),
+        ("cambio completo", synthetic_rows(count, seed=7)),
+    ]
+
+    visible = range(max(0, middle - VISIBLE_ROWS // 2), middle + VISIBLE_ROWS // 2)
+
+    print(f"{count} particiones, {repeat} repeticiones ({create_tree.__name__}), {len(visible)} filas visibles")
+    print(f"{'escenario':<28}{'reconstruir':>24}{'diferencias':>24}")
+    for label, target in scenarios:
+        timings = {"rebuild": 0.0, "diff": 0.0}
+        calls = {}
+        for _ in range(repeat):
+            for mode in timings:
+                tree = create_tree()
+                stripes: Dict[str, str] = {}
+                apply_plan(tree, plan_tree([], base), stripes)
+                started = time.perf_counter()
+                if mode == "rebuild":
+                    plan = plan_tree([], target)
+                    tree.delete(*tree.get_children())
+                    stripes.clear()
+                    calls[mode] = plan.calls + 1
+                    apply_plan(tree, plan, stripes)
+                else:
+                    plan = plan_tree(base, target)
+                    apply_plan(tree, plan, stripes)
+                    calls[mode] = plan.calls + restripe(tree, target, stripes, visible)
+                timings[mode] += time.perf_counter() - started
+                assert tuple(tree.get_children()) == tuple(row.key for row in target)
+                if hasattr(tree, "destroy"):
+                    tree.destroy()
+        print(
+            f"{label:<28}{calls['rebuild']:>8} llamadas {timings['rebuild'] / repeat * 1000:7.1f} ms"
+            f"{calls['diff']:>8} llamadas {timings['diff'] / repeat * 1000:7.1f} ms"
+        )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compara la reconstrucción completa con la actualización incremental.")
+    parser.add_argument("--particiones", type=int, default=5000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--tk", action="store_true", help="mide sobre un ttk.Treeview real (requiere pantalla)")
+    options = parser.parse_args(argv)
+    _benchmark(options.particiones, options.repeticiones, options.tk)
+
+
+__all__ = [
+    "CountingTree",
+    "TreePlan",
+    "TreeRow",
+    "apply_plan",
+    "device_key",
+    "plan_tree",
+    "restripe",
+    "synthetic_rows",
+]
+
+
+if __name__ == "__main__":
+    main()
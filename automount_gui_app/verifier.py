@@ -0,0 +1,362 @@
+"""
+Verificación de fstab dentro del proceso, al estilo de `findmnt --verify`.
+
+Se ejecuta sobre el texto que se va a escribir, antes del commit, en una
+sola pasada: cantidad de campos, escapes octales, puntos de montaje
+duplicados, orígenes que no corresponden a ningún dispositivo, soporte del
+tipo de sistema de archivos, opciones válidas para cada tipo y orden de los
+montajes anidados.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+
+from .constants import NETWORK_FILESYSTEMS, PSEUDO_FILESYSTEMS
+from .devices import DeviceSnapshot, SourceIndex
+from .fstab import normalize_mountpoint, split_source
+from .mounttable import unescape_mount_field
+
+SEVERITY_ERROR = "error"
+SEVERITY_WARNING = "aviso"
+
+NO_MOUNTPOINT = {"none", "swap"}
+# Valores del campo de tipo que no son sistemas de archivos del kernel.
+NON_KERNEL_TYPES = {"none", "bind", "swap"}
+NO_DEVICE_TYPES = PSEUDO_FILESYSTEMS | NETWORK_FILESYSTEMS | {"none", "bind"}
+NO_FSCK_FILESYSTEMS = PSEUDO_FILESYSTEMS | NETWORK_FILESYSTEMS | NON_KERNEL_TYPES
+FSTYPE_ALIASES = {"ntfs-3g": "fuseblk", "exfat-fuse": "fuseblk"}
+INVALID_ESCAPE = re.compile(r"\\(?![0-7]{3})")
+
+# Opciones que entiende mount(8), el kernel (banderas MS_*) o systemd para cualquier tipo.
+GENERIC_OPTIONS = frozenset({
+    "defaults", "auto", "noauto", "user", "nouser", "users", "owner", "group", "nofail", "_netdev",
+    "ro", "rw", "exec", "noexec", "suid", "nosuid", "dev", "nodev", "sync", "async", "dirsync",
+    "atime", "noatime", "diratime", "nodiratime", "relatime", "norelatime", "strictatime",
+    "nostrictatime", "lazytime", "nolazytime", "mand", "nomand", "silent", "loud", "remount", "bind",
+    "rbind", "iversion", "noiversion", "sw", "pri", "discard",
+    "context", "fscontext", "defcontext", "rootcontext", "x-mount.mkdir",
+})
+FAT_OPTIONS = frozenset({
+    "uid", "gid", "umask", "dmask", "fmask", "allow_utime", "codepage", "iocharset", "tz", "time_offset",
+    "quiet", "showexec", "check", "shortname", "utf8", "flush", "errors", "uni_xlate", "nonumtail",
+    "usefree", "dos1xfloppy", "rodir", "sys_immutable", "posix", "nfs",
+})
+EXT_OPTIONS = frozenset({
+    "acl", "noacl", "user_xattr", "nouser_xattr", "errors", "commit", "data", "barrier", "nobarrier",
+    "journal_checksum", "journal_async_commit", "orlov", "oldalloc", "grpid", "nogrpid", "bsdgroups",
+    "sysvgroups", "resgid", "resuid", "sb", "quota", "noquota", "usrquota", "grpquota", "prjquota",
+    "nodiscard", "stripe", "delalloc", "nodelalloc", "max_batch_time", "min_batch_time", "journal_ioprio",
+    "auto_da_alloc", "noauto_da_alloc", "noinit_itable", "init_itable", "dax", "nombcache", "data_err",
+    "inode_readahead_blks", "nojournal_checksum", "block_validity", "noblock_validity", "dioread_nolock",
+    "dioread_lock", "i_version", "test_dummy_encryption", "abort", "norecovery", "noload", "debug",
+})
+XFS_OPTIONS = frozenset({
+    "allocsize", "attr2", "noattr2", "dax", "filestreams", "ikeep", "noikeep", "inode32", "inode64",
+    "largeio", "nolargeio", "logbufs", "logbsize", "logdev", "noalign", "norecovery", "nouuid", "noquota",
+    "uquota", "usrquota", "quota", "uqnoenforce", "qnoenforce", "gquota", "grpquota", "gqnoenforce",
+    "pquota", "prjquota", "pqnoenforce", "sunit", "swidth", "swalloc", "wsync", "nodiscard", "grpid",
+    "nogrpid", "bsdgroups", "sysvgroups",
+})
+BTRFS_OPTIONS = frozenset({
+    "acl", "noacl", "autodefrag", "noautodefrag", "barrier", "nobarrier", "check_int", "clear_cache",
+    "commit", "compress", "compress-force", "datacow", "nodatacow", "datasum", "nodatasum", "degraded",
+    "device", "discard", "nodiscard", "enospc_debug", "fatal_errors", "flushoncommit", "noflushoncommit",
+    "max_inline", "metadata_ratio", "norecovery", "rescan_uuid_tree", "rescue", "skip_balance", "space_cache",
+    "nospace_cache", "ssd", "ssd_spread", "nossd", "nossd_spread", "subvol", "subvolid", "thread_pool",
+    "treelog", "notreelog", "usebackuproot", "user_subvol_rm_allowed",
+})
+NTFS3_OPTIONS = frozenset({
+    "uid", "gid", "umask", "dmask", "fmask", "iocharset", "nls", "prealloc", "noacsrules", "hidden",
+    "nohidden", "hide_dot_files", "windows_names", "sys_immutable", "discard", "force", "sparse",
+    "showmeta", "acl", "noacl", "case",
+})
+NTFS3G_OPTIONS = frozenset({
+    "uid", "gid", "umask", "dmask", "fmask", "usermapping", "permissions", "acl", "inherit", "locale",
+    "force", "recover", "norecover", "ignore_case", "remove_hiddenfiles", "hide_hid_files",
+    "hide_dot_files", "windows_names", "allow_other", "max_read", "silent", "no_def_opts", "streams_interface",
+    "user_xattr", "efs_raw", "compression", "nocompression", "big_writes", "debug", "no_detach", "delay_mtime",
+    "show_sys_files", "special_files", "posix_nlink", "dmask", "blksize", "default_permissions",
+})
+EXFAT_OPTIONS = frozenset({
+    "uid", "gid", "umask", "dmask", "fmask", "allow_utime", "iocharset", "errors", "discard",
+    "keep_last_dots", "sys_tz", "time_offset", "namecase", "utf8",
+})
+FSTYPE_OPTIONS: Dict[str, FrozenSet[str]] = {
+    "ext2": EXT_OPTIONS,
+    "ext3": EXT_OPTIONS,
+    "ext4": EXT_OPTIONS,
+    "xfs": XFS_OPTIONS,
+    "btrfs": BTRFS_OPTIONS,
+    "vfat": FAT_OPTIONS,
+    "msdos": FAT_OPTIONS,
+    "exfat": EXFAT_OPTIONS,
+    "exfat-fuse": EXFAT_OPTIONS,
+    "ntfs3": NTFS3_OPTIONS,
+    "ntfs": NTFS3G_OPTIONS | NTFS3_OPTIONS,
+    "ntfs-3g": NTFS3G_OPTIONS,
+}
+
+
+@dataclass(frozen=True)
+class VerifyIssue:
+    """Problema encontrado en una línea de fstab (numerada desde 1)."""
+
+    line_no: int
+    severity: str
+    code: str
+    message: str
+    text: str
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        """Identifica el problema sin depender del número de línea."""
+        return self.code, self.text.strip()
+
+    def __str__(self) -> str:
+        return f"línea {self.line_no} [{self.severity}]: {self.message}"
+
+
+class FstabVerifier:
+    """Verifica el texto de un fstab.
+
+    `snapshot` (con `source_index()`) permite comprobar los orígenes y
+    `fs_support` (p. ej. `FilesystemSupport`) el soporte del tipo de sistema
+    de archivos; ambos son opcionales.
+    """
+
+    def __init__(self, snapshot=None, fs_support=None) -> None:
+        self.snapshot = snapshot
+        self.fs_support = fs_support
+
+    def verify(self, text: str) -> List[VerifyIssue]:
+        """Devuelve los problemas del texto ordenados por línea, en una sola pasada."""
+        issues: List[VerifyIssue] = []
+        index = self._source_index()
+        supported = self._supported_types()
+        # En un fstab grande las mismas opciones y tipos se repiten: se verifican una vez.
+        option_cache: Dict[Tuple[str, str], List[Tuple[str, str, str]]] = {}
+        fstype_cache: Dict[str, bool] = {}
+        mountpoints: Dict[str, int] = {}
+        order: List[Tuple[str, int, str]] = []
+
+        for line_no, line in enumerate(text.splitlines(), start=1):
+            stripped = line.strip()
+            if not stripped or stripped[0] == "#":
+                continue
+            fields = stripped.split()
+            count = len(fields)
+            if count < 3 or count > 6:
+                hint = " ¿Hay espacios sin escapar (use \\040)?" if count > 6 else ""
+                found = [(SEVERITY_ERROR, "campos", f"Se esperaban de 3 a 6 campos y hay {count}.{hint}")]
+            elif (count > 4 and not fields[4].isdigit()) or (count > 5 and not fields[5].isdigit()):
+                found = [(SEVERITY_ERROR, "numeros", "Los campos freq y passno deben ser números.")]
+            else:
+                found = []
+                source, target, fstype = fields[0], fields[1], fields[2]
+                options = fields[3] if count > 3 else "defaults"
+                passno = int(fields[5]) if count > 5 else 0
+                for field_text in (source, target):
+                    if "\\" in field_text and INVALID_ESCAPE.search(field_text):
+                        found.append((SEVERITY_ERROR, "escape", f"Secuencia de escape inválida en {field_text}; use \\NNN en octal."))
+                if "\\" in source:
+                    source = unescape_mount_field(source)
+                if "\\" in target:
+                    target = unescape_mount_field(target)
+
+                if target not in NO_MOUNTPOINT and fstype != "swap":
+                    if target[0] != "/":
+                        found.append((SEVERITY_ERROR, "destino", f"El punto de montaje {target} no es una ruta absoluta."))
+                    else:
+                        if "//" in target or "/." in target:
+                            target = os.path.normpath(target)
+                        target = normalize_mountpoint(target)
+                        previous = mountpoints.get(target)
+                        if previous is not None:
+                            found.append((SEVERITY_ERROR, "duplicado", f"{target} ya se monta en la línea {previous}."))
+                        else:
+                            mountpoints[target] = line_no
+                            order.append((target, line_no, line))
+
+                if fstype not in NO_DEVICE_TYPES:
+                    problem = self._check_source(source, index)
+                    if problem:
+                        if "nofail" in options.split(","):
+                            problem += " (tiene nofail)"
+                        found.append((SEVERITY_WARNING, "origen", problem))
+
+                if supported is not None and fstype != "auto":
+                    known = fstype_cache.get(fstype)
+                    if known is None:
+                        known = fstype_cache[fstype] = self._fstype_known(fstype, supported)
+                    if not known:
+                        found.append((SEVERITY_WARNING, "tipo", f"El sistema no tiene soporte para el tipo {fstype}."))
+
+                option_issues = option_cache.get((fstype, options))
+                if option_issues is None:
+                    option_issues = option_cache[(fstype, options)] = self._check_options(fstype, options)
+                found.extend(option_issues)
+
+                if passno > 0 and fstype in NO_FSCK_FILESYSTEMS:
+                    found.append((SEVERITY_WARNING, "fsck", f"passno {passno} no tiene efecto en {fstype}; debería ser 0."))
+            if found:
+                issues.extend(VerifyIssue(line_no, severity, code, message, line) for severity, code, message in found)
+
+        issues.extend(self._check_nesting(order, mountpoints))
+        issues.sort(key=lambda issue: issue.line_no)
+        return issues
+
+    @staticmethod
+    def _check_options(fstype: str, options: str) -> List[Tuple[str, str, str]]:
+        found = []
+        option_list = options.split(",")
+        allowed = FSTYPE_OPTIONS.get(fstype)
+        if allowed is not None:
+            unknown = []
+            for option in option_list:
+                name = option.split("=", 1)[0]
+                if option and name not in GENERIC_OPTIONS and name not in allowed and not option.startswith(("x-", "comment=")):
+                    unknown.append(option)
+            if unknown:
+                found.append((SEVERITY_ERROR, "opciones", f"Opciones no válidas para {fstype}: {', '.join(unknown)}"))
+        if "" in option_list:
+            found.append((SEVERITY_WARNING, "opciones", "Hay opciones vacías (comas repetidas)."))
+        return found
+
+    def _check_nesting(self, order: List[Tuple[str, int, str]], mountpoints: Dict[str, int]) -> List[VerifyIssue]:
+        """Un montaje anidado debe aparecer después del montaje que lo contiene."""
+        issues = []
+        for mountpoint, line_no, line in order:
+            parent = mountpoint.rpartition("/")[0]
+            while parent:
+                parent_line = mountpoints.get(parent)
+                if parent_line is not None:
+                    break
+                parent = parent.rpartition("/")[0]
+            else:
+                parent = "/"
+                parent_line = mountpoints.get(parent) if mountpoint != "/" else None
+            if parent_line is not None and parent_line > line_no:
+                issues.append(VerifyIssue(
+                    line_no,
+                    SEVERITY_ERROR,
+                    "orden",
+                    f"{mountpoint} está dentro de {parent}, que se monta después (línea {parent_line}).",
+                    line,
+                ))
+        return issues
+
+    def _source_index(self) -> Optional[SourceIndex]:
+        return self.snapshot.source_index() if self.snapshot is not None else None
+
+    def _check_source(self, source: str, index: Optional[SourceIndex]) -> Optional[str]:
+        kind, _ = split_source(source)
+        if index is None:
+            if kind == "devnode" and not os.path.exists(source):
+                return f"{source} no existe."
+            return None
+        # El mismo índice que BootAnalyzer: incluye LVM, LUKS, md y dm, no sólo discos y particiones.
+        record, known = index.lookup(source)
+        if record is not None or not known:
+            return None
+        if kind == "devnode":
+            return f"{source} no existe."
+        return f"{source} no corresponde a ningún dispositivo conectado."
+
+    def _supported_types(self) -> Optional[Set[str]]:
+        if self.fs_support is None:
+            return None
+        return set(self.fs_support.kernel_filesystems()) | set(self.fs_support.kernel_modules())
+
+    def _fstype_known(self, fstype: str, supported: Set[str]) -> bool:
+        if fstype in PSEUDO_FILESYSTEMS or fstype in NON_KERNEL_TYPES or fstype in supported:
+            return True
+        if fstype.startswith("fuse.") or fstype in FSTYPE_ALIASES:
+            return "fuse" in supported or self.fs_support.has_helper(fstype)
+        return fstype.replace("-", "_") in supported or self.fs_support.has_helper(fstype)
+
+
+def check_change(verifier: FstabVerifier, before: str, after: str) -> List[VerifyIssue]:
+    """Verifica `after` frente a `before` antes de escribirlo.
+
+    Sólo cuentan los problemas que introduce el cambio: los que ya tenía el
+    fichero no bloquean. Lanza RuntimeError si hay errores nuevos y devuelve
+    los avisos nuevos.
+    """
+    existing = {issue.key for issue in verifier.verify(before)}
+    introduced = [issue for issue in verifier.verify(after) if issue.key not in existing]
+    errors = [issue for issue in introduced if issue.severity == SEVERITY_ERROR]
+    if errors:
+        details = "\n".join(str(issue) for issue in errors)
+        raise RuntimeError(f"La verificación de fstab encontró errores; no se escribirá:\n{details}")
+    return introduced
+
+
+def synthetic_fstab(count: int, seed: int = 0) -> Tuple[str, List[Dict]]:
+    """fstab de `count` líneas y los dispositivos de los que dependen (algunos ausentes)."""
+    rng = random.Random(seed)
+    devices: List[Dict] = []
+    lines = ["# fstab sintético", "UUID=00000000-0000-4000-8000-000000000000 / ext4 defaults 0 1"]
+    for number in range(count - len(lines)):
+        uuid = f"{rng.getrandbits(32):08x}-{number:04x}-4{rng.getrandbits(12):03x}-8000-{number:012x}"
+        if rng.random() < 0.9:
+            devices.append({"name": f"sd{number}", "kname": f"sd{number}", "type": "part", "uuid": uuid})
+        choice = rng.random()
+        if choice < 0.05:
+            lines.append(f"# comentario {number}")
+        elif choice < 0.1:
+            lines.append(f"tmpfs /run/t{number} tmpfs size=1M,mode=1777 0 0")
+        elif choice < 0.15:
+            lines.append(f"servidor:/export/{number} /srv/nfs/{number} nfs4 _netdev,nofail 0 0")
+        else:
+            fstype, options = rng.choice((("ext4", "defaults,noatime,commit=60"), ("vfat", "uid=1000,umask=022"),
+                                          ("xfs", "defaults,logbsize=256k"), ("btrfs", "compress=zstd:1,ssd")))
+            lines.append(f"UUID={uuid} /mnt/datos/{number} {fstype} {options},nofail 0 2")
+    devices.append({"name": "sda1", "kname": "sda1", "type": "part", "uuid": "00000000-0000-4000-8000-000000000000"})
+    return "\n".join(lines) + "\n", devices
+
+
+def _benchmark(count: int, repeat: int) -> None:
+    text, devices = synthetic_fstab(count)
+    snapshot = DeviceSnapshot(loader=lambda: devices)
+    snapshot.refresh()
+    verifier = FstabVerifier(snapshot)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        issues = verifier.verify(text)
+        timings.append(time.perf_counter() - started)
+    print(f"{count} líneas: mejor {min(timings) * 1000:.1f} ms, peor {max(timings) * 1000:.1f} ms "
+          f"({len(issues)} problemas)")
+
+    started = time.perf_counter()
+    check_change(verifier, text, text + "UUID=00000000-0000-4000-8000-000000000000 /mnt/nueva ext4 defaults 0 2\n")
+    print(f"check_change (dos verificaciones): {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Mide la verificación de un fstab sintético.")
+    parser.add_argument("--lineas", type=int, default=10000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    options = parser.parse_args(argv)
+    _benchmark(options.lineas, options.repeticiones)
+
+
+__all__ = [
+    "FstabVerifier",
+    "SEVERITY_ERROR",
+    "SEVERITY_WARNING",
+    "VerifyIssue",
+    "check_change",
+    "synthetic_fstab",
+]
+
+
+if __name__ == "__main__":
+    main()
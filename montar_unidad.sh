@@ -48,11 +48,15 @@ if [ ! -d "$punto_montaje" ]; then
   fi
 fi
 
-# Obtener UUID de la unidad seleccionada
-uuid=$(sudo blkid -s UUID -o value "/dev/$unidad")
-
-# Obtener el tipo de sistema de archivos (FSTYPE) automáticamente
-fstype=$(sudo blkid -s TYPE -o value "/dev/$unidad")
+# Obtener UUID y tipo de sistema de archivos (FSTYPE) con una sola llamada a blkid
+uuid=""
+fstype=""
+while IFS='=' read -r clave valor; do
+  case "$clave" in
+    UUID) uuid="$valor" ;;
+    TYPE) fstype="$valor" ;;
+  esac
+done < <(sudo blkid -o export "/dev/$unidad")
 
 # Verificar si se obtuvo el UUID y el tipo de sistema de archivos
 if [ -n "$uuid" ] && [ -n "$fstype" ]; then
@@ -0,0 +1,248 @@
+"""Ejecutor de comandos y montaje con mount(8), con ejecutables de prueba en un PATH temporal."""
+
+import errno
+import os
+import shutil
+import time
+from concurrent.futures import wait
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from automount_gui_app import system
+from automount_gui_app.errors import CommandTimeoutError, MountBusyError, NTFSUnsupportedError
+from automount_gui_app.executor import (
+    MNT_DETACH,
+    MS_BIND,
+    MS_NODEV,
+    MS_NOATIME,
+    MS_NOEXEC,
+    MS_NOSUID,
+    MS_RDONLY,
+    MS_REC,
+    MS_REMOUNT,
+    MountExecutor,
+    RecordingSyscalls,
+    parse_mount_options,
+)
+from automount_gui_app.fstab import FstabEntry
+from automount_gui_app.system import CommandRunner, run_cmd
+
+ENTRY = FstabEntry("UUID=0a1b2c3d-0000-4000-8000-000000000001", "/mnt/datos", "ext4", "defaults,nofail")
+
+
+class StubPath:
+    """Directorio con ejecutables de prueba que anotan cada invocación en calls.log."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.log = directory / "calls.log"
+
+    def add(self, name: str, body: str = "", exit_code: int = 0) -> None:
+        script = self.directory / name
+        script.write_text(
+            "#!/bin/sh\n"
+            f'echo "{name} $*" >> "{self.log}"\n'
+            f"{body}\n"
+            f"exit {exit_code}\n"
+        )
+        script.chmod(0o755)
+
+    def calls(self) -> List[str]:
+        return [line.rstrip() for line in self.log.read_text().splitlines()] if self.log.exists() else []
+
+
+@pytest.fixture
+def stubs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> StubPath:
+    directory = tmp_path / "bin"
+    tools = tmp_path / "tools"
+    directory.mkdir()
+    tools.mkdir()
+    # Sólo los ejecutables de prueba y lo imprescindible para los scripts: ni mount ni lsblk reales.
+    (tools / "sleep").symlink_to(shutil.which("sleep"))
+    monkeypatch.setenv("PATH", os.pathsep.join([str(directory), str(tools)]))
+    monkeypatch.setattr(system, "_runner", CommandRunner(cache_ttl=30.0, kill_grace=0.2))
+    return StubPath(directory)
+
+
+def test_run_cmd_returns_stdout_and_raises_with_stderr(stubs: StubPath) -> None:
+    stubs.add("saluda", 'echo "  hola  "')
+    stubs.add("falla", 'echo "algo salió mal" >&2', exit_code=3)
+    assert run_cmd(["saluda", "a", "b"]) == "hola"
+    with pytest.raises(RuntimeError, match="algo salió mal"):
+        run_cmd(["falla"])
+    assert run_cmd(["falla"], check=False) == ""
+    assert stubs.calls() == ["saluda a b", "falla", "falla"]
+
+
+def test_missing_executable(stubs: StubPath) -> None:
+    with pytest.raises(RuntimeError, match="No se pudo ejecutar"):
+        run_cmd(["no-existe-este-comando"])
+
+
+def test_timeout_escalates_to_sigkill(stubs: StubPath) -> None:
+    # Ignora SIGTERM: sólo SIGKILL al grupo del proceso lo detiene.
+    stubs.add("colgado", "trap '' TERM\nsleep 30")
+    started = time.monotonic()
+    with pytest.raises(CommandTimeoutError, match="no terminó en 0.3 s"):
+        run_cmd(["colgado"], timeout=0.3)
+    assert time.monotonic() - started < 5
+
+
+def test_read_only_output_is_cached_until_a_mutating_command(stubs: StubPath) -> None:
+    stubs.add("lsblk", "echo sda")
+    stubs.add("mount")
+    runner = system.get_runner()
+    first = runner.run_sync(["lsblk", "-J"])
+    second = runner.run_sync(["lsblk", "-J"])
+    assert (first.cached, second.cached) == (False, True)
+    assert second.stdout == first.stdout
+
+    run_cmd(["mount", "/mnt/datos"])
+    assert runner.run_sync(["lsblk", "-J"]).cached is False
+    assert stubs.calls() == ["lsblk -J", "mount /mnt/datos", "lsblk -J"]
+
+
+def test_identical_concurrent_queries_share_one_process(stubs: StubPath) -> None:
+    stubs.add("blkid", "sleep 0.3; echo TYPE=ext4")
+    runner = system.get_runner()
+    futures = [runner.submit(["blkid", "/dev/sdb1"]) for _ in range(3)]
+    wait(futures)
+    assert {future.result().stdout for future in futures} == {"TYPE=ext4\n"}
+    assert stubs.calls() == ["blkid /dev/sdb1"]
+
+
+def test_concurrency_limit(stubs: StubPath) -> None:
+    stubs.add("lento", "sleep 0.3")
+    runner = CommandRunner(max_concurrent=2)
+    started = time.monotonic()
+    wait([runner.submit(["lento", str(number)]) for number in range(4)])
+    # Cuatro procesos de 0,3 s de dos en dos: al menos dos tandas.
+    assert time.monotonic() - started >= 0.55
+    assert len(stubs.calls()) == 4
+
+
+def test_mount_command_fallback(stubs: StubPath) -> None:
+    stubs.add("mount")
+    executor = MountExecutor(use_syscalls=False)
+    executor.mount(ENTRY)
+    executor.mount(ENTRY, in_fstab=False)
+    assert stubs.calls() == [
+        "mount /mnt/datos",
+        f"mount -t ext4 -o defaults,nofail {ENTRY.source} /mnt/datos",
+    ]
+
+
+def test_mount_command_missing(stubs: StubPath) -> None:
+    with pytest.raises(RuntimeError, match="No se encontró el comando mount"):
+        MountExecutor(use_syscalls=False).mount(ENTRY)
+
+
+def test_mount_command_reports_missing_ntfs_driver(stubs: StubPath) -> None:
+    stubs.add("mount", "echo \"mount: /mnt/datos: unknown filesystem type 'ntfs'.\" >&2", exit_code=32)
+    with pytest.raises(NTFSUnsupportedError):
+        MountExecutor(use_syscalls=False).mount(FstabEntry("/dev/sdb1", "/mnt/datos", "ntfs", "defaults"))
+
+
+def test_umount_command_busy_and_lazy(stubs: StubPath) -> None:
+    stubs.add("umount", 'echo "umount: /mnt/datos: target is busy." >&2', exit_code=32)
+    executor = MountExecutor(use_syscalls=False)
+    with pytest.raises(MountBusyError):
+        executor.unmount("/mnt/datos")
+    stubs.add("umount")
+    executor.unmount("/mnt/datos", lazy=True)
+    assert stubs.calls()[-1] == "umount -l /mnt/datos"
+
+
+def test_syscalls_fall_back_to_mount_command(stubs: StubPath, tmp_path: Path) -> None:
+    stubs.add("mount")
+    syscalls = RecordingSyscalls(errors={"/mnt/sin-syscall": errno.ENOSYS})
+    helpers = tmp_path / "sbin"
+    helpers.mkdir()
+    (helpers / "mount.fakefs").touch()
+    executor = MountExecutor(syscalls=syscalls, helper_dirs=(str(helpers),))
+
+    executor.mount(FstabEntry("/dev/sdb1", "/mnt/sin-syscall", "ext4", "defaults"))
+    executor.mount(FstabEntry("/dev/sdb2", "/mnt/ayudante", "fakefs", "defaults"))
+    executor.mount(FstabEntry("/dev/sdb3", "/mnt/directo", "ext4", "noatime"))
+
+    assert stubs.calls() == ["mount /mnt/sin-syscall", "mount /mnt/ayudante"]
+    assert [call[2] for call in syscalls.calls] == ["/mnt/sin-syscall", "/mnt/directo"]
+
+
+def test_syscall_mount_and_umount_invalidate_cache(stubs: StubPath) -> None:
+    stubs.add("findmnt", "echo /mnt/datos")
+    runner = system.get_runner()
+    executor = MountExecutor(syscalls=RecordingSyscalls())
+    runner.run_sync(["findmnt"])
+    executor.mount(FstabEntry("/dev/sdb1", "/mnt/datos", "ext4", "defaults"))
+    assert runner.run_sync(["findmnt"]).cached is False
+    assert runner.run_sync(["findmnt"]).cached is True
+    executor.unmount("/mnt/datos")
+    assert runner.run_sync(["findmnt"]).cached is False
+
+
+@pytest.mark.parametrize(
+    "options,flags,data",
+    [
+        ("defaults", 0, ""),
+        ("ro,nosuid,nodev,noexec", MS_RDONLY | MS_NOSUID | MS_NODEV | MS_NOEXEC, ""),
+        ("remount,ro", MS_REMOUNT | MS_RDONLY, ""),
+        ("bind", MS_BIND, ""),
+        ("rbind,ro", MS_BIND | MS_REC | MS_RDONLY, ""),
+        ("ro,rw", 0, ""),
+        ("user,exec", MS_NOSUID | MS_NODEV, ""),
+        ("noatime,commit=60,errors=remount-ro,nofail,x-systemd.automount", MS_NOATIME, "commit=60,errors=remount-ro"),
+        ("uid=1000,,umask=022,noauto,_netdev,comment=x", 0, "uid=1000,umask=022"),
+    ],
+)
+def test_parse_mount_options_splits_flags_from_data(options: str, flags: int, data: str) -> None:
+    assert parse_mount_options(options) == (flags, data)
+
+
+def test_syscall_mount_passes_flags_and_data() -> None:
+    syscalls = RecordingSyscalls()
+    MountExecutor(syscalls=syscalls).mount(FstabEntry("/dev/sdb1", "/mnt/datos", "ext4", "ro,nodev,commit=60,nofail"))
+    assert syscalls.calls == [("mount", "/dev/sdb1", "/mnt/datos", "ext4", MS_RDONLY | MS_NODEV, "commit=60")]
+
+
+@pytest.mark.parametrize(
+    "fstype,err,error_class,message",
+    [
+        ("ntfs", errno.ENODEV, NTFSUnsupportedError, "unknown filesystem type 'ntfs'"),
+        ("ntfs3", errno.ENODEV, NTFSUnsupportedError, "unknown filesystem type 'ntfs3'"),
+        ("ext4", errno.ENODEV, RuntimeError, "unknown filesystem type 'ext4'"),
+        ("ext4", errno.EPERM, RuntimeError, "must be superuser to use mount"),
+        ("ext4", errno.EINVAL, RuntimeError, "wrong fs type, bad option, bad superblock on /dev/sdb1"),
+        ("ext4", errno.EBUSY, RuntimeError, "target is busy"),
+    ],
+)
+def test_syscall_mount_errors_map_like_mount_command(fstype: str, err: int, error_class: type, message: str) -> None:
+    executor = MountExecutor(syscalls=RecordingSyscalls(errors={"/mnt/datos": err}))
+    with pytest.raises(error_class) as caught:
+        executor.mount(FstabEntry("/dev/sdb1", "/mnt/datos", fstype, "defaults"))
+    assert str(caught.value).startswith(f"mount: /mnt/datos: {message}")
+    if error_class is RuntimeError:
+        assert not isinstance(caught.value, NTFSUnsupportedError)
+
+
+def test_syscall_umount_lazy_busy_and_not_mounted() -> None:
+    syscalls = RecordingSyscalls(errors={"/mnt/ocupado": errno.EBUSY, "/mnt/libre": errno.EINVAL})
+    executor = MountExecutor(syscalls=syscalls)
+    executor.unmount("/mnt/datos", lazy=True)
+    executor.unmount("/mnt/datos")
+    with pytest.raises(MountBusyError, match="umount: /mnt/ocupado: target is busy"):
+        executor.unmount("/mnt/ocupado")
+    with pytest.raises(RuntimeError, match="umount: /mnt/libre: not mounted") as caught:
+        executor.unmount("/mnt/libre")
+    assert not isinstance(caught.value, MountBusyError)
+    assert syscalls.calls[:2] == [("umount2", "/mnt/datos", MNT_DETACH), ("umount2", "/mnt/datos", 0)]
+
+
+def test_syscall_umount_falls_back_to_umount_command(stubs: StubPath) -> None:
+    stubs.add("umount")
+    syscalls = RecordingSyscalls(errors={"/mnt/datos": errno.ENOSYS})
+    MountExecutor(syscalls=syscalls).unmount("/mnt/datos", lazy=True)
+    assert syscalls.calls == [("umount2", "/mnt/datos", MNT_DETACH)]
+    assert stubs.calls() == ["umount -l /mnt/datos"]
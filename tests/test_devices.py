@@ -0,0 +1,143 @@
+"""Enumeración por sysfs frente a la salida de lsblk sobre un árbol falso."""
+
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+import pytest
+
+from automount_gui_app.devices import SysfsBlockEnumerator, flatten_lsblk, human_size
+
+ROOT_UUID = "11111111-2222-4333-8444-555555555555"
+HOME_UUID = "99999999-0000-4000-8000-000000000000"
+SCSI_PATH = "pci0000:00/0000:00:17.0/ata1/host0/target0:0:0/0:0:0:0"
+
+# `lsblk -J -o NAME,KNAME,MAJ:MIN,SIZE,TYPE,FSTYPE,MOUNTPOINT,UUID,PARTUUID,LABEL` sobre
+# el mismo sistema: un disco con raíz, swap y un PV de LVM, una imagen loop montada y
+# un lector óptico vacío. ram0 y el loop0 sin archivo asociado no aparecen.
+LSBLK_JSON = """
+{"blockdevices": [
+  {"name": "loop1", "kname": "loop1", "maj:min": "7:1", "size": "64M", "type": "loop", "fstype": "squashfs",
+   "mountpoint": "/snap/core/1", "uuid": null, "partuuid": null, "label": null},
+  {"name": "sda", "kname": "sda", "maj:min": "8:0", "size": "465.8G", "type": "disk", "fstype": null,
+   "mountpoint": null, "uuid": null, "partuuid": null, "label": null,
+   "children": [
+     {"name": "sda1", "kname": "sda1", "maj:min": "8:1", "size": "512M", "type": "part", "fstype": "ext4",
+      "mountpoint": "/", "uuid": "11111111-2222-4333-8444-555555555555", "partuuid": "0a1b2c3d-01", "label": "raiz"},
+     {"name": "sda2", "kname": "sda2", "maj:min": "8:2", "size": "2G", "type": "part", "fstype": "swap",
+      "mountpoint": "[SWAP]", "uuid": "aaaaaaaa-bbbb-4ccc-8ddd-eeeeeeeeeeee", "partuuid": "0a1b2c3d-02", "label": null},
+     {"name": "sda10", "kname": "sda10", "maj:min": "8:10", "size": "463.3G", "type": "part", "fstype": "LVM2_member",
+      "mountpoint": null, "uuid": "pv-uuid", "partuuid": "0a1b2c3d-0a", "label": null,
+      "children": [
+        {"name": "vg-home", "kname": "dm-0", "maj:min": "253:0", "size": "463.3G", "type": "lvm", "fstype": "ext4",
+         "mountpoint": "/home", "uuid": "99999999-0000-4000-8000-000000000000", "partuuid": null, "label": "casa"}
+      ]}
+   ]},
+  {"name": "sr0", "kname": "sr0", "maj:min": "11:0", "size": "1G", "type": "rom", "fstype": null,
+   "mountpoint": null, "uuid": null, "partuuid": null, "label": null}
+]}
+"""
+
+
+class FakeSysfs:
+    """Árbol /sys mínimo con los archivos que lee el enumerador y la base de datos de udev."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.sysfs = root / "sys"
+        self.udev = root / "udev"
+        for directory in (self.sysfs / "block", self.sysfs / "class" / "block", self.udev):
+            directory.mkdir(parents=True)
+
+    def add(
+        self, sys_dir: Path, dev: str, sectors: int, udev: Optional[Dict[str, str]] = None, top_level: bool = False
+    ) -> Path:
+        sys_dir.mkdir(parents=True)
+        (sys_dir / "dev").write_text(f"{dev}\n")
+        (sys_dir / "size").write_text(f"{sectors}\n")
+        (sys_dir / "holders").mkdir()
+        (sys_dir / "slaves").mkdir()
+        (self.sysfs / "class" / "block" / sys_dir.name).symlink_to(sys_dir)
+        if top_level:
+            (self.sysfs / "block" / sys_dir.name).symlink_to(sys_dir)
+        if udev:
+            (self.udev / f"b{dev}").write_text("S:disk/by-id/x\n" + "".join(f"E:{key}={value}\n" for key, value in udev.items()))
+        return sys_dir
+
+    def partition(self, disk: Path, name: str, dev: str, sectors: int, udev: Dict[str, str]) -> Path:
+        part = self.add(disk / name, dev, sectors, udev)
+        (part / "partition").write_text(f"{name[len(disk.name):]}\n")
+        return part
+
+    def stack(self, lower: Path, upper: Path) -> None:
+        (lower / "holders" / upper.name).symlink_to(upper)
+        (upper / "slaves" / lower.name).symlink_to(lower)
+
+
+@pytest.fixture
+def enumerator(tmp_path: Path) -> SysfsBlockEnumerator:
+    fake = FakeSysfs(tmp_path)
+    devices = fake.sysfs / "devices"
+    sda = fake.add(devices / SCSI_PATH / "block" / "sda", "8:0", 976773168, top_level=True)
+    fake.partition(sda, "sda1", "8:1", 1048576, {
+        "ID_FS_TYPE": "ext4", "ID_FS_UUID": ROOT_UUID, "ID_PART_ENTRY_UUID": "0a1b2c3d-01", "ID_FS_LABEL": "raiz",
+    })
+    fake.partition(sda, "sda2", "8:2", 4194304, {
+        "ID_FS_TYPE": "swap", "ID_FS_UUID": "aaaaaaaa-bbbb-4ccc-8ddd-eeeeeeeeeeee", "ID_PART_ENTRY_UUID": "0a1b2c3d-02",
+    })
+    pv = fake.partition(sda, "sda10", "8:10", 971530240, {
+        "ID_FS_TYPE": "LVM2_member", "ID_FS_UUID": "pv-uuid", "ID_PART_ENTRY_UUID": "0a1b2c3d-0a",
+    })
+    lv = fake.add(devices / "virtual" / "block" / "dm-0", "253:0", 971530240,
+                  {"ID_FS_TYPE": "ext4", "ID_FS_UUID": HOME_UUID, "ID_FS_LABEL": "casa"}, top_level=True)
+    (lv / "dm").mkdir()
+    (lv / "dm" / "name").write_text("vg-home\n")
+    (lv / "dm" / "uuid").write_text("LVM-abcdefabcdef\n")
+    fake.stack(pv, lv)
+
+    unused_loop = fake.add(devices / "virtual" / "block" / "loop0", "7:0", 0, top_level=True)
+    snap = fake.add(devices / "virtual" / "block" / "loop1", "7:1", 131072, {"ID_FS_TYPE": "squashfs"}, top_level=True)
+    (snap / "loop").mkdir()
+    (snap / "loop" / "backing_file").write_text("/var/lib/snapd/snaps/core_1.snap\n")
+    assert not (unused_loop / "loop").exists()
+    fake.add(devices / "virtual" / "block" / "ram0", "1:0", 131072, top_level=True)
+    sr0 = fake.add(devices / "pci0000:00" / "ata2" / "block" / "sr0", "11:0", 2097152, top_level=True)
+    (sr0 / "device").mkdir()
+    (sr0 / "device" / "type").write_text("5\n")
+
+    (tmp_path / "mountinfo").write_text(
+        "22 1 8:1 / / rw,relatime shared:1 - ext4 /dev/sda1 rw\n"
+        "30 22 253:0 / /home rw,relatime shared:2 - ext4 /dev/mapper/vg-home rw\n"
+        "31 22 7:1 / /snap/core/1 ro shared:3 - squashfs /dev/loop1 ro\n"
+        "32 22 8:1 /srv /srv rw shared:1 - ext4 /dev/sda1 rw\n"
+    )
+    (tmp_path / "swaps").write_text(
+        "Filename\t\t\t\tType\t\tSize\t\tUsed\t\tPriority\n"
+        "/dev/sda2                               partition\t2097148\t\t0\t\t-2\n"
+    )
+    return SysfsBlockEnumerator(fake.sysfs, fake.udev, tmp_path / "mountinfo", tmp_path / "swaps")
+
+
+def test_load_matches_lsblk_tree(enumerator: SysfsBlockEnumerator) -> None:
+    expected = json.loads(LSBLK_JSON)["blockdevices"]
+    assert enumerator.load() == expected
+    assert list(flatten_lsblk(enumerator.load())) == list(flatten_lsblk(expected))
+    assert list(flatten_lsblk(enumerator.load(), types=None)) == list(flatten_lsblk(expected, types=None))
+
+
+def test_describe_and_dm_names(enumerator: SysfsBlockEnumerator) -> None:
+    records = enumerator.describe(["sda10", "dm-0", "ram0", "sdz"])
+    assert "children" not in records["sda10"]
+    assert records["dm-0"]["name"] == "vg-home" and records["dm-0"]["mountpoint"] == "/home"
+    assert records["ram0"] is None and records["sdz"] is None
+    assert enumerator.dm_names() == {"dm-0": "vg-home"}
+    assert enumerator.device_exists("vg-home") and enumerator.device_exists("sda1")
+    assert not enumerator.device_exists("sdb")
+
+
+@pytest.mark.parametrize(
+    "num_bytes,text",
+    [(0, "0B"), (1023, "1023B"), (1024, "1K"), (1536, "1.5K"), (536870912, "512M"), (500107862016, "465.8G"), (1 << 40, "1T")],
+)
+def test_human_size_matches_lsblk(num_bytes: int, text: str) -> None:
+    assert human_size(num_bytes) == text
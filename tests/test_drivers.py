@@ -0,0 +1,118 @@
+"""Detección de controladores NTFS/exFAT sobre árboles /proc y /lib/modules falsos."""
+
+from pathlib import Path
+from typing import Iterable
+
+import pytest
+
+from automount_gui_app.drivers import FUSE_DRIVER, KERNEL_DRIVER, DriverChoice, FilesystemSupport
+from automount_gui_app.errors import NTFSUnsupportedError
+from automount_gui_app.mounting import mount_options
+
+RELEASE = "6.8.0-prueba"
+PROC_FILESYSTEMS = "nodev\tsysfs\nnodev\ttmpfs\n\text4\n\tvfat\nnodev\tfuse\n"
+
+
+def fake_support(
+    root: Path,
+    proc: str = PROC_FILESYSTEMS,
+    dep: Iterable[str] = (),
+    builtin: Iterable[str] = (),
+    tree: Iterable[str] = (),
+    helpers: Iterable[str] = (),
+) -> FilesystemSupport:
+    (root / "proc").mkdir()
+    (root / "proc" / "filesystems").write_text(proc)
+    modules_dir = root / "lib" / "modules" / RELEASE
+    modules_dir.mkdir(parents=True)
+    if dep:
+        (modules_dir / "modules.dep").write_text("".join(f"{line}\n" for line in dep))
+    if builtin:
+        (modules_dir / "modules.builtin").write_text("".join(f"{line}\n" for line in builtin))
+    for relative in tree:
+        (modules_dir / relative).parent.mkdir(parents=True, exist_ok=True)
+        (modules_dir / relative).touch()
+    sbin = root / "sbin"
+    sbin.mkdir()
+    for helper in helpers:
+        (sbin / f"mount.{helper}").touch()
+    return FilesystemSupport(root / "proc" / "filesystems", root / "lib" / "modules", RELEASE, (str(sbin),))
+
+
+def test_proc_filesystems(tmp_path: Path) -> None:
+    support = fake_support(tmp_path)
+    assert support.kernel_filesystems() == {"sysfs", "tmpfs", "ext4", "vfat", "fuse"}
+
+
+def test_missing_proc_and_modules(tmp_path: Path) -> None:
+    support = FilesystemSupport(tmp_path / "no-proc", tmp_path / "no-modules", RELEASE, (str(tmp_path),))
+    assert support.kernel_filesystems() == set()
+    assert support.kernel_modules() == set()
+    with pytest.raises(NTFSUnsupportedError):
+        support.select("ntfs")
+
+
+def test_modules_from_indexes(tmp_path: Path) -> None:
+    support = fake_support(
+        tmp_path,
+        dep=[
+            "kernel/fs/ntfs3/ntfs3.ko.zst:",
+            "kernel/fs/fuse/fuse.ko.xz:",
+            "kernel/drivers/usb/storage/usb-storage.ko: kernel/drivers/scsi/scsi_mod.ko",
+        ],
+        builtin=["kernel/fs/exfat/exfat.ko"],
+    )
+    assert support.kernel_modules() >= {"ntfs3", "fuse", "usb_storage", "exfat"}
+    assert support.has_kernel_driver("usb-storage")
+
+
+def test_modules_tree_without_indexes(tmp_path: Path) -> None:
+    support = fake_support(tmp_path, tree=["kernel/fs/ntfs3/ntfs3.ko.gz", "kernel/fs/exfat/exfat.ko", "kernel/fs/README"])
+    assert support.kernel_modules() == {"ntfs3", "exfat"}
+
+
+@pytest.mark.parametrize(
+    "setup,expected",
+    [
+        ({"proc": PROC_FILESYSTEMS + "\tntfs3\n"}, DriverChoice("ntfs3", KERNEL_DRIVER, "controlador ntfs3 del kernel")),
+        ({"dep": ["kernel/fs/ntfs3/ntfs3.ko.zst:"], "helpers": ["ntfs-3g"]}, DriverChoice("ntfs3", KERNEL_DRIVER, "controlador ntfs3 del kernel")),
+        ({"helpers": ["ntfs-3g", "ntfs"]}, DriverChoice("ntfs-3g", FUSE_DRIVER, "ntfs-3g (FUSE)")),
+        ({"helpers": ["ntfs"]}, DriverChoice("ntfs", FUSE_DRIVER, "ntfs-3g (FUSE)")),
+    ],
+)
+def test_select_ntfs_prefers_kernel(tmp_path: Path, setup: dict, expected: DriverChoice) -> None:
+    assert fake_support(tmp_path, **setup).select("ntfs") == expected
+
+
+def test_select_ntfs_without_any_driver(tmp_path: Path) -> None:
+    # El antiguo controlador "ntfs" de sólo lectura no cuenta como soporte.
+    support = fake_support(tmp_path, proc=PROC_FILESYSTEMS + "\tntfs\n")
+    with pytest.raises(NTFSUnsupportedError, match="ntfs-3g no está instalado"):
+        support.select("ntfs")
+
+
+@pytest.mark.parametrize(
+    "setup,expected",
+    [
+        ({"builtin": ["kernel/fs/exfat/exfat.ko"]}, DriverChoice("exfat", KERNEL_DRIVER, "controlador exfat del kernel")),
+        ({"helpers": ["exfat-fuse", "exfat"]}, DriverChoice("exfat-fuse", FUSE_DRIVER, "exfat-fuse (FUSE)")),
+        ({"helpers": ["exfat"]}, DriverChoice("exfat", FUSE_DRIVER, "exfat-fuse (FUSE)")),
+    ],
+)
+def test_select_exfat(tmp_path: Path, setup: dict, expected: DriverChoice) -> None:
+    assert fake_support(tmp_path, **setup).select("exfat") == expected
+
+
+def test_select_exfat_without_any_driver(tmp_path: Path) -> None:
+    with pytest.raises(RuntimeError, match="No hay soporte exFAT"):
+        fake_support(tmp_path).select("exfat")
+
+
+def test_other_filesystems_pass_through(tmp_path: Path) -> None:
+    assert fake_support(tmp_path).select("ext4") == DriverChoice("ext4", KERNEL_DRIVER, "ext4")
+
+
+def test_ntfs3_options() -> None:
+    options, posix = mount_options("ntfs3", 1000, 1000, "022")
+    assert options.split(",")[-5:] == ["uid=1000", "gid=1000", "umask=022", "iocharset=utf8", "prealloc"]
+    assert posix is False
@@ -0,0 +1,118 @@
+"""Modelo de fstab: ida y vuelta sin pérdidas, modificaciones e índice de orígenes."""
+
+from pathlib import Path
+
+import pytest
+
+from automount_gui_app.devices import DeviceSnapshot
+from automount_gui_app.fstab import FstabDocument, FstabEntry
+
+ORIGINAL = (
+    "# /etc/fstab: static file system information.\n"
+    "#\n"
+    "UUID=11111111-2222-4333-8444-555555555555 /               ext4    errors=remount-ro 0       1\n"
+    "\n"
+    "\tLABEL=EFI\t/boot/efi  vfat umask=0077   0 2   \n"
+    "/dev/sdb1 /mnt/Mis\\040Datos ntfs3 uid=1000,nofail 0 0\n"
+    "/dev/sdc1 /mnt/raro ext4 defaults 0 2 campo-de-mas\n"
+    "   # comentario sangrado con \\040 y acentos: canción\n"
+    "tmpfs /tmp tmpfs defaults"
+)
+DEVICES = [
+    {"name": "sda", "kname": "sda", "type": "disk", "children": [
+        {"name": "sda1", "kname": "sda1", "type": "part", "uuid": "11111111-2222-4333-8444-555555555555",
+         "partuuid": "0a1b2c3d-01", "label": "raiz"},
+        {"name": "sda2", "kname": "sda2", "type": "part", "uuid": "AAAA-BBBB", "label": "EFI"},
+    ]},
+]
+
+
+@pytest.fixture
+def snapshot(tmp_path: Path) -> DeviceSnapshot:
+    return DeviceSnapshot(loader=lambda: DEVICES, partitions_path=tmp_path / "partitions")
+
+
+def test_untouched_document_round_trips_byte_for_byte() -> None:
+    document = FstabDocument(ORIGINAL)
+    assert document.serialize() == ORIGINAL
+    entries = list(document.entries())
+    # La línea de siete campos no es una entrada, pero se conserva igual.
+    assert [entry.mountpoint for entry in entries] == ["/", "/boot/efi", "/mnt/Mis Datos", "/tmp"]
+    assert entries[3].options == "defaults" and entries[3].passno == 0
+
+
+def test_save_and_load_preserve_bytes(tmp_path: Path) -> None:
+    path = tmp_path / "fstab"
+    path.write_text(ORIGINAL, encoding="utf-8")
+    document = FstabDocument.load(path)
+    document.save()
+    assert path.read_text(encoding="utf-8") == ORIGINAL
+
+
+def test_add_remove_and_modify_only_touch_their_lines() -> None:
+    document = FstabDocument(ORIGINAL)
+    efi, = document.find_mountpoint("/boot/efi/")
+    datos, = document.find_mountpoint("/mnt/Mis Datos")
+
+    document.modify(efi, options="umask=0022,nofail")
+    document.remove(datos)
+    added = document.add(FstabEntry("LABEL=Copias", "/mnt/Copias de seguridad", "exfat", "nofail", 0, 0))
+
+    lines = ORIGINAL.splitlines(keepends=True)
+    expected = lines[:4] + ["LABEL=EFI /boot/efi vfat umask=0022,nofail 0 2\n"] + lines[6:-1]
+    expected += ["tmpfs /tmp tmpfs defaults\n", "LABEL=Copias /mnt/Copias\\040de\\040seguridad exfat nofail 0 0\n"]
+    assert document.serialize() == "".join(expected)
+    assert document.find_mountpoint("/mnt/Mis Datos") == []
+    assert document.find_mountpoint("/mnt/Copias de seguridad") == [added]
+    assert document.find_source("LABEL=EFI") == [efi]
+
+    document.modify(added, source="LABEL=Otra", mountpoint="/mnt/otra")
+    assert document.find_source("LABEL=Copias") == []
+    assert document.find_mountpoint("/mnt/Copias de seguridad") == []
+    assert document.find_source("LABEL=Otra") == [added]
+
+
+def test_entries_from_another_document_are_rejected() -> None:
+    document = FstabDocument(ORIGINAL)
+    stranger = FstabEntry("/dev/sdz1", "/mnt/z", "ext4")
+    with pytest.raises(ValueError):
+        document.remove(stranger)
+    with pytest.raises(AttributeError):
+        document.modify(next(document.entries()), dump=1)
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        "UUID=11111111-2222-4333-8444-555555555555",
+        "UUID=11111111-2222-4333-8444-555555555555".upper(),
+        'UUID="11111111-2222-4333-8444-555555555555"',
+        "PARTUUID=0A1B2C3D-01",
+        "LABEL=raiz",
+        "/dev/sda1",
+        "/dev/disk/by-uuid/11111111-2222-4333-8444-555555555555",
+        "/dev/disk/by-label/raiz",
+    ],
+)
+def test_sources_are_normalized_to_the_same_device(snapshot: DeviceSnapshot, spec: str) -> None:
+    document = FstabDocument(ORIGINAL, snapshot=snapshot)
+    root, = document.find_mountpoint("/")
+    assert document.find_source(spec) == [root]
+
+
+def test_label_lookup_is_case_sensitive(snapshot: DeviceSnapshot) -> None:
+    document = FstabDocument(ORIGINAL, snapshot=snapshot)
+    assert document.find_source("LABEL=efi") == []
+    assert len(document.find_source("LABEL=EFI")) == 1
+
+
+def test_device_mapper_names_and_dm_nodes_match(tmp_path: Path) -> None:
+    dm = tmp_path / "sys" / "class" / "block" / "dm-0" / "dm"
+    dm.mkdir(parents=True)
+    (dm / "name").write_text("vg-home\n")
+    text = "/dev/mapper/vg-home /home ext4 defaults 0 2\n"
+    document = FstabDocument(text, sysfs_root=tmp_path / "sys")
+    home, = document.entries()
+    assert document.find_source("/dev/dm-0") == [home]
+    assert document.find_source("/dev/mapper/vg-home") == [home]
+    assert document.find_source("/dev/mapper/vg-otro") == []
@@ -0,0 +1,224 @@
+"""Protocolo del ayudante de extremo a extremo sobre un socket.socketpair()."""
+
+import json
+import socket
+import threading
+from pathlib import Path
+from typing import Iterator, Tuple
+
+import pytest
+
+from automount_gui_app.devices import DeviceSnapshot
+from automount_gui_app.errors import MountBusyError
+from automount_gui_app.executor import MountExecutor, RecordingSyscalls
+from automount_gui_app.fstab import FstabEntry
+from automount_gui_app.helper import (
+    MAX_MESSAGE,
+    HelperClient,
+    HelperPolicy,
+    HelperServer,
+    MemoryBackend,
+    PeerCredentials,
+    SystemBackend,
+    connect_helper,
+)
+
+ROOT = PeerCredentials(pid=1, uid=0, gid=0)
+# Un uid sin cuenta en el sistema: no pertenece a ningún grupo de administración.
+STRANGER = PeerCredentials(pid=2, uid=61234, gid=61234)
+DEVICES = [{"name": "sdb1", "fstype": "ext4", "uuid": "0a1b2c3d-0000-4000-8000-000000000001", "label": "DATOS"}]
+ENTRY = FstabEntry("UUID=0a1b2c3d-0000-4000-8000-000000000001", "/mnt/datos", "ext4", "defaults,nofail")
+
+
+def serve(backend, peer: PeerCredentials) -> Tuple[socket.socket, threading.Thread]:
+    server_sock, client_sock = socket.socketpair()
+    client_sock.settimeout(5)
+    server = HelperServer(backend, HelperPolicy(), log=lambda _message: None)
+    thread = threading.Thread(target=server.serve_connection, args=(server_sock, peer), daemon=True)
+    thread.start()
+    return client_sock, thread
+
+
+@pytest.fixture
+def backend() -> MemoryBackend:
+    return MemoryBackend(DEVICES, "# fstab de prueba\n")
+
+
+@pytest.fixture
+def root_client(backend: MemoryBackend) -> Iterator[HelperClient]:
+    sock, thread = serve(backend, ROOT)
+    with HelperClient(sock) as client:
+        yield client
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def user_client(backend: MemoryBackend) -> Iterator[HelperClient]:
+    sock, thread = serve(backend, STRANGER)
+    with HelperClient(sock) as client:
+        yield client
+    thread.join(timeout=5)
+
+
+def raw_exchange(sock: socket.socket, payload: bytes, replies: int) -> list:
+    sock.sendall(payload)
+    with sock.makefile("rb") as reader:
+        return [json.loads(reader.readline()) for _ in range(replies)]
+
+
+def test_round_trip(root_client: HelperClient, backend: MemoryBackend) -> None:
+    assert root_client.ping()["version"] == 1
+    assert root_client.devices() == DEVICES
+    assert root_client.probe("/dev/sdb1")["label"] == "DATOS"
+
+    assert root_client.fstab_add(ENTRY) == ENTRY.render()
+    assert ENTRY.render() in root_client.fstab()["entries"]
+    root_client.mount(ENTRY)
+    assert [mount["mountpoint"] for mount in root_client.mounts()] == ["/mnt/datos"]
+    root_client.unmount("/mnt/datos")
+    assert root_client.fstab_remove(ENTRY.source, "/mnt/datos/") == 1
+    assert [call[0] for call in backend.calls] == ["mount", "unmount"]
+
+
+def test_server_errors_are_rebuilt_on_client(root_client: HelperClient, backend: MemoryBackend) -> None:
+    root_client.mount(ENTRY)
+    backend._mounts["/mnt/datos"]["busy"] = True
+    with pytest.raises(MountBusyError):
+        root_client.unmount("/mnt/datos")
+    root_client.unmount("/mnt/datos", lazy=True)
+    with pytest.raises(RuntimeError, match="not mounted"):
+        root_client.unmount("/mnt/datos")
+
+
+def test_pipelined_requests_keep_order(backend: MemoryBackend) -> None:
+    sock, thread = serve(backend, ROOT)
+    payload = b"".join(
+        json.dumps({"id": number, "op": "ping"}).encode() + b"\n" for number in range(1, 6)
+    )
+    responses = raw_exchange(sock, payload, 5)
+    assert [response["id"] for response in responses] == [1, 2, 3, 4, 5]
+    assert all(response["ok"] for response in responses)
+    sock.close()
+    thread.join(timeout=5)
+
+
+@pytest.mark.parametrize(
+    "line",
+    [b"esto no es json\n", b"[1, 2, 3]\n", b'{"id": 7, "op": 42}\n', b'{"id": 8, "op": "ping", "args": ["x"]}\n'],
+)
+def test_malformed_requests_get_an_error_and_keep_connection(backend: MemoryBackend, line: bytes) -> None:
+    sock, thread = serve(backend, ROOT)
+    bad, good = raw_exchange(sock, line + b'{"id": 99, "op": "ping"}\n', 2)
+    assert bad["ok"] is False
+    assert good == {"id": 99, "ok": True, "result": good["result"]}
+    sock.close()
+    thread.join(timeout=5)
+
+
+def test_oversized_message_closes_connection(backend: MemoryBackend) -> None:
+    sock, thread = serve(backend, ROOT)
+    sock.sendall(b"x" * (MAX_MESSAGE + 10) + b"\n")
+    with sock.makefile("rb") as reader:
+        response = json.loads(reader.readline())
+        assert reader.readline() == b""
+    assert response["error"]["message"] == "Mensaje demasiado grande."
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    sock.close()
+
+
+@pytest.mark.parametrize("op", ["_lookup", "load_fstab", "document", "__init__", "calls", "shutdown"])
+def test_only_allow_listed_operations_reach_backend(root_client: HelperClient, op: str) -> None:
+    with pytest.raises(PermissionError, match="Operación no permitida"):
+        root_client.call(op)
+
+
+def test_unknown_arguments_are_rejected(root_client: HelperClient) -> None:
+    with pytest.raises(ValueError, match="Argumentos no válidos"):
+        root_client.call("ping", extra=1)
+
+
+def test_queries_are_open_but_writes_need_admin(user_client: HelperClient, backend: MemoryBackend) -> None:
+    assert user_client.devices() == DEVICES
+    with pytest.raises(PermissionError, match="no está autorizado"):
+        user_client.mount(ENTRY)
+    with pytest.raises(PermissionError):
+        user_client.fstab_add(ENTRY)
+    assert backend.calls == []
+    assert ENTRY.render() not in backend.fstab()["entries"]
+
+
+@pytest.mark.parametrize(
+    "mountpoint",
+    ["/", "/etc", "/etc/cron.d", "/mnt/../etc/cron.d", "/proc/sys", "/usr/local/bin", "relativo", "/boot"],
+)
+def test_forbidden_mountpoints(root_client: HelperClient, backend: MemoryBackend, mountpoint: str) -> None:
+    with pytest.raises(PermissionError):
+        root_client.mount(FstabEntry(ENTRY.source, mountpoint, "ext4", "defaults"))
+    assert backend.calls == []
+
+
+@pytest.mark.parametrize("mountpoint", ["/run/media/ana/DATOS", "/var/mnt/datos", "/media/datos"])
+def test_removable_media_trees_are_allowed(root_client: HelperClient, mountpoint: str) -> None:
+    root_client.mount(FstabEntry(ENTRY.source, mountpoint, "ext4", "defaults"))
+
+
+@pytest.mark.parametrize(
+    "entry",
+    [
+        FstabEntry(ENTRY.source, "/mnt/datos", "proc", "defaults"),
+        FstabEntry(ENTRY.source, "/mnt/datos", "fuse.sshfs", "defaults"),
+        FstabEntry("/home/ana/imagen.img", "/mnt/datos", "ext4", "loop"),
+        FstabEntry("servidor:/export", "/mnt/datos", "ext4", "defaults"),
+    ],
+)
+def test_entries_with_arbitrary_types_or_sources_are_rejected(root_client: HelperClient, entry: FstabEntry) -> None:
+    with pytest.raises(PermissionError):
+        root_client.fstab_add(entry)
+
+
+def test_privileged_options_are_reserved_to_root(backend: MemoryBackend) -> None:
+    policy = HelperPolicy(allowed_uids=frozenset({STRANGER.uid}))
+    args = {"source": ENTRY.source, "mountpoint": "/mnt/datos", "fstype": "ext4"}
+    for options in ("suid", "rw,dev", "defaults,suid,nodev"):
+        with pytest.raises(PermissionError, match="reservadas a root"):
+            policy.check("mount", dict(args, options=options), STRANGER)
+        policy.check("mount", dict(args, options=options), ROOT)
+    policy.check("mount", dict(args, options="nosuid,nodev,noexec"), STRANGER)
+
+
+def test_system_backend_probe_refuses_paths_outside_dev(tmp_path: Path) -> None:
+    fstab = tmp_path / "fstab"
+    fstab.write_text("")
+    backend = SystemBackend(
+        snapshot=DeviceSnapshot(loader=lambda: []),
+        fstab_path=fstab,
+        executor=MountExecutor(syscalls=RecordingSyscalls()),
+    )
+    sock, thread = serve(backend, STRANGER)
+    with HelperClient(sock) as client:
+        for path in ("/etc/shadow", "/dev/../etc/shadow", "dev/sda1", str(fstab)):
+            with pytest.raises(ValueError, match="Sólo se pueden sondear"):
+                client.probe(path)
+    thread.join(timeout=5)
+
+
+def test_users_may_only_take_ownership_for_themselves() -> None:
+    policy = HelperPolicy(allowed_uids=frozenset({STRANGER.uid}))
+    args = {"mountpoint": "/mnt/datos", "gid": STRANGER.gid}
+    policy.check("chown_mountpoint", dict(args, uid=STRANGER.uid), STRANGER)
+    with pytest.raises(PermissionError, match="propio usuario"):
+        policy.check("chown_mountpoint", dict(args, uid=0), STRANGER)
+    policy.check("chown_mountpoint", dict(args, uid=STRANGER.uid), ROOT)
+
+
+def test_chown_needs_a_mounted_mountpoint(root_client: HelperClient, backend: MemoryBackend) -> None:
+    with pytest.raises(ValueError):
+        root_client.chown_mountpoint("/mnt/datos", 1000, 1000)
+    root_client.mount(ENTRY)
+    root_client.chown_mountpoint("/mnt/datos", 1000, 1000)
+    assert backend.calls[-1] == ("chown_mountpoint", {"mountpoint": "/mnt/datos", "uid": 1000, "gid": 1000})
+
+
+def test_connect_helper_returns_none_without_socket(tmp_path: Path) -> None:
+    assert connect_helper(tmp_path / "no-existe.sock") is None
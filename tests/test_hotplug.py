@@ -0,0 +1,188 @@
+"""Vigilante de hotplug con una grabación de uevents reproducida sin hardware."""
+
+import struct
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pytest
+
+from automount_gui_app.devices import SysfsBlockEnumerator
+from automount_gui_app.hotplug import (
+    UDEV_MONITOR_MAGIC,
+    DeviceDelta,
+    HotplugWatcher,
+    PartitionsPollSource,
+    ReplayEventSource,
+    coalesce_events,
+    merge_action,
+    parse_uevent,
+)
+
+STICK_UUID = "0a1b2c3d-0000-4000-8000-000000000001"
+USB_PATH = "/devices/pci0000:00/0000:00:14.0/usb2/2-1/2-1:1.0/host6/target6:0:0/6:0:0:0"
+
+
+def kernel_message(action: str, devpath: str, **properties: str) -> bytes:
+    """Mensaje tal como lo envía el kernel por NETLINK_KOBJECT_UEVENT."""
+    fields = {"ACTION": action, "DEVPATH": devpath, **properties}
+    return f"{action}@{devpath}\0".encode() + b"".join(f"{key}={value}\0".encode() for key, value in fields.items())
+
+
+def udev_message(action: str, devpath: str, **properties: str) -> bytes:
+    """Mensaje del grupo de udev: cabecera libudev y propiedades tras ella."""
+    payload = b"".join(f"{key}={value}\0".encode() for key, value in {"ACTION": action, "DEVPATH": devpath, **properties}.items())
+    header_size = 40
+    header = b"libudev\0" + struct.pack("!I", UDEV_MONITOR_MAGIC) + struct.pack("=III", header_size, header_size, len(payload))
+    return header.ljust(header_size, b"\0") + payload
+
+
+# Grabación de `udevadm monitor --kernel --property` al conectar una memoria USB
+# cifrada, abrirla, y después cerrarla y desconectarla. (espera en s, mensaje)
+RECORDING: List[Tuple[float, bytes]] = [
+    (0.0, kernel_message("add", "/devices/pci0000:00/0000:00:14.0/usb2/2-1", SUBSYSTEM="usb", DEVTYPE="usb_device")),
+    (0.01, kernel_message("add", f"{USB_PATH}/block/sdb", SUBSYSTEM="block", DEVNAME="sdb", DEVTYPE="disk", MAJOR="8", MINOR="16")),
+    (0.01, kernel_message("add", f"{USB_PATH}/block/sdb/sdb1", SUBSYSTEM="block", DEVNAME="sdb1", DEVTYPE="partition", MAJOR="8", MINOR="17")),
+    (0.01, kernel_message("change", f"{USB_PATH}/block/sdb", SUBSYSTEM="block", DEVNAME="sdb", DEVTYPE="disk")),
+    (0.01, kernel_message("add", "/devices/virtual/block/loop7", SUBSYSTEM="block", DEVNAME="loop7")),
+    (0.01, kernel_message("remove", "/devices/virtual/block/loop7", SUBSYSTEM="block", DEVNAME="loop7")),
+    # cryptsetup open: el nodo dm-0 aparece y udev anuncia su nombre.
+    (0.3, kernel_message("add", "/devices/virtual/block/dm-0", SUBSYSTEM="block", DEVNAME="dm-0", DEVTYPE="disk", MAJOR="253", MINOR="0")),
+    (0.01, udev_message("change", "/devices/virtual/block/dm-0", SUBSYSTEM="block", DEVNAME="/dev/dm-0", DM_NAME="cripta")),
+    # cryptsetup close y desconexión física.
+    (0.3, kernel_message("remove", "/devices/virtual/block/dm-0", SUBSYSTEM="block", DEVNAME="dm-0")),
+    (0.01, kernel_message("remove", f"{USB_PATH}/block/sdb/sdb1", SUBSYSTEM="block", DEVNAME="sdb1")),
+    (0.01, kernel_message("remove", f"{USB_PATH}/block/sdb", SUBSYSTEM="block", DEVNAME="sdb")),
+    (0.01, kernel_message("remove", "/devices/pci0000:00/0000:00:14.0/usb2/2-1", SUBSYSTEM="usb")),
+]
+
+
+def make_device(root: Path, sys_dir: Path, dev: str, sectors: int, udev: Dict[str, str] = None) -> None:
+    sys_dir.mkdir(parents=True)
+    (sys_dir / "dev").write_text(f"{dev}\n")
+    (sys_dir / "size").write_text(f"{sectors}\n")
+    (root / "sys" / "class" / "block").mkdir(parents=True, exist_ok=True)
+    (root / "sys" / "class" / "block" / sys_dir.name).symlink_to(sys_dir)
+    if udev:
+        (root / "udev").mkdir(exist_ok=True)
+        (root / "udev" / f"b{dev}").write_text("".join(f"E:{key}={value}\n" for key, value in udev.items()))
+
+
+@pytest.fixture
+def enumerator(tmp_path: Path) -> SysfsBlockEnumerator:
+    sysfs = tmp_path / "sys"
+    disk = sysfs / ("devices" + USB_PATH) / "block" / "sdb"
+    make_device(tmp_path, disk, "8:16", 30031872)
+    make_device(tmp_path, disk / "sdb1", "8:17", 30029824, {"ID_FS_TYPE": "crypto_LUKS", "ID_FS_UUID": STICK_UUID})
+    (disk / "sdb1" / "partition").write_text("1\n")
+    mapper = sysfs / "devices" / "virtual" / "block" / "dm-0"
+    make_device(tmp_path, mapper, "253:0", 29996032, {"ID_FS_TYPE": "ext4", "ID_FS_LABEL": "PRIVADO"})
+    (mapper / "dm").mkdir()
+    (mapper / "dm" / "name").write_text("cripta\n")
+    (mapper / "dm" / "uuid").write_text(f"CRYPT-LUKS2-{STICK_UUID.replace('-', '')}-cripta\n")
+    (tmp_path / "mountinfo").write_text("")
+    return SysfsBlockEnumerator(sysfs, tmp_path / "udev", tmp_path / "mountinfo", tmp_path / "swaps")
+
+
+def replay(enumerator: SysfsBlockEnumerator, recording: List[Tuple[float, bytes]]) -> List[List[DeviceDelta]]:
+    batches: List[List[DeviceDelta]] = []
+    source = ReplayEventSource([(delay, parse_uevent(message)) for delay, message in recording])
+    watcher = HotplugWatcher(batches.append, source=source, enumerator=enumerator, debounce=0.1, max_delay=2.0)
+    watcher.run()
+    return batches
+
+
+def summary(batch: List[DeviceDelta]) -> List[Tuple[str, str, str]]:
+    return [(delta.action, delta.kname, delta.name) for delta in batch]
+
+
+def test_replay_usb_stick_session(enumerator: SysfsBlockEnumerator) -> None:
+    batches = replay(enumerator, RECORDING)
+    assert [summary(batch) for batch in batches] == [
+        [("add", "sdb", "sdb"), ("add", "sdb1", "sdb1")],
+        [("add", "dm-0", "cripta")],
+        [("remove", "dm-0", "cripta"), ("remove", "sdb1", "sdb1"), ("remove", "sdb", "sdb")],
+    ]
+    added = {delta.kname: delta.record for delta in batches[0] + batches[1]}
+    assert added["sdb1"]["type"] == "part" and added["sdb1"]["uuid"] == STICK_UUID
+    assert added["dm-0"]["type"] == "crypt" and added["dm-0"]["label"] == "PRIVADO"
+    assert added["sdb"]["type"] == "disk" and "children" not in added["sdb"]
+
+
+def test_burst_longer_than_max_delay_is_split(enumerator: SysfsBlockEnumerator) -> None:
+    steady = [(0.05, kernel_message("change", f"{USB_PATH}/block/sdb", SUBSYSTEM="block", DEVNAME="sdb"))] * 8
+    batches: List[List[DeviceDelta]] = []
+    source = ReplayEventSource([(delay, parse_uevent(message)) for delay, message in steady])
+    HotplugWatcher(batches.append, source=source, enumerator=enumerator, debounce=0.1, max_delay=0.2).run()
+    assert len(batches) >= 2
+    assert all(summary(batch) == [("change", "sdb", "sdb")] for batch in batches)
+
+
+def test_added_device_missing_from_sysfs_is_skipped(enumerator: SysfsBlockEnumerator) -> None:
+    batches = replay(enumerator, [(0.0, kernel_message("add", "/devices/virtual/block/zram0", SUBSYSTEM="block", DEVNAME="zram0"))])
+    assert batches == []
+
+
+def test_stop_closes_source(enumerator: SysfsBlockEnumerator) -> None:
+    source = ReplayEventSource([(30.0, parse_uevent(RECORDING[1][1]))])
+    watcher = HotplugWatcher(lambda _batch: None, source=source, enumerator=enumerator)
+    watcher.start()
+    watcher.stop()
+    assert source.read(0.01) is None
+
+
+def test_parse_kernel_and_udev_messages() -> None:
+    kernel = parse_uevent(kernel_message("add", "/devices/virtual/block/dm-0", SUBSYSTEM="block", DEVNAME="dm-0"))
+    assert kernel == {"ACTION": "add", "DEVPATH": "/devices/virtual/block/dm-0", "SUBSYSTEM": "block", "DEVNAME": "dm-0"}
+    udev = parse_uevent(udev_message("change", "/devices/virtual/block/dm-0", SUBSYSTEM="block", DM_NAME="cripta"))
+    assert udev["ACTION"] == "change" and udev["DM_NAME"] == "cripta"
+
+    corrupt = bytearray(udev_message("change", "/x", SUBSYSTEM="block"))
+    corrupt[8:12] = b"\0\0\0\0"
+    assert parse_uevent(bytes(corrupt)) is None
+    assert parse_uevent(b"libudev\0") is None
+    assert parse_uevent(b"sin cabecera\0ACTION=add\0") is None
+    assert parse_uevent(b"add@/x\0SUBSYSTEM=block\0") is None
+
+
+@pytest.mark.parametrize(
+    "previous,current,expected",
+    [
+        (None, "add", "add"),
+        ("add", "change", "add"),
+        ("add", "remove", None),
+        ("remove", "add", "change"),
+        ("remove", "change", "remove"),
+        ("change", "change", "change"),
+        ("change", "remove", "remove"),
+    ],
+)
+def test_merge_action(previous, current, expected) -> None:
+    assert merge_action(previous, current) == expected
+
+
+def test_coalesce_ignores_other_subsystems_and_actions() -> None:
+    events = [parse_uevent(message) for _, message in RECORDING[:6]]
+    events.append({"ACTION": "bind", "SUBSYSTEM": "block", "DEVNAME": "sdb"})
+    assert coalesce_events(events) == [("sdb", "add"), ("sdb1", "add")]
+
+
+def test_partitions_poll_source(tmp_path: Path) -> None:
+    partitions = tmp_path / "partitions"
+    header = "major minor  #blocks  name\n\n"
+    partitions.write_text(header + "   8        0  500107608 sda\n   8        1     524288 sda1\n")
+    source = PartitionsPollSource(partitions, interval=0.01)
+    assert source.read(1.0) == []
+
+    partitions.write_text(
+        header + "   8        0  500107608 sda\n   8       16   15015936 sdb\n   8       17   15014912 sdb1\n   8        1    1048576 sda1\n"
+    )
+    events = source.read(1.0)
+    assert sorted((event["ACTION"], event["DEVNAME"]) for event in events) == [
+        ("add", "sdb"), ("add", "sdb1"), ("change", "sda1"),
+    ]
+    partitions.write_text(header + "   8        0  500107608 sda\n")
+    assert sorted((event["ACTION"], event["DEVNAME"]) for event in source.read(1.0)) == [
+        ("remove", "sda1"), ("remove", "sdb"), ("remove", "sdb1"),
+    ]
+    source.close()
+    assert source.read(1.0) is None
@@ -0,0 +1,223 @@
+"""Diario de fstab y almacén de respaldos sobre un fstab temporal."""
+
+import errno
+import os
+import subprocess
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+import pytest
+
+from automount_gui_app import journal as journal_module
+from automount_gui_app.backups import FstabBackupStore
+from automount_gui_app.journal import FstabJournal
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+ORIGINAL = b"# fstab original\nUUID=1111-2222 /     ext4 defaults 0 1\nUUID=3333-4444 /boot vfat umask=0077 0 2\n"
+UPDATED = "# fstab nuevo\nUUID=1111-2222 / ext4 defaults 0 1\n"
+
+# Proceso hijo que muere (os._exit, sin limpiar nada) justo cuando el diario
+# va a renombrar el temporal sobre fstab: el registro y el enlace ya existen.
+CRASH_SCRIPT = textwrap.dedent(
+    """
+    import os, sys
+    from automount_gui_app import journal
+
+    real_rename = os.rename
+
+    def crash_on_fstab(src, dst):
+        if str(dst) == sys.argv[1]:
+            os._exit(17)
+        real_rename(src, dst)
+
+    journal.os.rename = crash_on_fstab
+    journal.FstabJournal(sys.argv[1]).commit(sys.argv[2], "cambio interrumpido")
+    """
+)
+
+
+# Proceso hijo que aplica un cambio y lo deja sin confirmar hasta que se le
+# indique por la entrada estándar, como la interfaz mientras monta un lote.
+HOLDING_SCRIPT = textwrap.dedent(
+    """
+    import sys
+    from automount_gui_app import journal
+
+    commit = journal.FstabJournal(sys.argv[1]).commit(sys.argv[2], "cambio en curso")
+    print("aplicado", flush=True)
+    if sys.stdin.readline().strip() == "deshacer":
+        commit.rollback()
+    else:
+        commit.finalize()
+    """
+)
+
+
+@pytest.fixture
+def fstab(tmp_path: Path) -> Path:
+    path = tmp_path / "fstab"
+    path.write_bytes(ORIGINAL)
+    return path
+
+
+def crash_during_commit(fstab: Path) -> None:
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    result = subprocess.run([sys.executable, "-c", CRASH_SCRIPT, str(fstab), UPDATED], env=env)
+    assert result.returncode == 17
+
+
+def test_recover_after_crash_between_write_and_rename(fstab: Path) -> None:
+    crash_during_commit(fstab)
+    journal = FstabJournal(fstab)
+    assert journal.journal_path.exists()
+    assert journal.previous_path.exists()
+
+    assert journal.recover() == "cambio interrumpido"
+    assert fstab.read_bytes() == ORIGINAL
+    assert not journal.journal_path.exists()
+    assert not journal.previous_path.exists()
+    # Sólo queda el archivo de bloqueo, que se reutiliza en cada commit.
+    assert sorted(path.name for path in fstab.parent.iterdir()) == ["fstab", "fstab.automount-lock"]
+
+
+def test_recover_after_crash_once_renamed(fstab: Path) -> None:
+    journal = FstabJournal(fstab)
+    journal.commit(UPDATED, "sin confirmar")
+    # Cierre inesperado antes de finalize(): el nuevo fstab ya está en su sitio
+    # y, al morir el proceso, el kernel suelta su bloqueo.
+    assert fstab.read_text() == UPDATED
+    journal._unlock()
+
+    assert FstabJournal(fstab).recover() == "sin confirmar"
+    assert fstab.read_bytes() == ORIGINAL
+
+
+def test_recover_leaves_another_process_change_alone(fstab: Path) -> None:
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    holder = subprocess.Popen(
+        [sys.executable, "-c", HOLDING_SCRIPT, str(fstab), UPDATED],
+        env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        assert holder.stdout.readline().strip() == "aplicado"
+        journal = FstabJournal(fstab)
+        assert journal.recover() is None
+        assert fstab.read_text() == UPDATED
+        assert journal.journal_path.exists()
+        with pytest.raises(RuntimeError, match="cambio pendiente"):
+            journal.commit("# otro cambio\n")
+
+        holder.communicate("deshacer\n", timeout=10)
+    finally:
+        if holder.poll() is None:
+            holder.kill()
+            holder.wait()
+    assert holder.returncode == 0
+    assert fstab.read_bytes() == ORIGINAL
+    assert not journal.journal_path.exists()
+    journal.commit(UPDATED).finalize()
+    assert fstab.read_text() == UPDATED
+
+
+def test_lock_is_released_after_each_outcome(fstab: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    journal = FstabJournal(fstab)
+    other = FstabJournal(fstab)
+    commit = journal.commit(UPDATED)
+    with pytest.raises(RuntimeError):
+        other.commit(UPDATED)
+    commit.rollback()
+    other.commit(UPDATED).finalize()
+
+    def disk_full(*_args, **_kwargs):
+        raise OSError(errno.ENOSPC, "No queda espacio")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(journal_module, "atomic_write", disk_full)
+        with pytest.raises(OSError):
+            journal.commit("# no cabe\n")
+    assert fstab.read_text() == UPDATED
+    journal.commit("# nuevo\n").finalize()
+    assert fstab.read_text() == "# nuevo\n"
+
+
+def test_recover_without_journal_is_noop(fstab: Path) -> None:
+    assert FstabJournal(fstab).recover() is None
+    assert fstab.read_bytes() == ORIGINAL
+
+
+def test_commit_keeps_mode_and_refuses_pending_change(fstab: Path) -> None:
+    fstab.chmod(0o640)
+    journal = FstabJournal(fstab)
+    commit = journal.commit(UPDATED)
+    with pytest.raises(RuntimeError, match="cambio pendiente"):
+        journal.commit(UPDATED)
+    commit.finalize()
+    assert fstab.stat().st_mode & 0o777 == 0o640
+    assert not journal.previous_path.exists()
+
+
+def test_rollback_restores_previous_bytes(fstab: Path) -> None:
+    journal = FstabJournal(fstab)
+    journal.commit(UPDATED).rollback()
+    assert fstab.read_bytes() == ORIGINAL
+    assert not journal.journal_path.exists()
+
+
+def test_backups_are_deduplicated(fstab: Path, tmp_path: Path) -> None:
+    store = FstabBackupStore(tmp_path / "respaldos")
+    first = store.save(fstab)
+    assert store.save(fstab) == first
+    assert len(store.list()) == 1
+    assert store.read(first.digest) == ORIGINAL
+
+
+def test_retention_by_count_collects_unreferenced_objects(fstab: Path, tmp_path: Path) -> None:
+    store = FstabBackupStore(tmp_path / "respaldos", compress=False, keep_count=2, keep_days=None)
+    digests = []
+    for number in range(4):
+        fstab.write_text(f"# versión {number}\n")
+        digests.append(store.save(fstab).digest)
+        time.sleep(0.01)
+
+    assert [record.digest for record in store.list()] == digests[:1:-1]
+    objects = {path.name for path in store.directory.iterdir()} - {"index.json"}
+    assert objects == set(digests[2:])
+
+
+def test_retention_by_age_keeps_latest(fstab: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    store = FstabBackupStore(tmp_path / "respaldos", keep_count=None, keep_days=1)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now - 10 * 86400)
+    old = store.save(fstab)
+    monkeypatch.setattr(time, "time", lambda: now)
+    assert store.prune() == 0  # el único respaldo se conserva aunque sea antiguo
+
+    fstab.write_text("# reciente\n")
+    recent = store.save(fstab)
+    assert [record.digest for record in store.list()] == [recent.digest]
+    assert not store.object_path(old.digest, old.compressed).exists()
+
+
+def test_restore_goes_through_journal(fstab: Path, tmp_path: Path) -> None:
+    store = FstabBackupStore(tmp_path / "respaldos")
+    record = store.save(fstab)
+    fstab.write_text(UPDATED)
+
+    restored = store.restore(record.digest[:8], fstab)
+    assert restored.digest == record.digest
+    assert fstab.read_bytes() == ORIGINAL
+    journal = FstabJournal(fstab)
+    assert not journal.journal_path.exists() and not journal.previous_path.exists()
+    # La versión reemplazada quedó respaldada antes de restaurar.
+    assert UPDATED.encode() in {store.read(item.digest) for item in store.list()}
+
+
+def test_restore_refuses_while_change_pending(fstab: Path, tmp_path: Path) -> None:
+    store = FstabBackupStore(tmp_path / "respaldos")
+    record = store.save(fstab)
+    FstabJournal(fstab).commit(UPDATED)
+    with pytest.raises(RuntimeError, match="cambio pendiente"):
+        store.restore(record.digest, fstab)
+    assert fstab.read_text() == UPDATED
@@ -0,0 +1,227 @@
+"""Lotes de montaje: todo o nada sobre un fstab temporal y un ejecutor simulado."""
+
+import errno
+import os
+import socket
+import threading
+from pathlib import Path
+from typing import List, Set
+
+import pytest
+
+from automount_gui_app import mounting
+from automount_gui_app.backups import FstabBackupStore
+from automount_gui_app.devices import DeviceSnapshot
+from automount_gui_app.drivers import FilesystemSupport
+from automount_gui_app.fstab import FstabEntry
+from automount_gui_app.helper import HelperClient, HelperPolicy, HelperServer, MemoryBackend, PeerCredentials
+from automount_gui_app.mounting import MountConfigurator
+from automount_gui_app.operations import STAGE_MOUNT, STAGE_VERIFY
+
+ROOT = PeerCredentials(pid=1, uid=0, gid=0)
+ORIGINAL = b"# fstab de prueba\nUUID=11111111-2222-4333-8444-555555555555 /  ext4  defaults 0 1\n"
+DEVICES = [
+    {"name": "sdb", "kname": "sdb", "type": "disk", "children": [
+        {"name": f"sdb{number}", "kname": f"sdb{number}", "type": "part", "fstype": "ext4",
+         "uuid": f"0a1b2c3d-0000-4000-8000-00000000000{number}"}
+        for number in (1, 2, 3)
+    ]},
+]
+
+
+class FakeExecutor:
+    """Ejecutor que apunta los montajes en memoria y falla en los destinos indicados."""
+
+    def __init__(self, failing: Set[str]) -> None:
+        self.failing = failing
+        self.mounted: Set[str] = set()
+        self.unmounted: List[str] = []
+        self._lock = threading.Lock()
+
+    def mount(self, entry: FstabEntry, in_fstab: bool = True) -> None:
+        if entry.mountpoint in self.failing:
+            raise RuntimeError(f"mount: {entry.mountpoint}: {os.strerror(errno.EINVAL)}.")
+        with self._lock:
+            self.mounted.add(entry.mountpoint)
+
+    def unmount(self, target: str, lazy: bool = False) -> None:
+        with self._lock:
+            self.mounted.discard(target)
+            self.unmounted.append(target)
+
+
+@pytest.fixture
+def fstab(tmp_path: Path) -> Path:
+    path = tmp_path / "etc" / "fstab"
+    path.parent.mkdir()
+    path.write_bytes(ORIGINAL)
+    return path
+
+
+def make_configurator(tmp_path: Path, fstab: Path, executor: FakeExecutor, monkeypatch: pytest.MonkeyPatch):
+    proc_filesystems = tmp_path / "filesystems"
+    proc_filesystems.write_text("\text4\nnodev\ttmpfs\n")
+    monkeypatch.setattr(mounting, "is_mountpoint", lambda path: str(path) in executor.mounted)
+    logs: List[str] = []
+    configurator = MountConfigurator(
+        logs.append,
+        snapshot=DeviceSnapshot(loader=lambda: DEVICES, partitions_path=tmp_path / "partitions"),
+        fstab_path=fstab,
+        backup_store=FstabBackupStore(tmp_path / "respaldos"),
+        executor=executor,
+        unit_dir=tmp_path / "units",
+        fs_support=FilesystemSupport(proc_filesystems, tmp_path / "modules", "prueba", (str(tmp_path / "sbin"),)),
+    )
+    return configurator, logs
+
+
+def batch(tmp_path: Path):
+    media = tmp_path / "media"
+    return [({"name": f"sdb{number}", "type": "part"}, str(media / "lote" / f"disco{number}")) for number in (1, 2, 3)]
+
+
+def test_failed_mount_undoes_the_whole_batch(tmp_path: Path, fstab: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    requests = batch(tmp_path)
+    executor = FakeExecutor(failing={requests[1][1]})
+    configurator, logs = make_configurator(tmp_path, fstab, executor, monkeypatch)
+    stages: List[str] = []
+
+    with pytest.raises(RuntimeError, match="Falló el montaje de 1 de 3 unidades"):
+        configurator.configure_batch(requests, "022", lambda _lines: True, on_stage=stages.append)
+
+    assert fstab.read_bytes() == ORIGINAL
+    assert executor.mounted == set()
+    assert sorted(executor.unmounted) == [requests[0][1], requests[2][1]]
+    assert not (tmp_path / "media").exists()
+    assert stages[-1] == STAGE_VERIFY
+    assert configurator.journal.recover() is None
+
+
+def test_stage_callback_error_still_rolls_back(tmp_path: Path, fstab: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    requests = batch(tmp_path)
+    executor = FakeExecutor(failing={requests[0][1]})
+    configurator, _logs = make_configurator(tmp_path, fstab, executor, monkeypatch)
+    (tmp_path / "media").mkdir()
+
+    def cancel_on_verify(stage: str) -> None:
+        if stage == STAGE_VERIFY:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        configurator.configure_batch(requests, "022", lambda _lines: True, on_stage=cancel_on_verify)
+
+    assert fstab.read_bytes() == ORIGINAL
+    assert executor.mounted == set()
+    # Sólo se borra lo que creó el lote; /media ya existía.
+    assert [path.name for path in (tmp_path / "media").iterdir()] == []
+
+
+def test_cancel_before_mounting_undoes_the_batch(tmp_path: Path, fstab: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    requests = batch(tmp_path)
+    executor = FakeExecutor(failing=set())
+    configurator, _logs = make_configurator(tmp_path, fstab, executor, monkeypatch)
+
+    def cancel_on_mount(stage: str) -> None:
+        if stage == STAGE_MOUNT:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        configurator.configure_batch(requests, "022", lambda _lines: True, on_stage=cancel_on_mount)
+    assert fstab.read_bytes() == ORIGINAL
+    assert executor.mounted == set()
+    assert not (tmp_path / "media").exists()
+
+
+def test_successful_batch_keeps_entries_and_mounts(tmp_path: Path, fstab: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    requests = batch(tmp_path)
+    executor = FakeExecutor(failing=set())
+    configurator, _logs = make_configurator(tmp_path, fstab, executor, monkeypatch)
+    monkeypatch.setattr(mounting.os, "chown", lambda *_args: None)
+
+    assert configurator.configure_batch(requests, "022", lambda _lines: True) is True
+    text = fstab.read_text()
+    assert text.startswith(ORIGINAL.decode())
+    assert all(f"UUID=0a1b2c3d-0000-4000-8000-00000000000{number} " in text for number in (1, 2, 3))
+    assert executor.mounted == {mount_point for _, mount_point in requests}
+    assert all(Path(mount_point).is_dir() for _, mount_point in requests)
+
+
+class FailingBackend(MemoryBackend):
+    """Backend del ayudante cuyo montaje falla en los destinos indicados."""
+
+    def __init__(self, failing: Set[str]) -> None:
+        super().__init__(DEVICES[0]["children"], "")
+        self.failing = failing
+
+    def mount(self, source: str, mountpoint: str, fstype: str, options: str = "defaults", in_fstab: bool = True) -> None:
+        if mountpoint in self.failing:
+            raise RuntimeError(f"mount: {mountpoint}: {os.strerror(errno.EINVAL)}.")
+        super().mount(source, mountpoint, fstype, options, in_fstab)
+
+
+def make_helper_configurator(tmp_path: Path, fstab: Path, backend: MemoryBackend, monkeypatch: pytest.MonkeyPatch):
+    server_sock, client_sock = socket.socketpair()
+    client_sock.settimeout(5)
+    server = HelperServer(backend, HelperPolicy(), log=lambda _message: None)
+    threading.Thread(target=server.serve_connection, args=(server_sock, ROOT), daemon=True).start()
+    client = HelperClient(client_sock)
+    monkeypatch.setattr(mounting, "is_mountpoint", lambda path: str(path) in backend._mounts)
+    # Sin UUID en la caché: el sondeo tiene que pasar por el ayudante.
+    devices = [{**DEVICES[0], "children": [dict(child, uuid=None) for child in DEVICES[0]["children"]]}]
+    configurator = MountConfigurator(
+        lambda _message: None,
+        snapshot=DeviceSnapshot(loader=lambda: devices, partitions_path=tmp_path / "partitions"),
+        fstab_path=fstab,
+        backup_store=FstabBackupStore(tmp_path / "respaldos"),
+        unit_dir=tmp_path / "units",
+        helper=client,
+    )
+    return configurator, client
+
+
+HELPER_REQUESTS = [({"name": f"sdb{number}", "type": "part"}, f"/mnt/lote/disco{number}") for number in (1, 2, 3)]
+
+
+def test_helper_batch_goes_through_the_socket(tmp_path: Path, fstab: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    backend = FailingBackend(failing=set())
+    configurator, client = make_helper_configurator(tmp_path, fstab, backend, monkeypatch)
+    with client:
+        assert configurator.configure_batch(HELPER_REQUESTS, "022", lambda _lines: True) is True
+
+    # El fstab local no se toca: lo escribe el ayudante.
+    assert fstab.read_bytes() == ORIGINAL
+    assert not (tmp_path / "respaldos").exists()
+    assert sorted(backend._mounts) == [mount_point for _, mount_point in HELPER_REQUESTS]
+    assert len(backend.fstab()["entries"]) == 3
+    assert [op for op, _ in backend.calls].count("chown_mountpoint") == 3
+
+
+def test_helper_batch_failure_removes_the_added_entries(
+    tmp_path: Path, fstab: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    backend = FailingBackend(failing={HELPER_REQUESTS[1][1]})
+    configurator, client = make_helper_configurator(tmp_path, fstab, backend, monkeypatch)
+    with client:
+        with pytest.raises(RuntimeError, match="Falló el montaje de 1 de 3 unidades"):
+            configurator.configure_batch(HELPER_REQUESTS, "022", lambda _lines: True)
+
+    assert backend._mounts == {}
+    assert backend.fstab()["entries"] == []
+
+
+def test_helper_unmount_removes_the_entry_through_the_helper(
+    tmp_path: Path, fstab: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    backend = FailingBackend(failing=set())
+    configurator, client = make_helper_configurator(tmp_path, fstab, backend, monkeypatch)
+    monkeypatch.setattr(mounting, "systemd_running", lambda: False)
+    with client:
+        assert configurator.configure_batch(HELPER_REQUESTS[:1], "022", lambda _lines: True) is True
+        device_info, mount_point = HELPER_REQUESTS[0]
+        assert configurator.unmount(dict(device_info, mountpoint=mount_point), lambda _name, _mount_point: True)
+        with pytest.raises(RuntimeError, match="requiere ejecutar AutoMount como administrador"):
+            configurator.restore_backup("0" * 64)
+
+    assert backend._mounts == {}
+    assert backend.fstab()["entries"] == []
+    assert fstab.read_bytes() == ORIGINAL
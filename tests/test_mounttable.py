@@ -0,0 +1,99 @@
+"""Tabla de montajes sobre archivos mountinfo grabados."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from automount_gui_app.mounttable import MountTable, get_mount_table, parse_mountinfo
+
+MOUNTINFO = (
+    "22 1 8:1 / / rw,relatime shared:1 - ext4 /dev/sda1 rw,errors=remount-ro\n"
+    "25 22 0:5 / /dev rw,nosuid shared:2 - devtmpfs udev rw,size=8000000k\n"
+    "40 22 8:17 / /media/usuario/Mis\\040Datos rw,nosuid,nodev shared:30 - ntfs3 /dev/sdb1 rw,uid=1000\n"
+    "41 22 8:17 /fotos /srv/fotos rw shared:30 - ntfs3 /dev/sdb1 rw,uid=1000\n"
+    "50 22 0:45 / /mnt/tab\\011y\\134barra rw master:4 propagation:slave - fuse.sshfs usuario@host:/a\\040b rw\n"
+    "línea que no es de mountinfo\n"
+    "60 22 8:1 / / rw - ext4 /dev/sda1\n"
+)
+
+
+@pytest.fixture
+def mountinfo(tmp_path: Path) -> Path:
+    path = tmp_path / "mountinfo"
+    path.write_text(MOUNTINFO)
+    return path
+
+
+def test_parse_mountinfo_fields_and_escapes() -> None:
+    entries = parse_mountinfo(MOUNTINFO.splitlines())
+    # La línea ajena y la que no tiene opciones de superbloque se descartan.
+    assert [entry.mount_id for entry in entries] == [22, 25, 40, 41, 50]
+    datos = entries[2]
+    assert (datos.parent_id, datos.majmin, datos.fstype, datos.source) == (22, "8:17", "ntfs3", "/dev/sdb1")
+    assert datos.mountpoint == "/media/usuario/Mis Datos"
+    assert entries[3].root == "/fotos"
+    sshfs = entries[4]
+    assert sshfs.mountpoint == "/mnt/tab\ty\\barra"
+    assert sshfs.source == "usuario@host:/a b"
+    assert (sshfs.options, sshfs.super_options) == ("rw", "rw")
+
+
+def test_lookups_on_recorded_file(mountinfo: Path) -> None:
+    table = MountTable(mountinfo)
+    try:
+        assert table.by_mountpoint("/media/usuario/Mis Datos").mount_id == 40
+        assert table.by_mountpoint("/mnt/nada") is None
+        assert [entry.mount_id for entry in table.by_majmin("8:17")] == [40, 41]
+        assert [entry.mount_id for entry in table.by_source("/dev/sdb1")] == [40, 41]
+        assert table.by_source("/dev/sdz1") == []
+        assert table.mountpoint_for("8:17") == "/media/usuario/Mis Datos"
+        assert table.mountpoint_for(None, ["usuario@host:/a b"]) == "/mnt/tab\ty\\barra"
+        assert table.is_mountpoint(Path("/dev"))
+    finally:
+        table.close()
+
+
+def test_refresh_when_recorded_file_changes(mountinfo: Path) -> None:
+    table = MountTable(mountinfo)
+    try:
+        generation = table.generation
+        assert not table.changed()
+        assert table.refresh() is False
+
+        replacement = mountinfo.with_name("mountinfo.nuevo")
+        replacement.write_text(MOUNTINFO.splitlines(keepends=True)[0])
+        os.replace(replacement, mountinfo)
+
+        assert table.changed()
+        assert table.by_mountpoint("/media/usuario/Mis Datos") is None
+        assert table.generation == generation + 1
+        assert [entry.mount_id for entry in table.entries()] == [22]
+    finally:
+        table.close()
+
+
+def test_empty_recorded_file_still_reloads_on_change(tmp_path: Path) -> None:
+    path = tmp_path / "mountinfo"
+    path.write_text("")
+    table = MountTable(path)
+    try:
+        assert table.entries() == []
+        path.write_text(MOUNTINFO)
+        assert table.by_mountpoint("/srv/fotos").mount_id == 41
+    finally:
+        table.close()
+
+
+def test_shared_table_is_reused_per_path(mountinfo: Path) -> None:
+    assert get_mount_table(mountinfo) is get_mount_table(str(mountinfo))
+
+
+@pytest.mark.skipif(not Path("/proc/self/mountinfo").exists(), reason="requiere procfs")
+def test_procfs_mountinfo_uses_poll() -> None:
+    table = MountTable(Path("/proc/self/mountinfo"))
+    try:
+        assert table._use_poll
+        assert table.by_mountpoint("/") is not None
+    finally:
+        table.close()
@@ -0,0 +1,152 @@
+"""Sondeo de superbloques sobre imágenes creadas con mkfs en archivos normales."""
+
+import os
+import shutil
+import struct
+import subprocess
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+from automount_gui_app import system
+from automount_gui_app.probe import FilesystemInfo, parse_blkid_export, probe_devices, probe_superblock
+from automount_gui_app.system import CommandRunner
+
+UUID = "5f3c2a1e-8b7d-4c6e-9a0f-1d2e3f405162"
+MIB = 1024 * 1024
+
+# tipo -> (mkfs, tamaño en MiB, argumentos antes de la imagen, UUID fijado o None)
+IMAGES = {
+    "ext2": ("mkfs.ext2", 4, ["-q", "-F", "-L", "DATOS", "-U", UUID], UUID),
+    "ext3": ("mkfs.ext3", 4, ["-q", "-F", "-L", "DATOS", "-U", UUID], UUID),
+    "ext4": ("mkfs.ext4", 4, ["-q", "-F", "-L", "DATOS", "-U", UUID], UUID),
+    "vfat": ("mkfs.vfat", 4, ["-n", "DATOS", "-i", "1234ABCD"], "1234-ABCD"),
+    "exfat": ("mkfs.exfat", 4, ["-L", "DATOS"], None),
+    "ntfs": ("mkntfs", 4, ["-q", "-F", "-Q", "-L", "DATOS"], None),
+    "btrfs": ("mkfs.btrfs", 128, ["-q", "-f", "-L", "DATOS", "-U", UUID], UUID),
+    "xfs": ("mkfs.xfs", 300, ["-q", "-f", "-L", "DATOS", "-m", f"uuid={UUID}"], UUID),
+}
+
+
+def make_image(path: Path, fstype: str) -> Optional[str]:
+    command, size, args, expected_uuid = IMAGES[fstype]
+    if shutil.which(command) is None:
+        pytest.skip(f"{command} no está instalado")
+    with open(path, "wb") as image:
+        image.truncate(size * MIB)
+    subprocess.run([command, *args, str(path)], check=True, capture_output=True)
+    return expected_uuid
+
+
+def blkid_info(path: Path) -> Optional[FilesystemInfo]:
+    if shutil.which("blkid") is None:
+        return None
+    output = subprocess.run(["blkid", "-p", "-o", "export", str(path)], capture_output=True, text=True).stdout
+    return parse_blkid_export(f"DEVNAME={path}\n{output}").get(str(path))
+
+
+@pytest.mark.parametrize("fstype", sorted(IMAGES))
+def test_probe_mkfs_image(tmp_path: Path, fstype: str) -> None:
+    image = tmp_path / f"{fstype}.img"
+    expected_uuid = make_image(image, fstype)
+
+    info = probe_superblock(str(image))
+    assert info is not None
+    assert (info.fstype, info.label) == (fstype, "DATOS")
+    if expected_uuid is not None:
+        assert info.uuid == expected_uuid
+    reference = blkid_info(image)
+    if reference is not None:
+        assert info == reference
+
+
+def test_ext4_without_label(tmp_path: Path) -> None:
+    image = tmp_path / "sin-etiqueta.img"
+    if shutil.which("mkfs.ext4") is None:
+        pytest.skip("mkfs.ext4 no está instalado")
+    with open(image, "wb") as handle:
+        handle.truncate(4 * MIB)
+    subprocess.run(["mkfs.ext4", "-q", "-F", "-U", UUID, str(image)], check=True)
+    assert probe_superblock(str(image)) == FilesystemInfo("ext4", UUID, None)
+
+
+def fat_boot_sector(fat32: bool, label: bytes, serial: int) -> bytes:
+    sector = bytearray(512)
+    sector[0:3] = b"\xeb\x58\x90"
+    sector[3:11] = b"mkfs.fat"
+    struct.pack_into("<HBH", sector, 0x0B, 512, 4, 32)
+    if fat32:
+        struct.pack_into("<I", sector, 0x43, serial)
+        sector[0x47:0x52] = label
+        sector[0x52:0x5A] = b"FAT32   "
+    else:
+        struct.pack_into("<I", sector, 0x27, serial)
+        sector[0x2B:0x36] = label
+        sector[0x36:0x3E] = b"FAT16   "
+    sector[510:512] = b"\x55\xaa"
+    return bytes(sector)
+
+
+@pytest.mark.parametrize(
+    "fat32,label,expected",
+    [
+        (False, b"USB        ", FilesystemInfo("vfat", "0BAD-CAFE", "USB")),
+        (True, b"MIS DATOS  ", FilesystemInfo("vfat", "0BAD-CAFE", "MIS DATOS")),
+        (True, b"NO NAME    ", FilesystemInfo("vfat", "0BAD-CAFE", None)),
+    ],
+)
+def test_probe_fat_boot_sector(tmp_path: Path, fat32: bool, label: bytes, expected: FilesystemInfo) -> None:
+    image = tmp_path / "fat.img"
+    image.write_bytes(fat_boot_sector(fat32, label, 0x0BADCAFE) + bytes(MIB))
+    assert probe_superblock(str(image)) == expected
+
+
+def test_unknown_and_short_images(tmp_path: Path) -> None:
+    zeros = tmp_path / "ceros.img"
+    zeros.write_bytes(bytes(MIB))
+    tiny = tmp_path / "diminuta.img"
+    tiny.write_bytes(b"\x55\xaa")
+    assert probe_superblock(str(zeros)) is None
+    assert probe_superblock(str(tiny)) is None
+
+
+def test_unrecognised_paths_share_one_blkid_call(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    known = tmp_path / "conocida.img"
+    known.write_bytes(fat_boot_sector(True, b"USB        ", 0x0BADCAFE))
+    unknown: List[Path] = [tmp_path / f"rara{number}.img" for number in range(2)]
+    for path in unknown:
+        path.write_bytes(bytes(4096))
+    missing = tmp_path / "no-existe"
+
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log = tmp_path / "blkid.log"
+    (bin_dir / "blkid").write_text(
+        "#!/bin/sh\n"
+        f'echo "$*" >> "{log}"\n'
+        f'printf "DEVNAME={unknown[0]}\\nTYPE=squashfs\\n\\nDEVNAME={unknown[1]}\\nTYPE=swap\\nUUID={UUID}\\n"\n'
+    )
+    (bin_dir / "blkid").chmod(0o755)
+    monkeypatch.setenv("PATH", str(bin_dir))
+    monkeypatch.setattr(system, "_runner", CommandRunner())
+
+    results = probe_devices([str(known), *map(str, unknown), str(missing)])
+    assert results == {
+        str(known): FilesystemInfo("vfat", "0BAD-CAFE", "USB"),
+        str(unknown[0]): FilesystemInfo("squashfs"),
+        str(unknown[1]): FilesystemInfo("swap", UUID),
+    }
+    assert log.read_text().splitlines() == [f"-o export {unknown[0]} {unknown[1]} {missing}"]
+
+
+def test_parse_blkid_export() -> None:
+    output = (
+        "DEVNAME=/dev/sda1\nUUID=ABCD-1234\nBLOCK_SIZE=512\nTYPE=vfat\nPARTLABEL=EFI\n\n"
+        "DEVNAME=/dev/sda2\nLABEL=raíz=1\nUUID=0a1b\nTYPE=ext4\n\n"
+        "DEVNAME=/dev/sda3\nPARTUUID=1234-03\n"
+    )
+    assert parse_blkid_export(output) == {
+        "/dev/sda1": FilesystemInfo("vfat", "ABCD-1234", None),
+        "/dev/sda2": FilesystemInfo("ext4", "0a1b", "raíz=1"),
+    }
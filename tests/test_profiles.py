@@ -0,0 +1,142 @@
+"""Perfiles de montaje: matriz dorada de opciones y su traducción a banderas MS_*."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from automount_gui_app.executor import (
+    MS_DIRSYNC,
+    MS_LAZYTIME,
+    MS_NOATIME,
+    MS_NODEV,
+    MS_NODIRATIME,
+    MS_NOEXEC,
+    MS_NOSUID,
+    MS_RDONLY,
+    MS_RELATIME,
+    MS_SILENT,
+    MS_STRICTATIME,
+    MS_SYNCHRONOUS,
+    parse_mount_options,
+)
+from automount_gui_app.mounting import mount_options
+from automount_gui_app.profiles import (
+    FSTRIM_NOTE,
+    PROFILE_COMPATIBLE,
+    PROFILE_REMOVABLE_SAFE,
+    PROFILE_THROUGHPUT,
+    DeviceTraits,
+    apply_profile,
+    profile_matrix,
+    read_device_traits,
+)
+
+GOLDEN = Path(__file__).parent / "golden" / "profile_matrix.tsv"
+NVME = DeviceTraits(rotational=False, discard=True, bus="nvme")
+USB_FLASH = DeviceTraits(rotational=False, discard=True, bus="usb", removable=True)
+
+# opciones de fstab -> (banderas MS_*, datos que llegan al sistema de archivos)
+FLAG_MATRIX = [
+    ("defaults", 0, ""),
+    ("ro", MS_RDONLY, ""),
+    ("ro,rw", 0, ""),
+    ("rw,ro", MS_RDONLY, ""),
+    ("nosuid,nodev,noexec", MS_NOSUID | MS_NODEV | MS_NOEXEC, ""),
+    ("user", MS_NOSUID | MS_NODEV | MS_NOEXEC, ""),
+    ("users,exec", MS_NOSUID | MS_NODEV, ""),
+    ("users,exec,suid,dev", 0, ""),
+    ("owner", MS_NOSUID | MS_NODEV, ""),
+    ("sync,dirsync", MS_SYNCHRONOUS | MS_DIRSYNC, ""),
+    ("sync,async", 0, ""),
+    ("noatime,nodiratime", MS_NOATIME | MS_NODIRATIME, ""),
+    ("noatime,atime", 0, ""),
+    ("relatime", MS_RELATIME, ""),
+    ("strictatime,lazytime", MS_STRICTATIME | MS_LAZYTIME, ""),
+    ("lazytime,nolazytime", 0, ""),
+    ("silent", MS_SILENT, ""),
+    ("defaults,auto,nofail,_netdev,x-systemd.automount,comment=x,helper=udisks2", 0, ""),
+    ("noauto,nouser,x-systemd.device-timeout=5s", 0, ""),
+    ("uid=1000,gid=1000,umask=022", 0, "uid=1000,gid=1000,umask=022"),
+    ("defaults,auto,users,rw,exec,uid=1000,gid=1000,umask=000", MS_NOSUID | MS_NODEV, "uid=1000,gid=1000,umask=000"),
+    ("noatime,lazytime,commit=60", MS_NOATIME | MS_LAZYTIME, "commit=60"),
+    ("compress=zstd:1,ssd,discard=async", 0, "compress=zstd:1,ssd,discard=async"),
+    ("ro,,noexec", MS_RDONLY | MS_NOEXEC, ""),
+]
+
+
+@pytest.mark.parametrize("options,flags,data", FLAG_MATRIX)
+def test_option_flag_matrix(options: str, flags: int, data: str) -> None:
+    assert parse_mount_options(options) == (flags, data)
+
+
+def render_matrix() -> str:
+    return "".join("\t".join(row) + "\n" for row in profile_matrix())
+
+
+def test_profile_matrix_matches_golden() -> None:
+    # Tras un cambio intencionado en los perfiles: AUTOMOUNT_UPDATE_GOLDEN=1 python -m pytest tests/test_profiles.py
+    if os.environ.get("AUTOMOUNT_UPDATE_GOLDEN"):
+        GOLDEN.write_text(render_matrix(), encoding="utf-8")
+    assert render_matrix() == GOLDEN.read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("fstype", ["ext4", "xfs", "btrfs", "vfat", "exfat", "exfat-fuse", "ntfs3", "ntfs-3g"])
+def test_profiles_never_weaken_base_flags(fstype: str) -> None:
+    base, _ = mount_options(fstype, 1000, 1000, "022")
+    base_flags, _ = parse_mount_options(base)
+    for profile in (PROFILE_THROUGHPUT, PROFILE_REMOVABLE_SAFE):
+        tuned = apply_profile(base, fstype, profile, USB_FLASH).options
+        flags, _ = parse_mount_options(tuned)
+        assert flags & base_flags == base_flags
+        assert flags & MS_NOATIME
+
+
+def test_compatible_profile_is_identity() -> None:
+    base = "defaults,auto,users,rw,exec"
+    assert apply_profile(base, "ext4", PROFILE_COMPATIBLE, NVME).options == base
+
+
+def test_unknown_profile_is_rejected() -> None:
+    with pytest.raises(ValueError, match="Perfil de montaje desconocido"):
+        apply_profile("defaults", "ext4", "turbo", NVME)
+
+
+def test_ext4_on_nvme_suggests_fstrim_instead_of_discard() -> None:
+    result = apply_profile("defaults", "ext4", PROFILE_THROUGHPUT, NVME)
+    assert "discard" not in result.options.split(",")
+    assert FSTRIM_NOTE in result.notes
+
+
+def test_kernel_ntfs3_gets_inline_discard_on_removable_flash() -> None:
+    result = apply_profile("defaults", "ntfs3", PROFILE_REMOVABLE_SAFE, USB_FLASH)
+    assert result.options.split(",")[-3:] == ["nofail", "x-systemd.device-timeout=5s", "discard"]
+    assert apply_profile("defaults", "ntfs3", PROFILE_THROUGHPUT, NVME).notes == [FSTRIM_NOTE]
+
+
+def test_exfat_fuse_is_tuned_as_fuse() -> None:
+    assert "big_writes" in apply_profile("defaults", "exfat-fuse", PROFILE_THROUGHPUT, NVME).options.split(",")
+
+
+def make_block(sysfs: Path, device_path: str, disk: str, partition: str = "", **queue: int) -> None:
+    disk_dir = sysfs / "devices" / device_path / "block" / disk
+    (disk_dir / "queue").mkdir(parents=True)
+    for name, value in queue.items():
+        (disk_dir / "queue" / name).write_text(f"{value}\n")
+    (sysfs / "class" / "block").mkdir(parents=True, exist_ok=True)
+    (sysfs / "class" / "block" / disk).symlink_to(disk_dir)
+    if partition:
+        (disk_dir / partition).mkdir()
+        (disk_dir / partition / "partition").write_text("1\n")
+        (sysfs / "class" / "block" / partition).symlink_to(disk_dir / partition)
+
+
+def test_read_device_traits_from_sysfs(tmp_path: Path) -> None:
+    make_block(tmp_path, "pci0000:00/0000:00:1d.0/nvme/nvme0", "nvme0n1", "nvme0n1p2", rotational=0, discard_max_bytes=2199023255040)
+    make_block(tmp_path, "pci0000:00/0000:00:14.0/usb2/2-1/2-1:1.0/host6/target6:0:0/6:0:0:0", "sdb", "sdb1", rotational=1, discard_max_bytes=0)
+    make_block(tmp_path, "pci0000:00/0000:00:17.0/ata1/host0/target0:0:0/0:0:0:0", "sda", rotational=1)
+
+    assert read_device_traits("nvme0n1p2", tmp_path) == DeviceTraits(rotational=False, discard=True, bus="nvme")
+    assert read_device_traits("sdb1", tmp_path) == DeviceTraits(rotational=True, discard=False, bus="usb", removable=True)
+    assert read_device_traits("sda", tmp_path) == DeviceTraits()
+    assert read_device_traits("inexistente", tmp_path) == DeviceTraits()
@@ -0,0 +1,135 @@
+"""Generación de unidades .mount/.automount en un directorio de unidades temporal."""
+
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from automount_gui_app.fstab import FstabEntry
+from automount_gui_app.systemd_units import (
+    GENERATED_MARKER,
+    SystemdUnitWriter,
+    device_path,
+    escape_path,
+    on_demand_options,
+    unit_name,
+    unit_options,
+)
+
+ESCAPES = [
+    ("/", "-"),
+    ("/mnt/datos", "mnt-datos"),
+    ("/mnt/Mis Datos", "mnt-Mis\\x20Datos"),
+    ("/media/ana/.oculto", "media-ana-.oculto"),
+    ("/.oculto", "\\x2eoculto"),
+    ("/mnt/a-b", "mnt-a\\x2db"),
+    ("/mnt/ñandú", "mnt-\\xc3\\xb1and\\xc3\\xba"),
+    ("/mnt//x/./y/", "mnt-x-y"),
+    ("/mnt/100%", "mnt-100\\x25"),
+]
+ENTRY = FstabEntry("UUID=0a1b2c3d-0000-4000-8000-000000000001", "/mnt/Mis Datos", "ext4", "defaults,auto,nofail,noatime")
+
+
+@pytest.mark.parametrize("path,expected", ESCAPES)
+def test_escape_path(path: str, expected: str) -> None:
+    assert escape_path(path) == expected
+
+
+@pytest.mark.skipif(shutil.which("systemd-escape") is None, reason="systemd-escape no está instalado")
+@pytest.mark.parametrize("path", [path for path, _ in ESCAPES])
+def test_escape_path_matches_systemd_escape(path: str) -> None:
+    expected = subprocess.run(["systemd-escape", "--path", path], capture_output=True, text=True, check=True).stdout
+    assert escape_path(path) == expected.strip()
+
+
+def test_device_path_uses_udev_escaping() -> None:
+    assert device_path("UUID=0a1b") == "/dev/disk/by-uuid/0a1b"
+    assert device_path("LABEL=Mis Datos/2") == "/dev/disk/by-label/Mis\\x20Datos\\x2f2"
+    assert device_path("PARTUUID=abcd-01") == "/dev/disk/by-partuuid/abcd-01"
+    assert device_path("/dev/sdb1") == "/dev/sdb1"
+
+
+def test_on_demand_options_replace_previous_systemd_options() -> None:
+    options = on_demand_options("defaults,nofail,x-systemd.automount,x-systemd.idle-timeout=5,noatime", 300, 7)
+    assert options == "defaults,noatime,nofail,x-systemd.automount,x-systemd.idle-timeout=300,x-systemd.device-timeout=7s"
+    assert on_demand_options(options, 300, 7) == options
+
+
+def test_unit_options_drop_fstab_only_options() -> None:
+    assert unit_options("defaults,auto,nofail,noatime,x-systemd.automount,comment=x") == "noatime"
+    assert unit_options("defaults,nofail") == "defaults"
+
+
+def test_write_automount_units(tmp_path: Path) -> None:
+    writer = SystemdUnitWriter(tmp_path)
+    created = writer.write(ENTRY, idle_timeout=120, device_timeout=5)
+
+    mount_path = tmp_path / "mnt-Mis\\x20Datos.mount"
+    automount_path = tmp_path / "mnt-Mis\\x20Datos.automount"
+    link = tmp_path / "local-fs.target.wants" / automount_path.name
+    dropin = tmp_path / "dev-disk-by\\x2duuid-0a1b2c3d\\x2d0000\\x2d4000\\x2d8000\\x2d000000000001.device.d" / "automount-timeout.conf"
+    assert created == [mount_path, automount_path, link, dropin]
+    assert link.is_symlink() and Path(link.readlink()) == automount_path
+    assert writer.exists("/mnt/Mis Datos")
+
+    assert mount_path.read_text() == (
+        f"{GENERATED_MARKER}\n"
+        "[Unit]\n"
+        "Description=AutoMount: /mnt/Mis Datos\n"
+        "Documentation=man:systemd.mount(5)\n"
+        "\n"
+        "[Mount]\n"
+        "What=/dev/disk/by-uuid/0a1b2c3d-0000-4000-8000-000000000001\n"
+        "Where=/mnt/Mis Datos\n"
+        "Type=ext4\n"
+        "Options=noatime\n"
+    )
+    automount = automount_path.read_text()
+    assert "[Automount]\nWhere=/mnt/Mis Datos\nTimeoutIdleSec=120\n" in automount
+    assert automount.endswith("[Install]\nWantedBy=local-fs.target\n")
+    assert dropin.read_text() == f"{GENERATED_MARKER}\n[Unit]\nJobRunningTimeoutSec=5s\n"
+
+
+def test_write_mount_only_units(tmp_path: Path) -> None:
+    writer = SystemdUnitWriter(tmp_path)
+    entry = FstabEntry("/dev/sdb1", "/mnt/100%", "vfat", "uid=1000")
+    created = writer.write(entry, automount=False, device_timeout=None)
+    mount_path = tmp_path / unit_name("/mnt/100%", "mount")
+    assert created == [mount_path, tmp_path / "local-fs.target.wants" / mount_path.name]
+    text = mount_path.read_text()
+    assert "Where=/mnt/100%%\n" in text and "What=/dev/sdb1\n" in text
+    assert text.endswith("[Install]\nWantedBy=local-fs.target\n")
+
+
+def test_write_refuses_existing_units(tmp_path: Path) -> None:
+    writer = SystemdUnitWriter(tmp_path)
+    writer.write(ENTRY)
+    with pytest.raises(RuntimeError, match="Ya existe la unidad"):
+        writer.write(ENTRY)
+
+
+def test_remove_cleans_up_everything(tmp_path: Path) -> None:
+    writer = SystemdUnitWriter(tmp_path)
+    created = writer.write(ENTRY)
+    removed = writer.remove(ENTRY.mountpoint, ENTRY.source)
+    assert sorted(removed) == sorted(created)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_remove_keeps_foreign_units(tmp_path: Path) -> None:
+    foreign = tmp_path / unit_name(ENTRY.mountpoint, "mount")
+    foreign.write_text("[Mount]\nWhat=/dev/sdb1\n")
+    with pytest.raises(RuntimeError, match="no fue generada por AutoMount"):
+        SystemdUnitWriter(tmp_path).remove(ENTRY.mountpoint)
+    assert foreign.exists()
+
+
+@pytest.mark.skipif(shutil.which("systemd-analyze") is None, reason="systemd-analyze no está instalado")
+def test_generated_units_parse(tmp_path: Path) -> None:
+    created = SystemdUnitWriter(tmp_path).write(ENTRY)
+    result = subprocess.run(
+        ["systemd-analyze", "verify", "--man=no", *map(str, created[:2])], capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert "Unknown key" not in result.stderr
@@ -0,0 +1,134 @@
+"""Actualización incremental de tablas sobre un Treeview simulado."""
+
+import random
+from typing import Dict, List
+
+import pytest
+
+from automount_gui_app.device_table import DeviceTable, _BenchTree
+from automount_gui_app.tree_sync import (
+    STRIPE_TAGS,
+    CountingTree,
+    TreeRow,
+    apply_plan,
+    plan_tree,
+    restripe,
+    synthetic_rows,
+)
+
+COLUMNS = ("name", "size", "type", "fstype", "mountpoint")
+
+
+def rendered(tree: CountingTree) -> List[TreeRow]:
+    return [TreeRow(key, tree.items[key]["values"], tree.items[key]["tags"]) for key in tree.get_children()]
+
+
+def loaded(rows: List[TreeRow], stripes: Dict[str, str] = None) -> CountingTree:
+    tree = CountingTree()
+    apply_plan(tree, plan_tree([], rows), stripes)
+    tree.calls = 0
+    return tree
+
+
+def mutate(rows: List[TreeRow], rng: random.Random) -> List[TreeRow]:
+    result = [row for row in rows if rng.random() > 0.1]
+    for index, row in enumerate(result):
+        if rng.random() < 0.1:
+            result[index] = TreeRow(row.key, row.values[:4] + ("/mnt/x",), ("match",) if rng.random() < 0.5 else ())
+    for _ in range(rng.randint(0, 5)):
+        result.insert(rng.randint(0, len(result)), synthetic_rows(1, seed=rng.getrandbits(32))[0])
+    if rng.random() < 0.3 and len(result) > 2:
+        start = rng.randrange(len(result) - 1)
+        result.insert(rng.randrange(len(result)), result.pop(start))
+    return result
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_plan_reaches_target_without_stripes(seed: int) -> None:
+    rng = random.Random(seed)
+    old = synthetic_rows(rng.randint(0, 60), seed=seed)
+    new = mutate(old, rng)
+    tree = loaded(old)
+    plan = plan_tree(old, new)
+    apply_plan(tree, plan)
+    assert rendered(tree) == new
+    assert tree.calls == plan.calls
+
+
+def test_unchanged_rows_cost_nothing() -> None:
+    rows = synthetic_rows(200)
+    plan = plan_tree(rows, list(rows))
+    assert not plan and plan.calls == 0
+
+
+def test_single_insert_and_remove_touch_one_row() -> None:
+    rows = synthetic_rows(200)
+    extra = synthetic_rows(1, seed=99)[0]
+    plan = plan_tree(rows, rows[:100] + [extra] + rows[100:])
+    assert (plan.delete, plan.detach, plan.update) == ([], [], [])
+    assert plan.place == [(100, extra, True)]
+    plan = plan_tree(rows, rows[:100] + rows[101:])
+    assert plan.delete == [rows[100].key] and plan.calls == 1
+
+
+def test_reorder_moves_only_rows_outside_the_longest_run() -> None:
+    rows = synthetic_rows(100)
+    plan = plan_tree(rows, rows[10:] + rows[:10])
+    assert sorted(plan.detach) == sorted(row.key for row in rows[:10])
+    assert [index for index, _, _ in plan.place] == list(range(90, 100))
+
+
+def test_inserted_row_shifts_stripes_only_inside_the_window() -> None:
+    rows = synthetic_rows(200)
+    stripes: Dict[str, str] = {}
+    tree = loaded(rows, stripes)
+    assert [tree.items[row.key]["tags"] for row in rows[:2]] == [("even",), ("odd",)]
+
+    new = rows[:100] + synthetic_rows(1, seed=99) + rows[100:]
+    apply_plan(tree, plan_tree(rows, new), stripes)
+    window = range(90, 120)
+    assert restripe(tree, new, stripes, window) == 19
+    assert tree.calls == 20
+    for position, row in enumerate(new):
+        tags = tree.items[row.key]["tags"]
+        if position in window or position <= 100:
+            assert tags == (STRIPE_TAGS[position % 2],)
+    # Fuera de la ventana la etiqueta queda como estaba hasta que se vea.
+    assert tree.items[new[150].key]["tags"] == (STRIPE_TAGS[149 % 2],)
+    assert restripe(tree, new, stripes, range(len(new))) == len(new) - 120
+
+
+def test_update_keeps_stripe_and_adds_row_tags() -> None:
+    rows = synthetic_rows(4)
+    stripes: Dict[str, str] = {}
+    tree = loaded(rows, stripes)
+    highlighted = TreeRow(rows[1].key, rows[1].values, ("match",))
+    apply_plan(tree, plan_tree(rows, [rows[0], highlighted] + rows[2:]), stripes)
+    assert tree.items[rows[1].key]["tags"] == ("odd", "match")
+    apply_plan(tree, plan_tree(rows, rows[:1] + rows[2:]), stripes)
+    assert rows[1].key not in stripes
+
+
+def test_device_table_stripes_visible_rows_after_hotplug() -> None:
+    tree = _BenchTree(height=20)
+    table = DeviceTable(tree, tree, COLUMNS, COLUMNS, threshold=1000)
+    rows = synthetic_rows(500)
+    table.set_rows(rows)
+    tree.calls = 0
+
+    table.set_rows(rows[:5] + synthetic_rows(1, seed=99) + rows[5:])
+    # Una inserción y las filas visibles que cambian de paridad, no toda la tabla.
+    assert tree.calls <= 21
+    for position, key in enumerate(tree.get_children()[:20]):
+        assert tree.items[key]["tags"] == (STRIPE_TAGS[position % 2],)
+
+
+def test_virtual_table_keeps_stripes_when_scrolling() -> None:
+    tree = _BenchTree(height=20)
+    table = DeviceTable(tree, tree, COLUMNS, COLUMNS, threshold=10)
+    table.set_rows(synthetic_rows(500))
+    tree.calls = 0
+    table.scroll(1)
+    assert tree.calls == 2
+    for position, key in enumerate(tree.get_children(), start=table.first):
+        assert tree.items[key]["tags"] == (STRIPE_TAGS[position % 2],)
@@ -0,0 +1,119 @@
+"""Verificación de fstab en proceso y su coherencia con el análisis de arranque."""
+
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from automount_gui_app.boot_analysis import BootAnalyzer
+from automount_gui_app.constants import NETWORK_FILESYSTEMS, PSEUDO_FILESYSTEMS
+from automount_gui_app.devices import DeviceSnapshot
+from automount_gui_app.drivers import FilesystemSupport
+from automount_gui_app.fstab import FstabDocument
+from automount_gui_app.verifier import SEVERITY_ERROR, SEVERITY_WARNING, FstabVerifier, check_change, synthetic_fstab
+
+ROOT_UUID = "11111111-2222-4333-8444-555555555555"
+DEVICES: List[Dict] = [
+    {"name": "sda", "kname": "sda", "type": "disk", "children": [
+        {"name": "sda1", "kname": "sda1", "type": "part", "uuid": ROOT_UUID, "partuuid": "abcd-01"},
+        {"name": "sda2", "kname": "sda2", "type": "part", "uuid": "AAAA-BBBB", "label": "EFI"},
+        {"name": "sda3", "kname": "sda3", "type": "part", "children": [
+            {"name": "vg-home", "kname": "dm-0", "type": "lvm", "uuid": "99999999-0000-4000-8000-000000000000"},
+        ]},
+    ]},
+]
+
+
+@pytest.fixture
+def verifier(tmp_path: Path) -> FstabVerifier:
+    snapshot = DeviceSnapshot(loader=lambda: DEVICES, partitions_path=tmp_path / "partitions")
+    (tmp_path / "proc").mkdir()
+    (tmp_path / "proc" / "filesystems").write_text("nodev\ttmpfs\nnodev\tproc\n\text4\n\tvfat\nnodev\tfuse\n")
+    support = FilesystemSupport(tmp_path / "proc" / "filesystems", tmp_path / "modules", "prueba", (str(tmp_path),))
+    return FstabVerifier(snapshot, support)
+
+
+def codes(verifier: FstabVerifier, text: str) -> List[tuple]:
+    return [(issue.line_no, issue.severity, issue.code) for issue in verifier.verify(text)]
+
+
+def test_clean_fstab_has_no_issues(verifier: FstabVerifier) -> None:
+    text = (
+        "# /etc/fstab\n"
+        f"UUID={ROOT_UUID} / ext4 defaults,noatime,commit=60 0 1\n"
+        "LABEL=EFI /boot/efi vfat umask=0077,shortname=winnt 0 2\n"
+        "PARTUUID=abcd-01 /mnt/otra ext4 ro 0 0\n"
+        "/dev/mapper/vg-home /home ext4 defaults 0 2\n"
+        "tmpfs /tmp tmpfs size=2G,mode=1777 0 0\n"
+        "proc /proc proc defaults 0 0\n"
+        "/srv/datos /mnt/Mis\\040Datos none bind 0 0\n"
+        "usuario@host:/ /mnt/remoto fuse.sshfs _netdev,noauto 0 0\n"
+    )
+    assert verifier.verify(text) == []
+
+
+@pytest.mark.parametrize(
+    "line,expected",
+    [
+        ("UUID=x", [(SEVERITY_ERROR, "campos")]),
+        ("UUID=x /mnt/Mis Datos ext4 defaults 0 2", [(SEVERITY_ERROR, "campos")]),
+        (f"UUID={ROOT_UUID} /mnt ext4 defaults a 2", [(SEVERITY_ERROR, "numeros")]),
+        (f"UUID={ROOT_UUID} /mnt/a\\x20b ext4 defaults 0 0", [(SEVERITY_ERROR, "escape")]),
+        (f"UUID={ROOT_UUID} mnt ext4 defaults 0 0", [(SEVERITY_ERROR, "destino")]),
+        ("UUID=00000000-dead-4000-8000-000000000000 /mnt ext4 defaults 0 2", [(SEVERITY_WARNING, "origen")]),
+        (f"UUID={ROOT_UUID} /mnt zfs defaults 0 0", [(SEVERITY_WARNING, "tipo")]),
+        (f"UUID={ROOT_UUID} /mnt ext4 defaults,umask=022 0 0", [(SEVERITY_ERROR, "opciones")]),
+        (f"UUID={ROOT_UUID} /mnt ext4 defaults,,noatime 0 0", [(SEVERITY_WARNING, "opciones")]),
+        ("tmpfs /mnt tmpfs defaults 0 2", [(SEVERITY_WARNING, "fsck")]),
+        ("UUID=00000000-dead-4000-8000-000000000000 none swap sw 0 0", [(SEVERITY_WARNING, "origen")]),
+    ],
+)
+def test_single_line_issues(verifier: FstabVerifier, line: str, expected: List[tuple]) -> None:
+    assert [(issue.severity, issue.code) for issue in verifier.verify(line + "\n")] == expected
+
+
+def test_duplicates_and_nesting_order(verifier: FstabVerifier) -> None:
+    text = (
+        f"UUID={ROOT_UUID} /srv/datos/fotos ext4 defaults 0 2\n"
+        f"UUID={ROOT_UUID} /srv/datos ext4 defaults 0 2\n"
+        f"UUID={ROOT_UUID} /srv/datos/ ext4 defaults 0 2\n"
+    )
+    assert codes(verifier, text) == [(1, SEVERITY_ERROR, "orden"), (3, SEVERITY_ERROR, "duplicado")]
+
+
+def test_nofail_is_mentioned_in_missing_source(verifier: FstabVerifier) -> None:
+    issue, = verifier.verify("LABEL=NoEsta /mnt/usb ext4 nofail 0 0\n")
+    assert issue.message.endswith("(tiene nofail)")
+
+
+def test_check_change_only_blocks_new_errors(verifier: FstabVerifier) -> None:
+    before = "UUID=x\n"
+    after = before + "LABEL=NoEsta /mnt/usb ext4 nofail 0 0\n"
+    warnings = check_change(verifier, before, after)
+    assert [issue.code for issue in warnings] == ["origen"]
+    with pytest.raises(RuntimeError, match="no se escribirá"):
+        check_change(verifier, before, after + "LABEL=EFI /mnt/usb vfat defaults 0 0\n")
+
+
+@pytest.mark.parametrize("fstype", sorted(PSEUDO_FILESYSTEMS | NETWORK_FILESYSTEMS))
+def test_verifier_and_boot_analyzer_agree_on_deviceless_types(verifier: FstabVerifier, fstype: str) -> None:
+    line = f"nada-que-buscar /mnt/x {fstype} _netdev,nofail,x-systemd.device-timeout=1s 0 0\n"
+    assert not [issue for issue in verifier.verify(line) if issue.code == "origen"]
+    report, = BootAnalyzer(verifier.snapshot).analyze(FstabDocument(line))
+    assert report.device is None
+    assert not [finding for finding in report.findings if finding.code == "ausente"]
+
+
+def test_ten_thousand_lines_in_milliseconds(verifier: FstabVerifier) -> None:
+    text, devices = synthetic_fstab(10000)
+    snapshot = DeviceSnapshot(loader=lambda: devices)
+    fast = FstabVerifier(snapshot)
+    snapshot.refresh()
+    started = time.perf_counter()
+    issues = fast.verify(text)
+    elapsed = time.perf_counter() - started
+    assert len(text.splitlines()) == 10000
+    assert issues and all(issue.code == "origen" for issue in issues)
+    # Ronda los 50 ms en un portátil; el margen cubre máquinas de CI lentas.
+    assert elapsed < 1.0